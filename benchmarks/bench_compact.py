@@ -0,0 +1,59 @@
+"""Memory footprint of a CV corpus as Pydantic models versus compact records.
+
+Every CV is parsed from its own JSON text, as it would be when loading a
+corpus from disk, so no strings are shared between CVs except through
+interning. Run with::
+
+    python -m benchmarks.bench_compact
+"""
+
+import gc
+import json
+import time
+import tracemalloc
+
+from cv_builder_from_yaml_to_pdf.compact import CompactCV
+from cv_builder_from_yaml_to_pdf.models import CV
+
+from benchmarks.common import make_large_cv
+
+
+CORPUS_SIZE = 5000
+
+
+def corpus_documents(size: int):
+    """Yield JSON documents for a corpus of similar but distinct CVs."""
+    template = make_large_cv(3, roles_per_company=2, achievements_per_role=3).model_dump(mode='json')
+    for i in range(size):
+        template['personal_info']['name'] = f"Candidate {i}"
+        template['personal_info']['email'] = f"candidate{i}@example.com"
+        yield json.dumps(template)
+
+
+def measure(compact: bool, size: int):
+    """Load a corpus and return (bytes per CV, seconds)."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    corpus = []
+    for document in corpus_documents(size):
+        cv = CV.model_validate_json(document)
+        corpus.append(CompactCV.from_model(cv) if compact else cv)
+    elapsed = time.perf_counter() - start
+    del cv
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current / size, elapsed
+
+
+def main():
+    print(f"{'representation':>15} {'KiB per CV':>11} {'MiB per 100k':>13} {'seconds':>8}")
+    for compact in (False, True):
+        per_cv, elapsed = measure(compact, CORPUS_SIZE)
+        name = 'CompactCV' if compact else 'CV (pydantic)'
+        print(f"{name:>15} {per_cv / 1024:>11.1f} {per_cv * 100_000 / 2 ** 20:>13.0f} {elapsed:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
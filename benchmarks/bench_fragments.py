@@ -0,0 +1,63 @@
+"""Cost of parsing CVs that include shared fragments, with and without the fragment cache.
+
+Every CV includes the same company descriptions and skill list. Without the
+cache (``max_entries=0``) each fragment is read and parsed for every document;
+with it each is parsed once. Run with::
+
+    python -m benchmarks.bench_fragments
+"""
+
+import os
+import tempfile
+import time
+
+import yaml
+
+from cv_builder_from_yaml_to_pdf.fragments import FragmentCache, load_yaml
+
+from benchmarks.common import make_large_cv
+
+
+DOCUMENTS = 500
+
+
+def parse(paths, cache: FragmentCache) -> float:
+    """Parse every CV and return the seconds taken."""
+    start = time.perf_counter()
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            load_yaml(f.read(), os.path.dirname(path), cache)
+    return time.perf_counter() - start
+
+
+def main():
+    shared = make_large_cv(8).model_dump(mode='json', exclude_none=True)
+    with tempfile.TemporaryDirectory() as base_dir:
+        os.mkdir(os.path.join(base_dir, 'shared'))
+        for i, company in enumerate(shared['experience']):
+            with open(os.path.join(base_dir, 'shared', f'company{i}.yaml'), 'w') as f:
+                yaml.safe_dump(company, f)
+        with open(os.path.join(base_dir, 'shared', 'skills.yaml'), 'w') as f:
+            yaml.safe_dump({'skills': shared['skills']}, f)
+
+        paths = []
+        for n in range(DOCUMENTS):
+            path = os.path.join(base_dir, f'cv{n}.yaml')
+            document = yaml.safe_dump({'personal_info': {'name': f"Candidate {n}", 'email': "c@example.com"},
+                                       'education': shared['education']})
+            document += "experience:\n" + "".join(f"  - !include shared/company{(n + i) % 8}.yaml\n"
+                                                  for i in range(3))
+            document += "skills: !include shared/skills.yaml#skills\n"
+            with open(path, 'w') as f:
+                f.write(document)
+            paths.append(path)
+
+        print(f"{'fragments':>10} {'ms/doc':>8}")
+        for name, cache in (('uncached', FragmentCache(max_entries=0)), ('cached', FragmentCache())):
+            parse(paths[:10], cache)
+            seconds = parse(paths, cache)
+            print(f"{name:>10} {seconds / DOCUMENTS * 1000:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Cost of a profile photo and company logos per document, with and without the image cache.
+
+Every CV has a photo and the same logo on each of its companies. Without the
+cache (``max_entries=0``) both images are decoded and downscaled for every
+document; with it they are processed once. Run with::
+
+    python -m benchmarks.bench_images
+"""
+
+import io
+import os
+import tempfile
+import time
+
+from PIL import Image
+
+from cv_builder_from_yaml_to_pdf.images import ImageCache
+from cv_builder_from_yaml_to_pdf.pdf_generator import Renderer
+
+from benchmarks.common import make_large_cv
+
+
+DOCUMENTS = 100
+
+
+def render(cv, base_dir: str, cache: ImageCache, count: int) -> float:
+    """Render ``count`` documents and return the seconds taken."""
+    renderer = Renderer(images=cache)
+    start = time.perf_counter()
+    for _ in range(count):
+        renderer.layout(renderer.build_flowables(cv, base_dir), _Discard())
+    return time.perf_counter() - start
+
+
+class _Discard:
+    """Binary file object that drops what is written to it."""
+
+    def write(self, data):
+        return len(data)
+
+    def flush(self):
+        pass
+
+
+def main():
+    with tempfile.TemporaryDirectory() as base_dir:
+        # A phone-camera-sized photo and a large logo with transparency
+        Image.effect_noise((3000, 4000), 64).convert('RGB').save(os.path.join(base_dir, 'photo.jpg'), quality=90)
+        Image.effect_noise((1200, 400), 64).convert('RGBA').save(os.path.join(base_dir, 'logo.png'))
+        cv = make_large_cv(3, roles_per_company=1, achievements_per_role=2)
+        cv.personal_info.photo = 'photo.jpg'
+        for company in cv.experience:
+            company.logo = 'logo.png'
+
+        renderer = Renderer()
+        pdf = io.BytesIO()
+        renderer.layout(renderer.build_flowables(cv, base_dir), pdf)
+        print(f"PDF size: {len(pdf.getvalue()) / 1024:.0f} KiB")
+
+        plain = make_large_cv(3, roles_per_company=1, achievements_per_role=2)
+        print(f"{'images':>10} {'ms/doc':>8}")
+        for name, document, cache in (('none', plain, ImageCache()), ('uncached', cv, ImageCache(max_entries=0)),
+                                      ('cached', cv, ImageCache())):
+            render(document, base_dir, cache, 2)
+            seconds = render(document, base_dir, cache, DOCUMENTS)
+            print(f"{name:>10} {seconds / DOCUMENTS * 1000:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""Peak memory of rendering CVs of increasing size.
+
+Compares the default build, which materialises every flowable before layout,
+with the streaming build. Run with::
+
+    python -m benchmarks.bench_memory
+"""
+
+import os
+import tempfile
+import time
+import tracemalloc
+
+from cv_builder_from_yaml_to_pdf.pdf_generator import CVPDFGenerator
+
+from benchmarks.common import make_large_cv
+
+
+SIZES = [25, 100, 400]
+
+
+def measure(companies: int, streaming: bool):
+    """Render a synthetic CV and return (peak MiB, seconds, pages)."""
+    cv = make_large_cv(companies)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        generator = CVPDFGenerator(os.path.join(temp_dir, 'cv.pdf'), cv, streaming=streaming)
+        tracemalloc.start()
+        start = time.perf_counter()
+        generator.generate()
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return peak / (1024 * 1024), elapsed, generator.doc.page
+
+
+def main():
+    print(f"{'companies':>10} {'pages':>6} {'mode':>10} {'peak MiB':>9} {'seconds':>8}")
+    for companies in SIZES:
+        for streaming in (False, True):
+            peak, elapsed, pages = measure(companies, streaming)
+            mode = 'streaming' if streaming else 'eager'
+            print(f"{companies:>10} {pages:>6} {mode:>10} {peak:>9.1f} {elapsed:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
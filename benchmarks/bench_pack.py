@@ -0,0 +1,47 @@
+"""Time and size of a candidate pack against rendering every CV separately.
+
+Renders 100 generated CVs (2-4 companies each) as separate PDFs, which a
+merging tool would then concatenate, and as one pack with a table of
+contents. Run with::
+
+    python -m benchmarks.bench_pack
+"""
+
+import io
+import time
+
+from cv_builder_from_yaml_to_pdf.pack import Candidate, render_pack
+from cv_builder_from_yaml_to_pdf.pdf_generator import Renderer
+
+from benchmarks.common import make_large_cv
+
+
+CANDIDATES = 100
+
+
+def main():
+    candidates = []
+    for i in range(CANDIDATES):
+        cv = make_large_cv(2 + i % 3, roles_per_company=2, achievements_per_role=3)
+        cv.personal_info.name = f"Candidate {i}"
+        candidates.append(Candidate(title=cv.personal_info.name, source=str(i), cv=cv))
+    renderer = Renderer()
+    # Warm the caches both ways share
+    render_pack(renderer, candidates, io.BytesIO())
+
+    start = time.perf_counter()
+    separate = sum(len(renderer.render(candidate.cv)) for candidate in candidates)
+    separate_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pdf = io.BytesIO()
+    result = render_pack(renderer, candidates, pdf)
+    pack_seconds = time.perf_counter() - start
+
+    print(f"{'build':>9} {'seconds':>8} {'KiB':>6} {'pages':>6}")
+    print(f"{'separate':>9} {separate_seconds:>8.2f} {separate / 1024:>6.0f} {'':>6}")
+    print(f"{'pack':>9} {pack_seconds:>8.2f} {len(pdf.getvalue()) / 1024:>6.0f} {result.pages:>6}")
+
+
+if __name__ == '__main__':
+    main()
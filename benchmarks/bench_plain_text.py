@@ -0,0 +1,48 @@
+"""Flowable construction time with and without reportlab's markup parser.
+
+Builds the flowables of large CVs with every field parsed as paragraph markup,
+as all text used to be, and with the default plain-text path, then renders
+them. Run with::
+
+    python -m benchmarks.bench_plain_text
+"""
+
+import io
+import time
+
+from cv_builder_from_yaml_to_pdf.pdf_generator import MARKUP_FIELDS, Renderer
+from cv_builder_from_yaml_to_pdf.wrap_cache import WrapCache
+
+from benchmarks.common import make_large_cv
+
+
+COMPANIES = 100
+REPEATS = 5
+
+
+def measure(renderer: Renderer, cv) -> tuple:
+    """Build the CV's flowables and lay them out, returning the best seconds for each."""
+    build = layout = float('inf')
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        flowables = list(renderer.build_flowables(cv))
+        build = min(build, time.perf_counter() - start)
+        count = len(flowables)
+        start = time.perf_counter()
+        renderer.layout(flowables, io.BytesIO())
+        layout = min(layout, time.perf_counter() - start)
+    return build, layout, count
+
+
+def main():
+    cv = make_large_cv(COMPANIES)
+    print(f"{'text':>7} {'flowables':>9} {'build ms':>9} {'layout ms':>10}")
+    for name, fields in (('markup', MARKUP_FIELDS), ('plain', ())):
+        # Without line-break caching, so that both paths wrap every paragraph
+        renderer = Renderer(markup_fields=fields, wrap_cache=WrapCache(max_entries=0))
+        build, layout, count = measure(renderer, cv)
+        print(f"{name:>7} {count:>9} {build * 1000:>9.1f} {layout * 1000:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Per-document overhead of ``generate_cv_pdf`` versus a long-lived ``Renderer``.
+
+The one-shot path resolves the style sheet, page size and page templates for
+every document; the renderer does that once. Setup (everything before layout)
+is timed on its own because for typical CVs layout dominates the total and
+varies more between runs than the setup being removed. Run with::
+
+    python -m benchmarks.bench_renderer
+"""
+
+import io
+import time
+
+from cv_builder_from_yaml_to_pdf.pdf_generator import CVPDFGenerator, Renderer
+
+from benchmarks.common import make_large_cv
+
+
+DOCUMENTS = 200
+
+
+def setup_one_shot(cv, count: int) -> float:
+    """Configure a generator and its document ``count`` times."""
+    start = time.perf_counter()
+    for _ in range(count):
+        CVPDFGenerator(None, cv).build_flowables()
+    return time.perf_counter() - start
+
+
+def setup_reused(cv, count: int) -> float:
+    """Create ``count`` documents from one renderer."""
+    renderer = Renderer()
+    start = time.perf_counter()
+    for _ in range(count):
+        renderer.create_document(io.BytesIO())
+        renderer.build_flowables(cv)
+    return time.perf_counter() - start
+
+
+def one_shot(cv, count: int) -> float:
+    """Render ``count`` documents, configuring a new generator for each."""
+    start = time.perf_counter()
+    for _ in range(count):
+        generator = CVPDFGenerator(None, cv)
+        generator.layout(list(generator.build_flowables()), io.BytesIO())
+    return time.perf_counter() - start
+
+
+def reused(cv, count: int) -> float:
+    """Render ``count`` documents with one renderer."""
+    start = time.perf_counter()
+    renderer = Renderer()
+    for _ in range(count):
+        renderer.render(cv)
+    return time.perf_counter() - start
+
+
+def main():
+    cv = make_large_cv(1, roles_per_company=2, achievements_per_role=3)
+    # Warm up imports and font metrics
+    reused(cv, 5)
+    print(f"{'phase':>8} {'one-shot ms/doc':>16} {'renderer ms/doc':>16}")
+    for phase, before, after in (('setup', setup_one_shot, setup_reused), ('render', one_shot, reused)):
+        before_ms = before(cv, DOCUMENTS) / DOCUMENTS * 1000
+        after_ms = after(cv, DOCUMENTS) / DOCUMENTS * 1000
+        print(f"{phase:>8} {before_ms:>16.3f} {after_ms:>16.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""Indexing and search time for a corpus of CV files.
+
+Writes a corpus of similar JSON CVs with varied skills and employers, then
+times a full index, a re-index with nothing changed, a re-index after 1% of
+the files changed, and queries against the index compared with parsing every
+file to answer the same query. Run with::
+
+    python -m benchmarks.bench_search_index
+"""
+
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from cv_builder_from_yaml_to_pdf.models import CV
+from cv_builder_from_yaml_to_pdf.search_index import CVIndex, find_sources
+from cv_builder_from_yaml_to_pdf.yaml_parser import parse_yaml_file
+
+from benchmarks.common import make_large_cv
+
+
+CORPUS_SIZE = 5000
+WORKERS = min(4, os.cpu_count() or 1)
+QUERY_REPEATS = 50
+
+SKILLS = ["Python", "Go", "Rust", "C++", "Java", "Kubernetes", "Terraform", "PostgreSQL", "Kafka", "React",
+          "TypeScript", "Spark", "Airflow", "gRPC", "Redis", "Elixir", "Haskell", "OCaml", "Scala", "Swift"]
+QUERIES = [('skills', 'kubernetes'), ('skills', '"C++" AND rust'), ('companies', 'globex'),
+           ('achievements', 'latency'), ('all fields', 'hask*')]
+
+
+def write_corpus(directory: str, size: int):
+    """Write ``size`` JSON CVs with varied names, skills and companies."""
+    rng = random.Random(0)
+    template = make_large_cv(3, roles_per_company=2, achievements_per_role=3).model_dump(mode='json')
+    for i in range(size):
+        template['personal_info']['name'] = f"Candidate {i}"
+        template['skills'] = [{'category': "Engineering", 'name': skill} for skill in rng.sample(SKILLS, 6)]
+        for company in template['experience']:
+            company['company'] = rng.choice(["Initech", "Globex", "Umbrella", "Hooli", "Acme"]) + f" {i % 97}"
+        with open(os.path.join(directory, f"cv{i:05}.json"), 'w') as f:
+            f.write(CV.model_validate(template).model_dump_json(exclude_none=True))
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def scan(sources, skill: str) -> int:
+    """Answer a skill query by parsing and validating every file."""
+    return sum(any(s.name.lower() == skill for s in CV.model_validate(parse_yaml_file(path)).skills or [])
+               for path in sources)
+
+
+def main():
+    with tempfile.TemporaryDirectory(prefix="cv-builder-index-") as directory:
+        corpus = os.path.join(directory, 'corpus')
+        os.mkdir(corpus)
+        write_corpus(corpus, CORPUS_SIZE)
+        sources = find_sources([corpus])
+
+        with CVIndex(os.path.join(directory, 'index.db')) as index:
+            print(f"{'update':>22} {'seconds':>8}")
+            for name, workers in ((f"full, {WORKERS} worker(s)", WORKERS), ("nothing changed", 1)):
+                elapsed, _ = timed(lambda: list(index.update(sources, workers=workers)))
+                print(f"{name:>22} {elapsed:>8.2f}")
+            for path in sources[::100]:
+                with open(path, 'a') as f:
+                    f.write("\n")
+            elapsed, _ = timed(lambda: list(index.update(sources)))
+            print(f"{'1% changed':>22} {elapsed:>8.2f}")
+
+            print(f"\n{'field':>12} {'query':>18} {'hits':>5} {'ms':>6}")
+            for field, query in QUERIES:
+                fields = [] if field == 'all fields' else [field]
+                times = []
+                for _ in range(QUERY_REPEATS):
+                    elapsed, hits = timed(lambda: index.search(query, fields=fields, limit=20))
+                    times.append(elapsed)
+                print(f"{field:>12} {query:>18} {len(hits):>5} {statistics.median(times) * 1000:>6.2f}")
+
+        elapsed, matches = timed(lambda: scan(sources, 'kubernetes'))
+        print(f"\nScanning every file for kubernetes: {matches} CVs in {elapsed:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
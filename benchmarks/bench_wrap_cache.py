@@ -0,0 +1,48 @@
+"""Render time with and without the paragraph line-break cache.
+
+Renders a corpus of generated CVs, which share headings, skill categories,
+company names and date lines but differ in their names, in every style. Run
+with::
+
+    python -m benchmarks.bench_wrap_cache
+"""
+
+import time
+
+from cv_builder_from_yaml_to_pdf.pdf_generator import Renderer
+from cv_builder_from_yaml_to_pdf.wrap_cache import WrapCache
+
+from benchmarks.common import make_large_cv
+
+
+DOCUMENTS = 30
+STYLES = ('classic', 'modern', 'minimal')
+
+
+def render_corpus(cache: WrapCache) -> float:
+    """Render the corpus in every style and return the seconds taken."""
+    cvs = []
+    for i in range(DOCUMENTS):
+        cv = make_large_cv(2 + i % 4, roles_per_company=2, achievements_per_role=3)
+        cv.personal_info.name = f"Candidate {i}"
+        cvs.append(cv)
+    renderers = [Renderer(style, wrap_cache=cache) for style in STYLES]
+    start = time.perf_counter()
+    for cv in cvs:
+        for renderer in renderers:
+            renderer.render(cv)
+    return time.perf_counter() - start
+
+
+def main():
+    render_corpus(WrapCache(max_entries=0))
+    documents = DOCUMENTS * len(STYLES)
+    print(f"{'cache':>6} {'ms/doc':>8} {'hit rate':>9}")
+    for name, cache in (('off', WrapCache(max_entries=0)), ('on', WrapCache())):
+        seconds = render_corpus(cache)
+        hit_rate = f"{cache.stats()['hit_rate']:.1%}" if cache.max_entries else "-"
+        print(f"{name:>6} {seconds / documents * 1000:>8.2f} {hit_rate:>9}")
+
+
+if __name__ == '__main__':
+    main()
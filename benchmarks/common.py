@@ -0,0 +1,53 @@
+"""Shared helpers for the CV Builder benchmarks."""
+
+from cv_builder_from_yaml_to_pdf.models import CV
+
+
+def make_large_cv(companies: int, roles_per_company: int = 4, achievements_per_role: int = 5) -> CV:
+    """Build a synthetic CV whose rendered size grows with ``companies``.
+    
+    Args:
+        companies: Number of company entries
+        roles_per_company: Number of roles at each company
+        achievements_per_role: Number of achievements listed for each role
+        
+    Returns:
+        CV model
+    """
+    experience = []
+    for c in range(companies):
+        roles = []
+        for r in range(roles_per_company):
+            roles.append({
+                'title': f"Senior Research Engineer {r}",
+                'start_date': f"{2000 + r}-01",
+                'end_date': f"{2001 + r}-12",
+                'location': "Cambridge, UK",
+                'description': "Led a team working on distributed systems, data pipelines and "
+                               "numerical methods for large-scale simulation. " * 2,
+                'achievements': [
+                    f"Achievement {a} at company {c}: reduced processing latency by {a + 10}% "
+                    f"through careful profiling and targeted optimisation of hot paths."
+                    for a in range(achievements_per_role)
+                ],
+            })
+        experience.append({'company': f"Company {c}", 'location': "London, UK", 'roles': roles})
+
+    return CV.model_validate({
+        'personal_info': {
+            'name': "Benchmark Candidate",
+            'email': "bench@example.com",
+            'summary': "Researcher and engineer.\nInterested in performance.",
+        },
+        'education': [
+            {'institution': "University", 'degree': "PhD Computer Science", 'start_date': "1995"},
+        ],
+        'experience': experience,
+        'skills': [
+            {'category': f"Category {i % 5}", 'name': f"Skill {i}"} for i in range(40)
+        ],
+        'projects': [
+            {'name': f"Project {i}", 'description': "An open-source tool.", 'technologies': ["Python", "C"]}
+            for i in range(companies)
+        ],
+    })
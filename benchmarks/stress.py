@@ -0,0 +1,390 @@
+"""Stress test of the render pipeline with pathological CVs.
+
+Generates adversarial CVs (unbroken 5,000-character words, hundreds of roles
+at one company, thousands of skills, markup characters, right-to-left and
+combining text, huge custom sections) and renders each one through the full
+pipeline in a worker process, under a time and a memory budget. Cases that
+raise, run out of time or use too much memory are minimised: parts of the CV
+are removed or shortened for as long as the case still fails the same way.
+The minimised CVs are written as YAML files that ``cv-builder generate``
+reproduces. Run with::
+
+    python -m benchmarks.stress --cases 200 --seed 1
+
+Every case is generated from ``<seed>-<case>``, so ``--seed 1 --first 57
+--cases 1`` runs case 57 of seed 1 again. Memory is how much a render grows
+the peak resident set size of the process it runs in.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import resource
+import string
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import yaml
+
+from cv_builder_from_yaml_to_pdf.pipeline import CVValidationError, RenderPipeline
+
+
+STYLES = ('classic', 'modern', 'minimal')
+PAGE_SIZES = ('A4', 'letter')
+
+# Outcomes of a case; errors are reported as 'error:<exception type>'
+OK = 'ok'
+INVALID = 'invalid'
+TIMEOUT = 'timeout'
+MEMORY = 'memory'
+
+DEFAULT_TIME_BUDGET = 10.0
+DEFAULT_MEMORY_BUDGET = 256  # MiB
+
+_WORDS = ("design", "latency", "pipeline", "distributed", "Kubernetes", "optimised", "throughput", "migration",
+          "p99", "team", "customers", "revenue", "reliability", "on-call", "PostgreSQL", "rewrite")
+_UNICODE = ("naïve", "Zoë", "Łódź", "東京都", "데이터", "עברית", "العربية", "e\u0301\u0301\u0301", "🚀🔥",
+            "a\u200bb", "\u00a0", "\ufeff", "\u202e", "\ufb01")
+_MARKUP = ("AT&T", "a < b", "x > y", "<b>", "</i>", "&nbsp;", "<font size=80>", "C&amp;C", "<br/>", "&#9999999;")
+
+
+# Largest size of each dimension of a case when it is stressed, and otherwise
+_LIMITS = {
+    'companies': (40, 3),
+    'roles': (300, 3),
+    'achievements': (200, 4),
+    'education': (100, 2),
+    'skills': (3000, 20),
+    'categories': (300, 5),
+    'projects': (200, 3),
+    'technologies': (300, 5),
+    'custom_sections': (200, 2),
+    'words': (3000, 30),
+    'word_length': (5000, 12),
+}
+
+# Shapes of generated text
+_SHAPES = ('prose', 'unbroken', 'lines', 'unicode', 'markup', 'blank', 'url')
+
+
+class _Profile:
+    """Which dimensions and text shapes one case stresses.
+
+    Stressing a random subset of features per case ("swarm testing") keeps
+    one common failure, such as markup characters, from masking the others,
+    and keeps cases from being huge in every dimension at once.
+    """
+
+    def __init__(self, rng: random.Random, scale: float):
+        self.rng = rng
+        self.limits = {name: max(1, int(big * scale)) if rng.random() < 0.25 else small
+                       for name, (big, small) in _LIMITS.items()}
+        self.shapes = [shape for shape in _SHAPES[1:] if rng.random() < 0.3] + ['prose']
+        self.stressed = sorted(name for name, (big, small) in _LIMITS.items()
+                               if self.limits[name] != small) + self.shapes[:-1]
+
+    def size(self, dimension: str) -> int:
+        """Draw a size in [1, limit], log-uniformly so most are small and a few are at the limit."""
+        return int(self.limits[dimension] ** self.rng.random() + 0.5)
+
+    def text(self) -> str:
+        """Draw a piece of text in one of the case's shapes."""
+        rng = self.rng
+        shape = rng.choice(self.shapes)
+        if shape == 'unbroken':
+            # One unbroken word, as left by copy-pasted tokens
+            return rng.choice(string.ascii_letters) * self.size('word_length')
+        if shape == 'lines':
+            return "\n".join(rng.choice(_WORDS) for _ in range(self.size('words')))
+        if shape == 'unicode':
+            return " ".join(rng.choice(_UNICODE + _WORDS) for _ in range(self.size('words')))
+        if shape == 'markup':
+            return " ".join(rng.choice(_MARKUP + _WORDS) for _ in range(self.size('words')))
+        if shape == 'blank':
+            return rng.choice(("", " ", "\n\n\n", "\t"))
+        if shape == 'url':
+            return "https://example.com/" + "/".join(rng.choice(_WORDS) for _ in range(self.size('words')))
+        return " ".join(rng.choice(_WORDS) for _ in range(self.size('words')))
+
+    def texts(self, dimension: str) -> List[str]:
+        """Draw a list of texts whose length is drawn from ``dimension``."""
+        return [self.text() for _ in range(self.size(dimension))]
+
+    def optional(self, value):
+        """Return the value or, half of the time, None."""
+        return value if self.rng.random() < 0.5 else None
+
+
+def generate_case(rng: random.Random, scale: float = 1.0) -> Tuple[Dict[str, Any], List[str]]:
+    """Generate adversarial CV data that still matches the CV schema.
+
+    Args:
+        rng: Random number generator the case is drawn from
+        scale: Multiplier for the limits of stressed dimensions
+
+    Returns:
+        CV data, as parsed from YAML, and the names of the dimensions and
+        text shapes the case stresses
+    """
+    profile = _Profile(rng, scale)
+    text, optional = profile.text, profile.optional
+    experience = [{
+        'company': text(),
+        'location': optional(text()),
+        'roles': [{
+            'title': text(),
+            'start_date': "2015-01",
+            'end_date': optional(text()),
+            'location': optional(text()),
+            'description': optional(text()),
+            'achievements': optional(profile.texts('achievements')),
+        } for _ in range(profile.size('roles'))],
+    } for _ in range(profile.size('companies'))]
+    categories = profile.texts('categories')
+    data = {
+        'personal_info': {
+            'name': text(),
+            'email': "stress@example.com",
+            'phone': optional(text()),
+            'location': optional(text()),
+            'title': optional(text()),
+            'summary': optional(text()),
+        },
+        'education': [{'institution': text(), 'degree': text(), 'start_date': "2010", 'details': optional(text())}
+                      for _ in range(profile.size('education'))],
+        'experience': experience,
+        'skills': [{'category': rng.choice(categories), 'name': text()} for _ in range(profile.size('skills'))],
+        'projects': [{'name': text(), 'description': optional(text()),
+                      'technologies': optional(profile.texts('technologies'))}
+                     for _ in range(profile.size('projects'))],
+        'custom_sections': {f"section {i}": profile.texts('achievements')
+                            for i in range(profile.size('custom_sections'))},
+    }
+    return data, profile.stressed
+
+
+def _peak_rss() -> int:
+    """Get the peak resident set size of this process in bytes."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _render(connection, data: Dict[str, Any], style: str, page_size: str):
+    """Render a case and send (outcome, seconds, peak growth in bytes, error message)."""
+    baseline = _peak_rss()
+    start = time.perf_counter()
+    error = None
+    try:
+        RenderPipeline(style, page_size).run(data=data)
+        outcome = OK
+    except CVValidationError as e:
+        outcome, error = INVALID, str(e)
+    except Exception as e:
+        outcome, error = f"error:{type(e).__name__}", str(e)[:500]
+    connection.send((outcome, time.perf_counter() - start, _peak_rss() - baseline, error))
+
+
+class CaseRunner:
+    """Renders each case in a fresh child process, killed when it runs out of time.
+
+    Children are forked where possible, so starting one costs milliseconds
+    and nothing, including the line-break and image caches, carries over
+    from one case to the next.
+    """
+
+    def __init__(self, time_budget: float = DEFAULT_TIME_BUDGET, memory_budget: int = DEFAULT_MEMORY_BUDGET):
+        """Initialize the runner.
+
+        Args:
+            time_budget: Seconds a case may take
+            memory_budget: MiB a case may grow the process's peak resident set size by
+        """
+        self.time_budget = time_budget
+        self.memory_budget = memory_budget * 1024 * 1024
+        methods = multiprocessing.get_all_start_methods()
+        self._context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+
+    def run(self, data: Dict[str, Any], style: str = 'classic',
+            page_size: str = 'A4') -> Tuple[str, float, int, Optional[str]]:
+        """Render one case.
+
+        Returns:
+            (outcome, seconds, peak memory growth in bytes, error message); a
+            timed out case reports the budget and no memory
+        """
+        receiver, sender = self._context.Pipe(duplex=False)
+        process = self._context.Process(target=_render, args=(sender, data, style, page_size), daemon=True)
+        process.start()
+        sender.close()
+        try:
+            if not receiver.poll(self.time_budget):
+                process.kill()
+                return TIMEOUT, self.time_budget, 0, None
+            try:
+                outcome, seconds, peak, error = receiver.recv()
+            except EOFError:
+                # The child died, e.g. killed by the OOM killer
+                return MEMORY, 0.0, 0, f"render process died with exit code {process.exitcode}"
+        finally:
+            process.join()
+            receiver.close()
+        if outcome == OK and peak > self.memory_budget:
+            outcome = MEMORY
+        return outcome, seconds, peak, error
+
+
+class _OutOfAttempts(Exception):
+    """Raised when minimising has tried as many variants as it may."""
+
+
+class _Shrinker:
+    """Greedy minimiser of JSON-like data.
+
+    Walks the data depth first. Lists and strings lose ever smaller chunks
+    (all of it, halves, quarters, ... single items) while the result still fails, as in
+    delta debugging; dictionaries lose keys. Every removal that keeps the
+    failure is kept, so no variant is tried twice.
+    """
+
+    def __init__(self, value, fails: Callable[[Any], bool], max_attempts: int):
+        self.best = value
+        self.fails = fails
+        self.attempts = max_attempts
+
+    def _try(self, candidate) -> bool:
+        if self.attempts <= 0:
+            raise _OutOfAttempts()
+        self.attempts -= 1
+        if self.fails(candidate):
+            self.best = candidate
+            return True
+        return False
+
+    def shrink(self, root, path: Tuple = ()):
+        """Minimise the part of ``root`` at ``path`` and return the new root."""
+        node = _get(root, path)
+        if isinstance(node, (list, str)):
+            chunk = len(node)
+            while chunk >= 1:
+                start = 0
+                while start < len(node):
+                    smaller = node[:start] + node[start + chunk:]
+                    candidate = _replace(root, path, smaller)
+                    if self._try(candidate):
+                        root, node = candidate, smaller
+                    else:
+                        start += chunk
+                chunk //= 2
+            if isinstance(node, list):
+                for index in range(len(node)):
+                    root = self.shrink(root, path + (index,))
+        elif isinstance(node, dict):
+            for key in list(node):
+                candidate = _replace(root, path, {k: v for k, v in node.items() if k != key})
+                if self._try(candidate):
+                    root, node = candidate, _get(candidate, path)
+                else:
+                    root = self.shrink(root, path + (key,))
+                    node = _get(root, path)
+        return root
+
+
+def _get(value, path: Tuple):
+    """Get the part of ``value`` at ``path``."""
+    for key in path:
+        value = value[key]
+    return value
+
+
+def _replace(value, path: Tuple, new):
+    """Copy ``value`` with the part at ``path`` replaced, sharing everything else."""
+    if not path:
+        return new
+    key, rest = path[0], path[1:]
+    if isinstance(value, list):
+        return value[:key] + [_replace(value[key], rest, new)] + value[key + 1:]
+    return {**value, key: _replace(value[key], rest, new)}
+
+
+def shrink(value, fails: Callable[[Any], bool], max_attempts: int = 500):
+    """Minimise a failing value.
+
+    Args:
+        value: JSON-like data that fails
+        fails: Whether a variant still fails the same way
+        max_attempts: Most variants to try
+
+    Returns:
+        The smallest failing value found
+    """
+    shrinker = _Shrinker(value, fails, max_attempts)
+    try:
+        # Removing one part can make others removable, so repeat until nothing changes
+        while True:
+            previous = shrinker.best
+            if shrinker.shrink(previous) == previous:
+                break
+    except _OutOfAttempts:
+        pass
+    return shrinker.best
+
+
+def _describe(data: Dict[str, Any]) -> str:
+    """Describe the size of a case."""
+    return f"{len(json.dumps(data)):,} bytes of JSON"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--cases', type=int, default=100, help='number of cases to run')
+    parser.add_argument('--seed', default='0', help='seed the cases are derived from')
+    parser.add_argument('--first', type=int, default=0, help='number of the first case')
+    parser.add_argument('--scale', type=float, default=1.0, help='multiplier for generated sizes')
+    parser.add_argument('--time-budget', type=float, default=DEFAULT_TIME_BUDGET, help='seconds per case')
+    parser.add_argument('--memory-budget', type=int, default=DEFAULT_MEMORY_BUDGET, help='MiB per case')
+    parser.add_argument('--shrink-attempts', type=int, default=300, help='renders spent minimising each failure')
+    parser.add_argument('--out', default='stress-failures', help='directory for the minimised failing CVs')
+    args = parser.parse_args()
+
+    runner = CaseRunner(args.time_budget, args.memory_budget)
+    outcomes: Dict[str, int] = {}
+    slowest = []
+    for number in range(args.first, args.first + args.cases):
+        rng = random.Random(f"{args.seed}-{number}")
+        data, stressed = generate_case(rng, args.scale)
+        style, page_size = rng.choice(STYLES), rng.choice(PAGE_SIZES)
+        outcome, seconds, peak, error = runner.run(data, style, page_size)
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        slowest.append((seconds, number))
+        print(f"case {number:>5}: {outcome:<20} {seconds:>7.2f}s {peak / 2**20:>7.1f} MiB  "
+              f"{_describe(data)}, stressing {', '.join(stressed) or 'nothing'}")
+        if outcome in (OK, INVALID):
+            continue
+
+        def fails(candidate):
+            nonlocal error
+            result = runner.run(candidate, style, page_size)
+            if result[0] != outcome:
+                return False
+            error = result[3]
+            return True
+
+        minimal = shrink(data, fails, args.shrink_attempts)
+        os.makedirs(args.out, exist_ok=True)
+        path = os.path.join(args.out, f"{args.seed}-{number}-{outcome.replace(':', '-')}.yaml")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(f"# {outcome} with --style {style} --page-size {page_size}\n")
+            if error:
+                f.write("".join(f"# {line}\n" for line in error.splitlines()[:5]))
+            yaml.safe_dump(minimal, f, allow_unicode=True, sort_keys=False)
+        print(f"            minimised to {_describe(minimal)}: {path}")
+
+    print("\noutcomes: " + ", ".join(f"{name} {count}" for name, count in sorted(outcomes.items())))
+    print("slowest: " + ", ".join(f"case {number} ({seconds:.2f}s)" for seconds, number in sorted(slowest)[::-1][:5]))
+
+
+if __name__ == '__main__':
+    main()
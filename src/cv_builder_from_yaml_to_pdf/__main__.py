@@ -0,0 +1,5 @@
+"""Allow running CV Builder with ``python -m cv_builder_from_yaml_to_pdf``."""
+
+from cv_builder_from_yaml_to_pdf.main import main
+
+main()
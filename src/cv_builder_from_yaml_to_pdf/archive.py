@@ -0,0 +1,135 @@
+"""Archive output for CV Builder batches.
+
+This module writes the PDFs of a batch straight into a ``.zip`` or ``.tar``
+archive as the results arrive, without writing each PDF to disk first. Only
+the results in flight are held in memory. The archive ends with a
+``manifest.json`` member that lists the source, SHA-256 hash, page count and
+size of every member, plus the documents that failed.
+"""
+
+import io
+import json
+import tarfile
+import time
+import zipfile
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from cv_builder_from_yaml_to_pdf.batch import BatchResult, output_name, STATUS_OK
+
+
+MANIFEST_NAME = "manifest.json"
+
+# Suffixes of the supported archives and the tarfile mode for each tar variant
+ARCHIVE_FORMATS = {
+    ".zip": None,
+    ".tar": "w",
+    ".tar.gz": "w:gz",
+    ".tgz": "w:gz",
+}
+
+
+def archive_mode(path: str) -> Optional[str]:
+    """Get the tarfile mode for an archive path (None for zip files).
+
+    Raises:
+        ValueError: If the path does not end with a supported suffix
+    """
+    name = str(path).lower()
+    for suffix, mode in ARCHIVE_FORMATS.items():
+        if name.endswith(suffix):
+            return mode
+    raise ValueError(f"Unsupported archive: {path}. Use one of: {', '.join(ARCHIVE_FORMATS)}")
+
+
+class ArchiveWriter:
+    """Writes rendered PDFs into a zip or tar archive, followed by a manifest."""
+
+    def __init__(self, path: str):
+        """Open the archive for writing.
+
+        Args:
+            path: Path of the archive; the format follows the suffix
+                (.zip, .tar, .tar.gz or .tgz)
+
+        Raises:
+            ValueError: If the suffix is not supported
+        """
+        self.path = str(path)
+        mode = archive_mode(self.path)
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        if mode is None:
+            self._zip = zipfile.ZipFile(self.path, "w", compression=zipfile.ZIP_DEFLATED)
+            self._tar = None
+        else:
+            self._zip = None
+            self._tar = tarfile.open(self.path, mode)
+        self.members: List[Dict] = []
+        self.failures: List[Dict] = []
+        self._names: Set[str] = {MANIFEST_NAME}
+
+    def _member_name(self, result: BatchResult) -> str:
+        """Get a unique member name for a result, named like the file it would be written to."""
+        name = result.output_name or output_name(result.source)
+        stem, n = name[:-len(".pdf")], 2
+        while name in self._names:
+            name, n = f"{stem}-{n}.pdf", n + 1
+        self._names.add(name)
+        return name
+
+    def _write(self, name: str, data: bytes):
+        if self._zip is not None:
+            info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED
+            self._zip.writestr(info, data)
+        else:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = int(time.time())
+            self._tar.addfile(info, io.BytesIO(data))
+
+    def add(self, result: BatchResult) -> Optional[str]:
+        """Add the PDF of a result to the archive and record it in the manifest.
+
+        The PDF is dropped from the result once written. Failed results are
+        only recorded in the manifest.
+
+        Args:
+            result: Result rendered without an output path, so ``pdf`` holds the PDF
+
+        Returns:
+            The member name, or None if the document failed
+
+        Raises:
+            ValueError: If a successful result carries no PDF
+        """
+        if result.status != STATUS_OK:
+            self.failures.append({"source": result.source, "status": result.status, "error": result.error})
+            return None
+        if result.pdf is None:
+            raise ValueError(f"No PDF to archive for {result.source}; render it without an output path")
+        name = self._member_name(result)
+        self._write(name, result.pdf)
+        result.pdf = None
+        self.members.append({"name": name, "source": result.source, "sha256": result.sha256,
+                             "pages": result.pages, "bytes": result.bytes})
+        return name
+
+    def close(self):
+        """Write the manifest and close the archive."""
+        if self._zip is None and self._tar is None:
+            return
+        manifest = {"members": self.members, "failures": self.failures}
+        self._write(MANIFEST_NAME, json.dumps(manifest, indent=2).encode("utf-8"))
+        if self._zip is not None:
+            self._zip.close()
+            self._zip = None
+        else:
+            self._tar.close()
+            self._tar = None
+
+    def __enter__(self) -> "ArchiveWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,421 @@
+"""Batch rendering for CV Builder.
+
+This module renders many CV files with a pool of worker processes or threads.
+Each worker process builds one ``RenderPipeline`` when it starts and reuses it
+for every document it is given; worker threads all share a single pipeline.
+Only a bounded number of documents is in flight at a time, so sources are read
+lazily and finished PDFs do not pile up while an earlier document is slow.
+
+With ``RenderLimits`` that need process isolation, each worker thread drives
+its own ``RenderSandbox`` process instead, which is killed and replaced when
+a document exceeds its limits.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import yaml
+from pydantic import BaseModel, Field
+
+from cv_builder_from_yaml_to_pdf.images import ImagePathError
+from cv_builder_from_yaml_to_pdf.limits import RenderLimits, RenderSandbox, ResourceLimitExceeded, limit_of
+from cv_builder_from_yaml_to_pdf.memprofile import MemoryProfiler
+from cv_builder_from_yaml_to_pdf.metrics import METRICS
+from cv_builder_from_yaml_to_pdf.pipeline import CVValidationError, RenderContext, RenderPipeline
+from cv_builder_from_yaml_to_pdf.profiling import RenderProfiler
+from cv_builder_from_yaml_to_pdf.sources import Record
+
+
+STATUS_OK = "ok"
+STATUS_INVALID = "invalid"
+STATUS_ERROR = "error"
+# A resource limit was exceeded; see ``BatchResult.limit``
+STATUS_LIMIT = "limit"
+
+EXECUTOR_PROCESS = "process"
+EXECUTOR_THREAD = "thread"
+EXECUTORS = (EXECUTOR_PROCESS, EXECUTOR_THREAD)
+
+
+class BatchResult(BaseModel):
+    """Model for the outcome of rendering one document in a batch."""
+    source: str = Field(description="Path of the source YAML or JSON file, or the key of a record.")
+    output_path: Optional[str] = Field(default=None, description="Path of the generated PDF, if any.")
+    output_name: Optional[str] = Field(default=None, description="File name for the PDF, derived from the source.")
+    status: str = Field(description="One of ok, invalid, limit or error.")
+    error: Optional[str] = Field(default=None, description="Error message if the document failed.")
+    limit: Optional[str] = Field(default=None, description="Resource limit the document exceeded, e.g. timeout.")
+    duration: float = Field(description="Time spent on the document in seconds.")
+    pages: Optional[int] = Field(default=None, description="Number of pages in the generated PDF.")
+    # Declared before the ``bytes`` field, which shadows the builtin in the class body
+    pdf: Optional[bytes] = Field(default=None, exclude=True,
+                                 description="The PDF itself, when it was rendered without an output path.")
+    bytes: Optional[int] = Field(default=None, description="Size of the generated PDF in bytes.")
+    sha256: Optional[str] = Field(default=None, description="SHA-256 hex digest of the generated PDF.")
+    timings: Dict[str, float] = Field(default_factory=dict, description="Seconds spent in each pipeline stage.")
+    error_locations: List[Tuple] = Field(default_factory=list,
+                                         description="Locations of validation errors in the CV data.")
+    cache_requests: Dict[str, Dict[str, int]] = Field(
+        default_factory=dict, exclude=True,
+        description="Cache lookups made by a worker process for this document, by cache and result.")
+
+
+def output_name(source: Union[str, Record]) -> str:
+    """Get the PDF file name for a source file or record."""
+    if isinstance(source, Record):
+        return f"{source.name}.pdf"
+    return Path(source).with_suffix('.pdf').name
+
+
+def output_path_for(source: Union[str, Record], output_dir: str) -> str:
+    """Get the PDF path for a source file or record in the output directory."""
+    return str(Path(output_dir) / output_name(source))
+
+
+def _source_label(source: Union[str, Record]) -> str:
+    return source.key if isinstance(source, Record) else str(source)
+
+
+def _unique_outputs(tasks: Iterable[Tuple[Union[str, Record], Optional[str]]]) -> Iterator[Tuple]:
+    """Pass (source, output path) tasks through, raising before a task whose output an earlier one writes."""
+    writers: Dict[str, str] = {}
+    for source, output_path in tasks:
+        if output_path is not None:
+            key = os.path.normcase(os.path.abspath(output_path))
+            label = _source_label(source)
+            if key in writers:
+                if writers[key] == label:
+                    raise ValueError(f"{label} is given more than once")
+                raise ValueError(f"{label} and {writers[key]} would both be written to {output_path}")
+            writers[key] = label
+        yield source, output_path
+
+
+def check_outputs(sources: Iterable[Union[str, Record]], output_dir: str):
+    """Check that no two sources would be rendered to the same PDF in ``output_dir``.
+
+    PDFs are named after the source file only, so ``a/jane.yaml`` and
+    ``b/jane.yaml`` would overwrite each other.
+
+    Raises:
+        ValueError: If two sources share an output path
+    """
+    for _ in _unique_outputs((source, output_path_for(source, output_dir)) for source in sources):
+        pass
+
+
+def failure_status(error: Exception) -> str:
+    """Get the batch status for an exception raised while rendering."""
+    if isinstance(error, (CVValidationError, FileNotFoundError, ImagePathError, yaml.YAMLError)):
+        return STATUS_INVALID
+    if limit_of(error) is not None:
+        return STATUS_LIMIT
+    return STATUS_ERROR
+
+
+def render_source(pipeline: RenderPipeline, source: Union[str, Record], output_path: Optional[str]) -> BatchResult:
+    """Render one source file or record, capturing failures in the result.
+
+    Args:
+        pipeline: Pipeline to render with
+        source: Path to the YAML or JSON file, or a record holding the CV as JSON
+        output_path: Path where the PDF will be written, or None to return
+            the PDF in the result's ``pdf`` field
+
+    Returns:
+        The result for the document
+    """
+    name = output_name(source)
+    # Contexts are built here so that failed documents still report their stage timings
+    if isinstance(source, Record):
+        if source.error is not None:
+            return BatchResult(source=source.key, output_name=name, status=STATUS_INVALID, error=source.error,
+                               duration=0.0)
+        return render_context(pipeline, RenderContext(json_text=source.json_text, output_path=output_path),
+                              source.key, name)
+    return render_context(pipeline, RenderContext(source=source, output_path=output_path), source, name)
+
+
+def render_context(pipeline: RenderPipeline, context: RenderContext, source: str,
+                   name: Optional[str] = None) -> BatchResult:
+    """Render a prepared context, capturing failures in the result.
+
+    Args:
+        pipeline: Pipeline to render with
+        context: Document to render; its ``output_path`` may be None to
+            return the PDF in the result's ``pdf`` field
+        source: What to call the document in the result
+        name: File name for the PDF
+
+    Returns:
+        The result for the document
+    """
+    start = time.perf_counter()
+    try:
+        pipeline.run_context(context)
+    except CVValidationError as e:
+        return BatchResult(source=source, output_name=name, status=STATUS_INVALID,
+                           error="; ".join(e.errors), duration=time.perf_counter() - start, timings=context.timings,
+                           error_locations=e.locations)
+    except (FileNotFoundError, ImagePathError, yaml.YAMLError) as e:
+        return BatchResult(source=source, output_name=name, status=STATUS_INVALID, error=str(e),
+                           duration=time.perf_counter() - start, timings=context.timings)
+    except (ResourceLimitExceeded, MemoryError) as e:
+        return BatchResult(source=source, output_name=name, status=STATUS_LIMIT, limit=limit_of(e),
+                           error=str(e) or "Render ran out of memory", duration=time.perf_counter() - start,
+                           timings=context.timings)
+    except Exception as e:
+        return BatchResult(source=source, output_name=name, status=STATUS_ERROR,
+                           error=f"{type(e).__name__}: {e}", duration=time.perf_counter() - start,
+                           timings=context.timings)
+    return BatchResult(source=source, output_path=context.written_path, output_name=name, status=STATUS_OK,
+                       duration=time.perf_counter() - start, pages=context.pages, bytes=len(context.pdf),
+                       sha256=hashlib.sha256(context.pdf).hexdigest(), timings=context.timings,
+                       pdf=context.pdf if context.output_path is None else None)
+
+
+# Pipeline of the current worker process, created by _init_worker
+_worker_pipeline: Optional[RenderPipeline] = None
+
+# Profilers of the current worker process and where they save their profiles
+_worker_profiler: Optional[RenderProfiler] = None
+_worker_memory_profiler: Optional[MemoryProfiler] = None
+_worker_profile_path: Optional[str] = None
+
+
+def _init_worker(style: str, page_size: str, streaming: bool, profile=None, max_pages: Optional[int] = None,
+                 memprofile=None):
+    global _worker_pipeline, _worker_profiler, _worker_memory_profiler, _worker_profile_path
+    _worker_pipeline = RenderPipeline(style, page_size, streaming=streaming, max_pages=max_pages)
+    if profile is not None:
+        options, profile_dir = profile
+        _worker_profiler = RenderProfiler(**options)
+        _worker_profiler.attach(_worker_pipeline)
+        _worker_profile_path = os.path.join(profile_dir, str(os.getpid()))
+    if memprofile is not None:
+        options, profile_dir = memprofile
+        _worker_memory_profiler = MemoryProfiler(**options)
+        _worker_memory_profiler.attach(_worker_pipeline)
+        _worker_profile_path = os.path.join(profile_dir, str(os.getpid()))
+
+
+def _counting_cache_requests(fn: Callable[..., BatchResult], *args) -> BatchResult:
+    """Call a render function in a child process, sending its cache lookups back with the result."""
+    before = METRICS.cache_counts()
+    result = fn(*args)
+    result.cache_requests = METRICS.cache_counts(since=before)
+    return result
+
+
+def _render_in_worker(task) -> BatchResult:
+    source, output_path = task
+    result = _counting_cache_requests(render_source, _worker_pipeline, source, output_path)
+    # Workers are never told the batch is over, so keep the saved profiles current
+    if _worker_profiler is not None and _worker_profiler.sampled:
+        _worker_profiler.save(_worker_profile_path)
+    if _worker_memory_profiler is not None and _worker_memory_profiler.profiled:
+        _worker_memory_profiler.save(_worker_profile_path)
+    return result
+
+
+# Pipelines of the current sandbox process, keyed by (style, page_size, streaming, max_pages)
+_sandbox_pipelines: Dict[tuple, RenderPipeline] = {}
+
+
+def sandbox_pipeline(style: str, page_size: str, streaming: bool = False,
+                     max_pages: Optional[int] = None) -> RenderPipeline:
+    """Get the pipeline of the current process for these options, creating it on first use."""
+    key = (style, page_size, streaming, max_pages)
+    if key not in _sandbox_pipelines:
+        _sandbox_pipelines[key] = RenderPipeline(style, page_size, streaming=streaming, max_pages=max_pages)
+    return _sandbox_pipelines[key]
+
+
+def _render_in_sandbox(options: tuple, source: Union[str, Record], output_path: Optional[str]) -> BatchResult:
+    return _counting_cache_requests(render_source, sandbox_pipeline(*options), source, output_path)
+
+
+def _merge_cache_requests(results: Iterable[BatchResult]) -> Iterator[BatchResult]:
+    """Pass results through, adding the cache lookups of worker processes to ``METRICS``."""
+    for result in results:
+        METRICS.merge_cache_counts(result.cache_requests)
+        yield result
+
+
+def render_sandboxed(sandbox: RenderSandbox, fn: Callable[..., BatchResult], *args, source: str,
+                     name: Optional[str] = None) -> BatchResult:
+    """Run a render function in a sandbox, turning a killed render into a result.
+
+    Args:
+        sandbox: Sandbox to render in
+        fn: Module-level function returning a ``BatchResult``
+        *args: Arguments for ``fn``
+        source: What to call the document in a failed result
+        name: File name for the PDF, for a failed result
+
+    Returns:
+        The result from ``fn``, or a ``limit`` or ``error`` result if the
+        sandbox had to stop it
+    """
+    start = time.perf_counter()
+    try:
+        return sandbox.call(fn, *args)
+    except ResourceLimitExceeded as e:
+        return BatchResult(source=source, output_name=name, status=STATUS_LIMIT, limit=e.limit, error=str(e),
+                           duration=time.perf_counter() - start)
+    except RuntimeError as e:
+        return BatchResult(source=source, output_name=name, status=STATUS_ERROR, error=str(e),
+                           duration=time.perf_counter() - start)
+
+
+def _run_sandboxed(tasks: Iterable, options: tuple, limits: RenderLimits, workers: int,
+                   max_in_flight: int) -> Iterator[BatchResult]:
+    """Render tasks with one sandbox per worker thread."""
+    local = threading.local()
+    sandboxes = []
+    lock = threading.Lock()
+
+    def render(task) -> BatchResult:
+        if not hasattr(local, 'sandbox'):
+            local.sandbox = RenderSandbox(limits, preload=(__name__,))
+            with lock:
+                sandboxes.append(local.sandbox)
+        source, output_path = task
+        label = source.key if isinstance(source, Record) else source
+        return render_sandboxed(local.sandbox, _render_in_sandbox, options, source, output_path,
+                                source=label, name=output_name(source))
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cv-builder-sandbox") as pool:
+            yield from _bounded_map(pool, render, tasks, max_in_flight)
+    finally:
+        for sandbox in sandboxes:
+            sandbox.close()
+
+
+def _bounded_map(pool: Executor, fn: Callable, tasks: Iterable, max_in_flight: int) -> Iterator:
+    """Like ``pool.map``, but only takes a new task from ``tasks`` when fewer than ``max_in_flight`` are pending."""
+    in_flight = deque()
+    for task in tasks:
+        if len(in_flight) >= max_in_flight:
+            yield in_flight.popleft().result()
+        in_flight.append(pool.submit(fn, task))
+    while in_flight:
+        yield in_flight.popleft().result()
+
+
+def run_batch(sources: Iterable[Union[str, Record]], output_dir: Optional[str], style: str = "classic",
+              page_size: str = "A4", workers: int = 1, streaming: bool = False,
+              profiler: Optional[RenderProfiler] = None,
+              executor: str = EXECUTOR_PROCESS, max_in_flight: Optional[int] = None,
+              limits: Optional[RenderLimits] = None,
+              memory_profiler: Optional[MemoryProfiler] = None) -> Iterator[BatchResult]:
+    """Render many CV files or records into a directory.
+
+    Args:
+        sources: Paths to YAML or JSON files, or records from ``sources``;
+            taken lazily, at most ``max_in_flight`` ahead of the results
+        output_dir: Directory for the PDFs, named after each source file, or
+            None to return each PDF in its result's ``pdf`` field
+        style: Style name for the CVs
+        page_size: Page size for the PDFs
+        workers: Number of worker processes or threads; 1 renders in the current thread
+        streaming: Produce flowables lazily during layout to bound memory use
+        profiler: Profiler for the render stages; profiles from worker
+            processes are merged into it when the batch finishes
+        executor: 'process' for a process pool or 'thread' for a thread pool
+            sharing one pipeline
+        max_in_flight: Most documents submitted to the pool but not yet
+            yielded; defaults to twice the number of workers
+        limits: Resource limits for each document; documents exceeding them
+            get the ``limit`` status. Time and memory limits render in one
+            sandbox process per worker, whatever the executor
+        memory_profiler: Memory profiler for every stage; statistics from
+            worker processes are merged into it when the batch finishes
+
+    Sources that would be written to the same PDF (e.g. ``a/jane.yaml`` and
+    ``b/jane.yaml``) are an error: a list or tuple of sources is checked
+    before anything is rendered, other iterables when the clashing source
+    is reached.
+
+    Yields:
+        One result per source, in input order
+
+    Raises:
+        ValueError: If the executor is not valid, a profiler is combined
+            with the thread executor or sandboxed limits, or two sources
+            share an output path
+    """
+    if executor not in EXECUTORS:
+        raise ValueError(f"Invalid executor: {executor}. Valid executors are: {', '.join(EXECUTORS)}")
+    profiling = profiler is not None or memory_profiler is not None
+    if executor == EXECUTOR_THREAD and workers > 1 and profiling:
+        raise ValueError("Profiling is not supported with the thread executor")
+    limits = limits or RenderLimits()
+    if limits.isolated and profiling:
+        raise ValueError("Profiling is not supported with time or memory limits")
+
+    if output_dir is not None:
+        if isinstance(sources, (list, tuple)):
+            check_outputs(sources, output_dir)
+        os.makedirs(output_dir, exist_ok=True)
+    sources = (source if isinstance(source, Record) else str(source) for source in sources)
+    tasks = _unique_outputs((source, output_path_for(source, output_dir) if output_dir is not None else None)
+                            for source in sources)
+    max_in_flight = max_in_flight or 2 * workers
+
+    if limits.isolated:
+        yield from _merge_cache_requests(_run_sandboxed(tasks, (style, page_size, streaming, limits.max_pages),
+                                                        limits, workers, max_in_flight))
+        return
+
+    if workers <= 1:
+        pipeline = RenderPipeline(style, page_size, streaming=streaming, max_pages=limits.max_pages)
+        if profiler is not None:
+            profiler.attach(pipeline)
+        if memory_profiler is not None:
+            memory_profiler.attach(pipeline)
+        try:
+            for source, output_path in tasks:
+                yield render_source(pipeline, source, output_path)
+        finally:
+            if profiler is not None:
+                profiler.stop()
+            if memory_profiler is not None:
+                memory_profiler.close()
+        return
+
+    if executor == EXECUTOR_THREAD:
+        pipeline = RenderPipeline(style, page_size, streaming=streaming, max_pages=limits.max_pages)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cv-builder-render") as pool:
+            yield from _bounded_map(pool, lambda task: render_source(pipeline, *task), tasks, max_in_flight)
+        return
+
+    with tempfile.TemporaryDirectory(prefix="cv-builder-profile-") as profile_dir:
+        profile = (profiler.options(), profile_dir) if profiler is not None else None
+        memprofile = (memory_profiler.options(), profile_dir) if memory_profiler is not None else None
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(style, page_size, streaming, profile, limits.max_pages,
+                                           memprofile)) as executor:
+            yield from _merge_cache_requests(_bounded_map(executor, _render_in_worker, tasks, max_in_flight))
+        if profiler is not None:
+            profiler.merge(profile_dir)
+        if memory_profiler is not None:
+            memory_profiler.merge(profile_dir)
+
+
+def summarize(results: List[BatchResult]) -> str:
+    """Get a one-line summary of batch results."""
+    counts = {}
+    for result in results:
+        counts[result.status] = counts.get(result.status, 0) + 1
+    total = sum(result.duration for result in results)
+    parts = ", ".join(f"{status}: {n}" for status, n in sorted(counts.items()))
+    return f"{len(results)} documents ({parts or 'none'}) in {total:.2f}s of render time"
@@ -0,0 +1,332 @@
+"""Manifest-driven incremental builds for CV Builder.
+
+A build manifest maps CV sources to PDFs in one or more styles and page
+sizes::
+
+    targets:
+      - inputs: cvs/*.yaml
+        styles: [classic, modern]
+        output: pdfs/{stem}-{style}.pdf
+      - inputs: [cvs/jane.yaml]
+        page_sizes: [A4, letter]
+        output: pdfs/letter/{stem}-{page_size}.pdf
+
+Every combination of input, style and page size of a rule is one target.
+Paths are relative to the manifest.
+
+A target depends on its source file, the YAML fragments it includes, the
+images the CV refers to, the resolved style and page geometry, and the versions of CV Builder and
+reportlab. Their fingerprints are recorded in a state file next to the
+manifest after each successful build. A target is rebuilt only when one of
+them changed, when its output is missing or when it has never been built.
+As in make's dependency files, the fragments and images a CV uses are read
+from the recorded state while its source and all of them are unchanged, so
+up-to-date targets are checked without parsing any YAML.
+"""
+
+import glob
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+import reportlab
+from pydantic import BaseModel, Field, ValidationError
+
+from cv_builder_from_yaml_to_pdf.batch import STATUS_OK, BatchResult, _bounded_map, render_source
+from cv_builder_from_yaml_to_pdf.images import ImagePathError, resolve_image_path
+from cv_builder_from_yaml_to_pdf.pdf_generator import PAGE_SIZES, Renderer
+from cv_builder_from_yaml_to_pdf.pipeline import RenderPipeline
+from cv_builder_from_yaml_to_pdf.styles import get_style
+from cv_builder_from_yaml_to_pdf.yaml_parser import parse_yaml_file, parse_yaml_file_with_includes
+
+
+DEFAULT_MANIFEST = "cv-build.yaml"
+STATE_NAME = ".cv-build-state.json"
+STATE_VERSION = 1
+
+
+class BuildRule(BaseModel):
+    """Model for one rule of a build manifest."""
+    inputs: Union[str, List[str]] = Field(description="Source files or glob patterns, relative to the manifest.")
+    styles: Union[str, List[str]] = Field(default="classic", description="Styles to render each input in.")
+    page_sizes: Union[str, List[str]] = Field(default="A4", description="Page sizes to render each input in.")
+    output: str = Field(description="Output path template; may use {stem}, {style} and {page_size}.")
+
+
+class BuildManifest(BaseModel):
+    """Model for a build manifest."""
+    targets: List[BuildRule] = Field(description="Rules that expand into build targets.")
+
+
+class BuildTarget(BaseModel):
+    """Model for one PDF to build."""
+    source: str = Field(description="Path of the source file, relative to the manifest.")
+    style: str = Field(description="Style to render in.")
+    page_size: str = Field(description="Page size to render in.")
+    output: str = Field(description="Path of the PDF, relative to the manifest.")
+
+
+class TargetState(BaseModel):
+    """Model for the fingerprints a target was last built from."""
+    source: Optional[str] = Field(description="SHA-256 of the source file, or None if it is missing.")
+    dependencies: Dict[str, Optional[str]] = Field(default_factory=dict,
+                                                   description="SHA-256 of each fragment and image the CV uses, by path.")
+    style: str = Field(description="Fingerprint of the resolved styles and page geometry.")
+    tool: str = Field(description="Versions of CV Builder and reportlab.")
+
+
+class BuildState(BaseModel):
+    """Model for the state file of a manifest."""
+    version: int = Field(default=STATE_VERSION, description="Format version of the state file.")
+    targets: Dict[str, TargetState] = Field(default_factory=dict, description="State of each built target, by output.")
+
+
+class PlannedTarget(BaseModel):
+    """Model for a target and whether it needs to be built."""
+    target: BuildTarget
+    state: TargetState = Field(description="Fingerprints the target would be built from now.")
+    reason: Optional[str] = Field(default=None, description="Why the target is out of date, or None if it is not.")
+
+
+def _as_list(value: Union[str, List[str]]) -> List[str]:
+    return [value] if isinstance(value, str) else list(value)
+
+
+def load_manifest(path: str) -> List[BuildTarget]:
+    """Load a build manifest and expand its rules into targets.
+
+    Raises:
+        FileNotFoundError: If the manifest does not exist
+        yaml.YAMLError: If the manifest cannot be parsed
+        ValueError: If the manifest is not valid, names an unknown style, page
+            size or placeholder, or two targets write the same output
+    """
+    try:
+        manifest = BuildManifest.model_validate(parse_yaml_file(path) or {})
+    except ValidationError as e:
+        raise ValueError(f"Invalid build manifest {path}: {e}")
+    base = os.path.dirname(os.path.abspath(path))
+    targets, outputs = [], {}
+    for rule in manifest.targets:
+        sources = []
+        for pattern in _as_list(rule.inputs):
+            if glob.has_magic(pattern):
+                matches = glob.glob(os.path.join(base, pattern), recursive=True)
+                sources.extend(sorted(os.path.relpath(match, base) for match in matches))
+            else:
+                sources.append(os.path.normpath(pattern))
+        for source in sources:
+            for style in _as_list(rule.styles):
+                get_style(style)
+                for page_size in _as_list(rule.page_sizes):
+                    if page_size.lower() not in PAGE_SIZES:
+                        raise ValueError(f"Invalid page size: {page_size}. Valid page sizes are: A4, letter")
+                    try:
+                        output = rule.output.format(stem=Path(source).stem, style=style, page_size=page_size)
+                    except (KeyError, IndexError) as e:
+                        raise ValueError(f"Unknown placeholder {e} in output {rule.output!r}")
+                    output = os.path.normpath(output)
+                    if output in outputs:
+                        raise ValueError(f"{output} is the output of both {outputs[output]} and {source}")
+                    outputs[output] = source
+                    targets.append(BuildTarget(source=source, style=style, page_size=page_size, output=output))
+    return targets
+
+
+def state_path_for(manifest_path: str) -> str:
+    """Get the default state file path for a manifest."""
+    return os.path.join(os.path.dirname(os.path.abspath(manifest_path)), STATE_NAME)
+
+
+def load_state(path: str) -> BuildState:
+    """Load a state file; a missing, unreadable or outdated one is treated as empty."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            state = BuildState.model_validate_json(f.read())
+    except (OSError, ValueError):
+        return BuildState()
+    return state if state.version == STATE_VERSION else BuildState()
+
+
+def save_state(state: BuildState, path: str):
+    """Write a state file atomically."""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(state.model_dump_json(indent=2))
+    os.replace(temp_path, path)
+
+
+def tool_version() -> str:
+    """Get the versions of CV Builder and reportlab, which both affect the output."""
+    # Imported here: the package imports the CLI, which imports this module
+    import cv_builder_from_yaml_to_pdf
+    return f"cv-builder {cv_builder_from_yaml_to_pdf.__version__}; reportlab {reportlab.Version}"
+
+
+def renderer_fingerprint(style: str, page_size: str) -> str:
+    """Get a fingerprint of everything a renderer resolves from a style and page size."""
+    renderer = Renderer(style, page_size)
+    styles = sorted((name, fingerprint or repr(sorted(renderer.styles[name].__dict__.items(), key=str)))
+                    for name, fingerprint in renderer.style_fingerprints.items())
+    layout = [styles, repr(sorted(renderer.list_style.__dict__.items(), key=str)),
+              list(renderer.page_size), list(renderer.frame_geometry)]
+    return hashlib.sha256(json.dumps(layout).encode('utf-8')).hexdigest()
+
+
+def discover_dependencies(source: str) -> List[str]:
+    """Get the fragments a CV source includes and the image files it refers to.
+
+    Image paths are resolved against the source's directory. Sources that
+    cannot be parsed have no dependencies; rendering them reports the error.
+    """
+    try:
+        data, includes = parse_yaml_file_with_includes(source)
+    except Exception:
+        return []
+    if not isinstance(data, dict):
+        return []
+    paths = []
+    personal_info = data.get('personal_info')
+    if isinstance(personal_info, dict):
+        paths.append(personal_info.get('photo'))
+    for company in data.get('experience') or []:
+        if isinstance(company, dict):
+            paths.append(company.get('logo'))
+    base_dir = os.path.dirname(os.path.abspath(source))
+    images = []
+    for path in paths:
+        if isinstance(path, str):
+            try:
+                images.append(resolve_image_path(path, base_dir))
+            except ImagePathError:
+                # Rendering reports it
+                pass
+    return includes + images
+
+
+class _Digests:
+    """SHA-256 of files, each read at most once per build."""
+
+    def __init__(self):
+        self._digests: Dict[str, Optional[str]] = {}
+
+    def __call__(self, path: str) -> Optional[str]:
+        if path not in self._digests:
+            try:
+                with open(path, 'rb') as f:
+                    self._digests[path] = hashlib.file_digest(f, 'sha256').hexdigest()
+            except OSError:
+                self._digests[path] = None
+        return self._digests[path]
+
+
+def _reason(target: BuildTarget, base: str, previous: Optional[TargetState], current: TargetState) -> Optional[str]:
+    """Get why a target is out of date, or None if it is up to date."""
+    if previous is None:
+        return "never built"
+    if not os.path.exists(os.path.join(base, target.output)):
+        return "output missing"
+    if previous.tool != current.tool:
+        return "tool version changed"
+    if previous.style != current.style:
+        return "style changed"
+    if previous.source != current.source:
+        return "source changed"
+    # Also catches dependencies that were added or dropped
+    for path in {**previous.dependencies, **current.dependencies}:
+        if previous.dependencies.get(path, "") != current.dependencies.get(path, ""):
+            return f"{path} changed"
+    return None
+
+
+def plan_build(targets: List[BuildTarget], base: str, state: BuildState, force: bool = False) -> List[PlannedTarget]:
+    """Work out which targets are out of date.
+
+    Args:
+        targets: Targets from ``load_manifest``
+        base: Directory the manifest's paths are relative to
+        state: State recorded by earlier builds
+        force: Treat every target as out of date
+
+    Returns:
+        Every target, in manifest order, with the fingerprints it would be
+        built from and why it needs building
+    """
+    digest = _Digests()
+    styles: Dict[Tuple[str, str], str] = {}
+    tool = tool_version()
+    planned = []
+    for target in targets:
+        source = os.path.join(base, target.source)
+        previous = state.targets.get(target.output)
+        source_digest = digest(source)
+        if (previous is not None and previous.source == source_digest
+                and all(digest(os.path.join(base, path)) == recorded
+                        for path, recorded in previous.dependencies.items())):
+            dependencies = list(previous.dependencies)
+        else:
+            # A changed fragment may include other fragments or images
+            dependencies = [os.path.relpath(path, base) for path in discover_dependencies(source)]
+        key = (target.style, target.page_size)
+        if key not in styles:
+            styles[key] = renderer_fingerprint(*key)
+        current = TargetState(source=source_digest, style=styles[key], tool=tool,
+                              dependencies={path: digest(os.path.join(base, path)) for path in dependencies})
+        reason = "forced" if force else _reason(target, base, previous, current)
+        planned.append(PlannedTarget(target=target, state=current, reason=reason))
+    return planned
+
+
+# Pipelines of the current worker process, keyed by (style, page_size)
+_worker_pipelines: Dict[Tuple[str, str], RenderPipeline] = {}
+
+
+def _build_target(task) -> BatchResult:
+    source, output, style, page_size = task
+    key = (style, page_size)
+    if key not in _worker_pipelines:
+        _worker_pipelines[key] = RenderPipeline(style, page_size)
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    return render_source(_worker_pipelines[key], source, output)
+
+
+def run_build(planned: List[PlannedTarget], base: str, state: BuildState,
+              workers: int = 1) -> Iterator[Tuple[PlannedTarget, BatchResult]]:
+    """Build the out-of-date targets, in parallel worker processes.
+
+    The state of each target that builds successfully is updated in
+    ``state``; save it with ``save_state`` afterwards.
+
+    Args:
+        planned: Targets from ``plan_build``; up-to-date ones are skipped
+        base: Directory the manifest's paths are relative to
+        state: State to record the built targets in
+        workers: Number of worker processes; 1 builds in the current process
+
+    Yields:
+        Each built target with its result, in manifest order
+    """
+    stale = [item for item in planned if item.reason is not None]
+    tasks = ((os.path.join(base, item.target.source), os.path.join(base, item.target.output),
+              item.target.style, item.target.page_size) for item in stale)
+    if workers <= 1 or len(stale) <= 1:
+        results = map(_build_target, tasks)
+        for item, result in zip(stale, results):
+            yield _record(item, result, state)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for item, result in zip(stale, _bounded_map(pool, _build_target, tasks, 2 * workers)):
+            yield _record(item, result, state)
+
+
+def _record(item: PlannedTarget, result: BatchResult, state: BuildState) -> Tuple[PlannedTarget, BatchResult]:
+    """Record the state of a successfully built target."""
+    if result.status == STATUS_OK:
+        state.targets[item.target.output] = item.state
+    else:
+        # Build it again next time, even if nothing changes
+        state.targets.pop(item.target.output, None)
+    return item, result
@@ -0,0 +1,171 @@
+"""Compact CV representation for CV Builder.
+
+This module provides memory-lean, read-only counterparts of the Pydantic models
+for holding very large numbers of CVs in memory (analytics, batch planning).
+Records use ``__slots__`` and refuse attribute assignment, lists become
+tuples, mappings become read-only proxies, URLs become plain strings and
+values that repeat across a corpus (skill categories, company names, locations,
+dates) are interned so every CV shares a single copy.
+
+Conversion is lossless in both directions::
+
+    compact = CompactCV.from_model(cv)
+    assert compact.to_model() == cv
+"""
+
+import sys
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, Type
+
+from pydantic import BaseModel
+
+from cv_builder_from_yaml_to_pdf.models import (
+    CV, PersonalInfo, Education, CompanyExperience, Role, Skill, Project, Certificate, Language, Reference,
+)
+
+
+class CompactRecord:
+    """Base class for slotted records that mirror a Pydantic model."""
+    __slots__ = ()
+
+    # Set on each subclass by _record_type
+    _model: Type[BaseModel]
+    _nested: Dict[str, Type["CompactRecord"]]
+    _interned: FrozenSet[str]
+
+    @classmethod
+    def from_model(cls, model: BaseModel) -> "CompactRecord":
+        """Create a compact record from a Pydantic model instance.
+
+        Args:
+            model: Instance of the model this record mirrors
+
+        Returns:
+            Compact record holding the same data
+        """
+        record = cls.__new__(cls)
+        for name in cls.__slots__:
+            object.__setattr__(record, name, cls._compact_value(name, getattr(model, name)))
+        return record
+
+    @classmethod
+    def _compact_value(cls, name: str, value: Any) -> Any:
+        if value is None:
+            return None
+        nested = cls._nested.get(name)
+        intern = name in cls._interned
+        if isinstance(value, list):
+            if nested is not None:
+                return tuple(nested.from_model(item) for item in value)
+            return tuple(sys.intern(item) if intern and isinstance(item, str) else item for item in value)
+        if nested is not None:
+            return nested.from_model(value)
+        if isinstance(value, str):
+            return sys.intern(value) if intern else value
+        if isinstance(value, dict):
+            return _freeze(value)
+        # URLs and other scalar types are stored as their string form
+        return str(value)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the record to plain Python data suitable for model validation."""
+        data = {}
+        for name in self.__slots__:
+            value = getattr(self, name)
+            if isinstance(value, tuple):
+                value = [item.to_dict() if isinstance(item, CompactRecord) else item for item in value]
+            elif isinstance(value, CompactRecord):
+                value = value.to_dict()
+            elif isinstance(value, MappingProxyType):
+                value = _thaw(value)
+            data[name] = value
+        return data
+
+    def to_model(self) -> BaseModel:
+        """Convert the record back to its Pydantic model."""
+        return self._model.model_validate(self.to_dict())
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __reduce__(self):
+        # Slots cannot be restored by assignment, so pickle the plain data
+        return _from_dict, (type(self), self.to_dict())
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+def _freeze(value: Any) -> Any:
+    """Copy nested dicts and lists into read-only proxies and tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _thaw(value: Any) -> Any:
+    """Undo ``_freeze``."""
+    if isinstance(value, MappingProxyType):
+        return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(item) for item in value]
+    return value
+
+
+def _from_dict(cls: Type[CompactRecord], data: Dict[str, Any]) -> CompactRecord:
+    return cls.from_model(cls._model.model_validate(data))
+
+
+def _record_type(model: Type[BaseModel], nested: Dict[str, Type[CompactRecord]] = None,
+                 interned: tuple = ()) -> Type[CompactRecord]:
+    """Create a slotted record class with one slot per model field.
+
+    Args:
+        model: Pydantic model the record mirrors
+        nested: Record types for fields holding nested models (or lists of them)
+        interned: Names of string fields whose values are interned
+
+    Returns:
+        The new record class
+    """
+    return type(f"Compact{model.__name__}", (CompactRecord,), {
+        '__slots__': tuple(model.model_fields),
+        '__doc__': f"Compact, read-only counterpart of :class:`{model.__name__}`.",
+        '__module__': __name__,
+        '_model': model,
+        '_nested': nested or {},
+        '_interned': frozenset(interned),
+    })
+
+
+CompactPersonalInfo = _record_type(PersonalInfo, interned=('location', 'title'))
+CompactEducation = _record_type(Education, interned=('institution', 'degree', 'start_date', 'end_date', 'location'))
+CompactRole = _record_type(Role, interned=('title', 'start_date', 'end_date', 'location'))
+CompactCompanyExperience = _record_type(CompanyExperience, nested={'roles': CompactRole},
+                                        interned=('company', 'location', 'logo'))
+CompactSkill = _record_type(Skill, interned=('category', 'name'))
+CompactProject = _record_type(Project, interned=('technologies', 'start_date', 'end_date'))
+CompactCertificate = _record_type(Certificate, interned=('name', 'issuer', 'date'))
+CompactLanguage = _record_type(Language, interned=('name', 'proficiency'))
+CompactReference = _record_type(Reference, interned=('position', 'company', 'relation'))
+CompactCV = _record_type(CV, nested={
+    'personal_info': CompactPersonalInfo,
+    'education': CompactEducation,
+    'experience': CompactCompanyExperience,
+    'skills': CompactSkill,
+    'projects': CompactProject,
+    'certifications': CompactCertificate,
+    'languages': CompactLanguage,
+    'references': CompactReference,
+}, interned=('interests',))
@@ -0,0 +1,269 @@
+"""Shared YAML fragments for CV Builder.
+
+CV files can pull in shared boilerplate, such as company descriptions, project
+write-ups or skill lists, with the ``!include`` tag::
+
+    experience:
+      - !include shared/acme.yaml
+    skills: !include shared/skills.yaml#backend
+
+The path is relative to the file containing the tag. An optional ``#`` and a
+dotted key path select part of the fragment; list items are selected by index.
+Fragments may include other fragments.
+
+Includes are confined to the directory of the CV file being parsed: absolute
+paths, ``~`` and ``..`` paths that leave it are rejected. Documents that do
+not come from a file (queue payloads, standard input, records) have no such
+directory, so ``!include`` is rejected in them altogether; otherwise an
+uploaded CV could pull any file the renderer can read into its PDF.
+
+Each fragment is parsed once per process and kept in a bounded, process-wide
+cache, so a company description shared by thousands of CVs in a batch is read
+once per worker. A cached fragment is checked with ``os.stat`` on every use;
+when its modification time or size changed, the file is hashed and re-parsed
+only if its content actually differs. Long-running watch and queue processes
+therefore pick up edited fragments without a restart.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import yaml
+from yaml.constructor import ConstructorError
+
+from cv_builder_from_yaml_to_pdf.metrics import METRICS
+
+
+INCLUDE_TAG = "!include"
+
+# The libyaml-based loader is an order of magnitude faster
+_BaseLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# (st_mtime_ns, st_size) of a file
+_Stat = Tuple[int, int]
+
+
+def _stat(path: str) -> Optional[_Stat]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _copy(value: Any) -> Any:
+    """Copy the mutable containers of parsed YAML; scalars are immutable."""
+    if isinstance(value, dict):
+        return {key: _copy(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy(item) for item in value]
+    return value
+
+
+def _select(data: Any, key_path: str, node: yaml.Node) -> Any:
+    """Select a dotted key path, e.g. ``roles.0.title``, from fragment data."""
+    for part in key_path.split('.'):
+        if isinstance(data, dict) and part in data:
+            data = data[part]
+        elif isinstance(data, list) and part.isdigit() and int(part) < len(data):
+            data = data[int(part)]
+        else:
+            raise ConstructorError(None, None, f"{node.value}: no {part!r} in the fragment", node.start_mark)
+    return data
+
+
+class _Fragment:
+    """A parsed fragment and the files it was built from."""
+
+    def __init__(self, data: Any, digest: str, stats: Dict[str, Optional[_Stat]]):
+        self.data = data
+        self.digest = digest
+        # The fragment's own file first, then every file it includes
+        self.stats = stats
+
+
+class FragmentCache:
+    """Bounded, thread-safe LRU cache of parsed fragments, keyed by absolute path."""
+
+    def __init__(self, max_entries: int = 512):
+        """Initialize the cache.
+
+        Args:
+            max_entries: Most fragments kept
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._fragments: "OrderedDict[str, _Fragment]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _lookup(self, path: str) -> Tuple[Optional[_Fragment], Optional[bytes]]:
+        """Get the cached fragment if it is still current, and the file content if it had to be read."""
+        with self._lock:
+            fragment = self._fragments.get(path)
+        if fragment is None:
+            return None, None
+        own_stat, *_ = fragment.stats.values()
+        if any(_stat(other) != stat for other, stat in list(fragment.stats.items())[1:]):
+            return None, None
+        stat = _stat(path)
+        if stat == own_stat:
+            return fragment, None
+        try:
+            with open(path, 'rb') as f:
+                content = f.read()
+        except OSError:
+            return None, None
+        if hashlib.sha256(content).hexdigest() != fragment.digest:
+            return None, content
+        # Touched but unchanged; remember the new stat to skip hashing next time
+        with self._lock:
+            fragment.stats[path] = stat
+        return fragment, None
+
+    def load(self, path: str, stack: Tuple[str, ...] = (), root: Optional[str] = None) -> Tuple[Any, Set[str]]:
+        """Get a copy of a parsed fragment, parsing it on a cache miss.
+
+        Args:
+            path: Absolute path of the fragment
+            stack: Files currently being included, to detect cycles
+            root: Directory includes must stay within; defaults to the
+                fragment's directory
+
+        Returns:
+            Tuple of (data, paths of the fragment and every file it includes)
+
+        Raises:
+            FileNotFoundError: If the fragment does not exist
+            yaml.YAMLError: If the fragment cannot be parsed, includes itself or
+                includes a file outside ``root``
+        """
+        fragment, content = self._lookup(path)
+        METRICS.cache("fragment", fragment is not None)
+        if fragment is None:
+            stat = _stat(path)
+            if content is None:
+                try:
+                    with open(path, 'rb') as f:
+                        content = f.read()
+                except FileNotFoundError:
+                    raise FileNotFoundError(f"YAML fragment not found: {path}")
+            data, includes = load_yaml(content.decode('utf-8-sig'), os.path.dirname(path), self, stack + (path,), root)
+            stats = {path: stat}
+            stats.update((include, _stat(include)) for include in sorted(includes))
+            fragment = _Fragment(data, hashlib.sha256(content).hexdigest(), stats)
+            with self._lock:
+                self.misses += 1
+                self._fragments[path] = fragment
+                self._fragments.move_to_end(path)
+                while len(self._fragments) > self.max_entries:
+                    self._fragments.popitem(last=False)
+        else:
+            with self._lock:
+                self.hits += 1
+                if path in self._fragments:
+                    self._fragments.move_to_end(path)
+        return _copy(fragment.data), set(fragment.stats)
+
+    def stats(self) -> Dict[str, int]:
+        """Get the number of hits, misses and cached fragments."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._fragments)}
+
+    def clear(self):
+        """Drop all cached fragments and statistics."""
+        with self._lock:
+            self._fragments.clear()
+            self.hits = self.misses = 0
+
+
+# Process-wide cache shared by all parses
+FRAGMENT_CACHE = FragmentCache()
+
+
+class _IncludeLoader(_BaseLoader):
+    """Safe loader that resolves ``!include`` tags through a fragment cache."""
+
+    def __init__(self, stream, base_dir: Optional[str], cache: FragmentCache, stack: Tuple[str, ...],
+                 root: Optional[str]):
+        super().__init__(stream)
+        self.base_dir = base_dir
+        self.root = root
+        self.cache = cache
+        self.stack = stack
+        self.includes: Set[str] = set()
+
+
+def _within(path: str, root: str) -> bool:
+    return os.path.commonpath([path, root]) == root
+
+
+def _construct_include(loader: _IncludeLoader, node: yaml.Node) -> Any:
+    if not isinstance(node, yaml.ScalarNode) or not node.value:
+        raise ConstructorError(None, None, f"{INCLUDE_TAG} needs a file path, e.g. "
+                               f"'{INCLUDE_TAG} shared/skills.yaml'", node.start_mark)
+    if loader.base_dir is None:
+        raise ConstructorError(None, None, f"{INCLUDE_TAG} is only allowed in CV files, "
+                               f"not in documents passed as text", node.start_mark)
+    reference, _, key_path = node.value.partition('#')
+    if os.path.isabs(reference) or reference.startswith('~'):
+        raise ConstructorError(None, None, f"{node.value}: included paths must be relative", node.start_mark)
+    path = os.path.normpath(os.path.join(loader.base_dir, reference))
+    if not _within(path, loader.root):
+        raise ConstructorError(None, None, f"{node.value}: outside {loader.root}", node.start_mark)
+    if path in loader.stack:
+        cycle = " -> ".join(loader.stack[loader.stack.index(path):] + (path,))
+        raise ConstructorError(None, None, f"Include cycle: {cycle}", node.start_mark)
+    try:
+        data, includes = loader.cache.load(path, loader.stack, loader.root)
+    except FileNotFoundError as e:
+        raise ConstructorError(None, None, str(e), node.start_mark)
+    except yaml.MarkedYAMLError as e:
+        # Report errors in the fragment at the tag, as their marks are lines of another file
+        mark = e.problem_mark or e.context_mark
+        where = f", line {mark.line + 1}" if mark is not None and e.problem_mark is not None else ""
+        raise ConstructorError(None, None, f"{path}{where}: {e.problem or e}", node.start_mark)
+    # A cached fragment may have been parsed for a CV in a parent directory
+    outside = sorted(include for include in includes if not _within(include, loader.root))
+    if outside:
+        raise ConstructorError(None, None, f"{node.value}: includes {outside[0]}, outside {loader.root}",
+                               node.start_mark)
+    loader.includes.update(includes)
+    return _select(data, key_path, node) if key_path else data
+
+
+_IncludeLoader.add_constructor(INCLUDE_TAG, _construct_include)
+
+
+def load_yaml(content: str, base_dir: Optional[str] = None, cache: Optional[FragmentCache] = None,
+              stack: Tuple[str, ...] = (), root: Optional[str] = None) -> Tuple[Any, List[str]]:
+    """Parse a YAML document, resolving ``!include`` tags.
+
+    Args:
+        content: YAML document
+        base_dir: Directory included paths are relative to, normally that of
+            the file the document was read from; None rejects ``!include``
+        cache: Fragment cache to use; defaults to ``FRAGMENT_CACHE``
+        stack: Files currently being included, to detect cycles
+        root: Directory includes must stay within; defaults to ``base_dir``
+
+    Returns:
+        Tuple of (data, sorted absolute paths of every included file)
+
+    Raises:
+        yaml.YAMLError: If the document or a fragment cannot be parsed, an
+            included file is missing or outside ``root``, includes form a
+            cycle, or the document has an ``!include`` and no ``base_dir``
+    """
+    if base_dir is not None:
+        base_dir = os.path.abspath(base_dir)
+        root = os.path.abspath(root) if root is not None else base_dir
+    loader = _IncludeLoader(content, base_dir, cache if cache is not None else FRAGMENT_CACHE, stack, root)
+    try:
+        data = loader.get_single_data()
+    finally:
+        loader.dispose()
+    return data, sorted(loader.includes)
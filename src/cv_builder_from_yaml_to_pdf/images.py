@@ -0,0 +1,251 @@
+"""Image handling for CV Builder.
+
+This module loads the profile photo and company logos drawn into CVs. Each
+image is decoded once, downscaled to the pixel size it needs at the target DPI
+and kept in a bounded, process-wide cache keyed by the hash of the file's
+content and that pixel size. The same logo used by thousands of CVs in a batch
+is therefore decoded and resized once per worker.
+
+Opaque images are stored as JPEG, which reportlab embeds as-is instead of
+re-encoding them for every PDF; images with transparency are stored as PNG.
+
+Like ``!include``, image paths are confined to the directory of the CV file:
+absolute paths, ``~`` and ``..`` paths that leave it are rejected, and CVs that
+do not come from a file (queue payloads, standard input, records) cannot refer
+to images at all. Otherwise an uploaded CV could embed any image file the
+renderer can read.
+"""
+
+import hashlib
+import io
+import math
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from PIL import Image as PILImage, ImageOps
+from reportlab.lib.utils import ImageReader
+from reportlab.platypus import Flowable
+
+from cv_builder_from_yaml_to_pdf.metrics import METRICS
+
+
+# Resolution images are downscaled to; plenty for print at the sizes drawn
+DEFAULT_DPI = 150
+
+JPEG_QUALITY = 88
+
+
+class ImagePathError(ValueError):
+    """Raised for an image path a CV is not allowed to refer to."""
+
+
+def resolve_image_path(path: str, base_dir: Optional[str]) -> str:
+    """Resolve a photo or logo path from a CV against the CV file's directory.
+
+    Args:
+        path: Path as written in the CV
+        base_dir: Directory of the CV file, or None for CVs passed as text
+
+    Returns:
+        Absolute path of the image file
+
+    Raises:
+        ImagePathError: If there is no ``base_dir``, or the path is absolute,
+            starts with ``~`` or leaves ``base_dir``
+    """
+    if base_dir is None:
+        raise ImagePathError(f"{path}: images are only allowed in CV files, not in documents passed as text")
+    if os.path.isabs(path) or path.startswith('~'):
+        raise ImagePathError(f"{path}: image paths must be relative")
+    root = os.path.abspath(base_dir)
+    resolved = os.path.normpath(os.path.join(root, path))
+    if os.path.commonpath([resolved, root]) != root:
+        raise ImagePathError(f"{path}: outside {root}")
+    return resolved
+
+
+class CachedImage:
+    """A decoded, downscaled image ready to be drawn into any number of PDFs."""
+
+    def __init__(self, data: bytes, pixel_size: Tuple[int, int]):
+        """Initialize the image.
+
+        Args:
+            data: The downscaled image as JPEG or PNG
+            pixel_size: Width and height of the downscaled image in pixels
+        """
+        self.data = data
+        self.pixel_size = pixel_size
+        self.reader = ImageReader(io.BytesIO(data))
+        # Decode now so that renders only read the reader's cached pixels
+        raw = self.reader.getRGBData()
+        alpha = self.reader._dataA.getRGBData() if self.reader._dataA is not None else b""
+        self.size_bytes = len(data) + len(raw) + len(alpha)
+        # reportlab reads JPEG data through the reader's shared file object
+        self.lock = threading.Lock()
+
+    def fit(self, max_width: float, max_height: float) -> Tuple[float, float]:
+        """Get the drawn size in points that fits the box while keeping the aspect ratio."""
+        width, height = self.pixel_size
+        scale = min(max_width / width, max_height / height)
+        return width * scale, height * scale
+
+
+class ImageFlowable(Flowable):
+    """Flowable drawing a ``CachedImage`` at a fixed size."""
+
+    def __init__(self, image: CachedImage, width: float, height: float):
+        super().__init__()
+        self.image = image
+        self.width = width
+        self.height = height
+
+    def wrap(self, available_width, available_height):
+        return self.width, self.height
+
+    def draw(self):
+        with self.image.lock:
+            self.canv.drawImage(self.image.reader, 0, 0, self.width, self.height, mask='auto')
+
+
+def _has_alpha(image: PILImage.Image) -> bool:
+    return image.mode in ('RGBA', 'LA', 'PA') or (image.mode == 'P' and 'transparency' in image.info)
+
+
+def downscale(data: bytes, max_pixels: Tuple[int, int]) -> Tuple[bytes, Tuple[int, int]]:
+    """Decode an image and shrink it to fit within a pixel box.
+
+    Images are never enlarged. EXIF orientation is applied, so photos taken
+    on phones are drawn upright.
+
+    Args:
+        data: Content of a JPEG, PNG or other image file PIL can read
+        max_pixels: Largest width and height in pixels
+
+    Returns:
+        The encoded image (JPEG, or PNG if it has transparency) and its pixel size
+    """
+    with PILImage.open(io.BytesIO(data)) as image:
+        # Lets JPEG decoding skip straight to a reduced scale
+        image.draft('RGB', max_pixels)
+        image = ImageOps.exif_transpose(image)
+        alpha = _has_alpha(image)
+        image = image.convert('RGBA' if alpha else 'RGB')
+        image.thumbnail(max_pixels, PILImage.LANCZOS)
+        output = io.BytesIO()
+        if alpha:
+            image.save(output, 'PNG', optimize=True)
+        else:
+            image.save(output, 'JPEG', quality=JPEG_QUALITY, optimize=True)
+        return output.getvalue(), image.size
+
+
+class ImageCache:
+    """Bounded, thread-safe LRU cache of downscaled images."""
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 64 * 1024 * 1024, dpi: int = DEFAULT_DPI):
+        """Initialize the cache.
+
+        Args:
+            max_entries: Most images kept
+            max_bytes: Most memory kept, counting encoded and decoded pixels
+            dpi: Resolution images are downscaled to
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.dpi = dpi
+        self.hits = 0
+        self.misses = 0
+        self.size_bytes = 0
+        self._images: "OrderedDict[Tuple[str, Tuple[int, int]], CachedImage]" = OrderedDict()
+        # Content hash of each file, so unchanged files are not re-read
+        self._digests: Dict[Tuple[str, int, int], str] = {}
+        self._lock = threading.Lock()
+
+    def pixel_box(self, max_width: float, max_height: float) -> Tuple[int, int]:
+        """Get the pixel box for a box in points at the cache's DPI."""
+        return math.ceil(max_width * self.dpi / 72), math.ceil(max_height * self.dpi / 72)
+
+    def _digest(self, path: str) -> Tuple[str, Optional[bytes]]:
+        """Get the content hash of a file, and its content if it had to be read."""
+        stat = os.stat(path)
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            digest = self._digests.get(key)
+        if digest is not None:
+            return digest, None
+        with open(path, 'rb') as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            if len(self._digests) >= 4 * self.max_entries:
+                self._digests.clear()
+            self._digests[key] = digest
+        return digest, data
+
+    def get(self, path: str, max_width: float, max_height: float) -> CachedImage:
+        """Get an image downscaled to fit a box, decoding it on a cache miss.
+
+        Args:
+            path: Path of the image file
+            max_width: Largest width the image is drawn at, in points
+            max_height: Largest height the image is drawn at, in points
+
+        Returns:
+            The cached image
+
+        Raises:
+            FileNotFoundError: If the file does not exist
+            ValueError: If the file is not an image PIL can read
+        """
+        path = os.path.abspath(path)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Image file not found: {path}")
+        box = self.pixel_box(max_width, max_height)
+        digest, data = self._digest(path)
+        key = (digest, box)
+        with self._lock:
+            image = self._images.get(key)
+            if image is not None:
+                self._images.move_to_end(key)
+                self.hits += 1
+        METRICS.cache("image", image is not None)
+        if image is not None:
+            return image
+
+        if data is None:
+            with open(path, 'rb') as f:
+                data = f.read()
+        try:
+            image = CachedImage(*downscale(data, box))
+        except (OSError, PILImage.DecompressionBombError) as e:
+            raise ValueError(f"Cannot read image {path}: {e}")
+
+        with self._lock:
+            self.misses += 1
+            if key not in self._images:
+                self._images[key] = image
+                self.size_bytes += image.size_bytes
+            while self._images and (len(self._images) > self.max_entries or self.size_bytes > self.max_bytes):
+                _, evicted = self._images.popitem(last=False)
+                self.size_bytes -= evicted.size_bytes
+        return image
+
+    def stats(self) -> Dict[str, int]:
+        """Get the number of hits, misses, cached images and cached bytes."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._images),
+                    "bytes": self.size_bytes}
+
+    def clear(self):
+        """Drop all cached images and statistics."""
+        with self._lock:
+            self._images.clear()
+            self._digests.clear()
+            self.hits = self.misses = self.size_bytes = 0
+
+
+# Process-wide cache shared by all renderers
+IMAGE_CACHE = ImageCache()
@@ -0,0 +1,477 @@
+"""Persistent render job queue for CV Builder.
+
+This module provides a SQLite-backed job queue so that several producers can
+enqueue render jobs and a fixed pool of worker processes can claim and render
+them. The queue lives in a single database file and survives restarts.
+
+A worker renews the lease of the job it is rendering as a heartbeat, so only
+jobs of workers that died are reclaimed, however long a render takes.
+
+Workers can render each job under ``RenderLimits``; jobs that exceed them
+fail permanently with an error starting with ``Limit exceeded``.
+"""
+
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import yaml
+from pydantic import BaseModel, Field
+
+from cv_builder_from_yaml_to_pdf.batch import (STATUS_INVALID, STATUS_LIMIT, STATUS_OK, BatchResult,
+                                               _counting_cache_requests, render_context, render_sandboxed,
+                                               sandbox_pipeline)
+from cv_builder_from_yaml_to_pdf.limits import RenderLimits, RenderSandbox, ResourceLimitExceeded, limit_of
+from cv_builder_from_yaml_to_pdf.metrics import METRICS, REGISTRY, RenderMetrics, serve_metrics
+from cv_builder_from_yaml_to_pdf.pipeline import CVValidationError, RenderContext, RenderPipeline
+
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    status TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    source TEXT,
+    output_path TEXT NOT NULL,
+    style TEXT NOT NULL,
+    page_size TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    available_at REAL NOT NULL,
+    lease_expires_at REAL,
+    worker TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    duration REAL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (status, available_at);
+"""
+
+
+class Job(BaseModel):
+    """Model for a single render job stored in the queue."""
+    id: int = Field(description="Unique job identifier.")
+    status: str = Field(description="One of queued, running, done or failed.")
+    payload: str = Field(description="YAML or JSON CV document to render.")
+    source: Optional[str] = Field(default=None, description="Where the payload came from (e.g., the submitted file path).")
+    output_path: str = Field(description="Path where the PDF will be written.")
+    style: str = Field(description="Style name for the CV.")
+    page_size: str = Field(description="Page size for the PDF.")
+    attempts: int = Field(description="Number of times the job has been claimed.")
+    max_attempts: int = Field(description="Maximum number of attempts before the job is marked as failed.")
+    available_at: float = Field(description="Unix time from which the job may be claimed.")
+    lease_expires_at: Optional[float] = Field(default=None, description="Unix time after which a running job is considered abandoned.")
+    worker: Optional[str] = Field(default=None, description="Identifier of the worker that last claimed the job.")
+    created_at: float = Field(description="Unix time the job was submitted.")
+    started_at: Optional[float] = Field(default=None, description="Unix time the last attempt started.")
+    finished_at: Optional[float] = Field(default=None, description="Unix time the job finished.")
+    duration: Optional[float] = Field(default=None, description="Duration of the last attempt in seconds.")
+    error: Optional[str] = Field(default=None, description="Error message of the last failed attempt.")
+
+
+class PermanentJobError(Exception):
+    """Raised for job failures that retrying cannot fix (e.g., invalid CV data)."""
+
+
+class JobQueue:
+    """SQLite-backed queue of render jobs."""
+
+    def __init__(self, db_path: str, lease_seconds: float = 300.0, backoff_seconds: float = 5.0):
+        """Open (and create if needed) the job queue database.
+
+        Args:
+            db_path: Path to the SQLite database file
+            lease_seconds: How long a claimed job stays reserved for its worker
+            backoff_seconds: Base delay before a failed job is retried; doubles on each attempt
+        """
+        self.db_path = str(db_path)
+        self.lease_seconds = lease_seconds
+        self.backoff_seconds = backoff_seconds
+
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        """Close the database connection."""
+        self.conn.close()
+
+    def submit(self, payload: str, output_path: str, style: str = "classic", page_size: str = "A4",
+               source: Optional[str] = None, max_attempts: int = 3) -> int:
+        """Add a render job to the queue.
+
+        Args:
+            payload: YAML or JSON CV document
+            output_path: Path where the PDF will be written
+            style: Style name for the CV
+            page_size: Page size for the PDF
+            source: Optional description of where the payload came from
+            max_attempts: Maximum number of attempts before giving up
+
+        Returns:
+            The new job id
+        """
+        now = time.time()
+        cursor = self.conn.execute(
+            "INSERT INTO jobs (status, payload, source, output_path, style, page_size, max_attempts, "
+            "available_at, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (JOB_QUEUED, payload, source, str(output_path), style, page_size, max_attempts, now, now),
+        )
+        return cursor.lastrowid
+
+    def claim(self, worker: str) -> Optional[Job]:
+        """Atomically claim the next available job.
+
+        Queued jobs whose backoff has elapsed and running jobs whose lease has
+        expired (their worker died) are both eligible. A job whose lease
+        expires on its last attempt is marked failed instead, so that a job
+        that crashes or hangs its worker does not take out one worker after
+        another.
+
+        Args:
+            worker: Identifier of the claiming worker
+
+        Returns:
+            The claimed job, or None if no job is available
+        """
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, lease_expires_at = NULL, "
+                "error = 'Worker lost: the lease of attempt ' || attempts || ' expired' "
+                "WHERE status = ? AND lease_expires_at <= ? AND attempts >= max_attempts",
+                (JOB_FAILED, now, JOB_RUNNING, now),
+            )
+            row = self.conn.execute(
+                "SELECT id FROM jobs WHERE (status = ? AND available_at <= ?) "
+                "OR (status = ? AND lease_expires_at <= ?) ORDER BY id LIMIT 1",
+                (JOB_QUEUED, now, JOB_RUNNING, now),
+            ).fetchone()
+            if row is None:
+                self.conn.execute("COMMIT")
+                return None
+            self.conn.execute(
+                "UPDATE jobs SET status = ?, worker = ?, attempts = attempts + 1, started_at = ?, "
+                "lease_expires_at = ? WHERE id = ?",
+                (JOB_RUNNING, worker, now, now + self.lease_seconds, row["id"]),
+            )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return self.get(row["id"])
+
+    def renew(self, job_id: int, worker: str) -> bool:
+        """Extend the lease of a running job, as a heartbeat while it renders.
+
+        Args:
+            job_id: Id of the job being rendered
+            worker: Identifier of the worker rendering it
+
+        Returns:
+            False if the worker no longer holds the job
+        """
+        condition, params = self._holder(worker)
+        cursor = self.conn.execute(
+            "UPDATE jobs SET lease_expires_at = ? WHERE id = ?" + condition,
+            (time.time() + self.lease_seconds, job_id) + params,
+        )
+        return cursor.rowcount > 0
+
+    @staticmethod
+    def _holder(worker: Optional[str]):
+        """SQL condition and parameters that a job is still claimed by ``worker``, if given."""
+        if worker is None:
+            return "", ()
+        return " AND status = ? AND worker = ?", (JOB_RUNNING, worker)
+
+    def complete(self, job_id: int, duration: float, worker: Optional[str] = None) -> bool:
+        """Mark a job as successfully finished.
+
+        Args:
+            job_id: Id of the finished job
+            duration: Duration of the attempt in seconds
+            worker: Identifier of the worker that ran the job; if given, the
+                job is only updated while that worker still holds it
+
+        Returns:
+            False if the worker had lost the job to another worker
+        """
+        condition, params = self._holder(worker)
+        cursor = self.conn.execute(
+            "UPDATE jobs SET status = ?, finished_at = ?, duration = ?, error = NULL, "
+            "lease_expires_at = NULL WHERE id = ?" + condition,
+            (JOB_DONE, time.time(), duration, job_id) + params,
+        )
+        return cursor.rowcount > 0
+
+    def fail(self, job_id: int, error: str, duration: float, retry: bool = True,
+             worker: Optional[str] = None) -> bool:
+        """Record a failed attempt and either reschedule the job or mark it failed.
+
+        Args:
+            job_id: Id of the failed job
+            error: Error message for the attempt
+            duration: Duration of the attempt in seconds
+            retry: Whether the failure may be retried
+            worker: Identifier of the worker that ran the job; if given, the
+                job is only updated while that worker still holds it
+
+        Returns:
+            False if the worker had lost the job to another worker
+        """
+        job = self.get(job_id)
+        now = time.time()
+        condition, params = self._holder(worker)
+        if retry and job.attempts < job.max_attempts:
+            delay = self.backoff_seconds * (2 ** (job.attempts - 1))
+            cursor = self.conn.execute(
+                "UPDATE jobs SET status = ?, available_at = ?, duration = ?, error = ?, "
+                "lease_expires_at = NULL WHERE id = ?" + condition,
+                (JOB_QUEUED, now + delay, duration, error, job_id) + params,
+            )
+        else:
+            cursor = self.conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, duration = ?, error = ?, "
+                "lease_expires_at = NULL WHERE id = ?" + condition,
+                (JOB_FAILED, now, duration, error, job_id) + params,
+            )
+        return cursor.rowcount > 0
+
+    def get(self, job_id: int) -> Job:
+        """Get a job by id."""
+        row = self.conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            raise KeyError(f"Job not found: {job_id}")
+        return Job(**dict(row))
+
+    def list_jobs(self, status: Optional[str] = None) -> List[Job]:
+        """List jobs, optionally filtered by status."""
+        if status:
+            rows = self.conn.execute("SELECT * FROM jobs WHERE status = ? ORDER BY id", (status,))
+        else:
+            rows = self.conn.execute("SELECT * FROM jobs ORDER BY id")
+        return [Job(**dict(row)) for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        """Get the number of jobs in each status."""
+        rows = self.conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status")
+        return {row["status"]: row["n"] for row in rows}
+
+    def pending(self) -> int:
+        """Get the number of jobs that are queued or running."""
+        row = self.conn.execute(
+            "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", (JOB_QUEUED, JOB_RUNNING)
+        ).fetchone()
+        return row[0]
+
+
+class _LeaseRenewer(threading.Thread):
+    """Thread that keeps renewing the lease of the job being rendered."""
+
+    def __init__(self, queue: JobQueue, job: Job):
+        super().__init__(name="cv-builder-lease", daemon=True)
+        self.db_path = queue.db_path
+        self.lease_seconds = queue.lease_seconds
+        self.job = job
+        self._stop_event = threading.Event()
+
+    def run(self):
+        # SQLite connections cannot be shared between threads
+        queue = JobQueue(self.db_path, lease_seconds=self.lease_seconds)
+        try:
+            interval = max(self.lease_seconds / 4, 0.01)
+            while not self._stop_event.wait(interval):
+                if not queue.renew(self.job.id, self.job.worker):
+                    return
+        finally:
+            queue.close()
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def _limit_error(limit: str, message: str) -> str:
+    return f"Limit exceeded ({limit}): {message}"
+
+
+def render_job(job: Job, pipelines: Optional[Dict[tuple, RenderPipeline]] = None,
+               metrics: Optional[RenderMetrics] = None, max_pages: Optional[int] = None) -> str:
+    """Run the parse/validate/render pipeline for a job.
+
+    Args:
+        job: The job to render
+        pipelines: Pipelines to reuse, keyed by (style, page_size); new ones are added to it
+        metrics: Metrics to record renders in
+        max_pages: Most pages a job's PDF may have
+
+    Returns:
+        Path to the generated PDF file
+
+    Raises:
+        PermanentJobError: If the payload is not a valid CV document or
+            exceeds a resource limit
+    """
+    pipelines = {} if pipelines is None else pipelines
+    key = (job.style, job.page_size)
+    if key not in pipelines:
+        pipelines[key] = RenderPipeline(job.style, job.page_size, max_pages=max_pages)
+        if metrics is not None:
+            metrics.attach(pipelines[key])
+
+    try:
+        context = pipelines[key].run(text=job.payload, output_path=job.output_path)
+    except yaml.YAMLError as e:
+        raise PermanentJobError(str(e))
+    except CVValidationError as e:
+        raise PermanentJobError(str(e))
+    except (ResourceLimitExceeded, MemoryError) as e:
+        raise PermanentJobError(_limit_error(limit_of(e), str(e) or "Render ran out of memory"))
+    return context.written_path
+
+
+def _render_job_in_sandbox(job: Job, max_pages: Optional[int]) -> BatchResult:
+    context = RenderContext(text=job.payload, output_path=job.output_path)
+    return _counting_cache_requests(render_context, sandbox_pipeline(job.style, job.page_size, max_pages=max_pages),
+                                    context, job.source or f"job {job.id}")
+
+
+def _process_sandboxed(queue: JobQueue, job: Job, sandbox: RenderSandbox, metrics: Optional[RenderMetrics]):
+    """Render a claimed job in a sandbox and record the outcome."""
+    result = render_sandboxed(sandbox, _render_job_in_sandbox, job, sandbox.limits.max_pages,
+                              source=job.source or f"job {job.id}")
+    if metrics is not None:
+        metrics.observe_result(result, job.style)
+        metrics.merge_cache_counts(result.cache_requests)
+    if result.status == STATUS_OK:
+        queue.complete(job.id, result.duration, worker=job.worker)
+    elif result.status == STATUS_LIMIT:
+        queue.fail(job.id, _limit_error(result.limit, result.error), result.duration, retry=False, worker=job.worker)
+    else:
+        queue.fail(job.id, result.error, result.duration, retry=result.status != STATUS_INVALID, worker=job.worker)
+
+
+def process_one(queue: JobQueue, worker: str, pipelines: Optional[Dict[tuple, RenderPipeline]] = None,
+                metrics: Optional[RenderMetrics] = None, limits: Optional[RenderLimits] = None,
+                sandbox: Optional[RenderSandbox] = None) -> Optional[Job]:
+    """Claim and process a single job.
+
+    Args:
+        queue: The job queue
+        worker: Identifier of the worker
+        pipelines: Pipelines to reuse across jobs, keyed by (style, page_size)
+        metrics: Metrics to record renders in
+        limits: Resource limits for the render; only the page limit applies
+            unless a sandbox is given
+        sandbox: Sandbox to render in, which enforces its own limits
+
+    Returns:
+        The job as stored after processing, or None if no job was available
+    """
+    job = queue.claim(worker)
+    if job is None:
+        return None
+
+    renewer = _LeaseRenewer(queue, job)
+    renewer.start()
+    try:
+        if sandbox is not None:
+            _process_sandboxed(queue, job, sandbox, metrics)
+            return queue.get(job.id)
+
+        start = time.perf_counter()
+        try:
+            render_job(job, pipelines, metrics, limits.max_pages if limits is not None else None)
+        except PermanentJobError as e:
+            queue.fail(job.id, str(e), time.perf_counter() - start, retry=False, worker=worker)
+        except Exception as e:
+            queue.fail(job.id, f"{type(e).__name__}: {e}", time.perf_counter() - start, worker=worker)
+        else:
+            queue.complete(job.id, time.perf_counter() - start, worker=worker)
+        return queue.get(job.id)
+    finally:
+        renewer.stop()
+
+
+def _worker_loop(db_path: str, worker: str, poll_interval: float, drain: bool,
+                 lease_seconds: float, backoff_seconds: float, metrics_port: Optional[int] = None,
+                 metrics_host: str = "127.0.0.1", limits: Optional[RenderLimits] = None):
+    """Claim and process jobs until stopped (or until the queue is empty when draining)."""
+    queue = JobQueue(db_path, lease_seconds=lease_seconds, backoff_seconds=backoff_seconds)
+    pipelines = {}
+    metrics = None
+    if metrics_port is not None:
+        metrics = METRICS
+        serve_metrics(REGISTRY, metrics_host, metrics_port)
+    sandbox = RenderSandbox(limits, preload=(__name__,)) if limits is not None and limits.isolated else None
+    try:
+        while True:
+            if process_one(queue, worker, pipelines, metrics, limits, sandbox) is not None:
+                continue
+            if drain and queue.pending() == 0:
+                return
+            time.sleep(poll_interval)
+    finally:
+        if sandbox is not None:
+            sandbox.close()
+        queue.close()
+
+
+def run_workers(db_path: str, concurrency: int = 1, poll_interval: float = 1.0, drain: bool = False,
+                lease_seconds: float = 300.0, backoff_seconds: float = 5.0, metrics_port: Optional[int] = None,
+                metrics_host: str = "127.0.0.1", limits: Optional[RenderLimits] = None):
+    """Run a fixed pool of worker processes against the queue.
+
+    Args:
+        db_path: Path to the SQLite database file
+        concurrency: Number of worker processes
+        poll_interval: Seconds to wait when no job is available
+        drain: Exit once no queued or running jobs remain
+        lease_seconds: How long a claimed job stays reserved for its worker
+        backoff_seconds: Base delay before a failed job is retried
+        metrics_port: Serve Prometheus metrics from each worker process, on
+            this port for the first worker and the following ports for the others
+        metrics_host: Interface the metrics endpoints listen on
+        limits: Resource limits for each job; time and memory limits make
+            each worker render in its own sandbox process
+    """
+    # Make sure the schema exists before the workers race to create it
+    JobQueue(db_path).close()
+
+    prefix = f"{socket.gethostname()}-{os.getpid()}"
+    options = (poll_interval, drain, lease_seconds, backoff_seconds)
+    if concurrency <= 1:
+        _worker_loop(db_path, f"{prefix}-0", *options, metrics_port, metrics_host, limits)
+        return
+
+    processes = []
+    for i in range(concurrency):
+        port = metrics_port + i if metrics_port is not None else None
+        process = multiprocessing.Process(target=_worker_loop,
+                                          args=(db_path, f"{prefix}-{i}", *options, port, metrics_host, limits))
+        process.start()
+        processes.append(process)
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
@@ -0,0 +1,262 @@
+"""Per-render resource limits for CV Builder.
+
+Untrusted CV documents can be crafted to pin a worker for minutes or exhaust
+its memory. ``RenderLimits`` bounds every render:
+
+* ``timeout``: wall-clock seconds; the render process is killed when it is
+  exceeded
+* ``cpu_seconds``: CPU time, enforced with ``RLIMIT_CPU``; the render is
+  interrupted by ``SIGXCPU``
+* ``memory_mb``: address space of the render process, enforced with
+  ``RLIMIT_AS``; allocations beyond it raise ``MemoryError``
+* ``max_pages``: pages per document; layout stops at the first page over it
+
+The page limit is checked in the renderer itself and works anywhere. The
+other limits need a separate process: ``RenderSandbox`` runs renders in a
+long-lived child process with the limits applied, and replaces the child
+whenever a render has to be killed or ran out of memory, so the next render
+starts from a clean process. Renders that hit a limit raise
+``ResourceLimitExceeded``, which batch, queue and preview modes report as
+their own failure class. CPU time and address-space limits need the
+``resource`` module and are ignored where it is not available.
+"""
+
+import importlib
+import math
+import multiprocessing
+import signal
+import time
+from typing import Any, Callable, Optional, Sequence
+
+from pydantic import BaseModel, Field
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+
+LIMIT_TIMEOUT = "timeout"
+LIMIT_CPU = "cpu"
+LIMIT_MEMORY = "memory"
+LIMIT_PAGES = "pages"
+# The render process died, e.g. killed by the kernel's out-of-memory killer
+LIMIT_KILLED = "killed"
+
+
+class ResourceLimitExceeded(Exception):
+    """Raised when a render exceeds one of its resource limits."""
+
+    # Which limit was exceeded, one of the ``LIMIT_*`` names
+    limit = LIMIT_KILLED
+
+    def __init__(self, message: str, limit: Optional[str] = None):
+        """Initialize the error.
+
+        Args:
+            message: Description of what happened
+            limit: Which limit was exceeded; defaults to the class's ``limit``
+        """
+        super().__init__(message)
+        if limit is not None:
+            self.limit = limit
+
+    def __reduce__(self):
+        return type(self), (str(self), self.limit)
+
+
+class RenderLimits(BaseModel):
+    """Model for the resource limits of each render."""
+    timeout: Optional[float] = Field(default=None, gt=0, description="Wall-clock seconds per render.")
+    cpu_seconds: Optional[int] = Field(default=None, gt=0, description="CPU seconds per render.")
+    memory_mb: Optional[int] = Field(default=None, gt=0, description="Address space of the render process in MiB.")
+    max_pages: Optional[int] = Field(default=None, gt=0, description="Most pages per document.")
+
+    @property
+    def isolated(self) -> bool:
+        """Whether renders need a separate process to enforce these limits."""
+        return self.timeout is not None or self.cpu_seconds is not None or self.memory_mb is not None
+
+
+def limit_of(error: BaseException) -> Optional[str]:
+    """Get the limit an exception raised while rendering stands for, or None."""
+    if isinstance(error, ResourceLimitExceeded):
+        return error.limit
+    if isinstance(error, MemoryError):
+        return LIMIT_MEMORY
+    return None
+
+
+def check_page_limit(page: int, max_pages: Optional[int]):
+    """Raise if starting page number ``page`` would go over ``max_pages``."""
+    if max_pages is not None and page > max_pages:
+        raise ResourceLimitExceeded(f"Document has more than {max_pages} pages", LIMIT_PAGES)
+
+
+def _runs_out_of_memory(reply) -> bool:
+    """Whether a call's reply shows it ran out of memory, directly or in a result reporting it."""
+    if reply[0] == "limit":
+        return reply[1] == LIMIT_MEMORY
+    return reply[0] == "ok" and getattr(reply[1], "limit", None) == LIMIT_MEMORY
+
+
+def _on_sigxcpu(signum, frame):
+    raise ResourceLimitExceeded("Render used up its CPU time", LIMIT_CPU)
+
+
+def _sandbox_main(conn, limits: RenderLimits, preload: Sequence[str]):
+    """Run calls received on ``conn`` under ``limits`` until told to stop."""
+    try:
+        for module in preload:
+            importlib.import_module(module)
+        if resource is not None and limits.memory_mb is not None:
+            size = limits.memory_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (size, size))
+    except Exception as e:
+        conn.send(("error", f"{type(e).__name__}: {e}"))
+        return
+    conn.send(("ready",))
+    cpu_limit = resource is not None and limits.cpu_seconds is not None
+    if cpu_limit:
+        signal.signal(signal.SIGXCPU, _on_sigxcpu)
+        _, cpu_hard = resource.getrlimit(resource.RLIMIT_CPU)
+    while True:
+        call = conn.recv()
+        if call is None:
+            return
+        fn, args = call
+        if cpu_limit:
+            usage = resource.getrusage(resource.RUSAGE_SELF)
+            soft = math.ceil(usage.ru_utime + usage.ru_stime) + limits.cpu_seconds
+            if cpu_hard != resource.RLIM_INFINITY:
+                soft = min(soft, cpu_hard)
+            resource.setrlimit(resource.RLIMIT_CPU, (soft, cpu_hard))
+        try:
+            reply = ("ok", fn(*args))
+        except Exception as e:
+            limit = limit_of(e)
+            reply = ("limit", limit, str(e)) if limit else ("error", f"{type(e).__name__}: {e}")
+        finally:
+            if cpu_limit:
+                resource.setrlimit(resource.RLIMIT_CPU, (cpu_hard, cpu_hard))
+        conn.send(reply)
+        # Start over in a fresh process after running out of memory
+        if _runs_out_of_memory(reply):
+            return
+
+
+def _context():
+    # Children are never forked from a process that may be running other threads
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+class RenderSandbox:
+    """A child process that runs renders under resource limits.
+
+    The child is started on first use and kept for later calls, so renderers
+    and caches it builds stay warm. It is replaced after a call that timed
+    out, died or ran out of memory. A sandbox serves one caller at a time;
+    give each thread its own.
+    """
+
+    def __init__(self, limits: RenderLimits, preload: Sequence[str] = ()):
+        """Initialize the sandbox.
+
+        Args:
+            limits: Limits to apply to each call
+            preload: Modules the child imports before the limits apply, so
+                that importing them does not count against the first call
+        """
+        self.limits = limits
+        self.preload = tuple(preload)
+        self.restarts = 0
+        self._process = None
+        self._conn = None
+
+    def _start(self):
+        parent_conn, child_conn = _context().Pipe()
+        self._process = _context().Process(target=_sandbox_main, args=(child_conn, self.limits, self.preload),
+                                           daemon=True, name="cv-builder-sandbox")
+        self._process.start()
+        child_conn.close()
+        self._conn = parent_conn
+        try:
+            reply = self._conn.recv()
+        except EOFError:
+            reply = ("error", f"exit code {self._process.exitcode}")
+        if reply[0] != "ready":
+            self._stop(kill=True)
+            raise RuntimeError(f"Render sandbox failed to start: {reply[1]}")
+
+    def _stop(self, kill: bool):
+        if self._process is None:
+            return
+        if kill:
+            self._process.kill()
+        else:
+            try:
+                self._conn.send(None)
+            except OSError:
+                pass
+        self._process.join(5)
+        if self._process.is_alive():
+            self._process.kill()
+            self._process.join()
+        self._conn.close()
+        self._process = self._conn = None
+
+    def call(self, fn: Callable, *args) -> Any:
+        """Run ``fn(*args)`` in the child process and return its result.
+
+        ``fn`` must be a module-level function; it and its arguments and
+        result are pickled.
+
+        Raises:
+            ResourceLimitExceeded: If the call exceeded a limit or the child died
+            RuntimeError: If ``fn`` raised any other exception
+        """
+        if self._process is None:
+            self._start()
+        try:
+            self._conn.send((fn, args))
+        except OSError:
+            # The child died between calls
+            self._stop(kill=True)
+            self._start()
+            self._conn.send((fn, args))
+        start = time.monotonic()
+        if not self._conn.poll(self.limits.timeout):
+            self._stop(kill=True)
+            self.restarts += 1
+            raise ResourceLimitExceeded(f"Render took longer than {self.limits.timeout:g}s", LIMIT_TIMEOUT)
+        try:
+            reply = self._conn.recv()
+        except (EOFError, OSError):
+            self._process.join(5)
+            exitcode = self._process.exitcode
+            self._stop(kill=True)
+            self.restarts += 1
+            if exitcode == -signal.SIGXCPU:
+                raise ResourceLimitExceeded("Render used up its CPU time", LIMIT_CPU)
+            cause = f"signal {-exitcode}" if exitcode is not None and exitcode < 0 else f"exit code {exitcode}"
+            raise ResourceLimitExceeded(f"Render process died ({cause}) after {time.monotonic() - start:.1f}s")
+        if _runs_out_of_memory(reply):
+            # The child exits after sending the reply
+            self._stop(kill=False)
+            self.restarts += 1
+        if reply[0] == "limit":
+            raise ResourceLimitExceeded(reply[2], reply[1])
+        if reply[0] == "error":
+            raise RuntimeError(reply[1])
+        return reply[1]
+
+    def close(self):
+        """Stop the child process."""
+        self._stop(kill=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
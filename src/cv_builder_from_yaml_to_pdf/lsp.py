@@ -0,0 +1,502 @@
+"""Language server for CV YAML files.
+
+This module implements a small Language Server Protocol server over stdio that
+validates CV documents as they are edited and completes field names. Each edit
+re-parses only the changed document; validation errors from the ``CV`` model
+are mapped back to YAML line/column positions using the node marks produced by
+the YAML composer.
+
+Positions are exchanged in UTF-16 code units, the protocol's default, unless
+the client offers UTF-32 (code points), which is what the server works in.
+
+``!include`` tags are resolved like in CV files, relative to the directory of
+documents opened from ``file:`` URIs; in other documents they are reported.
+"""
+
+import json
+import os
+import re
+import sys
+import time
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlparse
+from urllib.request import url2pathname
+
+import yaml
+from pydantic import ValidationError
+
+from cv_builder_from_yaml_to_pdf.fragments import FRAGMENT_CACHE, INCLUDE_TAG, _construct_include
+from cv_builder_from_yaml_to_pdf.models import CV
+from cv_builder_from_yaml_to_pdf.schema import get_cv_schema
+
+
+SEVERITY_ERROR = 1
+
+# TextDocumentSyncKind.Incremental
+SYNC_INCREMENTAL = 2
+
+# CompletionItemKind.Field
+COMPLETION_FIELD = 5
+
+# PositionEncodingKind
+ENCODING_UTF16 = "utf-16"
+ENCODING_UTF32 = "utf-32"
+
+# JSON-RPC error codes
+ERROR_PARSE = -32700
+ERROR_METHOD_NOT_FOUND = -32601
+ERROR_INVALID_PARAMS = -32602
+ERROR_INTERNAL = -32603
+
+# The libyaml-based loader is an order of magnitude faster and also records node marks
+_Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+class _DocumentLoader(_Loader):
+    """Loader that resolves ``!include`` tags through the process-wide fragment cache."""
+
+    def __init__(self, stream, path: Optional[str]):
+        super().__init__(stream)
+        # Same attributes as the fragment loader; without a path, includes are rejected
+        self.base_dir = self.root = os.path.dirname(path) if path else None
+        self.cache = FRAGMENT_CACHE
+        self.stack = (path,) if path else ()
+        self.includes = set()
+
+
+_DocumentLoader.add_constructor(INCLUDE_TAG, _construct_include)
+
+
+def document_path(uri: str) -> Optional[str]:
+    """Get the file path of a ``file:`` URI, or None for other schemes."""
+    parsed = urlparse(uri)
+    if parsed.scheme != "file":
+        return None
+    return os.path.abspath(url2pathname(unquote(parsed.path)))
+
+
+def _mark_position(mark) -> Dict[str, int]:
+    return {"line": mark.line, "character": mark.column}
+
+
+def _node_range(node: yaml.Node) -> Dict[str, Dict[str, int]]:
+    return {"start": _mark_position(node.start_mark), "end": _mark_position(node.end_mark)}
+
+
+def _diagnostic(range_: Dict[str, Any], message: str) -> Dict[str, Any]:
+    return {"range": range_, "severity": SEVERITY_ERROR, "source": "cv-builder", "message": message}
+
+
+def parse_document(text: str, path: Optional[str] = None) -> Tuple[Optional[yaml.Node], Any]:
+    """Parse YAML text into both its node tree and Python data in a single pass.
+
+    Args:
+        text: YAML document
+        path: File the document is edited as, which ``!include`` paths are
+            relative to; None rejects ``!include``
+
+    Returns:
+        Tuple of (root node, constructed data); both are None for an empty document
+
+    Raises:
+        yaml.YAMLError: If the text cannot be parsed as YAML
+    """
+    loader = _DocumentLoader(text, path)
+    try:
+        node = loader.get_single_node()
+        data = loader.construct_document(node) if node is not None else None
+    finally:
+        loader.dispose()
+    return node, data
+
+
+def find_node(root: yaml.Node, loc: Tuple) -> Tuple[yaml.Node, bool]:
+    """Find the YAML node for a pydantic error location.
+
+    Args:
+        root: Root node of the document
+        loc: Error location, a tuple of mapping keys and sequence indexes
+
+    Returns:
+        Tuple of (node, exact). When part of the location does not exist in the
+        document (e.g., a missing required field), the deepest existing node is
+        returned with ``exact`` set to False; for a mapping key the key node is
+        returned so the diagnostic points at the field name.
+    """
+    node = root
+    key_node = None
+    for part in loc:
+        child = None
+        if isinstance(node, yaml.MappingNode):
+            for key, value in node.value:
+                if key.value == str(part):
+                    key_node, child = key, value
+                    break
+        elif isinstance(node, yaml.SequenceNode) and isinstance(part, int) and part < len(node.value):
+            key_node, child = None, node.value[part]
+        if child is None:
+            return (key_node or node), False
+        node = child
+    return node, True
+
+
+def validate_document(text: str, path: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Validate a CV YAML document and return LSP diagnostics.
+
+    Args:
+        text: YAML document
+        path: File the document is edited as, which ``!include`` paths are
+            relative to; None rejects ``!include``
+
+    Returns:
+        List of LSP ``Diagnostic`` objects
+    """
+    try:
+        root, data = parse_document(text, path)
+    except yaml.MarkedYAMLError as e:
+        mark = e.problem_mark or e.context_mark
+        position = _mark_position(mark) if mark else {"line": 0, "character": 0}
+        return [_diagnostic({"start": position, "end": position}, f"YAML syntax error: {e.problem or e}")]
+    except yaml.YAMLError as e:
+        position = {"line": 0, "character": 0}
+        return [_diagnostic({"start": position, "end": position}, f"YAML error: {e}")]
+
+    if root is None or not isinstance(data, dict):
+        position = {"line": 0, "character": 0}
+        return [_diagnostic({"start": position, "end": position}, "The CV document must be a mapping of sections.")]
+
+    try:
+        CV.model_validate(data)
+    except ValidationError as e:
+        diagnostics = []
+        for err in e.errors():
+            node, exact = find_node(root, err["loc"])
+            message = err["msg"]
+            if not exact:
+                message = f"{'.'.join(str(part) for part in err['loc'])}: {message}"
+            diagnostics.append(_diagnostic(_node_range(node), message))
+        return diagnostics
+    return []
+
+
+def _resolve_schema(schema: Dict[str, Any], definitions: Dict[str, Any]) -> Dict[str, Any]:
+    """Follow ``$ref`` and optional ``anyOf`` wrappers to the concrete schema."""
+    while True:
+        if "$ref" in schema:
+            schema = definitions[schema["$ref"].split("/")[-1]]
+        elif "anyOf" in schema:
+            options = [option for option in schema["anyOf"] if option.get("type") != "null"]
+            if len(options) != 1:
+                return schema
+            schema = options[0]
+        else:
+            return schema
+
+
+_KEY_LINE = re.compile(r"^(?P<indent>\s*)(?P<dash>-\s+)?(?P<key>[^\s#:][^:#]*?)\s*:(\s|$)")
+_DASH_LINE = re.compile(r"^(?P<indent>\s*)-(\s|$)")
+
+
+def _key_path(lines: List[str], line: int, character: int) -> List[str]:
+    """Work out which mapping keys enclose a cursor position from indentation.
+
+    Returns:
+        The enclosing key path from the document root
+    """
+    current = lines[line][:character] if line < len(lines) else ""
+    if _DASH_LINE.match(current):
+        indent = len(current) - len(current.lstrip(" -"))
+    else:
+        indent = len(current) - len(current.lstrip())
+    path = []
+    limit = indent
+    for previous in reversed(lines[:line]):
+        if not previous.strip() or previous.lstrip().startswith("#"):
+            continue
+        key_match = _KEY_LINE.match(previous)
+        if key_match:
+            key_indent = len(key_match.group("indent"))
+            if key_match.group("dash"):
+                # A list item's first key sits after the dash
+                key_indent += len(key_match.group("dash"))
+            if key_indent < limit and previous.rstrip().endswith(":"):
+                path.insert(0, key_match.group("key").strip())
+                limit = len(key_match.group("indent"))
+            elif key_match.group("dash") and len(key_match.group("indent")) < limit:
+                limit = len(key_match.group("indent"))
+        else:
+            dash_match = _DASH_LINE.match(previous)
+            if dash_match and len(dash_match.group("indent")) < limit:
+                limit = len(dash_match.group("indent"))
+        if limit == 0:
+            break
+    return path
+
+
+class CompletionProvider:
+    """Field name completion driven by the CV JSON schema."""
+
+    def __init__(self, schema: Optional[Dict[str, Any]] = None):
+        """Initialize the provider.
+
+        Args:
+            schema: JSON schema of the CV model; defaults to ``get_cv_schema()``
+        """
+        self.schema = schema or get_cv_schema()
+        self.definitions = self.schema.get("$defs", {})
+
+    def properties_for(self, path: List[str]) -> Dict[str, Any]:
+        """Get the schema properties of the object at a key path."""
+        schema = self.schema
+        for key in path:
+            schema = _resolve_schema(schema, self.definitions)
+            if schema.get("type") == "array":
+                schema = _resolve_schema(schema.get("items", {}), self.definitions)
+            schema = schema.get("properties", {}).get(key)
+            if schema is None:
+                return {}
+        schema = _resolve_schema(schema, self.definitions)
+        if schema.get("type") == "array":
+            schema = _resolve_schema(schema.get("items", {}), self.definitions)
+        return schema.get("properties", {})
+
+    def complete(self, text: str, line: int, character: int) -> List[Dict[str, Any]]:
+        """Get completion items for field names at a position.
+
+        Args:
+            text: YAML document
+            line: Zero-based cursor line
+            character: Zero-based cursor column
+
+        Returns:
+            List of LSP ``CompletionItem`` objects
+        """
+        lines = text.split("\n")
+        path = _key_path(lines, line, character)
+        properties = self.properties_for(path)
+        return [
+            {
+                "label": name,
+                "kind": COMPLETION_FIELD,
+                "detail": prop.get("title", name),
+                "documentation": prop.get("description", ""),
+                "insertText": f"{name}: ",
+            }
+            for name, prop in properties.items()
+        ]
+
+
+def _line_start(text: str, line: int) -> int:
+    """Get the offset of the start of a line, or the length of ``text`` past its end."""
+    offset = 0
+    for _ in range(line):
+        newline = text.find("\n", offset)
+        if newline == -1:
+            return len(text)
+        offset = newline + 1
+    return offset
+
+
+def _to_code_points(line: str, character: int, encoding: str) -> int:
+    """Convert a column in ``encoding`` units to a code point column of ``line``."""
+    if encoding == ENCODING_UTF32:
+        return character
+    column = units = 0
+    for char in line:
+        if units >= character:
+            break
+        units += 2 if ord(char) > 0xFFFF else 1
+        column += 1
+    return column
+
+
+def _from_code_points(line: str, column: int, encoding: str) -> int:
+    """Convert a code point column of ``line`` to ``encoding`` units."""
+    if encoding == ENCODING_UTF32:
+        return column
+    return column + sum(1 for char in line[:column] if ord(char) > 0xFFFF)
+
+
+def _line(text: str, line: int) -> str:
+    start = _line_start(text, line)
+    end = text.find("\n", start)
+    return text[start:] if end == -1 else text[start:end]
+
+
+def _offset(text: str, position: Dict[str, int], encoding: str = ENCODING_UTF16) -> int:
+    """Convert an LSP position to an offset into ``text``."""
+    start = _line_start(text, position["line"])
+    column = _to_code_points(_line(text, position["line"]), position["character"], encoding)
+    return min(start + column, len(text))
+
+
+def encode_diagnostics(text: str, diagnostics: List[Dict[str, Any]], encoding: str) -> List[Dict[str, Any]]:
+    """Convert the code point columns of diagnostics from ``validate_document`` to ``encoding`` units."""
+    if encoding == ENCODING_UTF32 or text.isascii():
+        return diagnostics
+    for diagnostic in diagnostics:
+        # Start and end may be the same dict, so replace them rather than update them
+        diagnostic["range"] = {
+            name: {"line": position["line"],
+                   "character": _from_code_points(_line(text, position["line"]), position["character"], encoding)}
+            for name, position in diagnostic["range"].items()
+        }
+    return diagnostics
+
+
+def apply_change(text: str, change: Dict[str, Any], encoding: str = ENCODING_UTF16) -> str:
+    """Apply an LSP content change (full or ranged) to a document.
+
+    Args:
+        text: Document before the change
+        change: ``TextDocumentContentChangeEvent``
+        encoding: Position encoding agreed with the client
+    """
+    if "range" not in change:
+        return change["text"]
+    start = _offset(text, change["range"]["start"], encoding)
+    end = _offset(text, change["range"]["end"], encoding)
+    return text[:start] + change["text"] + text[end:]
+
+
+class CVLanguageServer:
+    """Language server speaking JSON-RPC over a pair of binary streams."""
+
+    def __init__(self, reader: BinaryIO, writer: BinaryIO):
+        """Initialize the server.
+
+        Args:
+            reader: Stream the client messages are read from
+            writer: Stream the server messages are written to
+        """
+        self.reader = reader
+        self.writer = writer
+        self.documents: Dict[str, str] = {}
+        self.completion = CompletionProvider()
+        self.shutdown_requested = False
+        self.last_validation_ms: Optional[float] = None
+        self.position_encoding = ENCODING_UTF16
+
+    def read_message(self) -> Optional[Dict[str, Any]]:
+        """Read one framed JSON-RPC message, or None at end of input.
+
+        Raises:
+            ValueError: If the message is not valid JSON
+        """
+        length = None
+        while True:
+            header = self.reader.readline()
+            if not header:
+                return None
+            header = header.strip()
+            if not header:
+                break
+            name, _, value = header.decode("ascii").partition(":")
+            if name.lower() == "content-length":
+                length = int(value.strip())
+        if length is None:
+            return None
+        return json.loads(self.reader.read(length).decode("utf-8"))
+
+    def send(self, message: Dict[str, Any]):
+        """Write one framed JSON-RPC message."""
+        body = json.dumps({"jsonrpc": "2.0", **message}).encode("utf-8")
+        self.writer.write(f"Content-Length: {len(body)}\r\n\r\n".encode("ascii") + body)
+        self.writer.flush()
+
+    def publish_diagnostics(self, uri: str):
+        """Validate a document and publish its diagnostics."""
+        start = time.perf_counter()
+        text = self.documents.get(uri, "")
+        diagnostics = encode_diagnostics(text, validate_document(text, document_path(uri)), self.position_encoding)
+        self.last_validation_ms = (time.perf_counter() - start) * 1000
+        self.send({"method": "textDocument/publishDiagnostics",
+                   "params": {"uri": uri, "diagnostics": diagnostics}})
+
+    def handle(self, message: Dict[str, Any]) -> bool:
+        """Handle one message.
+
+        Returns:
+            False once the client has asked the server to exit
+        """
+        method = message.get("method")
+        params = message.get("params") or {}
+        result = None
+
+        if method == "initialize":
+            offered = ((params.get("capabilities") or {}).get("general") or {}).get("positionEncodings") or []
+            self.position_encoding = ENCODING_UTF32 if ENCODING_UTF32 in offered else ENCODING_UTF16
+            result = {
+                "capabilities": {
+                    "positionEncoding": self.position_encoding,
+                    "textDocumentSync": {"openClose": True, "change": SYNC_INCREMENTAL},
+                    "completionProvider": {"triggerCharacters": []},
+                },
+                "serverInfo": {"name": "cv-builder"},
+            }
+        elif method == "textDocument/didOpen":
+            document = params["textDocument"]
+            self.documents[document["uri"]] = document["text"]
+            self.publish_diagnostics(document["uri"])
+        elif method == "textDocument/didChange":
+            uri = params["textDocument"]["uri"]
+            text = self.documents.get(uri, "")
+            for change in params["contentChanges"]:
+                text = apply_change(text, change, self.position_encoding)
+            self.documents[uri] = text
+            self.publish_diagnostics(uri)
+        elif method == "textDocument/didClose":
+            uri = params["textDocument"]["uri"]
+            self.documents.pop(uri, None)
+            self.send({"method": "textDocument/publishDiagnostics", "params": {"uri": uri, "diagnostics": []}})
+        elif method == "textDocument/completion":
+            uri = params["textDocument"]["uri"]
+            position = params["position"]
+            text = self.documents.get(uri, "")
+            character = _to_code_points(_line(text, position["line"]), position["character"], self.position_encoding)
+            result = self.completion.complete(text, position["line"], character)
+        elif method == "shutdown":
+            self.shutdown_requested = True
+        elif method == "exit":
+            return False
+        elif "id" in message:
+            self.send({"id": message["id"], "error": {"code": ERROR_METHOD_NOT_FOUND,
+                                                      "message": f"Method not found: {method}"}})
+            return True
+
+        if "id" in message:
+            self.send({"id": message["id"], "result": result})
+        return True
+
+    def serve(self):
+        """Handle messages until the client exits or closes the stream.
+
+        A message that cannot be handled gets an error response if it is a
+        request; either way the session goes on.
+        """
+        while True:
+            try:
+                message = self.read_message()
+            except ValueError as e:
+                self.send({"id": None, "error": {"code": ERROR_PARSE, "message": f"Parse error: {e}"}})
+                continue
+            if message is None:
+                return
+            try:
+                if not self.handle(message):
+                    return
+            except Exception as e:
+                request_id = message.get("id") if isinstance(message, dict) else None
+                if request_id is None:
+                    print(f"cv-builder lsp: error handling a notification: {e!r}", file=sys.stderr)
+                    continue
+                invalid_params = isinstance(e, (KeyError, TypeError, IndexError))
+                self.send({"id": request_id, "error": {
+                    "code": ERROR_INVALID_PARAMS if invalid_params else ERROR_INTERNAL,
+                    "message": f"Invalid params: missing or malformed {e}" if invalid_params
+                    else f"Internal error: {type(e).__name__}: {e}"}})
+
+
+def run_stdio_server():
+    """Run the language server on stdin/stdout."""
+    CVLanguageServer(sys.stdin.buffer, sys.stdout.buffer).serve()
@@ -3,10 +3,14 @@
 This module provides the main functionality and CLI for the CV Builder.
 """
 
+import io
+import itertools
 import os
 import sys
 import subprocess
 import platform
+import sqlite3
+import webbrowser
 from pathlib import Path
 from typing import Optional
 
@@ -14,10 +18,28 @@ import click
 import yaml
 
 from cv_builder_from_yaml_to_pdf.yaml_parser import parse_yaml_file, validate_cv_data
-from cv_builder_from_yaml_to_pdf.pdf_generator import generate_cv_pdf
-from cv_builder_from_yaml_to_pdf.templates import create_yaml_from_template
+from cv_builder_from_yaml_to_pdf.pipeline import CVValidationError, RenderPipeline
+from cv_builder_from_yaml_to_pdf.batch import check_outputs, run_batch, summarize, EXECUTORS, STATUS_OK
+from cv_builder_from_yaml_to_pdf.archive import ArchiveWriter, archive_mode
+from cv_builder_from_yaml_to_pdf.build import (
+    DEFAULT_MANIFEST, STATE_NAME, load_manifest, load_state, plan_build, run_build, save_state, state_path_for,
+)
+from cv_builder_from_yaml_to_pdf.pack import DEFAULT_TITLE, load_candidate, render_pack
+from cv_builder_from_yaml_to_pdf.pdf_generator import MARKUP_FIELDS
+from cv_builder_from_yaml_to_pdf.images import ImagePathError
+from cv_builder_from_yaml_to_pdf.sources import DEFAULT_SQLITE_QUERY, iter_jsonl, iter_sqlite
+from cv_builder_from_yaml_to_pdf.templates import create_yaml_from_template, get_template_index
 from cv_builder_from_yaml_to_pdf.schema import save_schema_to_file, generate_schema_markdown
 from cv_builder_from_yaml_to_pdf.models import CV
+from cv_builder_from_yaml_to_pdf.job_queue import JobQueue, run_workers
+from cv_builder_from_yaml_to_pdf.limits import RenderLimits
+from cv_builder_from_yaml_to_pdf.memprofile import MemoryProfiler
+from cv_builder_from_yaml_to_pdf.shared_batch import SharedWorkDir, default_node_name, parse_shard, run_node
+from cv_builder_from_yaml_to_pdf.lsp import run_stdio_server
+from cv_builder_from_yaml_to_pdf.metrics import METRICS, REGISTRY
+from cv_builder_from_yaml_to_pdf.preview_server import PreviewServer
+from cv_builder_from_yaml_to_pdf.profiling import RenderProfiler
+from cv_builder_from_yaml_to_pdf.search_index import DEFAULT_INDEX, FIELDS, INDEX_INVALID, CVIndex, find_sources
 
 
 @click.group()
@@ -26,69 +48,441 @@ def cli():
     pass
 
 
+# Exit codes of ``generate``; click itself exits with 2 on usage errors
+EXIT_INVALID_INPUT = 1
+EXIT_RENDER_ERROR = 3
+# What a shell reports for a process killed by SIGPIPE
+EXIT_BROKEN_PIPE = 141
+
+
+def limit_options(command):
+    """Add the per-render resource limit options to a command."""
+    options = [
+        click.option('--timeout', type=click.FloatRange(min=0, min_open=True),
+                     help='Kill renders that take longer than this many seconds.'),
+        click.option('--cpu-limit', type=click.IntRange(min=1),
+                     help='Stop renders that use more than this many seconds of CPU time.'),
+        click.option('--memory-limit', type=click.IntRange(min=1),
+                     help='Limit the address space of the render process to this many MiB.'),
+        click.option('--max-pages', type=click.IntRange(min=1),
+                     help='Fail documents that need more than this many pages.'),
+    ]
+    for option in reversed(options):
+        command = option(command)
+    return command
+
+
+def _render_limits(timeout: Optional[float], cpu_limit: Optional[int], memory_limit: Optional[int],
+                   max_pages: Optional[int]) -> RenderLimits:
+    return RenderLimits(timeout=timeout, cpu_seconds=cpu_limit, memory_mb=memory_limit, max_pages=max_pages)
+
+
 @cli.command('generate')
-@click.argument('yaml_file', type=click.Path(exists=True, file_okay=True, dir_okay=False, readable=True))
-@click.option('--output', '-o', type=click.Path(file_okay=True, dir_okay=False, writable=True),
-              help='Output PDF file path.')
+@click.argument('yaml_file', type=click.Path(exists=True, file_okay=True, dir_okay=False, readable=True,
+                                             allow_dash=True))
+@click.option('--output', '-o', type=click.Path(file_okay=True, dir_okay=False, writable=True, allow_dash=True),
+              help='Output PDF file path, or - for standard output.')
 @click.option('--style', '-s', type=click.Choice(['classic', 'modern', 'minimal'], case_sensitive=False),
               default='classic', help='Style for the CV (classic, modern, or minimal).')
 @click.option('--page-size', '-p', type=click.Choice(['A4', 'letter'], case_sensitive=False),
               default='A4', help='Page size for the PDF (A4 or letter).')
 @click.option('--preview', is_flag=True, help='Open the PDF after generation.')
+@click.option('--streaming', is_flag=True,
+              help='Build the document lazily to keep memory bounded for very large CVs.')
+@click.option('--cprofile', 'cprofile_path', type=click.Path(file_okay=True, dir_okay=False, writable=True),
+              help='Write cProfile statistics of the render stages to this file (pstats format).')
+@click.option('--flamegraph', 'flamegraph_path', type=click.Path(file_okay=True, dir_okay=False, writable=True),
+              help='Write sampled render stacks to this file in collapsed-stack format.')
+@click.option('--memprofile', 'memprofile_path', type=click.Path(file_okay=True, dir_okay=False, writable=True),
+              help='Write the memory used by each render stage to this JSON file, and a text report next to it.')
+@click.option('--markup', 'markup_fields', multiple=True, type=click.Choice(MARKUP_FIELDS),
+              help='Render this field as reportlab paragraph markup (<b>, <i>, <a href>) instead of plain text. '
+                   'Can be repeated.')
 def generate_command(yaml_file: str, output: Optional[str] = None, style: str = 'classic',
-                     page_size: str = 'A4', preview: bool = False):
+                     page_size: str = 'A4', preview: bool = False, streaming: bool = False,
+                     cprofile_path: Optional[str] = None, flamegraph_path: Optional[str] = None,
+                     memprofile_path: Optional[str] = None, markup_fields=()):
     """Generate a PDF CV from a YAML file.
     
-    YAML_FILE: Path to the YAML file containing CV data.
+    YAML_FILE: Path to the YAML file containing CV data, or - to read YAML or
+    JSON from standard input. The PDF then goes to standard output unless
+    --output is given.
     """
+    # Reading from stdin has no file name to derive the output name from
+    to_stdout = output == '-' or (output is None and yaml_file == '-')
+    if to_stdout and preview:
+        raise click.UsageError("--preview cannot be used when writing the PDF to standard output.")
     try:
-        # Parse the YAML file
-        cv_data_dict = parse_yaml_file(yaml_file)
-        
-        # Validate the CV data and get the CV object
-        cv_data = validate_cv_data(cv_data_dict)
-        if isinstance(cv_data, list):
-            click.echo("Error: The YAML file contains validation errors:", err=True)
-            for error in cv_data:
-                click.echo(f"  - {error}", err=True)
-            sys.exit(1)
-
-        
         # If output is not specified, use the same name as the input file but with .pdf extension
         if not output:
             yaml_path = Path(yaml_file)
             output = str(yaml_path.with_suffix('.pdf'))
         
-        # Generate the PDF
-        pdf_path = generate_cv_pdf(cv_data, output, style, page_size)
-        
+        # Parse, validate and render the CV
+        pipeline = RenderPipeline(style, page_size, streaming=streaming, markup_fields=markup_fields)
+        profiler = _attach_profiler(pipeline, cprofile_path, flamegraph_path)
+        memory_profiler = MemoryProfiler() if memprofile_path else None
+        if memory_profiler is not None:
+            memory_profiler.attach(pipeline)
+        if yaml_file == '-':
+            text = sys.stdin.buffer.read().decode('utf-8-sig')
+            context = pipeline.run(text=text, output_path=None if to_stdout else output)
+        else:
+            context = pipeline.run(yaml_file, None if to_stdout else output)
+
+        if to_stdout:
+            stdout = sys.stdout.buffer
+            stdout.write(context.pdf)
+            stdout.flush()
+            _write_profile(profiler, cprofile_path, flamegraph_path, err=True)
+            _write_memory_profile(memory_profiler, memprofile_path, err=True)
+            return
+
+        pdf_path = context.written_path
         click.echo(f"Successfully generated PDF CV: {pdf_path}")
+        _write_profile(profiler, cprofile_path, flamegraph_path)
+        _write_memory_profile(memory_profiler, memprofile_path)
         
         # Open the PDF if preview is True
         if preview:
             open_pdf(pdf_path)
         
-    except FileNotFoundError as e:
+    except CVValidationError as e:
+        click.echo("Error: The YAML file contains validation errors:", err=True)
+        for error in e.errors:
+            click.echo(f"  - {error}", err=True)
+        sys.exit(EXIT_INVALID_INPUT)
+    except BrokenPipeError:
+        # The reader went away; stop quietly like other command-line filters
+        _silence_stdout()
+        sys.exit(EXIT_BROKEN_PIPE)
+    except (FileNotFoundError, ImagePathError) as e:
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(EXIT_INVALID_INPUT)
+    except (yaml.YAMLError, UnicodeDecodeError) as e:
         click.echo(f"Error: {e}", err=True)
+        sys.exit(EXIT_INVALID_INPUT)
+    except Exception as e:
+        click.echo(f"An unexpected error occurred: {e}", err=True)
+        sys.exit(EXIT_RENDER_ERROR)
+
+
+def _silence_stdout():
+    """Point stdout at /dev/null so flushing it again at exit does not raise."""
+    try:
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+    except (OSError, ValueError):
+        pass
+
+
+@cli.command('batch')
+@click.argument('yaml_files', nargs=-1,
+                type=click.Path(exists=True, file_okay=True, dir_okay=False, readable=True))
+@click.option('--jsonl', 'jsonl_files', multiple=True,
+              type=click.Path(exists=True, file_okay=True, dir_okay=False, readable=True),
+              help='Also render every line of this JSON Lines file as a CV (can be repeated).')
+@click.option('--sqlite', 'sqlite_database', type=click.Path(exists=True, file_okay=True, dir_okay=False),
+              help='Also render the CVs returned by --query from this SQLite database.')
+@click.option('--query', default=DEFAULT_SQLITE_QUERY, show_default=True,
+              help='SQLite query returning (identifier, CV JSON) rows.')
+@click.option('--output-dir', '-d', type=click.Path(file_okay=False, dir_okay=True, writable=True),
+              help='Directory for the generated PDF files.')
+@click.option('--archive', type=click.Path(file_okay=True, dir_okay=False, writable=True),
+              help='Write the PDFs and a manifest into this .zip, .tar, .tar.gz or .tgz archive instead.')
+@click.option('--style', '-s', type=click.Choice(['classic', 'modern', 'minimal'], case_sensitive=False),
+              default='classic', help='Style for the CVs (classic, modern, or minimal).')
+@click.option('--page-size', '-p', type=click.Choice(['A4', 'letter'], case_sensitive=False),
+              default='A4', help='Page size for the PDFs (A4 or letter).')
+@click.option('--workers', '-w', type=click.IntRange(min=1), default=os.cpu_count() or 1, show_default='CPU count',
+              help='Number of worker processes or threads.')
+@click.option('--executor', type=click.Choice(EXECUTORS), default='process', show_default=True,
+              help='Render in worker processes, or in threads sharing one renderer (less memory).')
+@click.option('--streaming', is_flag=True,
+              help='Build documents lazily to keep memory bounded for very large CVs.')
+@click.option('--cprofile', 'cprofile_path', type=click.Path(file_okay=True, dir_okay=False, writable=True),
+              help='Write cProfile statistics of the render stages to this file (pstats format).')
+@click.option('--flamegraph', 'flamegraph_path', type=click.Path(file_okay=True, dir_okay=False, writable=True),
+              help='Write sampled render stacks to this file in collapsed-stack format.')
+@click.option('--memprofile', 'memprofile_path', type=click.Path(file_okay=True, dir_okay=False, writable=True),
+              help='Write the memory used by each render stage to this JSON file, and a text report next to it.')
+@click.option('--profile-every', type=click.IntRange(min=1), default=1, show_default=True,
+              help='Profile only every n-th document of each worker.')
+@click.option('--metrics-textfile', type=click.Path(file_okay=True, dir_okay=False, writable=True),
+              help='Write Prometheus metrics for the run to this file (node exporter textfile format).')
+@limit_options
+def batch_command(yaml_files, output_dir: Optional[str] = None, style: str = 'classic', page_size: str = 'A4',
+                  workers: int = 1, streaming: bool = False, cprofile_path: Optional[str] = None,
+                  flamegraph_path: Optional[str] = None, profile_every: int = 1,
+                  memprofile_path: Optional[str] = None, metrics_textfile: Optional[str] = None,
+                  executor: str = 'process', archive: Optional[str] = None,
+                  jsonl_files=(), sqlite_database: Optional[str] = None, query: str = DEFAULT_SQLITE_QUERY,
+                  timeout: Optional[float] = None, cpu_limit: Optional[int] = None,
+                  memory_limit: Optional[int] = None, max_pages: Optional[int] = None):
+    """Generate PDF CVs for many YAML files or records.
+    
+    YAML_FILES: Paths to the YAML or JSON files containing CV data.
+    """
+    if not (yaml_files or jsonl_files or sqlite_database):
+        raise click.UsageError("Give YAML files, --jsonl or --sqlite to render.")
+    if bool(output_dir) == bool(archive):
+        raise click.UsageError("Give exactly one of --output-dir and --archive.")
+    if archive:
+        try:
+            archive_mode(archive)
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint='--archive')
+    profiler = None
+    limits = _render_limits(timeout, cpu_limit, memory_limit, max_pages)
+    profiling = cprofile_path or flamegraph_path or memprofile_path
+    if profiling and executor == 'thread' and workers > 1:
+        raise click.UsageError("Profiling is not supported with --executor thread.")
+    if profiling and limits.isolated:
+        raise click.UsageError("Profiling is not supported with --timeout, --cpu-limit or --memory-limit.")
+    if cprofile_path or flamegraph_path:
+        profiler = RenderProfiler(cprofile=bool(cprofile_path), flamegraph=bool(flamegraph_path),
+                                  every=profile_every)
+    memory_profiler = MemoryProfiler(every=profile_every) if memprofile_path else None
+    if output_dir:
+        # Records are checked as they are read
+        try:
+            check_outputs(yaml_files, output_dir)
+        except ValueError as e:
+            click.echo(f"Error: {e}", err=True)
+            sys.exit(EXIT_INVALID_INPUT)
+    sources = itertools.chain(yaml_files, *(iter_jsonl(path) for path in jsonl_files),
+                              iter_sqlite(sqlite_database, query) if sqlite_database else ())
+    results = []
+    writer = ArchiveWriter(archive) if archive else None
+    try:
+        for result in run_batch(sources, output_dir, style, page_size, workers=workers, streaming=streaming,
+                                profiler=profiler, executor=executor, limits=limits,
+                                memory_profiler=memory_profiler):
+            results.append(result)
+            METRICS.observe_result(result, style)
+            member = writer.add(result) if writer is not None else None
+            if result.status == STATUS_OK:
+                target = f"{archive}:{member}" if member else result.output_path
+                click.echo(f"Generated {target} ({result.pages} pages, {result.duration:.2f}s)")
+            else:
+                click.echo(f"Failed {result.source} [{result.status}]: {result.error}", err=True)
+    except sqlite3.Error as e:
+        click.echo(f"Error reading {sqlite_database}: {e}", err=True)
         sys.exit(1)
-    except yaml.YAMLError as e:
+    except ValueError as e:
         click.echo(f"Error: {e}", err=True)
+        sys.exit(EXIT_INVALID_INPUT)
+    finally:
+        if writer is not None:
+            writer.close()
+    
+    click.echo(summarize(results))
+    _write_profile(profiler, cprofile_path, flamegraph_path)
+    _write_memory_profile(memory_profiler, memprofile_path)
+    if metrics_textfile:
+        REGISTRY.write_textfile(metrics_textfile)
+    if any(result.status != STATUS_OK for result in results):
         sys.exit(1)
+
+
+@cli.command('pack')
+@click.argument('yaml_files', nargs=-1,
+                type=click.Path(exists=True, file_okay=True, dir_okay=False, readable=True))
+@click.option('--jsonl', 'jsonl_files', multiple=True,
+              type=click.Path(exists=True, file_okay=True, dir_okay=False, readable=True),
+              help='Also pack every line of this JSON Lines file as a CV (can be repeated).')
+@click.option('--sqlite', 'sqlite_database', type=click.Path(exists=True, file_okay=True, dir_okay=False),
+              help='Also pack the CVs returned by --query from this SQLite database.')
+@click.option('--query', default=DEFAULT_SQLITE_QUERY, show_default=True,
+              help='SQLite query returning (identifier, CV JSON) rows.')
+@click.option('--output', '-o', required=True,
+              type=click.Path(file_okay=True, dir_okay=False, writable=True, allow_dash=True),
+              help='Output PDF file path, or - for standard output.')
+@click.option('--style', '-s', type=click.Choice(['classic', 'modern', 'minimal'], case_sensitive=False),
+              default='classic', help='Style for the CVs (classic, modern, or minimal).')
+@click.option('--page-size', '-p', type=click.Choice(['A4', 'letter'], case_sensitive=False),
+              default='A4', help='Page size for the PDF (A4 or letter).')
+@click.option('--title', default=DEFAULT_TITLE, show_default=True, help='Heading of the table of contents.')
+@click.option('--toc/--no-toc', default=True, show_default=True, help='Start the pack with a table of contents.')
+@click.option('--skip-invalid', is_flag=True, help='Leave out invalid CVs instead of failing.')
+@click.option('--streaming', is_flag=True,
+              help='Build the CVs lazily during layout to keep memory bounded for very large packs.')
+def pack_command(yaml_files, output: str, style: str = 'classic', page_size: str = 'A4',
+                 title: str = DEFAULT_TITLE, toc: bool = True, skip_invalid: bool = False, streaming: bool = False,
+                 jsonl_files=(), sqlite_database: Optional[str] = None, query: str = DEFAULT_SQLITE_QUERY):
+    """Render many CVs into one PDF with a table of contents and bookmarks.
+    
+    YAML_FILES: Paths to the YAML or JSON files containing CV data, in pack order.
+    """
+    if not (yaml_files or jsonl_files or sqlite_database):
+        raise click.UsageError("Give YAML files, --jsonl or --sqlite to pack.")
+    pipeline = RenderPipeline(style, page_size, streaming=streaming)
+    sources = itertools.chain(yaml_files, *(iter_jsonl(path) for path in jsonl_files),
+                              iter_sqlite(sqlite_database, query) if sqlite_database else ())
+    # Every CV is validated before layout starts, so an invalid one cannot leave a partial pack
+    candidates, failed = [], 0
+    try:
+        for source in sources:
+            try:
+                candidates.append(load_candidate(pipeline, source))
+            except CVValidationError as e:
+                failed += 1
+                click.echo(f"Invalid {getattr(source, 'key', source)}: {'; '.join(e.errors)}", err=True)
+            except (FileNotFoundError, yaml.YAMLError) as e:
+                failed += 1
+                click.echo(f"Invalid {getattr(source, 'key', source)}: {e}", err=True)
+    except sqlite3.Error as e:
+        click.echo(f"Error reading {sqlite_database}: {e}", err=True)
+        sys.exit(EXIT_INVALID_INPUT)
+    if failed and not skip_invalid:
+        click.echo(f"Error: {failed} invalid CV(s); nothing was packed. Use --skip-invalid to leave them out.",
+                   err=True)
+        sys.exit(EXIT_INVALID_INPUT)
+    if not candidates:
+        click.echo("Error: No valid CVs to pack.", err=True)
+        sys.exit(EXIT_INVALID_INPUT)
+    
+    try:
+        if output == '-':
+            buffer = io.BytesIO()
+            result = render_pack(pipeline.renderer, candidates, buffer, title, toc)
+            sys.stdout.buffer.write(buffer.getvalue())
+            sys.stdout.buffer.flush()
+        else:
+            os.makedirs(Path(output).absolute().parent, exist_ok=True)
+            result = render_pack(pipeline.renderer, candidates, output, title, toc)
+    except BrokenPipeError:
+        _silence_stdout()
+        sys.exit(EXIT_BROKEN_PIPE)
     except Exception as e:
         click.echo(f"An unexpected error occurred: {e}", err=True)
+        sys.exit(EXIT_RENDER_ERROR)
+    # Keep stdout for the PDF when it is written there
+    click.echo(f"Packed {len(result.entries)} CVs into {output} ({result.pages} pages)", err=output == '-')
+
+
+@cli.command('build')
+@click.argument('manifest', default=DEFAULT_MANIFEST,
+                type=click.Path(exists=True, file_okay=True, dir_okay=False, readable=True))
+@click.option('--workers', '-w', type=click.IntRange(min=1), default=os.cpu_count() or 1, show_default='CPU count',
+              help='Number of worker processes.')
+@click.option('--dry-run', '-n', is_flag=True, help='Show what would be built, and why, without building it.')
+@click.option('--force', is_flag=True, help='Build every target, even if it is up to date.')
+@click.option('--state', 'state_path', type=click.Path(file_okay=True, dir_okay=False, writable=True),
+              help=f'State file recording what was built; defaults to {STATE_NAME} next to the manifest.')
+def build_command(manifest: str, workers: int = 1, dry_run: bool = False, force: bool = False,
+                  state_path: Optional[str] = None):
+    """Build the PDFs listed in a manifest, skipping those that are up to date.
+    
+    MANIFEST: Path to the build manifest (default: cv-build.yaml).
+    """
+    try:
+        targets = load_manifest(manifest)
+    except (ValueError, yaml.YAMLError) as e:
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(EXIT_INVALID_INPUT)
+    base = os.path.dirname(os.path.abspath(manifest))
+    state_path = state_path or state_path_for(manifest)
+    state = load_state(state_path)
+    planned = plan_build(targets, base, state, force=force)
+    stale = [item for item in planned if item.reason is not None]
+    up_to_date = len(planned) - len(stale)
+    
+    if dry_run:
+        for item in stale:
+            click.echo(f"Would build {item.target.output} ({item.reason})")
+        click.echo(f"{len(stale)} to build, {up_to_date} up to date")
+        return
+    
+    failed = 0
+    try:
+        for item, result in run_build(planned, base, state, workers=workers):
+            if result.status == STATUS_OK:
+                click.echo(f"Built {item.target.output} ({item.reason}; {result.pages} pages, {result.duration:.2f}s)")
+            else:
+                failed += 1
+                click.echo(f"Failed {item.target.output} [{result.status}]: {result.error}", err=True)
+    finally:
+        # Keep what was built even if the build is interrupted
+        save_state(state, state_path)
+    click.echo(f"{len(stale) - failed} built, {failed} failed, {up_to_date} up to date")
+    if failed:
         sys.exit(1)
 
 
+@cli.command('index')
+@click.argument('sources', nargs=-1, required=True,
+                type=click.Path(exists=True, file_okay=True, dir_okay=True, readable=True))
+@click.option('--index', '-i', 'index_path', default=DEFAULT_INDEX, show_default=True,
+              type=click.Path(file_okay=True, dir_okay=False, writable=True), help='Index database file.')
+@click.option('--workers', '-w', type=click.IntRange(min=1), default=os.cpu_count() or 1, show_default='CPU count',
+              help='Number of worker processes for parsing changed files.')
+@click.option('--prune/--no-prune', default=True, show_default=True,
+              help='Drop indexed files that no longer exist.')
+def index_command(sources, index_path: str = DEFAULT_INDEX, workers: int = 1, prune: bool = True):
+    """Index CVs for search, re-reading only files that changed.
+    
+    SOURCES: YAML or JSON files, or directories to search for them.
+    """
+    counts = {}
+    with CVIndex(index_path) as index:
+        for result in index.update(find_sources(sources), workers=workers, prune=prune):
+            counts[result.status] = counts.get(result.status, 0) + 1
+            if result.status == INDEX_INVALID:
+                click.echo(f"Skipped {result.path}: {result.error}", err=True)
+        total = len(index)
+    summary = ", ".join(f"{status}: {count}" for status, count in sorted(counts.items()))
+    click.echo(f"{total} CVs in {index_path} ({summary or 'nothing to index'})")
+
+
+@cli.command('search')
+@click.argument('query')
+@click.option('--index', '-i', 'index_path', default=DEFAULT_INDEX, show_default=True,
+              type=click.Path(exists=True, file_okay=True, dir_okay=False, readable=True), help='Index database file.')
+@click.option('--field', '-f', 'fields', multiple=True, type=click.Choice(FIELDS),
+              help='Only match in this field. Can be given more than once.')
+@click.option('--limit', '-n', type=click.IntRange(min=1), default=20, show_default=True,
+              help='Maximum number of results.')
+@click.option('--json', 'as_json', is_flag=True, help='Print each result as a JSON line.')
+def search_command(query: str, index_path: str = DEFAULT_INDEX, fields=(), limit: int = 20, as_json: bool = False):
+    """Search indexed CVs, most relevant first.
+    
+    QUERY: Terms to find, in SQLite FTS5 syntax (e.g. 'kubernetes AND "C++"').
+    """
+    with CVIndex(index_path) as index:
+        try:
+            hits = index.search(query, fields=fields, limit=limit)
+        except ValueError as e:
+            click.echo(f"Error: {e}", err=True)
+            sys.exit(EXIT_INVALID_INPUT)
+    for hit in hits:
+        if as_json:
+            click.echo(hit.model_dump_json())
+        else:
+            headline = f" - {hit.headline}" if hit.headline else ""
+            click.echo(f"{hit.path}: {hit.name}{headline}")
+            click.echo(f"    {' '.join(hit.snippet.split())}")
+    if not hits and not as_json:
+        click.echo("No matches", err=True)
+
+
 @cli.command('init')
 @click.argument('output_file', type=click.Path(file_okay=True, dir_okay=False, writable=True))
-@click.option('--template', '-t', type=click.Choice(['default', 'academic', 'minimal']), default='default',
-              help='Template to use for the YAML file.')
-def init_command(output_file: str, template: str = 'default'):
+@click.option('--template', '-t', default='default', show_default=True,
+              help='Template to use for the YAML file (default, academic, minimal or a user template).')
+@click.option('--template-dir', 'template_dirs', multiple=True,
+              type=click.Path(exists=True, file_okay=False, dir_okay=True, readable=True),
+              help='Directory with additional <name>.yaml templates. Can be given more than once.')
+def init_command(output_file: str, template: str = 'default', template_dirs=()):
     """Initialize a new CV YAML file using a template.
     
     OUTPUT_FILE: Path where the YAML file will be saved.
     """
     try:
+        index = get_template_index()
+        for template_dir in template_dirs:
+            index.add_directory(template_dir)
+        
         # Create the YAML file from the template
         yaml_path = create_yaml_from_template(template, output_file)
         click.echo(f"Successfully created CV YAML file: {yaml_path}")
@@ -98,6 +492,9 @@ def init_command(output_file: str, template: str = 'default'):
         click.echo("  - default: Standard professional CV for software engineers and other tech roles")
         click.echo("  - academic: Academic CV with focus on publications, teaching experience, and research")
         click.echo("  - minimal: Simplified CV format with essential sections only")
+        for name in index.names():
+            if name not in ('default', 'academic', 'minimal'):
+                click.echo(f"  - {name}: User template")
         
         click.echo("\nAvailable styles for PDF generation:")
         click.echo("  - classic: Traditional CV style with serif fonts")
@@ -133,6 +530,52 @@ def preview_command(pdf_file: str):
         sys.exit(1)
 
 
+@cli.command('serve-preview')
+@click.argument('yaml_file', type=click.Path(exists=True, file_okay=True, dir_okay=False, readable=True))
+@click.option('--host', default='127.0.0.1', show_default=True, help='Interface to listen on.')
+@click.option('--port', type=click.IntRange(min=0, max=65535), default=8000, show_default=True,
+              help='Port to listen on (0 picks a free port).')
+@click.option('--style', '-s', type=click.Choice(['classic', 'modern', 'minimal'], case_sensitive=False),
+              default='classic', help='Style for the CV (classic, modern, or minimal).')
+@click.option('--page-size', '-p', type=click.Choice(['A4', 'letter'], case_sensitive=False),
+              default='A4', help='Page size for the PDF (A4 or letter).')
+@click.option('--open', 'open_browser', is_flag=True, help='Open the preview in a web browser.')
+@limit_options
+def serve_preview_command(yaml_file: str, host: str = '127.0.0.1', port: int = 8000, style: str = 'classic',
+                          page_size: str = 'A4', open_browser: bool = False, timeout: Optional[float] = None,
+                          cpu_limit: Optional[int] = None, memory_limit: Optional[int] = None,
+                          max_pages: Optional[int] = None):
+    """Serve a live preview of a CV that re-renders when the file changes.
+    
+    YAML_FILE: Path to the YAML file containing CV data.
+    """
+    try:
+        server = PreviewServer(yaml_file, host, port, style=style, page_size=page_size,
+                               limits=_render_limits(timeout, cpu_limit, memory_limit, max_pages))
+    except OSError as e:
+        click.echo(f"Error: Could not start the preview server: {e}", err=True)
+        sys.exit(1)
+    
+    state = server.state
+    if state.errors:
+        click.echo("Warning: The CV could not be rendered yet:", err=True)
+        for error in state.errors:
+            click.echo(f"  - {error}", err=True)
+    else:
+        click.echo(f"Rendered {yaml_file} in {state.render_ms:.0f} ms")
+    click.echo(f"Serving preview at {server.url} (press Ctrl+C to stop)")
+    
+    if open_browser:
+        webbrowser.open(server.url)
+    
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        click.echo("Stopping preview server.")
+    finally:
+        server.server_close()
+
+
 @cli.command('validate')
 @click.argument('yaml_file', type=click.Path(exists=True, file_okay=True, dir_okay=False, readable=True))
 def validate_command(yaml_file: str):
@@ -194,6 +637,204 @@ def schema_command(output: Optional[str] = None, markdown: Optional[str] = None)
         sys.exit(1)
 
 
+@cli.command('submit')
+@click.argument('payload_files', nargs=-1, required=True,
+                type=click.Path(exists=True, file_okay=True, dir_okay=False, readable=True))
+@click.option('--queue', '-q', 'queue_path', type=click.Path(file_okay=True, dir_okay=False),
+              default='cv-jobs.db', show_default=True, help='Path to the SQLite job queue database.')
+@click.option('--output', '-o', type=click.Path(file_okay=True, dir_okay=False, writable=True),
+              help='Output PDF file path (only valid with a single payload file).')
+@click.option('--style', '-s', type=click.Choice(['classic', 'modern', 'minimal'], case_sensitive=False),
+              default='classic', help='Style for the CV (classic, modern, or minimal).')
+@click.option('--page-size', '-p', type=click.Choice(['A4', 'letter'], case_sensitive=False),
+              default='A4', help='Page size for the PDF (A4 or letter).')
+@click.option('--max-attempts', type=click.IntRange(min=1), default=3, show_default=True,
+              help='Maximum number of attempts before a job is marked as failed.')
+def submit_command(payload_files, queue_path: str, output: Optional[str] = None, style: str = 'classic',
+                   page_size: str = 'A4', max_attempts: int = 3):
+    """Submit YAML or JSON CV files to the render job queue.
+    
+    PAYLOAD_FILES: Paths to the YAML or JSON files containing CV data.
+    """
+    if output and len(payload_files) > 1:
+        click.echo("Error: --output can only be used with a single payload file.", err=True)
+        sys.exit(1)
+    
+    queue = JobQueue(queue_path)
+    try:
+        for payload_file in payload_files:
+            payload_path = Path(payload_file).absolute()
+            payload = payload_path.read_text(encoding='utf-8')
+            output_path = Path(output).absolute() if output else payload_path.with_suffix('.pdf')
+            job_id = queue.submit(payload, str(output_path), style, page_size,
+                                  source=str(payload_path), max_attempts=max_attempts)
+            click.echo(f"Submitted job {job_id}: {payload_path} -> {output_path}")
+    finally:
+        queue.close()
+
+
+@cli.command('worker')
+@click.option('--queue', '-q', 'queue_path', type=click.Path(file_okay=True, dir_okay=False),
+              default='cv-jobs.db', show_default=True, help='Path to the SQLite job queue database.')
+@click.option('--concurrency', '-c', type=click.IntRange(min=1), default=1, show_default=True,
+              help='Number of worker processes.')
+@click.option('--poll-interval', type=float, default=1.0, show_default=True,
+              help='Seconds to wait when no job is available.')
+@click.option('--drain', is_flag=True, help='Exit once the queue has no queued or running jobs.')
+@click.option('--lease', type=float, default=300.0, show_default=True,
+              help='Seconds before a claimed job from an unresponsive worker is reclaimed.')
+@click.option('--backoff', type=float, default=5.0, show_default=True,
+              help='Base retry delay in seconds; doubles on each failed attempt.')
+@click.option('--metrics-port', type=click.IntRange(min=1, max=65535),
+              help='Serve Prometheus metrics at /metrics; worker n listens on this port + n.')
+@click.option('--metrics-host', default='127.0.0.1', show_default=True,
+              help='Interface the metrics endpoints listen on.')
+@limit_options
+def worker_command(queue_path: str, concurrency: int = 1, poll_interval: float = 1.0, drain: bool = False,
+                   lease: float = 300.0, backoff: float = 5.0, metrics_port: Optional[int] = None,
+                   metrics_host: str = '127.0.0.1', timeout: Optional[float] = None, cpu_limit: Optional[int] = None,
+                   memory_limit: Optional[int] = None, max_pages: Optional[int] = None):
+    """Process render jobs from the job queue.
+    
+    Runs a fixed pool of worker processes that claim jobs atomically and render them.
+    """
+    run_workers(queue_path, concurrency=concurrency, poll_interval=poll_interval, drain=drain,
+                lease_seconds=lease, backoff_seconds=backoff, metrics_port=metrics_port, metrics_host=metrics_host,
+                limits=_render_limits(timeout, cpu_limit, memory_limit, max_pages))
+    
+    queue = JobQueue(queue_path)
+    try:
+        counts = queue.counts()
+    finally:
+        queue.close()
+    summary = ", ".join(f"{status}: {n}" for status, n in sorted(counts.items()))
+    click.echo(f"Job queue status - {summary or 'empty'}")
+
+
+@cli.command('shared-init')
+@click.argument('work_dir', type=click.Path(file_okay=False, dir_okay=True, writable=True))
+@click.argument('yaml_files', nargs=-1, required=True,
+                type=click.Path(exists=True, file_okay=True, dir_okay=False, readable=True))
+@click.option('--output-dir', '-d', type=click.Path(file_okay=False, dir_okay=True, writable=True),
+              required=True, help='Directory for the generated PDF files, as seen by every node.')
+@click.option('--style', '-s', type=click.Choice(['classic', 'modern', 'minimal'], case_sensitive=False),
+              default='classic', help='Style for the CVs (classic, modern, or minimal).')
+@click.option('--page-size', '-p', type=click.Choice(['A4', 'letter'], case_sensitive=False),
+              default='A4', help='Page size for the PDFs (A4 or letter).')
+@click.option('--streaming', is_flag=True,
+              help='Stream flowables into the layout and flush finished pages to bound memory use.')
+def shared_init_command(work_dir: str, yaml_files, output_dir: str, style: str = 'classic', page_size: str = 'A4',
+                        streaming: bool = False):
+    """Queue YAML files in a shared work directory for rendering by several nodes.
+    
+    WORK_DIR: Work directory on a filesystem shared by all nodes.
+    YAML_FILES: Paths to the YAML or JSON files containing CV data.
+    """
+    sources = [str(Path(yaml_file).absolute()) for yaml_file in yaml_files]
+    try:
+        added = SharedWorkDir(work_dir).init(sources, str(Path(output_dir).absolute()), style, page_size,
+                                             streaming=streaming)
+    except ValueError as e:
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(EXIT_INVALID_INPUT)
+    click.echo(f"Queued {added} of {len(sources)} files in {work_dir}")
+
+
+@cli.command('shared-node')
+@click.argument('work_dir', type=click.Path(exists=True, file_okay=False, dir_okay=True))
+@click.option('--node', help='Unique name of this node.  [default: <host>-<pid>]')
+@click.option('--shard', help='Only render the items of shard INDEX/COUNT (e.g. 0/4) instead of competing for all.')
+@click.option('--lease', type=float, default=300.0, show_default=True,
+              help='Seconds before a claim from an unresponsive node is reclaimed.')
+@click.option('--poll-interval', type=float, default=1.0, show_default=True,
+              help='Seconds to wait while only other nodes hold claims.')
+def shared_node_command(work_dir: str, node: Optional[str] = None, shard: Optional[str] = None,
+                        lease: float = 300.0, poll_interval: float = 1.0):
+    """Render items from a shared work directory until the batch is finished.
+    
+    WORK_DIR: Work directory created with 'cv-builder shared-init'.
+    """
+    try:
+        shard_range = parse_shard(shard) if shard else None
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='--shard')
+    node = node or default_node_name()
+    try:
+        results = run_node(work_dir, node, shard=shard_range, lease_seconds=lease, poll_interval=poll_interval)
+    except (FileNotFoundError, ValueError) as e:
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(1)
+    for result in results:
+        if result.status == STATUS_OK:
+            click.echo(f"Generated {result.output_path} ({result.pages} pages, {result.duration:.2f}s)")
+        else:
+            click.echo(f"Failed {result.source} [{result.status}]: {result.error}", err=True)
+    click.echo(f"Node {node}: {summarize(results)}")
+    if any(result.status != STATUS_OK for result in results):
+        sys.exit(1)
+
+
+@cli.command('shared-manifest')
+@click.argument('work_dir', type=click.Path(exists=True, file_okay=False, dir_okay=True))
+def shared_manifest_command(work_dir: str):
+    """Merge the results of a shared work directory into its manifest.json.
+    
+    WORK_DIR: Work directory created with 'cv-builder shared-init'.
+    """
+    shared = SharedWorkDir(work_dir)
+    try:
+        shared.config()
+    except FileNotFoundError as e:
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(1)
+    manifest_path = shared.write_manifest()
+    pending, claims = shared.pending_ids(), shared.claims()
+    click.echo(f"{summarize(shared.results())}; {len(pending)} pending, {len(claims)} claimed")
+    click.echo(f"Manifest written to {manifest_path}")
+
+
+@cli.command('lsp')
+def lsp_command():
+    """Run the CV YAML language server on stdin/stdout.
+    
+    Configure your editor to start 'cv-builder lsp' for CV YAML files to get
+    validation diagnostics and field name completion while editing.
+    """
+    run_stdio_server()
+
+
+def _attach_profiler(pipeline: RenderPipeline, cprofile_path: Optional[str],
+                     flamegraph_path: Optional[str]) -> Optional[RenderProfiler]:
+    """Attach a render profiler to a pipeline if any profile output was requested."""
+    if not (cprofile_path or flamegraph_path):
+        return None
+    profiler = RenderProfiler(cprofile=bool(cprofile_path), flamegraph=bool(flamegraph_path))
+    profiler.attach(pipeline)
+    return profiler
+
+
+def _write_profile(profiler: Optional[RenderProfiler], cprofile_path: Optional[str],
+                   flamegraph_path: Optional[str], err: bool = False):
+    """Write the requested profile outputs and report them."""
+    if profiler is None:
+        return
+    written = profiler.write(cprofile_path, flamegraph_path)
+    for path in written:
+        click.echo(f"Wrote render profile: {path}", err=err)
+    if cprofile_path and cprofile_path not in written:
+        click.echo("Warning: No documents were profiled; cProfile statistics were not written.", err=True)
+
+
+def _write_memory_profile(memory_profiler: Optional[MemoryProfiler], memprofile_path: Optional[str],
+                          err: bool = False):
+    """Write the memory profile, if one was requested, and report it."""
+    if memory_profiler is None:
+        return
+    memory_profiler.close()
+    for path in memory_profiler.write(memprofile_path):
+        click.echo(f"Wrote memory profile: {path}", err=err)
+
+
 def open_pdf(pdf_path: str):
     """Open a PDF file with the default PDF viewer.
     
@@ -0,0 +1,309 @@
+"""Memory profiling for CV Builder.
+
+This module attaches a tracemalloc-based profiler to a ``RenderPipeline``. For
+every profiled document it records, per pipeline stage (``load``,
+``validate``, ``build_flowables``, ``layout`` and ``write``):
+
+* peak: the most memory allocated above what was allocated when the stage
+  started, i.e. the headroom the stage needs
+* retained: memory still allocated when the stage finished
+* the source lines that allocated the retained memory, from tracemalloc
+  snapshots taken around the stage
+
+The whole document is reported the same way as the pseudo-stage
+``document``. Memory that is still allocated when the next document starts
+is growth; in a long-running worker, steady growth per document and the
+lines it comes from point at a leak.
+
+In streaming mode flowables are built while they are laid out, so their
+memory is reported under ``layout``. Snapshots walk every live allocation,
+which makes profiled documents several times slower; in a batch, profile
+every ``every``-th document. Like ``RenderProfiler``, worker processes save
+their statistics into a shared directory which the parent merges at the end.
+"""
+
+import functools
+import glob
+import json
+import os
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from cv_builder_from_yaml_to_pdf.pipeline import RenderContext, RenderPipeline, STAGES
+from cv_builder_from_yaml_to_pdf.profiling import _short_filename
+
+
+DOCUMENT = 'document'
+
+# Number of allocation sites listed per stage
+DEFAULT_TOP = 10
+
+# Allocations by tracemalloc, the import system and this module are not the render's
+_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+_SUFFIX = ".memprofile.json"
+
+
+def _sites() -> Dict[str, tuple]:
+    """Get the bytes and blocks currently allocated by each source line."""
+    snapshot = tracemalloc.take_snapshot().filter_traces(_FILTERS)
+    sites = {}
+    for stat in snapshot.statistics('lineno'):
+        frame = stat.traceback[0]
+        sites[f"{_short_filename(frame.filename)}:{frame.lineno}"] = (stat.size, stat.count)
+    return sites
+
+
+def _format_bytes(size: float) -> str:
+    sign = "-" if size < 0 else ""
+    size = abs(size)
+    for unit in ("B", "KiB", "MiB"):
+        if size < 1024 or unit == "MiB":
+            return f"{sign}{size:.0f} {unit}" if unit == "B" else f"{sign}{size:.1f} {unit}"
+        size /= 1024
+
+
+class PhaseStats:
+    """Memory statistics of one stage over all profiled documents."""
+
+    def __init__(self):
+        self.count = 0
+        self.peak_max = 0
+        self.peak_total = 0
+        self.retained_max = 0
+        self.retained_total = 0
+        # Bytes and blocks retained by each allocation site, summed over documents
+        self.site_bytes: Counter = Counter()
+        self.site_blocks: Counter = Counter()
+
+    def add(self, peak: int, retained: int, before: Dict[str, tuple], after: Dict[str, tuple]):
+        """Record one run of the stage, given the allocation sites before and after it."""
+        self.count += 1
+        self.peak_max = max(self.peak_max, peak)
+        self.peak_total += peak
+        self.retained_max = max(self.retained_max, retained)
+        self.retained_total += retained
+        for site, (size, blocks) in after.items():
+            old_size, old_blocks = before.get(site, (0, 0))
+            if size > old_size:
+                self.site_bytes[site] += size - old_size
+                self.site_blocks[site] += blocks - old_blocks
+
+    def state(self) -> Dict[str, Any]:
+        """Get the raw statistics, for ``merge``."""
+        return {"count": self.count, "peak_max": self.peak_max, "peak_total": self.peak_total,
+                "retained_max": self.retained_max, "retained_total": self.retained_total,
+                "site_bytes": dict(self.site_bytes), "site_blocks": dict(self.site_blocks)}
+
+    def merge(self, state: Dict[str, Any]):
+        """Add raw statistics from ``state``, e.g. saved by a worker process."""
+        self.count += state["count"]
+        self.peak_max = max(self.peak_max, state["peak_max"])
+        self.peak_total += state["peak_total"]
+        self.retained_max = max(self.retained_max, state["retained_max"])
+        self.retained_total += state["retained_total"]
+        self.site_bytes.update(state["site_bytes"])
+        self.site_blocks.update(state["site_blocks"])
+
+    def report(self, top: int) -> Dict[str, Any]:
+        """Get the statistics with the ``top`` allocation sites retaining the most memory."""
+        count = max(self.count, 1)
+        return {
+            "count": self.count,
+            "peak_bytes_max": self.peak_max,
+            "peak_bytes_mean": round(self.peak_total / count),
+            "retained_bytes_max": self.retained_max,
+            "retained_bytes_mean": round(self.retained_total / count),
+            "top_sites": [{"site": site, "bytes": size, "blocks": self.site_blocks[site]}
+                          for site, size in self.site_bytes.most_common(top)],
+        }
+
+
+class MemoryProfiler:
+    """Profiles the memory used by each stage of the documents passing through a pipeline."""
+
+    def __init__(self, every: int = 1, top: int = DEFAULT_TOP):
+        """Initialize the profiler.
+
+        Args:
+            every: Profile every n-th document (1 profiles all of them)
+            top: Number of allocation sites to report per stage
+        """
+        self.every = max(1, every)
+        self.top = top
+        self.documents = 0
+        self.profiled = 0
+        self.phases: Dict[str, PhaseStats] = {name: PhaseStats() for name in STAGES + (DOCUMENT,)}
+        # Growth between the starts of consecutive profiled documents
+        self.growth_bytes = 0
+        self.growth_intervals = 0
+        self.growth_sites: Counter = Counter()
+        self._started = False
+        self._document_sites: Optional[Dict[str, tuple]] = None
+        self._document_start = 0
+        self._document_peak = 0
+        self._document_current = 0
+        self._previous_start: Optional[int] = None
+        self._stage_sites: Optional[Dict[str, tuple]] = None
+        self._stage_start = 0
+
+    def options(self) -> Dict[str, object]:
+        """Get the constructor arguments, used to create matching profilers in worker processes."""
+        return {"every": self.every, "top": self.top}
+
+    def attach(self, pipeline: RenderPipeline):
+        """Start tracing allocations and register hooks that measure each stage of a pipeline."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started = True
+        pipeline.before(STAGES[0], self._begin_document)
+        for stage in STAGES:
+            after = functools.partial(self._after, stage)
+            pipeline.before(stage, self._before)
+            pipeline.after(stage, after)
+            # A failed stage ends the document
+            pipeline.on_error(stage, after)
+            pipeline.on_error(stage, self._end_document)
+        pipeline.after(STAGES[-1], self._end_document)
+
+    def close(self):
+        """Stop tracing allocations, if ``attach`` started it."""
+        if self._started and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._started = False
+
+    def _begin_document(self, context: RenderContext):
+        context.extra['memprofiled'] = self.documents % self.every == 0
+        self.documents += 1
+        if not context.extra['memprofiled']:
+            return
+        self.profiled += 1
+        sites = _sites()
+        previous, self._document_sites = self._document_sites, sites
+        if previous is not None:
+            self.growth_sites.update({site: size - previous.get(site, (0, 0))[0]
+                                      for site, (size, _) in sites.items()
+                                      if size != previous.get(site, (0, 0))[0]})
+            self.growth_sites.update({site: -size for site, (size, _) in previous.items() if site not in sites})
+        del previous
+        self._stage_sites = sites
+        self._document_start = tracemalloc.get_traced_memory()[0]
+        self._document_peak = self._document_start
+        if self._previous_start is not None:
+            self.growth_bytes += self._document_start - self._previous_start
+            self.growth_intervals += 1
+        self._previous_start = self._document_start
+
+    def _before(self, context: RenderContext):
+        if not context.extra.get('memprofiled'):
+            return
+        if self._stage_sites is None:
+            self._stage_sites = _sites()
+        tracemalloc.reset_peak()
+        self._stage_start = tracemalloc.get_traced_memory()[0]
+
+    def _after(self, stage: str, context: RenderContext):
+        if not context.extra.get('memprofiled') or self._stage_sites is None:
+            return
+        current, peak = tracemalloc.get_traced_memory()
+        sites = _sites()
+        self.phases[stage].add(peak - self._stage_start, current - self._stage_start, self._stage_sites, sites)
+        self._document_peak = max(self._document_peak, peak)
+        self._document_current = current
+        # The sites after this stage are those before the next one
+        self._stage_sites = sites
+
+    def _end_document(self, context: RenderContext):
+        if not context.extra.pop('memprofiled', False) or self._document_sites is None:
+            return
+        self.phases[DOCUMENT].add(self._document_peak - self._document_start,
+                                  self._document_current - self._document_start,
+                                  self._document_sites, self._stage_sites)
+        self._stage_sites = None
+
+    def state(self) -> Dict[str, Any]:
+        """Get the raw statistics, for ``merge``."""
+        return {"documents": self.documents, "profiled": self.profiled,
+                "phases": {name: stats.state() for name, stats in self.phases.items()},
+                "growth_bytes": self.growth_bytes, "growth_intervals": self.growth_intervals,
+                "growth_sites": dict(self.growth_sites)}
+
+    def save(self, base_path: str):
+        """Save the raw statistics to ``<base_path>.memprofile.json``."""
+        with open(base_path + _SUFFIX, "w", encoding="utf-8") as f:
+            json.dump(self.state(), f)
+
+    def merge(self, directory: str):
+        """Add the statistics saved by ``save`` into ``directory`` (e.g., by worker processes)."""
+        for path in sorted(glob.glob(os.path.join(directory, "*" + _SUFFIX))):
+            with open(path, encoding="utf-8") as f:
+                state = json.load(f)
+            self.documents += state["documents"]
+            self.profiled += state["profiled"]
+            for name, phase in state["phases"].items():
+                self.phases[name].merge(phase)
+            self.growth_bytes += state["growth_bytes"]
+            self.growth_intervals += state["growth_intervals"]
+            self.growth_sites.update(state["growth_sites"])
+
+    def report(self) -> Dict[str, Any]:
+        """Get the memory profile: statistics per stage and growth between documents."""
+        intervals = max(self.growth_intervals, 1)
+        growing = sorted(((site, size) for site, size in self.growth_sites.items() if size > 0),
+                         key=lambda item: item[1], reverse=True)[:self.top]
+        return {
+            "documents": self.documents,
+            "profiled": self.profiled,
+            "phases": {name: stats.report(self.top) for name, stats in self.phases.items()},
+            "growth": {
+                "intervals": self.growth_intervals,
+                "bytes_per_document": round(self.growth_bytes / intervals),
+                "top_sites": [{"site": site, "bytes": size} for site, size in growing],
+            },
+        }
+
+    def text(self, report: Optional[Dict[str, Any]] = None) -> str:
+        """Format the memory profile as a plain-text report."""
+        report = report or self.report()
+        lines = [f"Memory profile of {report['profiled']} of {report['documents']} documents", "",
+                 f"{'stage':<16}{'peak max':>12}{'peak mean':>12}{'retained max':>14}{'retained mean':>15}"]
+        for name, phase in report["phases"].items():
+            lines.append(f"{name:<16}{_format_bytes(phase['peak_bytes_max']):>12}"
+                         f"{_format_bytes(phase['peak_bytes_mean']):>12}"
+                         f"{_format_bytes(phase['retained_bytes_max']):>14}"
+                         f"{_format_bytes(phase['retained_bytes_mean']):>15}")
+        growth = report["growth"]
+        lines += ["", f"Growth between documents: {_format_bytes(growth['bytes_per_document'])} per document "
+                      f"over {growth['intervals']} intervals"]
+        lines += [f"  {_format_bytes(site['bytes']):>10}  {site['site']}" for site in growth["top_sites"]]
+        for name, phase in report["phases"].items():
+            if phase["top_sites"]:
+                lines += ["", f"Top allocation sites retained by {name}:"]
+                lines += [f"  {_format_bytes(site['bytes']):>10} {site['blocks']:>8} blocks  {site['site']}"
+                          for site in phase["top_sites"]]
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str) -> List[str]:
+        """Write the memory profile as JSON to ``path`` and as text next to it, with a ``.txt`` suffix.
+
+        Returns:
+            Paths of the files written
+        """
+        report = self.report()
+        text_path = str(Path(path).with_suffix(".txt"))
+        if text_path == path:
+            text_path = path + ".txt"
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        with open(text_path, "w", encoding="utf-8") as f:
+            f.write(self.text(report))
+        return [path, text_path]
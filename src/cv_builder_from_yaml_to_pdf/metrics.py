@@ -0,0 +1,383 @@
+"""Metrics for CV Builder.
+
+This module provides a small metrics registry with counters and histograms
+that are exported in the Prometheus text exposition format, either as a
+textfile for the node exporter's textfile collector (batch and cron runs) or
+from an HTTP endpoint (long-running modes).
+
+``RenderMetrics`` defines the metrics the CV Builder records:
+
+* ``cv_builder_render_stage_seconds``: time per pipeline stage, by stage and style
+* ``cv_builder_render_seconds``: time per document, by style
+* ``cv_builder_documents_total``: documents processed, by style and status
+* ``cv_builder_pages``: pages per rendered CV, by style
+* ``cv_builder_output_bytes_total``: PDF bytes produced, by style
+* ``cv_builder_validation_failures_total``: validation errors, by field location
+* ``cv_builder_cache_requests_total``: cache lookups, by cache and result
+* ``cv_builder_limit_exceeded_total``: documents stopped by a resource limit, by limit
+
+Process-wide instances are available as ``REGISTRY`` and ``METRICS``; caches
+in the library report their hits and misses to ``METRICS``. Lookups made in
+worker processes are sent back with each result and merged into the parent's
+``METRICS``.
+"""
+
+import math
+import os
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+# Seconds; covers a small CV (a few ms) up to very large documents
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PAGE_BUCKETS = (1, 2, 3, 4, 5, 10, 20, 50, 100, 500)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """Base class for a metric family with a fixed set of label names."""
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, **labels: str):
+        """Get the child metric for a set of label values."""
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {', '.join(self.labelnames) or '(none)'}")
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _samples(self, key: Tuple[str, ...], child) -> Iterable[str]:
+        raise NotImplementedError
+
+    def exposition(self) -> List[str]:
+        """Get the lines of this metric family in the Prometheus text format."""
+        lines = [f"# HELP {self.name} {_escape(self.documentation)}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            children = sorted(self._children.items())
+        for key, child in children:
+            lines.extend(self._samples(key, child))
+        return lines
+
+
+class _CounterChild:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        """Increase the counter."""
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        with self._lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    type_name = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        """Increase the counter of a metric without labels."""
+        self.labels().inc(amount)
+
+    def values(self) -> Dict[Tuple[str, ...], float]:
+        """Get the current value of each child, keyed by its label values."""
+        with self._lock:
+            children = list(self._children.items())
+        return {key: child.value for key, child in children}
+
+    def _samples(self, key, child):
+        yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"
+
+
+class _HistogramChild:
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        """Record one observation."""
+        with self._lock:
+            self.sum += value
+            self.count += 1
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[i] += 1
+                    break
+
+
+class Histogram(_Metric):
+    """Distribution of observed values over fixed buckets."""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        """Record one observation of a metric without labels."""
+        self.labels().observe(value)
+
+    def _samples(self, key, child):
+        cumulative = 0
+        for bound, count in zip(self.buckets, child.counts):
+            cumulative += count
+            le = f'le="{_format_value(bound)}"'
+            yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+        labels = _format_labels(self.labelnames, key)
+        yield f"{self.name}_sum{labels} {_format_value(child.sum)}"
+        yield f"{self.name}_count{labels} {child.count}"
+
+
+class MetricsRegistry:
+    """Collection of metric families that can be exported together."""
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        """Add a metric family, or return the existing one with the same name and type.
+
+        Raises:
+            ValueError: If a different metric with the same name is registered
+        """
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is None:
+                self._metrics[metric.name] = metric
+                return metric
+        if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+            raise ValueError(f"Metric {metric.name} is already registered with a different definition")
+        return existing
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """Get or create a counter."""
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        """Get or create a histogram."""
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def exposition(self) -> str:
+        """Get all metrics in the Prometheus text format."""
+        lines = []
+        for name in sorted(self._metrics):
+            lines.extend(self._metrics[name].exposition())
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str):
+        """Write all metrics to a file for the node exporter's textfile collector.
+
+        The file is replaced atomically so the collector never reads a partial file.
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".metrics-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(self.exposition())
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = self.server.registry.exposition().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve_metrics(registry: "MetricsRegistry", host: str = "127.0.0.1", port: int = 9108) -> ThreadingHTTPServer:
+    """Serve a registry at ``/metrics`` from a background thread.
+
+    Args:
+        registry: Registry to export
+        host: Interface to listen on
+        port: Port to listen on; 0 picks a free port
+
+    Returns:
+        The running server; call ``shutdown()`` to stop it
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    server.registry = registry
+    threading.Thread(target=server.serve_forever, name="cv-builder-metrics", daemon=True).start()
+    return server
+
+
+def location_label(loc: Sequence) -> str:
+    """Turn a validation error location into a label, collapsing list indexes to ``*``."""
+    return ".".join("*" if isinstance(part, int) else str(part) for part in loc) or "(root)"
+
+
+class RenderMetrics:
+    """The metrics recorded for CV rendering."""
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None):
+        """Initialize the metrics.
+
+        Args:
+            registry: Registry to register the metrics in; defaults to a new registry
+        """
+        self.registry = registry if registry is not None else MetricsRegistry()
+        self.stage_seconds = self.registry.histogram(
+            "cv_builder_render_stage_seconds", "Time spent in each render pipeline stage.", ("stage", "style"))
+        self.render_seconds = self.registry.histogram(
+            "cv_builder_render_seconds", "Time spent on each document.", ("style",))
+        self.documents = self.registry.counter(
+            "cv_builder_documents_total", "Documents processed, by outcome.", ("style", "status"))
+        self.pages = self.registry.histogram(
+            "cv_builder_pages", "Pages per rendered CV.", ("style",), buckets=PAGE_BUCKETS)
+        self.output_bytes = self.registry.counter(
+            "cv_builder_output_bytes_total", "Bytes of PDF output produced.", ("style",))
+        self.validation_failures = self.registry.counter(
+            "cv_builder_validation_failures_total", "CV validation errors, by field location.", ("location",))
+        self.cache_requests = self.registry.counter(
+            "cv_builder_cache_requests_total", "Cache lookups, by cache and result.", ("cache", "result"))
+        self.limits_exceeded = self.registry.counter(
+            "cv_builder_limit_exceeded_total", "Documents stopped by a resource limit, by limit.", ("limit",))
+
+    def observe(self, style: str, status: str, duration: float, timings: Optional[Dict[str, float]] = None,
+                pages: Optional[int] = None, bytes: Optional[int] = None, error_locations: Iterable[Sequence] = (),
+                limit: Optional[str] = None):
+        """Record the outcome of one document.
+
+        Args:
+            style: Style the document was rendered with
+            status: Outcome, e.g. ok, invalid or error
+            duration: Time spent on the document in seconds
+            timings: Seconds spent in each pipeline stage
+            pages: Number of pages, for rendered documents
+            bytes: Size of the PDF, for rendered documents
+            error_locations: Locations of validation errors
+            limit: Resource limit the document exceeded, if any
+        """
+        self.documents.labels(style=style, status=status).inc()
+        self.render_seconds.labels(style=style).observe(duration)
+        for stage, seconds in (timings or {}).items():
+            self.stage_seconds.labels(stage=stage, style=style).observe(seconds)
+        if pages is not None:
+            self.pages.labels(style=style).observe(pages)
+        if bytes is not None:
+            self.output_bytes.labels(style=style).inc(bytes)
+        for loc in error_locations:
+            self.validation_failures.labels(location=location_label(loc)).inc()
+        if limit is not None:
+            self.limits_exceeded.labels(limit=limit).inc()
+
+    def observe_result(self, result, style: str):
+        """Record a ``BatchResult``."""
+        self.observe(style, result.status, result.duration, result.timings, result.pages, result.bytes,
+                     result.error_locations, result.limit)
+
+    def cache(self, cache: str, hit: bool):
+        """Record a lookup in a named cache."""
+        self.cache_requests.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+    def cache_counts(self, since: Optional[Dict[str, Dict[str, int]]] = None) -> Dict[str, Dict[str, int]]:
+        """Get the number of cache lookups so far, by cache and result.
+
+        Args:
+            since: Earlier counts to subtract, to get the lookups made since then
+
+        Returns:
+            Dict mapping each cache to the number of hits and misses, e.g.
+            ``{"wrap": {"hit": 12, "miss": 3}}``; caches without new lookups are left out
+        """
+        counts: Dict[str, Dict[str, int]] = {}
+        for (cache, result), value in self.cache_requests.values().items():
+            value = int(value) - (since or {}).get(cache, {}).get(result, 0)
+            if value:
+                counts.setdefault(cache, {})[result] = value
+        return counts
+
+    def merge_cache_counts(self, counts: Dict[str, Dict[str, int]]):
+        """Add cache lookups counted in another process, e.g. from ``cache_counts``."""
+        for cache, results in counts.items():
+            for result, value in results.items():
+                self.cache_requests.labels(cache=cache, result=result).inc(value)
+
+    def attach(self, pipeline):
+        """Record every document rendered by a ``RenderPipeline``, including failures."""
+        from cv_builder_from_yaml_to_pdf.batch import failure_status
+        from cv_builder_from_yaml_to_pdf.limits import limit_of
+        from cv_builder_from_yaml_to_pdf.pipeline import CVValidationError, STAGES
+
+        def succeeded(context):
+            self.observe(pipeline.style, "ok", sum(context.timings.values()), context.timings, context.pages,
+                         len(context.pdf) if context.pdf is not None else None)
+
+        def failed(context):
+            locations = context.error.locations if isinstance(context.error, CVValidationError) else ()
+            self.observe(pipeline.style, failure_status(context.error), sum(context.timings.values()),
+                         context.timings, error_locations=locations, limit=limit_of(context.error))
+
+        pipeline.after(STAGES[-1], succeeded)
+        for stage in STAGES:
+            pipeline.on_error(stage, failed)
+
+
+REGISTRY = MetricsRegistry()
+METRICS = RenderMetrics(REGISTRY)
@@ -19,6 +19,7 @@ class PersonalInfo(BaseModel):
     github: Optional[HttpUrl] = Field(default=None, description="GitHub profile URL.")
     summary: Optional[str] = Field(default=None, description="A brief professional summary or objective statement.")
     title: Optional[str] = Field(default=None, description="Current job title or professional headline (e.g., Senior Software Engineer).")
+    photo: Optional[str] = Field(default=None, description="Path to a profile photo (JPEG or PNG), relative to the CV file.")
 
 
 class Education(BaseModel):
@@ -57,6 +58,7 @@ class CompanyExperience(BaseModel):
     """Model for professional experience at a single company, potentially with multiple roles."""
     company: str = Field(description="Name of the company or organization.")
     location: Optional[str] = Field(default=None, description="Main location of the company (e.g., New York, NY).") # Company-level location
+    logo: Optional[str] = Field(default=None, description="Path to the company logo (JPEG or PNG), relative to the CV file.")
     roles: List[Role] = Field(description="List of roles held at this company.")
 
 
@@ -0,0 +1,212 @@
+"""Candidate packs for CV Builder.
+
+A pack is a single PDF holding many CVs, e.g. for a hiring committee: a table
+of contents, then every CV starting on a new page, with a bookmark per
+candidate in the document outline. The whole pack is laid out in one
+document build by one ``Renderer``, so styles, fonts and cached images and
+line breaks are shared instead of repeated per CV.
+
+The table of contents comes first but the page each candidate starts on is
+only known once layout reaches it. Rather than laying the pack out twice, as
+reportlab's ``TableOfContents`` does, each page number in the contents is
+drawn as a reference to a PDF form XObject that is filled in when the
+candidate's first page is drawn.
+"""
+
+import os
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Union
+from xml.sax.saxutils import escape
+
+from pydantic import BaseModel, Field
+from reportlab.platypus import Flowable, PageBreak, Table, TableStyle
+
+from cv_builder_from_yaml_to_pdf.batch import output_name
+from cv_builder_from_yaml_to_pdf.models import CV
+from cv_builder_from_yaml_to_pdf.pdf_generator import Renderer
+from cv_builder_from_yaml_to_pdf.pipeline import CVValidationError, RenderContext, RenderPipeline
+from cv_builder_from_yaml_to_pdf.sources import Record
+
+
+DEFAULT_TITLE = "Candidates"
+
+# Width of the page number column in the table of contents
+PAGE_NUMBER_WIDTH = 40
+
+_TOC_STYLE = TableStyle([
+    ('VALIGN', (0, 0), (-1, -1), 'BOTTOM'),
+    ('LEFTPADDING', (0, 0), (-1, -1), 0),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 0),
+    ('TOPPADDING', (0, 0), (-1, -1), 1),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 1),
+    ('LINEBELOW', (0, 0), (-1, -1), 0.25, '#CCCCCC'),
+])
+
+
+class Candidate(BaseModel):
+    """Model for one validated CV in a pack."""
+    title: str = Field(description="Entry in the table of contents and the outline.")
+    source: str = Field(description="Where the CV came from.")
+    cv: CV = Field(description="The validated CV.")
+    base_dir: Optional[str] = Field(default=None, description="Directory relative image paths are resolved against.")
+
+
+class PackEntry(BaseModel):
+    """Model for where one candidate ended up in a pack."""
+    title: str = Field(description="Entry in the table of contents and the outline.")
+    source: str = Field(description="Where the CV came from.")
+    first_page: int = Field(description="Page the candidate's CV starts on.")
+
+
+class PackResult(BaseModel):
+    """Model for a rendered pack."""
+    pages: int = Field(description="Number of pages in the pack.")
+    entries: List[PackEntry] = Field(description="The candidates, in pack order.")
+
+
+def _bookmark(index: int) -> str:
+    """Get the bookmark name of the candidate at ``index``."""
+    return f"candidate-{index}"
+
+
+def _page_number_form(index: int) -> str:
+    """Get the name of the form holding the first page number of the candidate at ``index``."""
+    return f"candidate-{index}-page"
+
+
+class _CandidateStart(Flowable):
+    """Invisible flowable marking the start of a candidate's CV.
+
+    When drawn it bookmarks the page, adds the candidate to the outline,
+    records the page number and defines the form the table of contents
+    refers to.
+    """
+
+    def __init__(self, index: int, title: str, pages: List[Optional[int]], font_name: str, font_size: float):
+        super().__init__()
+        self.index = index
+        self.title = title
+        self.pages = pages
+        self.font_name = font_name
+        self.font_size = font_size
+
+    def wrap(self, availWidth, availHeight):
+        return 0, 0
+
+    def draw(self):
+        canv = self.canv
+        page = canv.getPageNumber()
+        self.pages[self.index] = page
+        canv.bookmarkPage(_bookmark(self.index))
+        canv.addOutlineEntry(self.title, _bookmark(self.index), level=0)
+        canv.showOutline()
+        # Right-aligned at the form's origin, clipped to one line of text
+        canv.beginForm(_page_number_form(self.index), lowerx=-PAGE_NUMBER_WIDTH, lowery=-self.font_size / 2,
+                       upperx=0, uppery=self.font_size * 1.5)
+        canv.setFont(self.font_name, self.font_size)
+        canv.drawRightString(0, 0, str(page))
+        canv.endForm()
+
+
+class _PageNumber(Flowable):
+    """Page number in the table of contents, drawn from a form defined later."""
+
+    def __init__(self, index: int, font_size: float, leading: float):
+        super().__init__()
+        self.index = index
+        self.font_size = font_size
+        self.leading = leading
+
+    def wrap(self, availWidth, availHeight):
+        self.width, self.height = PAGE_NUMBER_WIDTH, self.leading
+        return self.width, self.height
+
+    def draw(self):
+        canv = self.canv
+        canv.saveState()
+        canv.translate(self.width, self.height - self.font_size)
+        canv.doForm(_page_number_form(self.index))
+        canv.restoreState()
+        canv.linkRect("", _bookmark(self.index), (0, 0, self.width, self.height), relative=1, thickness=0)
+
+
+def _table_of_contents(renderer: Renderer, candidates: List[Candidate], title: str) -> Iterator[Flowable]:
+    """Yield the table of contents, with every entry linking to its candidate."""
+    yield renderer.paragraph(title, 'SectionHeading')
+    style = renderer.styles['Normal']
+    rows = [[renderer.paragraph(f'<a href="#{_bookmark(index)}">{escape(candidate.title)}</a>', 'Normal',
+                                markup=True),
+             _PageNumber(index, style.fontSize, style.leading)]
+            for index, candidate in enumerate(candidates)]
+    if rows:
+        width = renderer.frame_geometry[2]
+        yield Table(rows, colWidths=[width - PAGE_NUMBER_WIDTH, PAGE_NUMBER_WIDTH], style=_TOC_STYLE)
+
+
+def build_pack_flowables(renderer: Renderer, candidates: List[Candidate], pages: List[Optional[int]],
+                         title: str = DEFAULT_TITLE, toc: bool = True) -> Iterator[Flowable]:
+    """Yield the flowables of a pack in document order.
+
+    Args:
+        renderer: Renderer whose styles the pack uses
+        candidates: The CVs to pack, in order
+        pages: List with one slot per candidate, filled in with the page each
+            candidate starts on as layout reaches it
+        title: Heading of the table of contents
+        toc: Start the pack with a table of contents
+    """
+    style = renderer.styles['Normal']
+    if toc:
+        yield from _table_of_contents(renderer, candidates, title)
+    for index, candidate in enumerate(candidates):
+        if index or toc:
+            yield PageBreak()
+        yield _CandidateStart(index, candidate.title, pages, style.fontName, style.fontSize)
+        yield from renderer.build_flowables(candidate.cv, candidate.base_dir)
+
+
+def render_pack(renderer: Renderer, candidates: Iterable[Candidate], output: Union[str, BinaryIO],
+                title: str = DEFAULT_TITLE, toc: bool = True) -> PackResult:
+    """Render CVs into one pack document.
+
+    Args:
+        renderer: Renderer to lay the pack out with; in streaming mode the CVs'
+            flowables are built as layout reaches them
+        candidates: The CVs to pack, in order
+        output: Path or binary file object the PDF is written to
+        title: Heading of the table of contents
+        toc: Start the pack with a table of contents
+
+    Returns:
+        The number of pages and where each candidate starts
+    """
+    candidates = list(candidates)
+    pages: List[Optional[int]] = [None] * len(candidates)
+    total = renderer.layout(build_pack_flowables(renderer, candidates, pages, title, toc), output)
+    return PackResult(pages=total, entries=[PackEntry(title=candidate.title, source=candidate.source, first_page=page)
+                                            for candidate, page in zip(candidates, pages)])
+
+
+def load_candidate(pipeline: RenderPipeline, source: Union[str, Record]) -> Candidate:
+    """Load and validate one source file or record for a pack.
+
+    The candidate's title is the CV's name, or the source's base name when
+    the CV has none.
+
+    Raises:
+        FileNotFoundError: If the source file does not exist
+        yaml.YAMLError: If the source cannot be parsed
+        CVValidationError: If the data is not a valid CV, or the record could
+            not be read
+    """
+    if isinstance(source, Record):
+        if source.error is not None:
+            raise CVValidationError([source.error])
+        context = RenderContext(json_text=source.json_text)
+        key, base_dir = source.key, None
+    else:
+        context = RenderContext(source=source)
+        key, base_dir = str(source), os.path.dirname(os.path.abspath(source))
+    for stage in ('load', 'validate'):
+        pipeline.run_stage(stage, context)
+    name = context.cv.personal_info.name if context.cv.personal_info else None
+    return Candidate(title=name or output_name(source), source=key, cv=context.cv, base_dir=base_dir)
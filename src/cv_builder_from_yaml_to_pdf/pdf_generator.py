@@ -3,115 +3,445 @@
 This module handles the generation of PDF files from CV data.
 """
 
+import functools
+import io
+import itertools
 import os
+import threading
 from pathlib import Path
-from typing import List
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Union
+from xml.sax.saxutils import escape
 
-from reportlab.lib import colors
+from reportlab import rl_config
+from reportlab.lib.fonts import ps2tt, tt2ps
 from reportlab.lib.pagesizes import A4, letter
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.styles import ParagraphStyle, ListStyle
 from reportlab.lib.units import cm
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, ListFlowable, ListItem
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.pdfdoc import PDFArray, PDFBase85Encode, PDFName, PDFStream, PDFZCompress
+from reportlab.pdfgen.canvas import Canvas
+from reportlab.platypus import (
+    BaseDocTemplate, Frame, PageTemplate, Paragraph, Spacer, ListFlowable, ListItem, Flowable, Table, TableStyle,
+)
+from reportlab.platypus.paragraph import cleanBlockQuotedText, textTransformFrags
 
 from cv_builder_from_yaml_to_pdf.models import CV, PersonalInfo, Education, CompanyExperience, Role, Project, Skill # Updated import
+from cv_builder_from_yaml_to_pdf.images import IMAGE_CACHE, ImageCache, ImageFlowable, resolve_image_path
+from cv_builder_from_yaml_to_pdf.limits import ResourceLimitExceeded, check_page_limit
 from cv_builder_from_yaml_to_pdf.styles import get_style
+from cv_builder_from_yaml_to_pdf.wrap_cache import WRAP_CACHE, CachedParagraph, WrapCache, paragraph_key, style_fingerprint
 
 
-class CVPDFGenerator:
-    """Class to generate a PDF CV from structured data."""
+class FlowableStream:
+    """List-like view over a lazily produced sequence of flowables.
     
-    def __init__(self, output_path: str, data: CV, style: str = "classic", page_size: str = "A4"):
-        """Initialize the PDF generator.
+    ``BaseDocTemplate.build`` consumes its flowables from the front of a list
+    (``flowables[0]``, ``del flowables[0]``, ``flowables[0:0] = parts``). This
+    class supports exactly those operations while pulling flowables from an
+    iterator only when layout needs them, so a document never holds more than a
+    small window of flowables in memory.
+    """
+    
+    def __init__(self, flowables: Iterable[Flowable], lookahead: int = 8):
+        """Initialize the stream.
+        
+        Args:
+            flowables: Iterable producing the document flowables in order
+            lookahead: Minimum number of flowables kept buffered ahead of layout
+        """
+        self._source = iter(flowables)
+        self._buffer = []
+        self._lookahead = lookahead
+        self._exhausted = False
+    
+    def _fill(self, count: int):
+        """Buffer at least ``count`` flowables if the source has that many."""
+        while not self._exhausted and len(self._buffer) < count:
+            try:
+                self._buffer.append(next(self._source))
+            except StopIteration:
+                self._exhausted = True
+    
+    def _fill_lookahead(self):
+        """Buffer the lookahead window, extended past any keepWithNext chain.
+        
+        Layout scans ahead for flowables that must stay with the next one, so
+        the window must never end in the middle of such a chain.
+        """
+        self._fill(self._lookahead)
+        while not self._exhausted and self._buffer[-1].getKeepWithNext():
+            self._fill(len(self._buffer) + 1)
+    
+    def __len__(self):
+        self._fill_lookahead()
+        return len(self._buffer)
+    
+    def __bool__(self):
+        self._fill(1)
+        return bool(self._buffer)
+    
+    def _fill_for(self, index):
+        if isinstance(index, slice):
+            if index.stop is None or index.stop < 0:
+                self._fill(float('inf'))
+            else:
+                self._fill(index.stop)
+        elif index < 0:
+            self._fill(float('inf'))
+        else:
+            self._fill(index + 1)
+    
+    def __getitem__(self, index):
+        self._fill_for(index)
+        return self._buffer[index]
+    
+    def __setitem__(self, index, value):
+        self._fill_for(index)
+        self._buffer[index] = value
+    
+    def __delitem__(self, index):
+        self._fill_for(index)
+        del self._buffer[index]
+    
+    def insert(self, index: int, value: Flowable):
+        self._fill(index)
+        self._buffer.insert(index, value)
+
+
+class PageFlushingCanvas(Canvas):
+    """Canvas that compresses each page's content stream as soon as the page is finished.
+    
+    Reportlab keeps the uncompressed text of every page until the document is
+    saved. Encoding the stream at ``showPage`` time produces the same output
+    while only holding compressed bytes for finished pages.
+    """
+    
+    def showPage(self):
+        super().showPage()
+        page = self._doc.Pages[-1]
+        if page.compression and page.stream:
+            filters = [PDFBase85Encode, PDFZCompress] if rl_config.useA85 else [PDFZCompress]
+            content = page.stream
+            for stream_filter in reversed(filters):
+                content = stream_filter.encode(content)
+            contents = PDFStream(content=content)
+            contents.dictionary["Filter"] = PDFArray([PDFName(f.pdfname) for f in filters])
+            contents.__Comment__ = "page stream"
+            page.Contents = contents
+            page.stream = None
+
+
+PAGE_SIZES = {
+    "a4": A4,
+    "letter": letter,
+}
+
+# Default page margins in points
+DEFAULT_MARGINS = {
+    "left": 2*cm,
+    "right": 1*cm, # Reduced right margin
+    "top": 1*cm, # Reduced top margin
+    "bottom": 2*cm,
+}
+
+
+# Largest size of the profile photo and of company logos (width, height), and
+# the space between an image and the text next to it
+PHOTO_SIZE = (3*cm, 3.5*cm)
+LOGO_SIZE = (2.5*cm, 1*cm)
+IMAGE_GAP = 0.4*cm
+
+# Layout of the rows that put an image next to text
+_IMAGE_ROW_STYLE = TableStyle([
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('LEFTPADDING', (0, 0), (-1, -1), 0),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 0),
+    ('TOPPADDING', (0, 0), (-1, -1), 0),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 0),
+])
+
+
+# CV fields whose text can opt in to reportlab paragraph markup (<b>, <i>,
+# <font>, <a href>, entities); all other text is rendered as plain text
+MARKUP_FIELDS = ('name', 'title', 'contact', 'summary', 'company', 'role', 'dates', 'description',
+                 'achievements', 'degree', 'details', 'skills', 'project', 'technologies')
+
+
+# Serializes reportlab's lazy font registration
+_font_lock = threading.Lock()
+
+
+def _preload_fonts(font_names: Iterable[str]):
+    """Register fonts and their bold/italic variants up front.
+    
+    Reportlab registers standard fonts in a process-wide dictionary the first
+    time they are used. Doing that once, under a lock, means concurrent
+    renders only ever read the font registry.
+    """
+    with _font_lock:
+        for font_name in set(font_names):
+            try:
+                family, _, _ = ps2tt(font_name)
+            except ValueError:
+                pdfmetrics.getFont(font_name)
+                continue
+            for bold, italic in itertools.product((0, 1), repeat=2):
+                pdfmetrics.getFont(tt2ps(family, bold, italic))
+
+
+class Renderer:
+    """Long-lived PDF renderer that can render many CVs with the same configuration.
+    
+    Everything that does not depend on the CV being rendered (page size, the
+    style sheet, font overrides, the bullet list style and the page/frame
+    geometry) is resolved once here. Each document then only needs a fresh
+    document template bound to its output.
+    
+    CV text is plain text: it is escaped once and handed to reportlab as a
+    ready-made text fragment, skipping the paragraph markup parser, so that
+    characters such as ``&`` and ``<`` print as written. Fields listed in
+    ``markup_fields`` are parsed as reportlab paragraph markup instead.
+    
+    A renderer can be shared between threads. Styles, the list style and the
+    geometry are only read after ``__init__``; frames and page templates,
+    which reportlab mutates during layout, are created per document; and the
+    fonts used by the styles are registered before any render starts.
+    """
+    
+    def __init__(self, style: str = "classic", page_size: str = "A4", margins: Optional[Dict[str, float]] = None,
+                 fonts: Optional[Dict[str, str]] = None, streaming: bool = False,
+                 images: Optional[ImageCache] = None, wrap_cache: Optional[WrapCache] = None,
+                 max_pages: Optional[int] = None, markup_fields: Iterable[str] = ()):
+        """Initialize the renderer.
         
         Args:
-            output_path: Path where the PDF will be saved
-            data: CV model containing the CV data
             style: Style name for the CV (e.g., 'classic', 'modern', 'minimal')
             page_size: Size of the page ('A4' or 'letter')
+            margins: Page margins in points, keyed by 'left', 'right', 'top' and
+                'bottom'; missing keys use the defaults
+            fonts: Font name overrides keyed by paragraph style name (e.g.,
+                {'Name': 'Helvetica-Bold'}); fonts must already be registered
+            streaming: Produce flowables lazily during layout instead of building
+                the whole list up front, keeping memory bounded for large CVs
+            images: Cache for the photo and logos; defaults to the process-wide cache
+            wrap_cache: Cache for paragraph line breaks; defaults to the process-wide cache
+            max_pages: Stop layout with ``ResourceLimitExceeded`` when a document
+                needs more pages than this
+            markup_fields: Fields, from ``MARKUP_FIELDS``, whose text is
+                reportlab paragraph markup rather than plain text
+            
+        Raises:
+            ValueError: If a markup field is not one of ``MARKUP_FIELDS``
         """
-        self.output_path = Path(output_path)
-        self.data = data
+        self.streaming = streaming
+        self.max_pages = max_pages
+        self.markup_fields = frozenset(markup_fields)
+        unknown = self.markup_fields.difference(MARKUP_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown markup fields: {', '.join(sorted(unknown))}")
+        self.images = images if images is not None else IMAGE_CACHE
+        self.wrap_cache = wrap_cache if wrap_cache is not None else WRAP_CACHE
         
-        # Set page size
-        if page_size.lower() == "a4":
-            self.page_size = A4
-        elif page_size.lower() == "letter":
-            self.page_size = letter
-        else:
-            # Default to A4
-            self.page_size = A4
+        # Set page size, defaulting to A4
+        self.page_size = PAGE_SIZES.get(page_size.lower(), A4)
         
         # Apply style
         try:
             cv_style = get_style(style)
-            self.styles = cv_style.get_styles()
         except ValueError:
             # Fall back to classic style
             cv_style = get_style("classic")
-            self.styles = cv_style.get_styles()
+        self.styles = cv_style.get_styles()
+        for style_name, font_name in (fonts or {}).items():
+            self.styles[style_name].fontName = font_name
+        # Styles are not changed after this point, so their fingerprints can be computed once
+        self.style_fingerprints = {name: style_fingerprint(style) for name, style in self.styles.byName.items()}
+        # The fragment the markup parser makes for plain text in each style, copied for every plain paragraph
+        self.plain_frags = {name: Paragraph("x", style).frags[0] for name, style in self.styles.byName.items()
+                            if isinstance(style, ParagraphStyle)}
         
-        # Create output directory if it doesn't exist
-        os.makedirs(self.output_path.parent, exist_ok=True)
+        # Bullet lists for achievements
+        self.list_style = ListStyle(
+            'AchievementList',
+            bulletType='bullet',
+            leftIndent=0.5*cm,
+            bulletFontName='Helvetica-Bold',
+            bulletFontSize=10
+        )
         
-        # Initialize document
-        self.doc = SimpleDocTemplate(
-            str(self.output_path),
+        # Page and frame geometry: x, y, width, height of the single frame
+        self.margins = {**DEFAULT_MARGINS, **(margins or {})}
+        page_width, page_height = self.page_size
+        self.frame_geometry = (
+            self.margins["left"],
+            self.margins["bottom"],
+            page_width - self.margins["left"] - self.margins["right"],
+            page_height - self.margins["top"] - self.margins["bottom"],
+        )
+        
+        font_names = [getattr(style, attr) for style in self.styles.byName.values()
+                      for attr in ('fontName', 'bulletFontName') if hasattr(style, attr)]
+        _preload_fonts(font_names + [self.list_style.bulletFontName])
+    
+    def create_document(self, output: Union[str, BinaryIO, None] = None) -> BaseDocTemplate:
+        """Create a document template bound to an output path or binary file object."""
+        # Frames keep layout state, so every document gets its own
+        frame = Frame(*self.frame_geometry, id='normal')
+        return BaseDocTemplate(
+            output,
             pagesize=self.page_size,
-            rightMargin=1*cm, # Reduced right margin
-            leftMargin=2*cm,
-            topMargin=1*cm, # Reduced top margin
-            bottomMargin=2*cm
+            pageTemplates=[PageTemplate(id='Later', frames=frame, pagesize=self.page_size,
+                                        onPage=self._start_page)],
+            leftMargin=self.margins["left"],
+            rightMargin=self.margins["right"],
+            topMargin=self.margins["top"],
+            bottomMargin=self.margins["bottom"]
         )
+    
+    def _start_page(self, canvas: Canvas, doc: BaseDocTemplate):
+        check_page_limit(doc.page, self.max_pages)
+    
+    def build(self, doc: BaseDocTemplate, flowables: Iterable[Flowable]) -> int:
+        """Lay out flowables into a document's pages and write it.
         
-        # Elements to be added to the PDF
-        self.elements = []
+        Args:
+            doc: Document template from ``create_document``
+            flowables: Flowables to lay out; in streaming mode any iterable, otherwise a list
+            
+        Returns:
+            Number of pages in the document
+        """
+        try:
+            if self.streaming:
+                # Sections are turned into flowables as layout reaches them; each
+                # finished page is compressed and its flowables released
+                doc.build(FlowableStream(flowables), canvasmaker=PageFlushingCanvas)
+            else:
+                doc.build(flowables if isinstance(flowables, list) else list(flowables))
+        except ResourceLimitExceeded as e:
+            # reportlab re-raises errors from its callbacks as new exceptions with context in the message
+            while isinstance(e.__context__, ResourceLimitExceeded):
+                e = e.__context__
+            raise e from None
+        return doc.page
     
-    def generate(self):
-        """Generate the PDF document."""
-        # Add all sections
-        self._add_content()
+    def layout(self, flowables: Iterable[Flowable], output: Union[str, BinaryIO]) -> int:
+        """Lay out flowables into a new document written to ``output``.
         
-        # Build the document
-        self.doc.build(self.elements)
+        Returns:
+            Number of pages in the document
+        """
+        return self.build(self.create_document(output), flowables)
+    
+    def render(self, cv: CV, base_dir: Optional[str] = None) -> bytes:
+        """Render a CV and return the PDF bytes.
         
-        return self.output_path
+        Args:
+            cv: CV model containing the CV data
+            base_dir: Directory of the CV file, which images must be in
+        """
+        buffer = io.BytesIO()
+        self.layout(self.build_flowables(cv, base_dir), buffer)
+        return buffer.getvalue()
     
-    def _add_content(self):
-        """Add all CV content to the PDF."""
+    def render_to_file(self, cv: CV, output_path: str, base_dir: Optional[str] = None) -> int:
+        """Render a CV to a file, creating its directory if needed.
+        
+        Args:
+            cv: CV model containing the CV data
+            output_path: Path of the PDF file
+            base_dir: Directory of the CV file, which images must be in
+        
+        Returns:
+            Number of pages in the document
+        """
+        os.makedirs(Path(output_path).parent, exist_ok=True)
+        return self.layout(self.build_flowables(cv, base_dir), str(output_path))
+    
+    def build_flowables(self, cv: CV, base_dir: Optional[str] = None) -> Iterator[Flowable]:
+        """Yield the flowables for all CV sections in document order.
+        
+        Args:
+            cv: CV model containing the CV data
+            base_dir: Directory of the CV file, which image paths are relative
+                to and must stay within; None rejects images
+        """
         # Add personal info
-        personal_info = self.data.personal_info
+        personal_info = cv.personal_info
         if personal_info:
-            self._add_personal_info(personal_info)
+            yield from self._add_personal_info(personal_info, base_dir)
         
         # Add experience
-        experience = self.data.experience
+        experience = cv.experience
         if experience:
-            self._add_section('Work Experience', experience, self._format_company_experience) # Renamed formatter
+            formatter = functools.partial(self._format_company_experience, base_dir=base_dir)
+            yield from self._add_section('Work Experience', experience, formatter) # Renamed formatter
         
         # Add education
-        education = self.data.education
+        education = cv.education
         if education:
-            self._add_section('Education', education, self._format_education)
+            yield from self._add_section('Education', education, self._format_education)
         
         # Add skills
-        skills = self.data.skills
+        skills = cv.skills
         if skills:
-            self._add_skills(skills)
+            yield from self._add_skills(skills)
         
         # Add projects
-        projects = self.data.projects
+        projects = cv.projects
         if projects:
-            self._add_section('Projects', projects, self._format_project)
+            yield from self._add_section('Projects', projects, self._format_project)
+    
+    def paragraph(self, text: str, style_name: str, field: Optional[str] = None, markup: bool = False) -> Paragraph:
+        """Create a paragraph in one of the renderer's styles, with line breaks cached across documents.
+        
+        Plain text is escaped; pass ``markup=True`` for text with reportlab
+        paragraph markup, such as links.
+        
+        Args:
+            text: Text of the paragraph
+            style_name: Name of the paragraph style
+            field: Field the text comes from; its text is parsed as markup if
+                the field is one of the renderer's markup fields
+            markup: Parse the text as markup whatever the field
+        
+        Returns:
+            The paragraph
+        """
+        style = self.styles[style_name]
+        fingerprint = self.style_fingerprints[style_name]
+        if markup or field in self.markup_fields:
+            return CachedParagraph(text, style, cache=self.wrap_cache, key=paragraph_key(text, fingerprint))
+        # Build what the parser would make of the escaped text, without parsing it
+        text = cleanBlockQuotedText(text)
+        frags = [self.plain_frags[style_name].clone(text=text)] if text else []
+        textTransformFrags(frags, style)
+        markup = escape(text)
+        return CachedParagraph(markup, style, frags=frags, cache=self.wrap_cache,
+                               key=paragraph_key(markup, fingerprint))
+    
+    def _image(self, path: str, base_dir: Optional[str], max_size) -> ImageFlowable:
+        """Get a flowable for an image file, fitted into ``max_size`` (width, height)."""
+        image = self.images.get(resolve_image_path(path, base_dir), *max_size)
+        return ImageFlowable(image, *image.fit(*max_size))
     
-    def _add_personal_info(self, personal_info: PersonalInfo):
-        """Add personal information to the PDF."""
+    def _beside_image(self, image: ImageFlowable, content, image_first: bool):
+        """Put an image next to other flowables, using the full frame width."""
+        text_width = self.frame_geometry[2] - image.width - IMAGE_GAP
+        if image_first:
+            return Table([[image, content]], colWidths=[image.width + IMAGE_GAP, text_width], style=_IMAGE_ROW_STYLE)
+        return Table([[content, image]], colWidths=[text_width + IMAGE_GAP, image.width], style=_IMAGE_ROW_STYLE)
+    
+    def _add_personal_info(self, personal_info: PersonalInfo, base_dir: Optional[str] = None):
+        """Yield the personal information flowables."""
+        header = []
         # Add name
         if personal_info.name:
-            self.elements.append(Paragraph(personal_info.name, self.styles['Name']))
+            header.append(self.paragraph(personal_info.name, 'Name', 'name'))
         
         # Add title if present
         if personal_info.title:
-            self.elements.append(Paragraph(personal_info.title, self.styles['ContactInfo']))
+            header.append(self.paragraph(personal_info.title, 'ContactInfo', 'title'))
         
         # Combine contact information
         contact_parts = []
@@ -127,76 +457,86 @@ class CVPDFGenerator:
             contact_parts.append(f"LinkedIn: {personal_info.linkedin}")
         
         contact_info = " | ".join(contact_parts)
-        self.elements.append(Paragraph(contact_info, self.styles['ContactInfo']))
+        header.append(self.paragraph(contact_info, 'ContactInfo', 'contact'))
+        
+        # The photo goes to the right of the name and contact details
+        if personal_info.photo:
+            yield self._beside_image(self._image(personal_info.photo, base_dir, PHOTO_SIZE), header, False)
+        else:
+            yield from header
         
         # Add summary if present
         if personal_info.summary:
-            self.elements.append(Paragraph('Summary', self.styles['SectionHeading']))
+            yield self.paragraph('Summary', 'SectionHeading')
             # Split summary into paragraphs if it contains newlines
             summary_lines = personal_info.summary.split('\n')
             for line in summary_lines:
                 if line.strip(): # Add non-empty lines as paragraphs
                     indented_line = f"{line.lstrip()}" # Add 4 dashes to the start of the line
-                    self.elements.append(Paragraph(indented_line, self.styles['Paragraph']))
-            self.elements.append(Spacer(1, 12))
+                    yield self.paragraph(indented_line, 'Paragraph', 'summary')
+            yield Spacer(1, 12)
     
     def _add_section(self, title, items, formatter):
-        """Add a section to the PDF with formatted items."""
-        self.elements.append(Paragraph(title, self.styles['SectionHeading']))
+        """Yield a section heading followed by its formatted items."""
+        yield self.paragraph(title, 'SectionHeading')
         
         for item in items:
-            formatter(item)
-            self.elements.append(Spacer(1, 6)) # Add a bit more space after a full company entry
+            yield from formatter(item)
+            yield Spacer(1, 6) # Add a bit more space after a full company entry
     
-    def _format_company_experience(self, company_exp: CompanyExperience):
+    def _format_company_experience(self, company_exp: CompanyExperience, base_dir: Optional[str] = None):
         """Format a company experience entry, including all its roles."""
         # Company name and optional location
         company_text = company_exp.company
         if company_exp.location:
             company_text += f" ({company_exp.location})"
-        self.elements.append(Paragraph(company_text, self.styles['ExperienceTitle'])) # Style for company name
+        company = self.paragraph(company_text, 'ExperienceTitle', 'company') # Style for company name
+        if company_exp.logo:
+            yield self._beside_image(self._image(company_exp.logo, base_dir, LOGO_SIZE), company, True)
+        else:
+            yield company
         
         for role in company_exp.roles:
             # Role title
-            self.elements.append(Paragraph(role.title, self.styles['RoleTitle'])) # Potentially a new style or reuse ExperienceDetails/Normal
+            yield self.paragraph(role.title, 'RoleTitle', 'role') # Potentially a new style or reuse ExperienceDetails/Normal
             
             # Dates for the role
             dates = f"{role.start_date} - {role.end_date or 'Present'}"
             if role.location: # Role-specific location
                 dates += f" | {role.location}"
-            self.elements.append(Paragraph(dates, self.styles['ExperienceDetails']))
+            yield self.paragraph(dates, 'ExperienceDetails', 'dates')
             
             # Description for the role
             if role.description:
-                self.elements.append(Paragraph(role.description, self.styles['Normal']))
+                yield self.paragraph(role.description, 'Normal', 'description')
             
             # Achievements for the role
             if role.achievements:
                 items = []
                 for achievement in role.achievements:
-                    items.append(ListItem(Paragraph(achievement, self.styles['Normal'])))
-                self.elements.append(ListFlowable(items, bulletType='bullet', leftIndent=0.5*cm, bulletFontName='Helvetica-Bold', bulletFontSize=10))
-            self.elements.append(Spacer(1, 4)) # Spacer between roles within the same company
+                    items.append(ListItem(self.paragraph(achievement, 'Normal', 'achievements')))
+                yield ListFlowable(items, style=self.list_style)
+            yield Spacer(1, 4) # Spacer between roles within the same company
 
     def _format_education(self, edu: Education):
         """Format an education entry."""
         # Degree and institution
         degree_text = f"{edu.degree} - {edu.institution}"
-        self.elements.append(Paragraph(degree_text, self.styles['ExperienceTitle']))
+        yield self.paragraph(degree_text, 'ExperienceTitle', 'degree')
         
         # Dates and location
         dates = f"{edu.start_date} - {edu.end_date or 'Present'}"
         if edu.location:
             dates += f" | {edu.location}"
-        self.elements.append(Paragraph(dates, self.styles['ExperienceDetails']))
+        yield self.paragraph(dates, 'ExperienceDetails', 'dates')
         
         # Additional details
         if edu.details:
-            self.elements.append(Paragraph(edu.details, self.styles['Normal']))
+            yield self.paragraph(edu.details, 'Normal', 'details')
     
     def _add_skills(self, skills: List[Skill]):
-        """Add skills to the PDF."""
-        self.elements.append(Paragraph('Skills', self.styles['SectionHeading']))
+        """Yield the skills section flowables."""
+        yield self.paragraph('Skills', 'SectionHeading')
         
         # Group skills by category if they have categories
         categorized_skills = {}
@@ -211,11 +551,11 @@ class CVPDFGenerator:
         
         # Add categorized skills
         for category, skill_list in categorized_skills.items():
-            self.elements.append(Paragraph(category, self.styles['ExperienceTitle']))
+            yield self.paragraph(category, 'ExperienceTitle', 'skills')
             # Make sure we have a list of strings before joining
             skill_text = ", ".join([s for s in skill_list if s])
-            self.elements.append(Paragraph(skill_text, self.styles['Normal']))
-            self.elements.append(Spacer(1, 4))
+            yield self.paragraph(skill_text, 'Normal', 'skills')
+            yield Spacer(1, 4)
     
     def _format_project(self, project: Project):
         """Format a project entry."""
@@ -223,26 +563,98 @@ class CVPDFGenerator:
         project_text = project.name
         if project.link:
             project_text += f" ({project.link})"
-        self.elements.append(Paragraph(project_text, self.styles['ExperienceTitle']))
+        yield self.paragraph(project_text, 'ExperienceTitle', 'project')
         
         # Dates
         if project.start_date:
             date_text = project.start_date
             if project.end_date:
                 date_text += f" - {project.end_date}"
-            self.elements.append(Paragraph(date_text, self.styles['ExperienceDetails']))
+            yield self.paragraph(date_text, 'ExperienceDetails', 'dates')
         
         # Description
         if project.description:
-            self.elements.append(Paragraph(project.description, self.styles['Normal']))
+            yield self.paragraph(project.description, 'Normal', 'description')
         
         # Technologies used
         if project.technologies:
             tech_text = f"Technologies: {', '.join(project.technologies)}"
-            self.elements.append(Paragraph(tech_text, self.styles['Normal']))
+            yield self.paragraph(tech_text, 'Normal', 'technologies')
+
+
+class CVPDFGenerator:
+    """Class to generate a PDF CV from structured data."""
+    
+    def __init__(self, output_path: Optional[str], data: CV, style: str = "classic", page_size: str = "A4",
+                 streaming: bool = False, renderer: Optional[Renderer] = None):
+        """Initialize the PDF generator.
+        
+        Args:
+            output_path: Path where the PDF will be saved, or None to only lay out
+                into the output passed to ``layout``
+            data: CV model containing the CV data
+            style: Style name for the CV (e.g., 'classic', 'modern', 'minimal')
+            page_size: Size of the page ('A4' or 'letter')
+            streaming: Produce flowables lazily during layout instead of building
+                the whole list up front, keeping memory bounded for large CVs
+            renderer: Configured renderer to reuse; style, page_size and streaming
+                are ignored when it is given
+        """
+        self.output_path = Path(output_path) if output_path else None
+        self.data = data
+        self.renderer = renderer or Renderer(style, page_size, streaming=streaming)
+        self.streaming = self.renderer.streaming
+        self.page_size = self.renderer.page_size
+        self.styles = self.renderer.styles
+        
+        # Create output directory if it doesn't exist
+        if self.output_path:
+            os.makedirs(self.output_path.parent, exist_ok=True)
+        
+        # Initialize document
+        self.doc = self.renderer.create_document(str(self.output_path) if self.output_path else None)
+        
+        # Elements to be added to the PDF
+        self.elements = []
+    
+    def generate(self):
+        """Generate the PDF document."""
+        if self.streaming:
+            self.layout(self.build_flowables())
+        else:
+            # Add all sections
+            self._add_content()
+            
+            # Build the document
+            self.layout(self.elements)
+        
+        return self.output_path
+    
+    def build_flowables(self) -> Iterator[Flowable]:
+        """Get the flowables for the whole CV, produced lazily in document order."""
+        return self.renderer.build_flowables(self.data)
+    
+    def layout(self, flowables: Iterable[Flowable], output: Union[str, BinaryIO, None] = None) -> int:
+        """Lay out flowables into pages and write the PDF.
+        
+        Args:
+            flowables: Flowables to lay out; in streaming mode any iterable, otherwise a list
+            output: Path or binary file object to write to; defaults to ``output_path``
+            
+        Returns:
+            Number of pages in the document
+        """
+        if output is not None:
+            self.doc.filename = output
+        return self.renderer.build(self.doc, flowables)
+    
+    def _add_content(self):
+        """Add all CV content to the PDF."""
+        self.elements.extend(self.build_flowables())
 
 
-def generate_cv_pdf(cv_data: CV, output_path: str, style: str = "classic", page_size: str = "A4") -> str:
+def generate_cv_pdf(cv_data: CV, output_path: str, style: str = "classic", page_size: str = "A4",
+                    streaming: bool = False) -> str:
     """Generate a PDF CV from the provided data.
     
     Args:
@@ -250,9 +662,10 @@ def generate_cv_pdf(cv_data: CV, output_path: str, style: str = "classic", page_
         output_path: Path where the PDF will be saved
         style: Style name for the CV (e.g., 'classic', 'modern', 'minimal')
         page_size: Size of the page ('A4' or 'letter')
+        streaming: Produce flowables lazily during layout to bound memory use
         
     Returns:
         Path to the generated PDF file
     """
-    generator = CVPDFGenerator(output_path, cv_data, style, page_size)
+    generator = CVPDFGenerator(output_path, cv_data, style, page_size, streaming=streaming)
     return str(generator.generate())
@@ -0,0 +1,283 @@
+"""Render pipeline for CV Builder.
+
+This module provides ``RenderPipeline``, a reusable object that turns CV
+sources into PDFs through explicit stages:
+
+    load -> validate -> build_flowables -> layout -> write
+
+A pipeline is configured once and can then render any number of documents.
+Callbacks can be registered to run before or after each stage, or when a stage
+fails, e.g. for timing, caching, metrics or adding custom sections. Every callback receives the
+``RenderContext`` of the document being rendered. A stage is skipped when its
+output (or that of a later stage) is already present, e.g. because a ``before``
+hook filled it in, which is how caches plug in.
+"""
+
+import io
+import os
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from pydantic import ValidationError
+
+from cv_builder_from_yaml_to_pdf.models import CV
+from cv_builder_from_yaml_to_pdf.pdf_generator import Renderer
+from cv_builder_from_yaml_to_pdf.yaml_parser import parse_yaml_file_with_includes, parse_yaml_string
+
+
+STAGES = ('load', 'validate', 'build_flowables', 'layout', 'write')
+
+HOOK_TIMINGS = ('before', 'after', 'error')
+
+# Context attribute each stage produces
+STAGE_OUTPUTS = {
+    'load': 'data',
+    'validate': 'cv',
+    'build_flowables': 'flowables',
+    'layout': 'pdf',
+    'write': 'written_path',
+}
+
+Hook = Callable[['RenderContext'], None]
+
+
+class CVValidationError(ValueError):
+    """Raised when CV data does not match the CV schema."""
+
+    def __init__(self, errors: List[str], locations: Optional[List[Tuple]] = None):
+        """Initialize the error.
+
+        Args:
+            errors: Validation error messages
+            locations: Location of each error in the CV data, as tuples of keys and indexes
+        """
+        super().__init__("Validation errors: " + "; ".join(errors))
+        self.errors = errors
+        self.locations = locations or []
+
+
+class RenderContext:
+    """State of a single document as it moves through the pipeline."""
+
+    def __init__(self, source: Union[str, Path, None] = None, text: Optional[str] = None,
+                 data: Optional[Dict[str, Any]] = None, cv: Optional[CV] = None,
+                 output_path: Union[str, Path, None] = None, json_text: Optional[str] = None):
+        """Initialize the context.
+
+        Only one of ``source``, ``text``, ``json_text``, ``data`` or ``cv`` is
+        needed; stages whose output is already present are skipped.
+
+        Args:
+            source: Path to a YAML or JSON file
+            text: YAML or JSON document
+            data: Parsed CV data
+            cv: Validated CV model
+            output_path: Path where the PDF will be written, or None to keep it in memory
+            json_text: JSON document, validated directly with ``CV.model_validate_json``
+                instead of being parsed into ``data`` first
+        """
+        self.source = str(source) if source is not None else None
+        self.text = text
+        self.json_text = json_text
+        self.data = data
+        self.cv = cv
+        # Absolute paths of the fragments the source includes
+        self.includes: List[str] = []
+        self.output_path = str(output_path) if output_path is not None else None
+        self.flowables = None
+        self.pdf: Optional[bytes] = None
+        self.pages: Optional[int] = None
+        self.written_path: Optional[str] = None
+        self.timings: Dict[str, float] = {}
+        self.error: Optional[Exception] = None
+        # Free-form storage for hooks
+        self.extra: Dict[str, Any] = {}
+
+
+class RenderPipeline:
+    """Reusable CV rendering pipeline with per-stage hooks."""
+
+    def __init__(self, style: str = "classic", page_size: str = "A4", streaming: bool = False,
+                 renderer: Optional[Renderer] = None, max_pages: Optional[int] = None,
+                 markup_fields: Iterable[str] = ()):
+        """Initialize the pipeline.
+
+        Args:
+            style: Style name for the CV (e.g., 'classic', 'modern', 'minimal')
+            page_size: Size of the page ('A4' or 'letter')
+            streaming: Produce flowables lazily during layout to bound memory use
+            renderer: Configured renderer to use; style, page_size, streaming,
+                max_pages and markup_fields are ignored when it is given
+            max_pages: Fail documents that need more pages than this with
+                ``ResourceLimitExceeded``
+            markup_fields: Fields, from ``MARKUP_FIELDS``, whose text is
+                reportlab paragraph markup rather than plain text
+        """
+        self.style = style
+        self.page_size = page_size
+        self.renderer = renderer or Renderer(style, page_size, streaming=streaming, max_pages=max_pages,
+                                             markup_fields=markup_fields)
+        self.streaming = self.renderer.streaming
+        self._hooks: Dict[tuple, List[Hook]] = defaultdict(list)
+
+    def add_hook(self, stage: str, callback: Hook, when: str = 'after'):
+        """Register a callback to run before or after a stage, or when it raises.
+
+        Error callbacks find the exception in ``context.error``; the exception
+        is re-raised after they have run.
+
+        Args:
+            stage: One of ``STAGES``
+            callback: Called with the document's ``RenderContext``
+            when: 'before', 'after' or 'error'
+
+        Raises:
+            ValueError: If the stage or timing is not valid
+        """
+        if stage not in STAGES:
+            raise ValueError(f"Invalid stage: {stage}. Valid stages are: {', '.join(STAGES)}")
+        if when not in HOOK_TIMINGS:
+            raise ValueError(f"Invalid hook timing: {when}. Use 'before', 'after' or 'error'.")
+        self._hooks[(stage, when)].append(callback)
+
+    def before(self, stage: str, callback: Hook):
+        """Register a callback to run before a stage."""
+        self.add_hook(stage, callback, 'before')
+
+    def after(self, stage: str, callback: Hook):
+        """Register a callback to run after a stage."""
+        self.add_hook(stage, callback, 'after')
+
+    def on_error(self, stage: str, callback: Hook):
+        """Register a callback to run when a stage raises."""
+        self.add_hook(stage, callback, 'error')
+
+    def load(self, context: RenderContext):
+        """Parse the source file or text into CV data."""
+        if context.json_text is not None:
+            # Validated straight from the JSON text by the validate stage
+            return
+        if context.text is not None:
+            context.data = parse_yaml_string(context.text)
+        elif context.source is not None:
+            context.data, context.includes = parse_yaml_file_with_includes(context.source)
+        else:
+            raise ValueError("Nothing to render: no source, text, JSON, data or CV given.")
+
+    def validate(self, context: RenderContext):
+        """Validate the CV data against the CV model.
+
+        Raises:
+            CVValidationError: If the data is not a valid CV
+        """
+        try:
+            if context.data is None and context.json_text is not None:
+                context.cv = CV.model_validate_json(context.json_text)
+            else:
+                context.cv = CV.model_validate(context.data)
+        except ValidationError as e:
+            errors = e.errors()
+            raise CVValidationError([f"{err['loc']}: {err['msg']}" for err in errors],
+                                    [err['loc'] for err in errors])
+
+    def build_flowables(self, context: RenderContext):
+        """Turn the CV model into reportlab flowables."""
+        # Images in the CV are relative to its file
+        base_dir = os.path.dirname(os.path.abspath(context.source)) if context.source else None
+        flowables = self.renderer.build_flowables(context.cv, base_dir)
+        context.flowables = flowables if self.streaming else list(flowables)
+
+    def layout(self, context: RenderContext):
+        """Lay out the flowables into pages and produce the PDF bytes in memory."""
+        buffer = io.BytesIO()
+        context.pages = self.renderer.layout(context.flowables, buffer)
+        context.pdf = buffer.getvalue()
+
+    def write(self, context: RenderContext):
+        """Write the PDF bytes to the output path, if there is one."""
+        if context.output_path is None:
+            return
+        output_path = Path(context.output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        output_path.write_bytes(context.pdf)
+        context.written_path = str(output_path)
+
+    def run_stage(self, stage: str, context: RenderContext):
+        """Run one stage with its hooks, recording its duration.
+
+        Rendering only reads the pipeline's configuration, so one pipeline can
+        render documents from several threads at once, provided its hooks are
+        registered up front and are themselves thread-safe.
+        """
+        for callback in self._hooks.get((stage, 'before'), ()):
+            callback(context)
+        start = time.perf_counter()
+        # Skip the stage if its output, or that of a later stage, was supplied
+        later = STAGES[STAGES.index(stage):]
+        try:
+            if all(getattr(context, STAGE_OUTPUTS[name]) is None for name in later):
+                getattr(self, stage)(context)
+        except Exception as e:
+            context.timings[stage] = time.perf_counter() - start
+            context.error = e
+            for callback in self._hooks.get((stage, 'error'), ()):
+                callback(context)
+            raise
+        context.timings[stage] = time.perf_counter() - start
+        for callback in self._hooks.get((stage, 'after'), ()):
+            callback(context)
+
+    def run(self, source: Union[str, Path, None] = None, output_path: Union[str, Path, None] = None, *,
+            text: Optional[str] = None, data: Optional[Dict[str, Any]] = None,
+            cv: Optional[CV] = None) -> RenderContext:
+        """Render one document through all stages.
+
+        Args:
+            source: Path to a YAML or JSON file
+            output_path: Path where the PDF will be written, or None to keep it in memory
+            text: YAML or JSON document, instead of a source file
+            data: Parsed CV data, instead of a source file
+            cv: Validated CV model, instead of a source file
+
+        Returns:
+            The document's context, with ``pdf`` holding the rendered bytes
+
+        Raises:
+            FileNotFoundError: If the source file does not exist
+            yaml.YAMLError: If the source cannot be parsed
+            CVValidationError: If the data is not a valid CV
+        """
+        context = RenderContext(source=source, text=text, data=data, cv=cv, output_path=output_path)
+        return self.run_context(context)
+
+    def run_context(self, context: RenderContext) -> RenderContext:
+        """Render a prepared context through all stages.
+
+        Unlike ``run``, the caller keeps hold of the context when a stage
+        raises, e.g. to inspect the timings of a failed render.
+
+        Returns:
+            The same context, with ``pdf`` holding the rendered bytes
+        """
+        try:
+            for stage in STAGES:
+                self.run_stage(stage, context)
+        finally:
+            # Flowables are not needed once the document is written
+            context.flowables = None
+        return context
+
+    def run_many(self, sources: Iterable[Union[str, Path]], output_dir: Union[str, Path]) -> Iterator[RenderContext]:
+        """Render many source files into a directory, one after another.
+
+        Args:
+            sources: Paths to YAML or JSON files
+            output_dir: Directory for the PDFs, named after each source file
+
+        Yields:
+            The context of each rendered document
+        """
+        for source in sources:
+            yield self.run(source, Path(output_dir) / Path(source).with_suffix('.pdf').name)
@@ -0,0 +1,386 @@
+"""Live preview server for CV Builder.
+
+This module serves a CV over HTTP while it is being edited. The YAML file is
+rendered into memory with a long-lived ``RenderPipeline``, so the renderer
+stays warm between edits. A background thread watches the file and re-renders
+it when it changes; connected browsers are told to reload through a
+server-sent events stream.
+
+Routes:
+
+    /          preview page (embedded PDF with an HTML fallback)
+    /cv.pdf    latest rendered PDF
+    /cv.html   HTML rendering of the CV
+    /events    server-sent events; a ``reload`` event follows every render
+    /status    JSON with the render version, duration and errors
+    /metrics   render metrics in the Prometheus text format
+"""
+
+import html
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional, Tuple
+
+from cv_builder_from_yaml_to_pdf.batch import (STATUS_ERROR, STATUS_INVALID, STATUS_LIMIT, STATUS_OK, failure_status,
+                                               sandbox_pipeline)
+from cv_builder_from_yaml_to_pdf.limits import RenderLimits, RenderSandbox, ResourceLimitExceeded, limit_of
+from cv_builder_from_yaml_to_pdf.metrics import CONTENT_TYPE, METRICS, RenderMetrics
+from cv_builder_from_yaml_to_pdf.models import CV
+from cv_builder_from_yaml_to_pdf.pipeline import CVValidationError, RenderContext, RenderPipeline
+
+
+# Seconds between SSE keep-alive comments
+KEEPALIVE_INTERVAL = 15.0
+
+
+def _render(pipeline: RenderPipeline, source: str) -> tuple:
+    """Render a source.
+
+    Returns:
+        Tuple of (pdf, cv, errors, status, limit, fragments); the fragments
+        are None if the source could not be parsed
+    """
+    context = RenderContext(source)
+    errors, limit = [], None
+    try:
+        pipeline.run_context(context)
+    except Exception as e:
+        limit = limit_of(e)
+        if isinstance(e, CVValidationError):
+            errors = e.errors
+        elif limit is not None:
+            errors = [f"Limit exceeded ({limit}): {str(e) or 'Render ran out of memory'}"]
+        elif failure_status(e) == STATUS_INVALID:
+            errors = [str(e)]
+        else:
+            errors = [f"{type(e).__name__}: {e}"]
+        status = failure_status(e)
+    else:
+        status = STATUS_OK
+    return context.pdf, context.cv, errors, status, limit, context.includes if context.data is not None else None
+
+
+def _render_in_sandbox(options: tuple, source: str):
+    return _render(sandbox_pipeline(*options), source)
+
+
+class PreviewState:
+    """Latest render of a watched CV file, shared between the watcher and request handlers."""
+
+    def __init__(self, source: str, pipeline: RenderPipeline, sandbox: Optional[RenderSandbox] = None,
+                 metrics: Optional[RenderMetrics] = None):
+        """Initialize the state.
+
+        Args:
+            source: Path to the YAML or JSON file to preview
+            pipeline: Pipeline used for every render
+            sandbox: Render in this sandbox instead, with the pipeline's style
+                and page size and the sandbox's limits
+            metrics: Metrics to record sandboxed renders in; renders in this
+                process are recorded by hooks on the pipeline
+        """
+        self.source = source
+        self.pipeline = pipeline
+        self.sandbox = sandbox
+        self.metrics = metrics
+        self.pdf: Optional[bytes] = None
+        self.cv: Optional[CV] = None
+        self.errors: List[str] = []
+        self.version = 0
+        self.render_ms: Optional[float] = None
+        self.closed = False
+        # Fragments the source included in the last render that parsed it
+        self.includes: List[str] = []
+        self._mtimes_rendered: Optional[Tuple[Optional[int], ...]] = None
+        self._changed = threading.Condition()
+
+    def _mtimes(self) -> Tuple[Optional[int], ...]:
+        """Get the modification times of the source and then of each of its fragments."""
+        mtimes = []
+        for path in [self.source, *self.includes]:
+            try:
+                mtimes.append(os.stat(path).st_mtime_ns)
+            except FileNotFoundError:
+                mtimes.append(None)
+        return tuple(mtimes)
+
+    def refresh(self) -> bool:
+        """Re-render the source if it or a fragment it includes changed since the last render.
+
+        A failed render keeps the last good PDF and records the errors.
+
+        Returns:
+            True if a render was attempted
+        """
+        # Stat before rendering so that an edit made during the render is picked up next time
+        mtimes = self._mtimes()
+        if mtimes == self._mtimes_rendered and self.version:
+            return False
+        self._mtimes_rendered = mtimes
+
+        start = time.perf_counter()
+        if self.sandbox is None:
+            pdf, cv, errors, _, _, includes = _render(self.pipeline, self.source)
+        else:
+            pdf, cv, errors, includes = self._render_sandboxed()
+        if pdf is None:
+            pdf, cv = self.pdf, self.cv
+        # A source that cannot be parsed keeps watching the fragments it included last time
+        if includes is not None and includes != self.includes:
+            self.includes = includes
+            self._mtimes_rendered = mtimes[:1] + self._mtimes()[1:]
+        render_ms = (time.perf_counter() - start) * 1000
+
+        with self._changed:
+            self.pdf, self.cv, self.errors, self.render_ms = pdf, cv, errors, render_ms
+            self.version += 1
+            self._changed.notify_all()
+        return True
+
+    def _render_sandboxed(self):
+        """Render in the sandbox, recording the outcome in the metrics."""
+        start = time.perf_counter()
+        options = (self.pipeline.style, self.pipeline.page_size, False, self.sandbox.limits.max_pages)
+        try:
+            pdf, cv, errors, status, limit, includes = self.sandbox.call(_render_in_sandbox, options, self.source)
+        except ResourceLimitExceeded as e:
+            pdf, cv, errors, status, limit, includes = (None, None, [f"Limit exceeded ({e.limit}): {e}"],
+                                                        STATUS_LIMIT, e.limit, None)
+        except RuntimeError as e:
+            pdf, cv, errors, status, limit, includes = None, None, [str(e)], STATUS_ERROR, None, None
+        if self.metrics is not None:
+            self.metrics.observe(self.pipeline.style, status, time.perf_counter() - start, limit=limit)
+        return pdf, cv, errors, includes
+
+    def wait_for_change(self, version: int, timeout: float) -> int:
+        """Block until the version moves past ``version``, the state is closed or the timeout expires.
+
+        Returns:
+            The current version
+        """
+        with self._changed:
+            self._changed.wait_for(lambda: self.version != version or self.closed, timeout)
+            return self.version
+
+    def close(self):
+        """Wake up everyone waiting for a change so they can finish."""
+        with self._changed:
+            self.closed = True
+            self._changed.notify_all()
+
+    def watch(self, stop: threading.Event, poll_interval: float = 0.2):
+        """Poll the source for changes until ``stop`` is set."""
+        while not stop.wait(poll_interval):
+            self.refresh()
+
+
+def render_html(cv: CV) -> str:
+    """Render a CV as a simple HTML fragment, used when the browser cannot show the PDF."""
+    parts = []
+    info = cv.personal_info
+    parts.append(f"<h1>{html.escape(info.name)}</h1>")
+    if info.title:
+        parts.append(f"<p><em>{html.escape(info.title)}</em></p>")
+    contacts = [str(value) for value in (info.email, info.phone, info.location, info.website, info.linkedin) if value]
+    parts.append(f"<p>{' | '.join(html.escape(c) for c in contacts)}</p>")
+    if info.summary:
+        parts.append("<h2>Summary</h2>")
+        parts.extend(f"<p>{html.escape(line.strip())}</p>" for line in info.summary.split('\n') if line.strip())
+
+    if cv.experience:
+        parts.append("<h2>Work Experience</h2>")
+        for company in cv.experience:
+            location = f" ({html.escape(company.location)})" if company.location else ""
+            parts.append(f"<h3>{html.escape(company.company)}{location}</h3>")
+            for role in company.roles:
+                parts.append(f"<h4>{html.escape(role.title)}</h4>")
+                parts.append(f"<p><small>{html.escape(role.start_date)} - "
+                             f"{html.escape(role.end_date or 'Present')}</small></p>")
+                if role.description:
+                    parts.append(f"<p>{html.escape(role.description)}</p>")
+                if role.achievements:
+                    items = "".join(f"<li>{html.escape(a)}</li>" for a in role.achievements)
+                    parts.append(f"<ul>{items}</ul>")
+
+    if cv.education:
+        parts.append("<h2>Education</h2>")
+        for edu in cv.education:
+            parts.append(f"<h3>{html.escape(edu.degree)} - {html.escape(edu.institution)}</h3>")
+            parts.append(f"<p><small>{html.escape(edu.start_date)} - "
+                         f"{html.escape(edu.end_date or 'Present')}</small></p>")
+            if edu.details:
+                parts.append(f"<p>{html.escape(edu.details)}</p>")
+
+    if cv.skills:
+        parts.append("<h2>Skills</h2>")
+        categories = {}
+        for skill in cv.skills:
+            categories.setdefault(skill.category, []).append(skill.name)
+        for category, names in categories.items():
+            parts.append(f"<p><strong>{html.escape(category)}</strong>: {html.escape(', '.join(names))}</p>")
+
+    if cv.projects:
+        parts.append("<h2>Projects</h2>")
+        for project in cv.projects:
+            parts.append(f"<h3>{html.escape(project.name)}</h3>")
+            if project.description:
+                parts.append(f"<p>{html.escape(project.description)}</p>")
+            if project.technologies:
+                parts.append(f"<p>Technologies: {html.escape(', '.join(project.technologies))}</p>")
+    return "\n".join(parts)
+
+
+_PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title} - CV preview</title>
+<style>
+  html, body {{ margin: 0; height: 100%; font-family: sans-serif; }}
+  #errors {{ background: #fdd; color: #900; margin: 0; padding: 0.5em 2em; }}
+  #errors:empty {{ display: none; }}
+  object {{ width: 100%; height: 100%; border: 0; }}
+  .fallback {{ max-width: 50em; margin: 1em auto; }}
+</style>
+</head>
+<body>
+<ul id="errors">{errors}</ul>
+<object data="/cv.pdf?v={version}" type="application/pdf">
+  <div class="fallback">{fallback}</div>
+</object>
+<script>
+  new EventSource("/events").addEventListener("reload", function () {{ location.reload(); }});
+</script>
+</body>
+</html>
+"""
+
+
+class PreviewHandler(BaseHTTPRequestHandler):
+    """Request handler for the preview routes; ``server.state`` holds the ``PreviewState``."""
+
+    server_version = "cv-builder-preview"
+
+    def log_message(self, format, *args):
+        # Keep the terminal free for render messages
+        pass
+
+    def _send(self, status: int, content_type: str, body: bytes):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        state: PreviewState = self.server.state
+        path = self.path.split("?", 1)[0]
+        if path == "/":
+            errors = "".join(f"<li>{html.escape(error)}</li>" for error in state.errors)
+            fallback = render_html(state.cv) if state.cv else ""
+            page = _PAGE.format(title=html.escape(os.path.basename(state.source)), errors=errors,
+                                version=state.version, fallback=fallback)
+            self._send(200, "text/html; charset=utf-8", page.encode("utf-8"))
+        elif path == "/cv.pdf":
+            if state.pdf is None:
+                self._send(503, "text/plain; charset=utf-8", "\n".join(state.errors).encode("utf-8"))
+            else:
+                self._send(200, "application/pdf", state.pdf)
+        elif path == "/cv.html":
+            if state.cv is None:
+                self._send(503, "text/plain; charset=utf-8", "\n".join(state.errors).encode("utf-8"))
+            else:
+                body = f"<!DOCTYPE html><meta charset=\"utf-8\">\n{render_html(state.cv)}\n"
+                self._send(200, "text/html; charset=utf-8", body.encode("utf-8"))
+        elif path == "/status":
+            status = {"version": state.version, "render_ms": state.render_ms, "errors": state.errors}
+            self._send(200, "application/json", json.dumps(status).encode("utf-8"))
+        elif path == "/metrics":
+            self._send(200, CONTENT_TYPE, self.server.metrics.registry.exposition().encode("utf-8"))
+        elif path == "/events":
+            self._stream_events(state)
+        else:
+            self._send(404, "text/plain; charset=utf-8", b"Not found")
+
+    def _stream_events(self, state: PreviewState):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        version = state.version
+        try:
+            while not self.server.stopping.is_set():
+                current = state.wait_for_change(version, KEEPALIVE_INTERVAL)
+                if current != version:
+                    version = current
+                    self.wfile.write(f"event: reload\ndata: {version}\n\n".encode("ascii"))
+                else:
+                    self.wfile.write(b": keep-alive\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class PreviewServer(ThreadingHTTPServer):
+    """HTTP server that previews one CV file and re-renders it when it changes."""
+
+    daemon_threads = True
+
+    def __init__(self, source: str, host: str = "127.0.0.1", port: int = 8000, style: str = "classic",
+                 page_size: str = "A4", poll_interval: float = 0.2, metrics: Optional[RenderMetrics] = None,
+                 limits: Optional[RenderLimits] = None):
+        """Initialize the server and render the file once.
+
+        Args:
+            source: Path to the YAML or JSON file to preview
+            host: Interface to listen on
+            port: Port to listen on; 0 picks a free port
+            style: Style name for the CV
+            page_size: Page size for the PDF
+            poll_interval: Seconds between checks of the file for changes
+            metrics: Metrics to record renders in and serve at /metrics;
+                defaults to the process-wide metrics
+            limits: Resource limits for each render; time and memory limits
+                render in a sandbox process
+        """
+        super().__init__((host, port), PreviewHandler)
+        self.metrics = metrics if metrics is not None else METRICS
+        limits = limits or RenderLimits()
+        pipeline = RenderPipeline(style, page_size, max_pages=limits.max_pages)
+        self.metrics.attach(pipeline)
+        self.sandbox = RenderSandbox(limits, preload=(__name__,)) if limits.isolated else None
+        self.state = PreviewState(source, pipeline, self.sandbox, self.metrics)
+        self.state.refresh()
+        self.poll_interval = poll_interval
+        self.stopping = threading.Event()
+        self._watcher = threading.Thread(target=self.state.watch, args=(self.stopping, poll_interval), daemon=True)
+
+    @property
+    def url(self) -> str:
+        """Base URL of the server."""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def serve_forever(self, poll_interval: float = 0.5):
+        """Watch the source file and handle requests until ``shutdown`` is called."""
+        self._watcher.start()
+        try:
+            super().serve_forever(poll_interval)
+        finally:
+            self.stopping.set()
+
+    def shutdown(self):
+        """Stop serving, the file watcher and open event streams."""
+        self.stopping.set()
+        self.state.close()
+        super().shutdown()
+
+    def server_close(self):
+        """Close the listening socket and stop the sandbox, if any."""
+        super().server_close()
+        if self.sandbox is not None:
+            self.sandbox.close()
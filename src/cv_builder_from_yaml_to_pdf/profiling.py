@@ -0,0 +1,240 @@
+"""Render profiling for CV Builder.
+
+This module attaches profilers to a ``RenderPipeline`` so that only the render
+stages (``build_flowables`` and ``layout``) are measured, not parsing,
+validation or writing files. Two outputs are supported:
+
+* cProfile statistics, saved in the ``pstats`` format read by ``pstats``,
+  snakeviz, gprof2dot and similar tools.
+* Collapsed ("folded") stacks from a sampling profiler, one
+  ``frame;frame;frame count`` line per distinct stack, as read by
+  ``flamegraph.pl``, inferno and speedscope. Each stack starts with the name of
+  the render stage it was sampled in.
+
+In a batch, every ``every``-th document is profiled. Worker processes save
+their profiles into a shared directory which the parent merges at the end.
+"""
+
+import cProfile
+import glob
+import os
+import pstats
+import sys
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Sequence
+
+from cv_builder_from_yaml_to_pdf.pipeline import RenderContext, RenderPipeline, STAGES
+
+
+RENDER_STAGES = ('build_flowables', 'layout')
+
+# Seconds between stack samples
+DEFAULT_INTERVAL = 0.001
+
+
+def _short_filename(filename: str) -> str:
+    """Strip the longest ``sys.path`` prefix from a source file name."""
+    best = ""
+    for entry in sys.path:
+        if entry and filename.startswith(entry) and len(entry) > len(best):
+            best = entry
+    return filename[len(best):].lstrip(os.sep) if best else filename
+
+
+def _frame_label(code) -> str:
+    # Semicolons separate frames in the folded format
+    return f"{code.co_name} ({_short_filename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+
+class _StackSampler(threading.Thread):
+    """Thread that periodically records the stack of another thread."""
+
+    def __init__(self, thread_id: int, stacks: Counter, interval: float):
+        super().__init__(name="cv-builder-stack-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.stacks = stacks
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._labels: Dict[object, str] = {}
+
+    def _fold(self, frame) -> Optional[str]:
+        labels = []
+        root = None
+        while frame is not None:
+            if frame.f_code is _RUN_STAGE_CODE:
+                root = frame.f_locals.get('stage')
+                break
+            label = self._labels.get(frame.f_code)
+            if label is None:
+                label = self._labels[frame.f_code] = _frame_label(frame.f_code)
+            labels.append(label)
+            frame = frame.f_back
+        if root is None:
+            return None
+        labels.append(root)
+        return ";".join(reversed(labels))
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = self._fold(frame) if frame is not None else None
+            if stack:
+                self.stacks[stack] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+_RUN_STAGE_CODE = RenderPipeline.run_stage.__code__
+
+
+class RenderProfiler:
+    """Profiles the render stages of the documents passing through a pipeline."""
+
+    def __init__(self, cprofile: bool = True, flamegraph: bool = True, every: int = 1,
+                 interval: float = DEFAULT_INTERVAL, stages: Sequence[str] = RENDER_STAGES):
+        """Initialize the profiler.
+
+        Args:
+            cprofile: Collect cProfile statistics
+            flamegraph: Collect sampled stacks for a flame graph
+            every: Profile every n-th document (1 profiles all of them)
+            interval: Seconds between stack samples
+            stages: Pipeline stages to profile
+        """
+        self.cprofile = cprofile
+        self.flamegraph = flamegraph
+        self.every = max(1, every)
+        self.interval = interval
+        self.stages = tuple(stages)
+        self.profile = cProfile.Profile() if cprofile else None
+        self.stacks: Counter = Counter()
+        self.documents = 0
+        self.sampled = 0
+        self._sampler: Optional[_StackSampler] = None
+        self._running = False
+        self._switch_interval: Optional[float] = None
+        self._merged_stats: Optional[pstats.Stats] = None
+
+    def options(self) -> Dict[str, object]:
+        """Get the constructor arguments, used to create matching profilers in worker processes."""
+        return {"cprofile": self.cprofile, "flamegraph": self.flamegraph, "every": self.every,
+                "interval": self.interval, "stages": self.stages}
+
+    def attach(self, pipeline: RenderPipeline):
+        """Register hooks that profile the render stages of a pipeline."""
+        for stage in STAGES:
+            if stage in self.stages:
+                pipeline.before(stage, self._before)
+                pipeline.after(stage, self._after)
+            else:
+                # A stage that raised never runs its after-hook; make sure the
+                # profiler does not keep running into the next document
+                pipeline.before(stage, lambda context: self.stop())
+        pipeline.before(self.stages[0], self._begin_document)
+
+    def _begin_document(self, context: RenderContext):
+        self.stop()
+        context.extra['profiled'] = self.documents % self.every == 0
+        self.documents += 1
+        if context.extra['profiled']:
+            self.sampled += 1
+
+    def _before(self, context: RenderContext):
+        if context.extra.get('profiled'):
+            self.start()
+
+    def _after(self, context: RenderContext):
+        self.stop()
+
+    def start(self):
+        """Start profiling the current thread."""
+        if self._running:
+            return
+        self._running = True
+        if self.flamegraph:
+            # The sampler can only run when the render thread releases the GIL
+            self._switch_interval = sys.getswitchinterval()
+            sys.setswitchinterval(min(self._switch_interval, self.interval))
+            self._sampler = _StackSampler(threading.get_ident(), self.stacks, self.interval)
+            self._sampler.start()
+        if self.profile is not None:
+            self.profile.enable()
+
+    def stop(self):
+        """Stop profiling, if it is running."""
+        if not self._running:
+            return
+        if self.profile is not None:
+            self.profile.disable()
+        if self._sampler is not None:
+            self._sampler.stop()
+            self._sampler = None
+            sys.setswitchinterval(self._switch_interval)
+        self._running = False
+
+    def stats(self) -> Optional[pstats.Stats]:
+        """Get the collected cProfile statistics, or None if nothing was profiled."""
+        if self.profile is None:
+            return None
+        self.stop()
+        self.profile.create_stats()
+        if not self.profile.stats:
+            return None
+        return pstats.Stats(self.profile)
+
+    def folded(self) -> str:
+        """Get the sampled stacks in collapsed-stack format."""
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(self.stacks.items()))
+
+    def save(self, base_path: str):
+        """Save the profile to ``<base_path>.pstats`` and ``<base_path>.folded``."""
+        stats = self.stats()
+        if stats is not None:
+            stats.dump_stats(base_path + ".pstats")
+        if self.flamegraph:
+            with open(base_path + ".folded", "w", encoding="utf-8") as f:
+                f.write(self.folded())
+
+    def merge(self, directory: str):
+        """Add the profiles saved by ``save`` into ``directory`` (e.g., by worker processes)."""
+        for path in sorted(glob.glob(os.path.join(directory, "*.folded"))):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    stack, _, count = line.rstrip("\n").rpartition(" ")
+                    if stack:
+                        self.stacks[stack] += int(count)
+        for path in sorted(glob.glob(os.path.join(directory, "*.pstats"))):
+            if self._merged_stats is None:
+                self._merged_stats = pstats.Stats(path)
+            else:
+                self._merged_stats.add(path)
+
+    def write(self, cprofile_path: Optional[str] = None, flamegraph_path: Optional[str] = None) -> List[str]:
+        """Write the collected profile, including merged worker profiles.
+
+        The cProfile statistics are only written if something was profiled,
+        since ``pstats`` cannot load an empty statistics file.
+
+        Args:
+            cprofile_path: Where to write the cProfile statistics
+            flamegraph_path: Where to write the collapsed stacks
+
+        Returns:
+            Paths of the files written
+        """
+        written = []
+        if cprofile_path:
+            stats = self.stats()
+            if self._merged_stats is not None:
+                stats = stats.add(self._merged_stats) if stats is not None else self._merged_stats
+            if stats is not None:
+                stats.dump_stats(cprofile_path)
+                written.append(cprofile_path)
+        if flamegraph_path:
+            with open(flamegraph_path, "w", encoding="utf-8") as f:
+                f.write(self.folded())
+            written.append(flamegraph_path)
+        return written
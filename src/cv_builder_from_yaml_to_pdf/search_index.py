@@ -0,0 +1,303 @@
+"""Full-text and skill index over a corpus of CVs.
+
+This module keeps a SQLite FTS5 index of the searchable fields of many CV
+files: the headline, skills and skill categories, companies, role titles,
+achievements and project technologies. Indexing is incremental: a file is
+only parsed again when its size or modification time changed and its content
+hash no longer matches, or when a fragment it includes changed. Searches are
+answered from the index without opening any CV.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from pydantic import BaseModel, Field, ValidationError
+
+from cv_builder_from_yaml_to_pdf.batch import _bounded_map
+from cv_builder_from_yaml_to_pdf.models import CV
+from cv_builder_from_yaml_to_pdf.yaml_parser import parse_yaml_file_with_includes
+
+
+DEFAULT_INDEX = "cv-index.db"
+SOURCE_SUFFIXES = ('.yaml', '.yml', '.json')
+
+# Searchable columns, in the order of the FTS table
+FIELDS = ('name', 'headline', 'skills', 'companies', 'roles', 'achievements', 'technologies')
+
+INDEX_ADDED = "added"
+INDEX_UPDATED = "updated"
+INDEX_UNCHANGED = "unchanged"
+INDEX_INVALID = "invalid"
+INDEX_REMOVED = "removed"
+
+# Rows written between commits while indexing
+_COMMIT_EVERY = 500
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    path TEXT NOT NULL UNIQUE,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    includes TEXT NOT NULL,
+    error TEXT,
+    indexed_at REAL NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS cv_text USING fts5(
+    {', '.join(FIELDS)},
+    tokenize = "unicode61 remove_diacritics 2 tokenchars '+#'"
+);
+"""
+
+
+class IndexResult(BaseModel):
+    """Model for the outcome of indexing one CV file."""
+    path: str = Field(description="Absolute path of the CV file.")
+    status: str = Field(description="One of added, updated, unchanged, invalid or removed.")
+    error: Optional[str] = Field(default=None, description="Why the file could not be indexed, if it is invalid.")
+
+
+class SearchHit(BaseModel):
+    """Model for a CV that matches a search."""
+    path: str = Field(description="Absolute path of the CV file.")
+    name: str = Field(description="Name of the candidate.")
+    headline: Optional[str] = Field(default=None, description="Professional headline of the candidate.")
+    score: float = Field(description="BM25 relevance; lower is more relevant.")
+    snippet: str = Field(description="Matching text, with matched terms in [brackets].")
+
+
+def searchable_fields(cv: CV) -> Dict[str, str]:
+    """Get the text of each searchable field of a CV.
+
+    Args:
+        cv: Validated CV
+
+    Returns:
+        Dict mapping each name in ``FIELDS`` to its text, one entry per line
+    """
+    skills = cv.skills or []
+    roles = [role for company in cv.experience for role in company.roles]
+    technologies = [technology for project in cv.projects or [] for technology in project.technologies or []]
+    return {
+        'name': cv.personal_info.name,
+        'headline': cv.personal_info.title or "",
+        # Each category once, then every skill
+        'skills': "\n".join(list(dict.fromkeys(skill.category for skill in skills)) + [skill.name for skill in skills]),
+        'companies': "\n".join(company.company for company in cv.experience),
+        'roles': "\n".join(role.title for role in roles),
+        'achievements': "\n".join(achievement for role in roles for achievement in role.achievements or []),
+        'technologies': "\n".join(dict.fromkeys(technologies)),
+    }
+
+
+def find_sources(paths: Iterable[str]) -> List[str]:
+    """Expand directories into the CV files below them.
+
+    Args:
+        paths: Files and directories
+
+    Returns:
+        Sorted absolute paths of the files, and of every YAML or JSON file
+        found by walking the directories
+    """
+    found = set()
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                found.update(os.path.join(root, name) for name in names if name.endswith(SOURCE_SUFFIXES))
+        else:
+            found.add(path)
+    return sorted(os.path.abspath(path) for path in found)
+
+
+def _file_stat(path: str) -> Optional[List[int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _read_entry(task) -> dict:
+    """Hash and, unless its hash is ``known_sha256``, parse and validate one CV file."""
+    path, known_sha256 = task
+    entry = {'path': path, 'stat': _file_stat(path), 'sha256': None, 'includes': {}, 'fields': None, 'error': None}
+    try:
+        with open(path, 'rb') as f:
+            entry['sha256'] = hashlib.file_digest(f, 'sha256').hexdigest()
+        if entry['sha256'] == known_sha256:
+            return entry
+        data, includes = parse_yaml_file_with_includes(path)
+        entry['includes'] = {include: _file_stat(include) for include in includes}
+        entry['fields'] = searchable_fields(CV.model_validate(data))
+    except ValidationError as e:
+        entry['error'] = "; ".join(f"{err['loc']}: {err['msg']}" for err in e.errors())
+    except Exception as e:
+        entry['error'] = str(e) or type(e).__name__
+    return entry
+
+
+class CVIndex:
+    """SQLite FTS5 index of a CV corpus."""
+
+    def __init__(self, db_path: str = DEFAULT_INDEX):
+        """Open (and create if needed) the index database.
+
+        Args:
+            db_path: Path to the SQLite database file
+        """
+        self.db_path = str(db_path)
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        """Close the database connection."""
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self) -> int:
+        """Number of searchable (valid) CVs in the index."""
+        return self.conn.execute("SELECT COUNT(*) FROM documents WHERE error IS NULL").fetchone()[0]
+
+    def update(self, paths: Iterable[str], workers: int = 1, prune: bool = True) -> Iterator[IndexResult]:
+        """Bring the index up to date with CV files.
+
+        A file whose size and modification time, and those of every fragment
+        it includes, are unchanged is not read. Otherwise it is hashed, and
+        parsed and validated only if the hash changed or a fragment did.
+        Invalid files are recorded too, so that they are not parsed again
+        until they change.
+
+        Args:
+            paths: Absolute paths of CV files, e.g. from ``find_sources``
+            workers: Number of worker processes for parsing; 1 parses in the
+                current process
+            prune: Also drop indexed files that no longer exist
+
+        Yields:
+            The result for each file, and for each pruned file
+        """
+        known = {row['path']: row for row in self.conn.execute(
+            "SELECT id, path, mtime_ns, size, sha256, includes FROM documents")}
+        tasks = []
+        for path in dict.fromkeys(paths):
+            row = known.get(path)
+            if row is None:
+                tasks.append((path, None))
+                continue
+            includes = json.loads(row['includes'])
+            if any(_file_stat(include) != stat for include, stat in includes.items()):
+                # Same source, but what it includes changed
+                tasks.append((path, None))
+            elif _file_stat(path) == [row['mtime_ns'], row['size']]:
+                yield IndexResult(path=path, status=INDEX_UNCHANGED)
+            else:
+                tasks.append((path, row['sha256']))
+
+        if workers <= 1 or len(tasks) <= 1:
+            entries = map(_read_entry, tasks)
+            yield from self._store(entries, known)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                yield from self._store(_bounded_map(pool, _read_entry, tasks, 4 * workers), known)
+
+        if prune:
+            for path, row in known.items():
+                if not os.path.exists(path):
+                    self._delete(row['id'])
+                    yield IndexResult(path=path, status=INDEX_REMOVED)
+        self._commit()
+
+    def _store(self, entries: Iterable[dict], known: Dict[str, sqlite3.Row]) -> Iterator[IndexResult]:
+        """Write parsed entries, committing every ``_COMMIT_EVERY`` rows."""
+        self.conn.execute("BEGIN")
+        for written, entry in enumerate(entries, 1):
+            yield self._store_entry(entry, known.get(entry['path']))
+            if written % _COMMIT_EVERY == 0:
+                self._commit()
+                self.conn.execute("BEGIN")
+
+    def _store_entry(self, entry: dict, row: Optional[sqlite3.Row]) -> IndexResult:
+        path = entry['path']
+        if entry['stat'] is None or entry['sha256'] is None:
+            # Vanished or unreadable; forget it so that it is retried next time
+            if row is not None:
+                self._delete(row['id'])
+            return IndexResult(path=path, status=INDEX_INVALID, error=entry['error'])
+        mtime_ns, size = entry['stat']
+        if entry['fields'] is None and entry['error'] is None:
+            # Touched, but the content hash is unchanged
+            self.conn.execute("UPDATE documents SET mtime_ns = ?, size = ? WHERE id = ?", (mtime_ns, size, row['id']))
+            return IndexResult(path=path, status=INDEX_UNCHANGED)
+
+        values = (mtime_ns, size, entry['sha256'], json.dumps(entry['includes']), entry['error'], time.time())
+        if row is None:
+            doc_id = self.conn.execute(
+                "INSERT INTO documents (mtime_ns, size, sha256, includes, error, indexed_at, path) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", values + (path,)).lastrowid
+        else:
+            doc_id = row['id']
+            self.conn.execute("UPDATE documents SET mtime_ns = ?, size = ?, sha256 = ?, includes = ?, error = ?, "
+                              "indexed_at = ? WHERE id = ?", values + (doc_id,))
+            self.conn.execute("DELETE FROM cv_text WHERE rowid = ?", (doc_id,))
+        if entry['error'] is not None:
+            return IndexResult(path=path, status=INDEX_INVALID, error=entry['error'])
+        self.conn.execute(f"INSERT INTO cv_text (rowid, {', '.join(FIELDS)}) VALUES (?{', ?' * len(FIELDS)})",
+                          (doc_id,) + tuple(entry['fields'][field] for field in FIELDS))
+        return IndexResult(path=path, status=INDEX_ADDED if row is None else INDEX_UPDATED)
+
+    def _delete(self, doc_id: int):
+        self.conn.execute("DELETE FROM cv_text WHERE rowid = ?", (doc_id,))
+        self.conn.execute("DELETE FROM documents WHERE id = ?", (doc_id,))
+
+    def _commit(self):
+        if self.conn.in_transaction:
+            self.conn.execute("COMMIT")
+
+    def search(self, query: str, fields: Iterable[str] = (), limit: int = 20) -> List[SearchHit]:
+        """Find the CVs that match a query, most relevant first.
+
+        Args:
+            query: FTS5 query, e.g. ``kubernetes AND "site reliability"`` or
+                ``pyth*``; quote terms with punctuation such as ``"node.js"``
+            fields: Only match in these of ``FIELDS``; all of them by default
+            limit: Maximum number of hits
+
+        Returns:
+            The matching CVs, with a snippet of the matching text
+
+        Raises:
+            ValueError: If a field is unknown or the query is not valid FTS5 syntax
+        """
+        fields = list(fields)
+        unknown = [field for field in fields if field not in FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown search fields: {', '.join(unknown)}. Valid fields are: {', '.join(FIELDS)}")
+        if fields:
+            query = f"{{{' '.join(fields)}}} : ({query})"
+        try:
+            rows = self.conn.execute(
+                "SELECT documents.path, cv_text.name, cv_text.headline, bm25(cv_text) AS score, "
+                "snippet(cv_text, -1, '[', ']', '...', 12) AS snippet "
+                "FROM cv_text JOIN documents ON documents.id = cv_text.rowid "
+                "WHERE cv_text MATCH ? ORDER BY score LIMIT ?", (query, limit)).fetchall()
+        except sqlite3.OperationalError as e:
+            raise ValueError(f"Invalid search query {query!r}: {e}")
+        return [SearchHit(path=row['path'], name=row['name'], headline=row['headline'] or None,
+                          score=row['score'], snippet=row['snippet']) for row in rows]
+
@@ -0,0 +1,393 @@
+"""Shared-directory batch rendering for CV Builder.
+
+This module spreads a batch over several nodes (hosts or processes) that share
+a filesystem, such as an NFS volume, without any broker. The work directory
+looks like this::
+
+    <work_dir>/
+        batch.json                 style, page size and output directory
+        pending/<id>.json          items waiting to be rendered
+        claimed/<id>@<node>.json   items being rendered by a node
+        done/<id>.json             result of each finished item
+        manifest.json              merged results, written when all work is done
+
+A node claims an item by renaming it from ``pending/`` to ``claimed/``; rename
+is atomic, so exactly one node wins each item. While it renders, the node
+touches its claim files as a heartbeat. Claims whose modification time is
+older than the lease belong to dead nodes and are renamed back to
+``pending/``. Ages are measured against a file written to the shared
+directory, so clock skew between hosts does not matter.
+
+Instead of competing for items, nodes can also be given a deterministic shard
+(``index/count``) and only take items whose id hashes to it.
+"""
+
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from cv_builder_from_yaml_to_pdf.batch import BatchResult, _unique_outputs, output_path_for, render_source
+from cv_builder_from_yaml_to_pdf.pipeline import RenderPipeline
+
+
+CONFIG_FILE = "batch.json"
+MANIFEST_FILE = "manifest.json"
+
+
+class WorkItem(BaseModel):
+    """Model for one document of a shared batch."""
+    id: str = Field(description="Stable identifier derived from the source path.")
+    source: str = Field(description="Path of the source YAML or JSON file.")
+    output_path: str = Field(description="Path where the PDF will be written.")
+
+
+class ItemResult(BatchResult):
+    """Model for the result of one item, as recorded in ``done/``."""
+    id: str = Field(description="Identifier of the work item.")
+    node: str = Field(description="Name of the node that rendered the item.")
+
+
+def item_id(source: str) -> str:
+    """Get the stable id of a source path: its file stem plus a hash of the full path."""
+    digest = hashlib.sha1(source.encode("utf-8")).hexdigest()[:12]
+    stem = "".join(c if c.isalnum() or c in "-_" else "_" for c in Path(source).stem)[:40]
+    return f"{stem}-{digest}"
+
+
+def shard_of(item: str, shards: int) -> int:
+    """Get the shard an item id belongs to."""
+    return int(hashlib.sha1(item.encode("utf-8")).hexdigest(), 16) % shards
+
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    """Parse a shard given as ``index/count``, e.g. ``0/4``.
+
+    Raises:
+        ValueError: If the value is not a valid shard
+    """
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise ValueError(f"Invalid shard: {value}. Use INDEX/COUNT, e.g. 0/4.")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Invalid shard: {value}. INDEX must be between 0 and COUNT - 1.")
+    return index, count
+
+
+def _write_atomic(path: Path, content: str):
+    """Write a file so readers on other nodes never see it partially written."""
+    temp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    temp_path.write_text(content, encoding="utf-8")
+    os.replace(temp_path, path)
+
+
+class SharedWorkDir:
+    """Work directory shared by the nodes of a batch."""
+
+    def __init__(self, path: str, lease_seconds: float = 300.0):
+        """Initialize access to a work directory.
+
+        Args:
+            path: Path of the shared work directory
+            lease_seconds: Age after which a claim without heartbeat is considered stale
+        """
+        self.path = Path(path)
+        self.lease_seconds = lease_seconds
+        self.pending_dir = self.path / "pending"
+        self.claimed_dir = self.path / "claimed"
+        self.done_dir = self.path / "done"
+
+    def init(self, sources: Iterable[str], output_dir: str, style: str = "classic", page_size: str = "A4",
+             streaming: bool = False) -> int:
+        """Create the work directory and queue the sources.
+
+        Sources that are already queued, claimed or done are not added again,
+        so ``init`` can be re-run to add files to a batch.
+
+        Raises:
+            ValueError: If two sources, new or already in the batch, would be
+                written to the same PDF; nothing is queued then
+
+        Returns:
+            Number of items added
+        """
+        for directory in (self.pending_dir, self.claimed_dir, self.done_dir):
+            directory.mkdir(parents=True, exist_ok=True)
+        queued = self._queued_items(str(output_dir))
+        items = {}
+        for source in sources:
+            item = WorkItem(id=item_id(str(source)), source=str(source),
+                            output_path=output_path_for(str(source), str(output_dir)))
+            if item.id not in queued:
+                items.setdefault(item.id, item)
+        # Fail before queueing anything if two sources would write the same PDF
+        for _ in _unique_outputs((item.source, item.output_path) for item in [*queued.values(), *items.values()]):
+            pass
+
+        config = {"output_dir": str(output_dir), "style": style, "page_size": page_size, "streaming": streaming}
+        _write_atomic(self.path / CONFIG_FILE, json.dumps(config, indent=2))
+        for item in items.values():
+            _write_atomic(self.pending_dir / f"{item.id}.json", item.model_dump_json())
+        return len(items)
+
+    def _queued_items(self, output_dir: str) -> Dict[str, WorkItem]:
+        """Get the items already in the batch, pending, claimed or done, by id."""
+        items = {}
+        paths = [self.pending_dir / f"{item}.json" for item in self.pending_ids()]
+        paths += [self._claim_path(item, node) for item, node in self.claims()]
+        for path in paths:
+            try:
+                item = WorkItem.model_validate_json(path.read_text(encoding="utf-8"))
+            except FileNotFoundError:
+                # Claimed or finished meanwhile; done items are read below
+                continue
+            items[item.id] = item
+        for item in self.done_ids():
+            result = ItemResult.model_validate_json((self.done_dir / f"{item}.json").read_text(encoding="utf-8"))
+            # Failed items have no output path, but would write it if queued again
+            items[item] = WorkItem(id=item, source=result.source,
+                                   output_path=result.output_path or output_path_for(result.source, output_dir))
+        return items
+
+    def config(self) -> Dict:
+        """Get the batch configuration written by ``init``.
+
+        Raises:
+            FileNotFoundError: If the directory was not initialized
+        """
+        config_path = self.path / CONFIG_FILE
+        if not config_path.exists():
+            raise FileNotFoundError(f"Not a shared batch directory (no {CONFIG_FILE}): {self.path}")
+        return json.loads(config_path.read_text(encoding="utf-8"))
+
+    def pending_ids(self) -> List[str]:
+        """Get the ids of the items waiting to be claimed."""
+        return sorted(name[:-len(".json")] for name in os.listdir(self.pending_dir) if name.endswith(".json"))
+
+    def claims(self) -> List[Tuple[str, str]]:
+        """Get the current claims as (item id, node) pairs."""
+        claims = []
+        for name in sorted(os.listdir(self.claimed_dir)):
+            if name.endswith(".json") and "@" in name:
+                item, _, node = name[:-len(".json")].partition("@")
+                claims.append((item, node))
+        return claims
+
+    def done_ids(self) -> List[str]:
+        """Get the ids of the finished items."""
+        return sorted(name[:-len(".json")] for name in os.listdir(self.done_dir) if name.endswith(".json"))
+
+    def _claim_path(self, item: str, node: str) -> Path:
+        return self.claimed_dir / f"{item}@{node}.json"
+
+    def claim(self, node: str, shard: Optional[Tuple[int, int]] = None) -> Optional[WorkItem]:
+        """Claim the next pending item.
+
+        Args:
+            node: Name of the claiming node
+            shard: Only claim items of this (index, count) shard
+
+        Returns:
+            The claimed item, or None if there is nothing left to claim
+        """
+        candidates = self.pending_ids()
+        if shard is not None:
+            candidates = [item for item in candidates if shard_of(item, shard[1]) == shard[0]]
+        if not candidates:
+            return None
+        # Start at a node-specific offset so nodes do not all race for the same file
+        start = int(hashlib.sha1(node.encode("utf-8")).hexdigest(), 16) % len(candidates)
+        for item in candidates[start:] + candidates[:start]:
+            pending_path = self.pending_dir / f"{item}.json"
+            claim_path = self._claim_path(item, node)
+            try:
+                # Reset the age first: rename keeps the modification time, and
+                # a claim that arrives already older than the lease is reclaimed
+                os.utime(pending_path)
+                os.rename(pending_path, claim_path)
+                work_item = WorkItem.model_validate_json(claim_path.read_text(encoding="utf-8"))
+            except FileNotFoundError:
+                # Another node got there first, or reclaimed it meanwhile
+                continue
+            if (self.done_dir / f"{item}.json").exists():
+                # Finished by a node that died before it could drop its claim
+                claim_path.unlink(missing_ok=True)
+                continue
+            return work_item
+        return None
+
+    def heartbeat(self, item: WorkItem, node: str) -> bool:
+        """Refresh a claim so it is not considered stale.
+
+        Returns:
+            False if the claim no longer exists (it was reclaimed)
+        """
+        try:
+            os.utime(self._claim_path(item.id, node))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def complete(self, item: WorkItem, node: str, result: BatchResult) -> ItemResult:
+        """Record the result of an item and drop its claim."""
+        record = ItemResult(id=item.id, node=node, **result.model_dump())
+        _write_atomic(self.done_dir / f"{item.id}.json", record.model_dump_json())
+        self._claim_path(item.id, node).unlink(missing_ok=True)
+        return record
+
+    def shared_now(self) -> float:
+        """Get the current time according to the shared filesystem's clock."""
+        probe = self.claimed_dir / f".clock-{uuid.uuid4().hex}"
+        probe.touch()
+        try:
+            return probe.stat().st_mtime
+        finally:
+            probe.unlink(missing_ok=True)
+
+    def reclaim_stale(self, shard: Optional[Tuple[int, int]] = None) -> List[str]:
+        """Move claims whose heartbeat is older than the lease back to pending.
+
+        Args:
+            shard: Only reclaim items of this (index, count) shard
+
+        Returns:
+            Ids of the reclaimed items
+        """
+        now = self.shared_now()
+        reclaimed = []
+        for item, node in self.claims():
+            if shard is not None and shard_of(item, shard[1]) != shard[0]:
+                continue
+            claim_path = self._claim_path(item, node)
+            try:
+                age = now - claim_path.stat().st_mtime
+                if age <= self.lease_seconds:
+                    continue
+                os.rename(claim_path, self.pending_dir / f"{item}.json")
+            except FileNotFoundError:
+                # Completed or reclaimed by someone else meanwhile
+                continue
+            reclaimed.append(item)
+        return reclaimed
+
+    def results(self) -> List[ItemResult]:
+        """Get the recorded results of all finished items, ordered by source."""
+        results = []
+        for item in self.done_ids():
+            path = self.done_dir / f"{item}.json"
+            results.append(ItemResult.model_validate_json(path.read_text(encoding="utf-8")))
+        return sorted(results, key=lambda result: result.source)
+
+    def is_finished(self) -> bool:
+        """Check whether no items are pending or claimed."""
+        return not self.pending_ids() and not self.claims()
+
+    def write_manifest(self) -> Path:
+        """Merge all results into ``manifest.json``.
+
+        Returns:
+            Path to the manifest
+        """
+        results = self.results()
+        counts: Dict[str, int] = {}
+        for result in results:
+            counts[result.status] = counts.get(result.status, 0) + 1
+        manifest = {
+            "complete": self.is_finished(),
+            "documents": len(results),
+            "counts": counts,
+            "nodes": sorted({result.node for result in results}),
+            "results": [result.model_dump(mode="json") for result in results],
+        }
+        manifest_path = self.path / MANIFEST_FILE
+        _write_atomic(manifest_path, json.dumps(manifest, indent=2))
+        return manifest_path
+
+
+class _Heartbeat(threading.Thread):
+    """Thread that keeps the claim of the item being rendered fresh."""
+
+    def __init__(self, work_dir: SharedWorkDir, node: str):
+        super().__init__(name="cv-builder-heartbeat", daemon=True)
+        self.work_dir = work_dir
+        self.node = node
+        self.item: Optional[WorkItem] = None
+        self._stop_event = threading.Event()
+
+    def run(self):
+        interval = max(self.work_dir.lease_seconds / 4, 0.01)
+        while not self._stop_event.wait(interval):
+            item = self.item
+            if item is not None:
+                self.work_dir.heartbeat(item, self.node)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def default_node_name() -> str:
+    """Get a node name that is unique per process: ``<host>-<pid>``."""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def run_node(path: str, node: str, shard: Optional[Tuple[int, int]] = None, lease_seconds: float = 300.0,
+             poll_interval: float = 1.0) -> List[ItemResult]:
+    """Process items of a shared batch until the batch (or the node's shard) is finished.
+
+    A node keeps polling while other nodes hold claims, so that it can take
+    over their items if they die. The node that finishes the batch writes the
+    merged manifest.
+
+    Args:
+        path: Path of the shared work directory
+        node: Unique name of this node
+        shard: Only process items of this (index, count) shard
+        lease_seconds: Age after which a claim without heartbeat is considered stale
+        poll_interval: Seconds to wait while only other nodes' claims remain
+
+    Returns:
+        Results of the items this node rendered
+    """
+    if "@" in node or os.sep in node:
+        raise ValueError(f"Invalid node name: {node}. It must not contain '@' or '{os.sep}'.")
+    work_dir = SharedWorkDir(path, lease_seconds=lease_seconds)
+    config = work_dir.config()
+    pipeline = RenderPipeline(config["style"], config["page_size"], streaming=config.get("streaming", False))
+    os.makedirs(config["output_dir"], exist_ok=True)
+
+    results = []
+    heartbeat = _Heartbeat(work_dir, node)
+    heartbeat.start()
+    try:
+        while True:
+            item = work_dir.claim(node, shard)
+            if item is not None:
+                heartbeat.item = item
+                result = render_source(pipeline, item.source, item.output_path)
+                heartbeat.item = None
+                results.append(work_dir.complete(item, node, result))
+                continue
+            if work_dir.reclaim_stale(shard):
+                continue
+            remaining = work_dir.claims()
+            if shard is not None:
+                remaining = [claim for claim in remaining if shard_of(claim[0], shard[1]) == shard[0]]
+            if not remaining:
+                break
+            time.sleep(poll_interval)
+    finally:
+        heartbeat.stop()
+
+    if work_dir.is_finished():
+        work_dir.write_manifest()
+    return results
+
@@ -0,0 +1,109 @@
+"""Batch input sources for CV Builder.
+
+Besides YAML and JSON files, a batch can render CVs stored as records: lines of
+a JSON Lines export or rows of a SQLite query. Sources are generators that read
+one record at a time, so an export of any size can be rendered without loading
+it into memory; ``run_batch`` only takes as many records as it has in flight.
+Each record's JSON is validated directly with ``CV.model_validate_json``.
+
+A line or row that cannot be read as a record (bad UTF-8, a NULL CV column, a
+query returning the wrong number of columns) is yielded as a record with an
+``error``, which the batch reports as invalid like a CV that fails
+validation; only a missing file or a bad query stops the source.
+"""
+
+import re
+import sqlite3
+from pathlib import Path
+from typing import Iterator, Optional
+
+from pydantic import BaseModel, Field
+
+
+DEFAULT_SQLITE_QUERY = "SELECT id, data FROM cvs"
+
+
+class Record(BaseModel):
+    """Model for one CV read from a record source."""
+    key: str = Field(description="Where the record came from, e.g. 'export.jsonl:12'; reported as its source.")
+    name: str = Field(description="Base name for the record's PDF, without suffix.")
+    json_text: str = Field(default="", description="The CV as a JSON document.")
+    error: Optional[str] = Field(default=None, description="Why the record could not be read, if it could not.")
+
+
+def _safe_name(value: str) -> str:
+    """Make a value usable as a file name."""
+    return re.sub(r"[^\w.-]+", "_", value).strip("._") or "cv"
+
+
+def iter_jsonl(path: str) -> Iterator[Record]:
+    """Read CVs from a JSON Lines file, one JSON object per line.
+
+    Blank lines are skipped. PDFs are named ``<file stem>-<line number>``.
+
+    Args:
+        path: Path to the JSON Lines file
+
+    Yields:
+        One record per non-blank line
+    """
+    stem = _safe_name(Path(path).stem)
+    # Read as bytes, so that a line of bad UTF-8 fails only its own record
+    with open(path, "rb") as f:
+        for line_number, raw in enumerate(f, start=1):
+            key, name = f"{path}:{line_number}", f"{stem}-{line_number}"
+            try:
+                line = raw.decode("utf-8")
+            except UnicodeDecodeError as e:
+                yield Record(key=key, name=name, error=f"Line is not valid UTF-8: {e}")
+                continue
+            if not line.strip():
+                continue
+            yield Record(key=key, name=name, json_text=line)
+
+
+def _sqlite_record(database: str, row_number: int, row: tuple) -> Record:
+    """Make a record of a query row, or a record with an error if the row is not (identifier, JSON)."""
+    if len(row) != 2:
+        return Record(key=f"{database}:row {row_number}", name=f"row-{row_number}",
+                      error=f"Query returned {len(row)} columns; expected an identifier and the CV as JSON")
+    identifier, json_text = row
+    key, name = f"{database}:{identifier}", _safe_name(str(identifier))
+    if isinstance(json_text, bytes):
+        try:
+            json_text = json_text.decode("utf-8")
+        except UnicodeDecodeError as e:
+            return Record(key=key, name=name, error=f"CV column is not valid UTF-8: {e}")
+    if not isinstance(json_text, str):
+        kind = "NULL" if json_text is None else type(json_text).__name__
+        return Record(key=key, name=name, error=f"CV column is {kind}, not JSON text")
+    return Record(key=key, name=name, json_text=json_text)
+
+
+def iter_sqlite(database: str, query: str = DEFAULT_SQLITE_QUERY) -> Iterator[Record]:
+    """Read CVs from a SQLite query.
+
+    The query must return two columns: an identifier, used to name the PDF,
+    and the CV as JSON text. Rows are fetched through the cursor as they are
+    needed.
+
+    Args:
+        database: Path to the SQLite database
+        query: Query returning (identifier, JSON) rows
+
+    Yields:
+        One record per row
+
+    Raises:
+        FileNotFoundError: If the database does not exist
+        sqlite3.Error: If the query fails
+    """
+    if not Path(database).exists():
+        raise FileNotFoundError(f"Database not found: {database}")
+    # Opened read-only so a mistyped query cannot change the data
+    connection = sqlite3.connect(f"{Path(database).absolute().as_uri()}?mode=ro", uri=True)
+    try:
+        for row_number, row in enumerate(connection.execute(query), start=1):
+            yield _sqlite_record(database, row_number, row)
+    finally:
+        connection.close()
@@ -6,7 +6,12 @@ class CVStyle:
     """Base class for CV styling."""
     
     def __init__(self):
-        """Initialize the style."""
+        """Initialize the style.
+        
+        ``getSampleStyleSheet`` builds a new sheet on every call, so the changes
+        ``_setup_styles`` makes (including to ``Normal``) stay local to this
+        instance and never leak into other styles or renderers.
+        """
         self.styles = getSampleStyleSheet()
         self._setup_styles()
     
@@ -1,4 +1,6 @@
 # filepath: c:\\Users\\LENOVO\\Documents\\python\\yaml-to-pdf\\cv-builder-from-yaml-to-pdf-2\\src\\cv_builder_from_yaml_to_pdf\\templates\\__init__.py
 """Templates module for CV Builder."""
 
-from .template_manager import create_sample_cv_yaml, create_yaml_from_template
+from .template_manager import (
+    create_sample_cv_yaml, create_yaml_from_template, get_template_index, list_templates, TemplateIndex,
+)
@@ -1,24 +1,119 @@
 """CV Template Manager module.
 
 This module provides template generation for CVs.
+
+Built-in templates are package data read through ``importlib.resources``, so
+they load the same way from a source checkout, an installed wheel, a zipapp or
+a frozen build. Templates are indexed once per process; user template
+directories can be added to the index and take precedence over the built-ins.
 """
 
 import os
+from importlib import resources
+from importlib.resources.abc import Traversable
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, List, Optional, Union
 
 import yaml
 
-TEMPLATES_DIR = Path(__file__).parent / "yaml_templates"
+from cv_builder_from_yaml_to_pdf.metrics import METRICS
+
+TEMPLATES_PACKAGE = "cv_builder_from_yaml_to_pdf.templates"
+TEMPLATES_RESOURCE_DIR = "yaml_templates"
+
+# Environment variable holding extra template directories (os.pathsep separated)
+TEMPLATE_PATH_ENV = "CV_BUILDER_TEMPLATE_PATH"
+
+
+class TemplateIndex:
+    """Index of available YAML templates by name."""
+
+    def __init__(self):
+        """Initialize the index with the built-in templates."""
+        self._sources: Dict[str, Traversable] = {}
+        self._contents: Dict[str, str] = {}
+        self._directories: List[Path] = []
+        self._add_templates(resources.files(TEMPLATES_PACKAGE) / TEMPLATES_RESOURCE_DIR)
+
+    def _add_templates(self, directory: Traversable):
+        for entry in directory.iterdir():
+            if entry.is_file() and entry.name.endswith(".yaml"):
+                name = entry.name[:-len(".yaml")]
+                self._sources[name] = entry
+                self._contents.pop(name, None)
+
+    def add_directory(self, directory: Union[str, Path]):
+        """Add a user template directory.
+
+        Templates in the directory override built-in templates with the same name.
+
+        Args:
+            directory: Directory containing ``<name>.yaml`` template files
+
+        Raises:
+            FileNotFoundError: If the directory does not exist
+        """
+        path = Path(directory).expanduser().resolve()
+        if path in self._directories:
+            return
+        if not path.is_dir():
+            raise FileNotFoundError(f"Template directory not found: {directory}")
+        self._add_templates(path)
+        self._directories.append(path)
+
+    def names(self) -> List[str]:
+        """Get the sorted names of all indexed templates."""
+        return sorted(self._sources)
+
+    def get(self, template_name: str) -> str:
+        """Get the raw content of a template.
+
+        Args:
+            template_name: Name of the template
+
+        Returns:
+            The template content
+
+        Raises:
+            ValueError: If the template_name is not valid
+        """
+        if template_name not in self._sources:
+            valid_templates = ', '.join(self.names())
+            raise ValueError(f"Invalid template name: {template_name}. Valid templates are: {valid_templates}")
+        cached = template_name in self._contents
+        METRICS.cache("template", cached)
+        if not cached:
+            self._contents[template_name] = self._sources[template_name].read_text(encoding='utf-8')
+        return self._contents[template_name]
+
+
+_index: Optional[TemplateIndex] = None
+
+
+def get_template_index() -> TemplateIndex:
+    """Get the process-wide template index, building it on first use.
+
+    Directories listed in the ``CV_BUILDER_TEMPLATE_PATH`` environment variable
+    are added when the index is built.
+    """
+    global _index
+    if _index is None:
+        index = TemplateIndex()
+        for directory in os.environ.get(TEMPLATE_PATH_ENV, "").split(os.pathsep):
+            if directory:
+                index.add_directory(directory)
+        _index = index
+    return _index
+
+
+def list_templates() -> List[str]:
+    """Get the names of all available templates."""
+    return get_template_index().names()
 
 
 def _load_template_content(template_name: str) -> str:
-    """Load raw content from a YAML template file."""
-    file_path = TEMPLATES_DIR / f"{template_name}.yaml"
-    if not file_path.exists():
-        raise FileNotFoundError(f"Template file {file_path} not found.")
-    with open(file_path, 'r', encoding='utf-8') as f:
-        return f.read()
+    """Load raw content from a YAML template."""
+    return get_template_index().get(template_name)
 
 
 def create_sample_cv_yaml(output_path: str = None) -> str:
@@ -52,13 +147,7 @@ def create_yaml_from_template(template_name: str, output_path: str) -> str:
         
     Raises:
         ValueError: If the template_name is not valid
-        FileNotFoundError: If the template file does not exist
     """
-    available_templates = [f.stem for f in TEMPLATES_DIR.glob("*.yaml")]
-    if template_name not in available_templates:
-        valid_templates = ', '.join(available_templates)
-        raise ValueError(f"Invalid template name: {template_name}. Valid templates are: {valid_templates}")
-    
     content = _load_template_content(template_name)
     
     with open(output_path, 'w', encoding='utf-8') as f:
@@ -0,0 +1,162 @@
+"""Paragraph line-break cache for CV Builder.
+
+Breaking a paragraph into lines measures every word with ``stringWidth`` and
+is a third of the time spent laying out a typical CV. CVs repeat a lot of
+text: section headings, skill categories, company names, date lines, and
+whole CVs rendered again in another style or page size. This module caches the
+result of ``Paragraph.breakLines`` keyed on the paragraph's text, a fingerprint
+of its style and the line widths, so identical paragraphs are only measured
+once per process, within a document and across documents.
+
+When a paragraph is split across pages, both halves get keys derived from the
+original paragraph, so re-wrapping them on the next frame is cached too.
+
+Line breaks of plain paragraphs are shared between paragraphs and only read.
+Those of paragraphs with mixed fonts or markup (reportlab's ``kind`` 1) hold
+the fragments of each line, which reportlab edits when splitting the
+paragraph, so every paragraph gets its own copy of them. Paragraphs
+whose line breaks reportlab may modify while drawing (right-to-left text,
+hyphenation) or whose content is not determined by the text alone (``<seq>``,
+``<onDraw>`` and ``<index>`` tags) are never cached.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.platypus import Paragraph
+
+from cv_builder_from_yaml_to_pdf.metrics import METRICS
+
+
+# Tags whose output depends on more than the paragraph text
+_UNCACHEABLE_TAGS = ('<seq', '<onDraw', '<ondraw', '<index')
+
+
+def style_fingerprint(style: ParagraphStyle) -> Optional[str]:
+    """Get a fingerprint of everything in a style that affects line breaking.
+
+    Two styles with equal attributes get the same fingerprint, whatever
+    their names.
+
+    Returns:
+        The fingerprint, or None if paragraphs in this style must not be cached
+    """
+    if getattr(style, 'wordWrap', None) == 'RTL' or getattr(style, 'hyphenationLang', None):
+        return None
+    attributes = sorted((key, repr(value)) for key, value in style.__dict__.items() if key not in ('name', 'parent'))
+    return hashlib.sha1(repr(attributes).encode('utf-8')).hexdigest()
+
+
+class WrapCache:
+    """Bounded, thread-safe LRU cache of paragraph line breaks."""
+
+    def __init__(self, max_entries: int = 50000):
+        """Initialize the cache.
+
+        Args:
+            max_entries: Most line-break results kept; 0 disables caching
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, object]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable):
+        """Get the cached line breaks for a key, or None."""
+        with self._lock:
+            lines = self._entries.get(key)
+            if lines is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        METRICS.cache("wrap", lines is not None)
+        return lines
+
+    def put(self, key: Hashable, lines):
+        """Store line breaks, evicting the least recently used entries beyond the limit."""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = lines
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, float]:
+        """Get the number of hits, misses and entries, and the hit rate."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries),
+                    "hit_rate": self.hits / lookups if lookups else 0.0}
+
+    def clear(self):
+        """Drop all cached line breaks and statistics."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+
+def _own_lines(lines):
+    """Copy line breaks whose fragments reportlab may edit; plain (kind 0) ones are returned as they are."""
+    if getattr(lines, 'kind', 0) != 1:
+        return lines
+    copy = lines.clone()
+    copy.lines = [line.clone(words=[word.clone() for word in line.words]) for line in lines.lines]
+    return copy
+
+
+class CachedParagraph(Paragraph):
+    """Paragraph that looks its line breaks up in a ``WrapCache``."""
+
+    def __init__(self, text, style, *args, cache: Optional[WrapCache] = None, key: Optional[Hashable] = None,
+                 **kwargs):
+        """Initialize the paragraph.
+
+        Args:
+            text: Paragraph markup
+            style: Paragraph style
+            cache: Cache for the line breaks; None disables caching
+            key: Cache key for the text and style, from ``paragraph_key``;
+                None disables caching
+        """
+        super().__init__(text, style, *args, **kwargs)
+        self._wrap_cache = cache
+        self._wrap_key = key
+
+    def breakLines(self, width):
+        if self._wrap_cache is None or self._wrap_key is None:
+            return super().breakLines(width)
+        key = (self._wrap_key, tuple(width))
+        lines = self._wrap_cache.get(key)
+        if lines is None:
+            lines = super().breakLines(width)
+            self._wrap_cache.put(key, _own_lines(lines))
+            return lines
+        return _own_lines(lines)
+
+    def split(self, availWidth, availHeight):
+        parts = super().split(availWidth, availHeight)
+        if len(parts) == 2 and self._wrap_key is not None:
+            # Both halves are determined by the original text and the split line
+            head, tail = parts
+            split_line = len(head.blPara.lines)
+            head._wrap_cache = tail._wrap_cache = self._wrap_cache
+            head._wrap_key = (self._wrap_key, 'head', split_line)
+            tail._wrap_key = (self._wrap_key, 'tail', split_line)
+        return parts
+
+
+def paragraph_key(text: str, fingerprint: Optional[str]) -> Optional[Hashable]:
+    """Get the cache key for a paragraph's text in a style with the given fingerprint, or None."""
+    if fingerprint is None or any(tag in text for tag in _UNCACHEABLE_TAGS):
+        return None
+    return (text, fingerprint)
+
+
+# Process-wide cache shared by all renderers
+WRAP_CACHE = WrapCache()
@@ -1,13 +1,16 @@
 """YAML Parser for CV Builder.
 
-This module handles the parsing of YAML files containing CV data.
+This module handles the parsing of YAML files containing CV data, including
+shared fragments pulled in with ``!include`` (see ``fragments``).
 """
 
+import os
 import yaml
 from pathlib import Path
-from typing import Dict, Any, Union, List
+from typing import Dict, Any, Optional, Tuple, Union, List
 from pydantic import ValidationError
 
+from cv_builder_from_yaml_to_pdf.fragments import load_yaml
 from cv_builder_from_yaml_to_pdf.models import CV
 
 
@@ -18,25 +21,63 @@ def parse_yaml_file(file_path: str) -> Dict[str, Any]:
         file_path: Path to the YAML file
         
     Returns:
-        Dict containing the parsed YAML data
+        Dict containing the parsed YAML data, with ``!include`` tags resolved
         
     Raises:
         FileNotFoundError: If the file does not exist
-        yaml.YAMLError: If the file cannot be parsed as YAML
+        yaml.YAMLError: If the file or an included fragment cannot be parsed as YAML
+    """
+    return parse_yaml_file_with_includes(file_path)[0]
+
+
+def parse_yaml_file_with_includes(file_path: str) -> Tuple[Dict[str, Any], List[str]]:
+    """Parse a YAML file and also return the fragments it includes.
+    
+    Args:
+        file_path: Path to the YAML file
+        
+    Returns:
+        Tuple of (parsed data, sorted absolute paths of every included fragment)
+        
+    Raises:
+        FileNotFoundError: If the file does not exist
+        yaml.YAMLError: If the file or an included fragment cannot be parsed as YAML
     """
     yaml_path = Path(file_path)
     
     if not yaml_path.exists():
         raise FileNotFoundError(f"YAML file not found: {file_path}")
     
+    path = os.path.abspath(yaml_path)
     try:
         with open(yaml_path, 'r', encoding='utf-8') as yaml_file:
-            data = yaml.safe_load(yaml_file)
-        return data
+            content = yaml_file.read()
+        return load_yaml(content, os.path.dirname(path), stack=(path,))
     except yaml.YAMLError as e:
         raise yaml.YAMLError(f"Error parsing YAML file: {e}")
 
 
+def parse_yaml_string(content: str, base_dir: Optional[str] = None) -> Dict[str, Any]:
+    """Parse YAML (or JSON) text and return its contents as a dictionary.
+    
+    Args:
+        content: YAML or JSON document as a string
+        base_dir: Directory ``!include`` paths are relative to and must stay
+            within; None (the default) rejects ``!include``, as the text may
+            come from an untrusted upload
+        
+    Returns:
+        Dict containing the parsed data
+        
+    Raises:
+        yaml.YAMLError: If the content or an included fragment cannot be parsed as YAML
+    """
+    try:
+        return load_yaml(content, base_dir)[0]
+    except yaml.YAMLError as e:
+        raise yaml.YAMLError(f"Error parsing YAML content: {e}")
+
+
 def validate_cv_data(data: Dict[str, Any]) -> Union[CV, List[str]]:
     """Validates that the CV data is properly structured using Pydantic models.
     
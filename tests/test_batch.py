@@ -0,0 +1,155 @@
+"""Tests for batch rendering."""
+
+import hashlib
+import json
+import os
+import tarfile
+import tempfile
+import zipfile
+
+import pytest
+from click.testing import CliRunner
+
+from cv_builder_from_yaml_to_pdf.batch import run_batch, STATUS_INVALID, STATUS_OK
+from cv_builder_from_yaml_to_pdf.main import cli
+
+
+CV_YAML = '''
+personal_info:
+  name: Test User
+  email: test@example.com
+education:
+  - institution: Test University
+    degree: Test Degree
+    start_date: "2015"
+experience:
+  - company: Test Company
+    roles:
+      - title: Test Title
+        start_date: "2019"
+'''
+
+
+def _write_sources(temp_dir, count, invalid=0):
+    sources = []
+    for i in range(count + invalid):
+        path = os.path.join(temp_dir, f'cv{i}.yaml')
+        with open(path, 'w') as f:
+            f.write(CV_YAML if i < count else 'personal_info: {}\n')
+        sources.append(path)
+    return sources
+
+
+def test_run_batch_with_worker_processes():
+    """Test rendering a batch in worker processes, keeping input order."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        sources = _write_sources(temp_dir, 3, invalid=1)
+        output_dir = os.path.join(temp_dir, 'out')
+
+        results = list(run_batch(sources, output_dir, workers=2))
+
+        assert [r.source for r in results] == sources
+        assert [r.status for r in results] == [STATUS_OK] * 3 + [STATUS_INVALID]
+        assert all(os.path.exists(r.output_path) for r in results[:3])
+        assert results[0].pages == 1 and results[0].bytes > 0
+
+
+def test_batch_command():
+    """Test the batch CLI command."""
+    runner = CliRunner()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        sources = _write_sources(temp_dir, 2)
+        output_dir = os.path.join(temp_dir, 'out')
+
+        result = runner.invoke(cli, ['batch', *sources, '--output-dir', output_dir, '--workers', '1'])
+
+        assert result.exit_code == 0, result.output
+        assert '2 documents (ok: 2)' in result.output
+        assert sorted(os.listdir(output_dir)) == ['cv0.pdf', 'cv1.pdf']
+
+
+def test_run_batch_reads_sources_lazily():
+    """Test that only a bounded number of sources is taken ahead of the results."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        sources = _write_sources(temp_dir, 6)
+        taken = []
+
+        def lazy_sources():
+            for source in sources:
+                taken.append(source)
+                yield source
+
+        results = run_batch(lazy_sources(), None, workers=2, executor='thread', max_in_flight=2)
+        first = next(results)
+        assert len(taken) <= 3
+        assert first.pdf.startswith(b'%PDF') and first.output_path is None
+        assert 'pdf' not in first.model_dump()
+        assert len(list(results)) == 5
+
+
+@pytest.mark.parametrize('archive_name', ['cvs.zip', 'cvs.tar.gz'])
+def test_batch_command_writes_archive(archive_name):
+    """Test writing batch output into an archive with a manifest."""
+    runner = CliRunner()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        sources = _write_sources(temp_dir, 2, invalid=1)
+        archive = os.path.join(temp_dir, archive_name)
+
+        result = runner.invoke(cli, ['batch', *sources, '--archive', archive, '--workers', '2'])
+
+        assert result.exit_code == 1, result.output
+        if archive_name.endswith('.zip'):
+            with zipfile.ZipFile(archive) as f:
+                members = {name: f.read(name) for name in f.namelist()}
+        else:
+            with tarfile.open(archive) as f:
+                members = {info.name: f.extractfile(info).read() for info in f.getmembers()}
+        assert sorted(members) == ['cv0.pdf', 'cv1.pdf', 'manifest.json']
+        manifest = json.loads(members['manifest.json'])
+        assert [member['source'] for member in manifest['members']] == sources[:2]
+        for member in manifest['members']:
+            assert hashlib.sha256(members[member['name']]).hexdigest() == member['sha256']
+            assert member['pages'] == 1
+        assert [failure['source'] for failure in manifest['failures']] == sources[2:]
+        assert not os.path.exists(os.path.join(temp_dir, 'cv0.pdf'))
+
+
+def test_batch_command_needs_one_destination():
+    """Test that exactly one of --output-dir and --archive is accepted."""
+    runner = CliRunner()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        sources = _write_sources(temp_dir, 1)
+        assert runner.invoke(cli, ['batch', *sources]).exit_code == 2
+        result = runner.invoke(cli, ['batch', *sources, '--archive', os.path.join(temp_dir, 'cvs.rar')])
+        assert result.exit_code == 2
+
+
+def test_sources_with_the_same_output_are_refused():
+    """Test that two sources that would write the same PDF fail the batch before rendering."""
+    runner = CliRunner()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        sources = []
+        for team in ('a', 'b'):
+            os.mkdir(os.path.join(temp_dir, team))
+            sources.append(os.path.join(temp_dir, team, 'jane.yaml'))
+            with open(sources[-1], 'w') as f:
+                f.write(CV_YAML)
+        output_dir = os.path.join(temp_dir, 'out')
+
+        with pytest.raises(ValueError, match="would both be written to"):
+            next(run_batch(sources, output_dir))
+        with pytest.raises(ValueError, match="is given more than once"):
+            next(run_batch(sources[:1] * 2, output_dir))
+        assert not os.path.exists(output_dir)
+        # Lazily read sources are checked when the clashing one is reached
+        results = run_batch(iter(sources), output_dir)
+        assert next(results).status == STATUS_OK
+        with pytest.raises(ValueError, match="would both be written to"):
+            next(results)
+        # Without an output directory nothing is written, so nothing clashes
+        assert len(list(run_batch(sources, None))) == 2
+
+        result = runner.invoke(cli, ['batch', *sources, '--output-dir', os.path.join(temp_dir, 'cli')])
+        assert result.exit_code == 1
+        assert "would both be written to" in result.stderr
+        assert not os.path.exists(os.path.join(temp_dir, 'cli', 'jane.pdf'))
@@ -0,0 +1,105 @@
+"""Tests for manifest-driven incremental builds."""
+
+import os
+
+import pytest
+from click.testing import CliRunner
+from PIL import Image
+
+from cv_builder_from_yaml_to_pdf import build
+from cv_builder_from_yaml_to_pdf.build import load_manifest, load_state, plan_build, run_build, save_state
+from cv_builder_from_yaml_to_pdf.main import cli
+
+from tests.test_batch import CV_YAML
+
+
+MANIFEST = '''
+targets:
+  - inputs: cvs/*.yaml
+    styles: [classic, modern]
+    output: pdfs/{stem}-{style}.pdf
+'''
+
+
+@pytest.fixture
+def project(tmp_path):
+    """A manifest with two CVs in two styles; the second CV has a photo."""
+    (tmp_path / 'cvs').mkdir()
+    (tmp_path / 'cvs' / 'a.yaml').write_text(CV_YAML)
+    (tmp_path / 'cvs' / 'b.yaml').write_text(CV_YAML.replace("Test User", "Other User\n  photo: photo.png"))
+    Image.new('RGB', (40, 50), 'red').save(tmp_path / 'cvs' / 'photo.png')
+    (tmp_path / 'cv-build.yaml').write_text(MANIFEST)
+    return tmp_path
+
+
+def _build(project, force=False):
+    """Plan and run a build of the project, returning {output: reason} of what was built."""
+    targets = load_manifest(str(project / 'cv-build.yaml'))
+    state_path = str(project / build.STATE_NAME)
+    state = load_state(state_path)
+    built = {item.target.output: item.reason
+             for item, result in run_build(plan_build(targets, str(project), state, force), str(project), state)
+             if result.status == 'ok'}
+    save_state(state, state_path)
+    return built
+
+
+def test_only_changed_targets_are_rebuilt(project, monkeypatch):
+    """Test the up-to-date checks on sources, images, outputs, styles and the tool version."""
+    outputs = {os.path.join('pdfs', name) for name in ('a-classic.pdf', 'a-modern.pdf', 'b-classic.pdf',
+                                                      'b-modern.pdf')}
+    assert _build(project) == dict.fromkeys(outputs, "never built")
+    assert all((project / output).exists() for output in outputs)
+    assert _build(project) == {}
+
+    (project / 'cvs' / 'a.yaml').write_text(CV_YAML.replace("Test Title", "New Title"))
+    Image.new('RGB', (40, 50), 'blue').save(project / 'cvs' / 'photo.png')
+    (project / 'pdfs' / 'b-modern.pdf').unlink()
+    assert _build(project) == {
+        os.path.join('pdfs', 'a-classic.pdf'): "source changed",
+        os.path.join('pdfs', 'a-modern.pdf'): "source changed",
+        os.path.join('pdfs', 'b-classic.pdf'): f"{os.path.join('cvs', 'photo.png')} changed",
+        os.path.join('pdfs', 'b-modern.pdf'): "output missing",
+    }
+
+    monkeypatch.setattr(build, 'renderer_fingerprint', lambda style, page_size: f"{style}-{page_size}-v2")
+    assert set(_build(project).values()) == {"style changed"}
+    monkeypatch.setattr(build, 'tool_version', lambda: "cv-builder 99")
+    assert set(_build(project).values()) == {"tool version changed"}
+    assert set(_build(project, force=True).values()) == {"forced"}
+
+
+def test_invalid_manifests(tmp_path):
+    """Test that duplicate outputs, unknown styles and unknown placeholders are rejected."""
+    manifest = tmp_path / 'cv-build.yaml'
+    for rule, message in (("{inputs: [a.yaml, b.yaml], output: cv.pdf}", "output of both"),
+                          ("{inputs: a.yaml, styles: fancy, output: x.pdf}", "Invalid style"),
+                          ("{inputs: a.yaml, output: '{name}.pdf'}", "Unknown placeholder"),
+                          ("{output: x.pdf}", "Invalid build manifest")):
+        manifest.write_text(f"targets:\n  - {rule}\n")
+        with pytest.raises(ValueError, match=message):
+            load_manifest(str(manifest))
+
+
+def test_build_command(project):
+    """Test the build CLI command, including --dry-run and failing targets."""
+    runner = CliRunner()
+    manifest = str(project / 'cv-build.yaml')
+
+    result = runner.invoke(cli, ['build', manifest, '--dry-run'])
+    assert result.exit_code == 0
+    assert "Would build pdfs/a-classic.pdf (never built)" in result.output
+    assert "4 to build, 0 up to date" in result.output
+    assert not (project / 'pdfs').exists()
+
+    result = runner.invoke(cli, ['build', manifest, '--workers', '2'])
+    assert result.exit_code == 0, result.output
+    assert "4 built, 0 failed, 0 up to date" in result.output
+
+    (project / 'cvs' / 'a.yaml').write_text("personal_info: {}\n")
+    result = runner.invoke(cli, ['build', manifest])
+    assert result.exit_code == 1
+    assert "Failed pdfs/a-modern.pdf [invalid]" in result.stderr
+    assert "0 built, 2 failed, 2 up to date" in result.stdout
+    # Failed targets are tried again even though nothing changed
+    assert "2 to build" in runner.invoke(cli, ['build', manifest, '-n']).output
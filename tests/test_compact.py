@@ -0,0 +1,85 @@
+"""Tests for the compact CV representation."""
+
+import json
+import pickle
+
+import pytest
+
+from cv_builder_from_yaml_to_pdf.compact import CompactCV, CompactSkill
+from cv_builder_from_yaml_to_pdf.models import CV
+
+
+CV_DATA = {
+    'personal_info': {
+        'name': 'Test User',
+        'email': 'test@example.com',
+        'website': 'https://example.com',
+        'location': 'Berlin, Germany',
+    },
+    'education': [{'institution': 'Test University', 'degree': 'Test Degree', 'start_date': '2015'}],
+    'experience': [
+        {
+            'company': 'Test Company',
+            'location': 'Berlin, Germany',
+            'roles': [
+                {'title': 'Engineer', 'start_date': '2019', 'achievements': ['Shipped things']},
+                {'title': 'Senior Engineer', 'start_date': '2021', 'end_date': 'Present'},
+            ],
+        }
+    ],
+    'skills': [
+        {'category': 'Programming Languages', 'name': 'Python'},
+        {'category': 'Programming Languages', 'name': 'Go'},
+    ],
+    'projects': [{'name': 'Tool', 'link': 'https://github.com/example/tool', 'technologies': ['Python']}],
+    'languages': [{'name': 'English', 'proficiency': 'Fluent'}],
+    'publications': ['A paper'],
+    'custom_sections': {'Volunteering': ['Mentor']},
+}
+
+
+def test_round_trip_is_lossless():
+    """Test that converting to the compact form and back gives an equal CV."""
+    cv = CV.model_validate(CV_DATA)
+    compact = CompactCV.from_model(cv)
+
+    assert compact.to_model() == cv
+    assert CompactCV.from_model(compact.to_model()) == compact
+
+
+def test_compact_records_use_slots_and_tuples():
+    """Test that records have no instance dict and lists are stored as tuples."""
+    compact = CompactCV.from_model(CV.model_validate(CV_DATA))
+
+    assert not hasattr(compact, '__dict__')
+    assert isinstance(compact.experience, tuple)
+    assert isinstance(compact.skills[0], CompactSkill)
+    assert compact.personal_info.website == 'https://example.com/'
+
+
+def test_repeated_values_are_interned():
+    """Test that repeated values share a single string across separately parsed CVs."""
+    first = CompactCV.from_model(CV.model_validate_json(json.dumps(CV_DATA)))
+    second = CompactCV.from_model(CV.model_validate_json(json.dumps(CV_DATA)))
+
+    assert first.skills[0].category is second.skills[1].category
+    assert first.experience[0].company is second.experience[0].company
+    assert first.personal_info.location is second.experience[0].location
+
+
+def test_compact_records_are_read_only():
+    """Test that records refuse assignment and do not share mutable data with the model."""
+    cv = CV.model_validate(CV_DATA)
+    compact = CompactCV.from_model(cv)
+
+    for statement in (lambda: setattr(compact, 'interests', ()), lambda: delattr(compact.personal_info, 'name')):
+        with pytest.raises(AttributeError, match="read-only"):
+            statement()
+    with pytest.raises(TypeError):
+        compact.custom_sections['Volunteering'] = ['Organizer']
+    assert compact.custom_sections['Volunteering'] == ('Mentor',)
+
+    cv.custom_sections['Volunteering'].append('Organizer')
+    assert compact.custom_sections['Volunteering'] == ('Mentor',)
+    assert compact.to_model().custom_sections == {'Volunteering': ['Mentor']}
+    assert pickle.loads(pickle.dumps(compact)) == compact
@@ -167,3 +167,48 @@ def test_generate_cv_pdf():
         with open(pdf_path, 'rb') as pdf_file:
             header = pdf_file.read(4)
             assert header == b'%PDF'
+
+
+def test_streaming_build_matches_eager_build():
+    """Test that the streaming build produces the same PDF as the default build."""
+    from reportlab import rl_config
+    from reportlab.platypus import Paragraph
+    from reportlab.lib.styles import getSampleStyleSheet
+    from cv_builder_from_yaml_to_pdf.models import CV
+    from cv_builder_from_yaml_to_pdf.pdf_generator import CVPDFGenerator, FlowableStream
+
+    # The stream behaves like the list that reportlab consumes from the front
+    style = getSampleStyleSheet()['Normal']
+    stream = FlowableStream((Paragraph(str(i), style) for i in range(20)), lookahead=4)
+    assert len(stream) == 4
+    del stream[0]
+    stream[0:0] = [Paragraph('split', style)]
+    assert stream[0].text == 'split'
+    assert stream[1].text == '1'
+
+    roles = [
+        {'title': f'Role {i}', 'start_date': '2020', 'achievements': [f'Achievement {j}' for j in range(5)]}
+        for i in range(30)
+    ]
+    cv_model = CV.model_validate({
+        'personal_info': {'name': 'Test User', 'email': 'test@example.com', 'summary': 'Line one\nLine two'},
+        'education': [{'institution': 'Test University', 'degree': 'Test Degree', 'start_date': '2015'}],
+        'experience': [{'company': 'Test Company', 'roles': roles}],
+        'skills': [{'category': 'Languages', 'name': 'Python'}],
+    })
+
+    invariant = rl_config.invariant
+    rl_config.invariant = 1
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            outputs = []
+            for streaming in (False, True):
+                output_path = os.path.join(temp_dir, f'cv_{streaming}.pdf')
+                generator = CVPDFGenerator(output_path, cv_model, streaming=streaming)
+                generator.generate()
+                assert generator.doc.page > 1
+                with open(output_path, 'rb') as pdf_file:
+                    outputs.append(pdf_file.read())
+            assert outputs[0] == outputs[1]
+    finally:
+        rl_config.invariant = invariant
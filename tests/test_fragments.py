@@ -0,0 +1,158 @@
+"""Tests for shared YAML fragments and the fragment cache."""
+
+import os
+
+import pytest
+import yaml
+
+from cv_builder_from_yaml_to_pdf.build import discover_dependencies
+from cv_builder_from_yaml_to_pdf.fragments import FRAGMENT_CACHE, FragmentCache, load_yaml
+from cv_builder_from_yaml_to_pdf.pipeline import RenderPipeline
+from cv_builder_from_yaml_to_pdf.preview_server import PreviewState
+from cv_builder_from_yaml_to_pdf.yaml_parser import parse_yaml_file, parse_yaml_string
+
+from tests.test_batch import CV_YAML
+
+
+COMPANY = '''
+company: Acme Corp
+location: London, UK
+roles:
+  - title: Engineer
+    start_date: "2019"
+    achievements: !include achievements.yaml
+'''
+
+SKILLS = '''
+backend:
+  - {category: Backend, name: Python}
+  - {category: Backend, name: PostgreSQL}
+frontend:
+  - {category: Frontend, name: TypeScript}
+'''
+
+CV_WITH_FRAGMENTS = CV_YAML.replace("experience:\n", "experience:\n  - !include shared/acme.yaml\n") + '''
+skills: !include shared/skills.yaml#backend
+projects:
+  - name: Tool
+    technologies: [!include "shared/skills.yaml#frontend.0.name"]
+'''
+
+
+def _write(path, text):
+    """Write a file, moving its modification time on even on coarse-grained filesystems."""
+    mtime = os.stat(path).st_mtime_ns if os.path.exists(path) else 0
+    path.write_text(text)
+    if mtime:
+        os.utime(path, ns=(mtime + 10 ** 9, mtime + 10 ** 9))
+
+
+@pytest.fixture
+def cv_dir(tmp_path):
+    """A CV including a company, which includes its achievements, and a skills fragment."""
+    (tmp_path / 'shared').mkdir()
+    _write(tmp_path / 'shared' / 'acme.yaml', COMPANY)
+    _write(tmp_path / 'shared' / 'achievements.yaml', "- Shipped it\n")
+    _write(tmp_path / 'shared' / 'skills.yaml', SKILLS)
+    _write(tmp_path / 'cv.yaml', CV_WITH_FRAGMENTS)
+    FRAGMENT_CACHE.clear()
+    yield tmp_path
+    FRAGMENT_CACHE.clear()
+
+
+def test_includes_are_resolved(cv_dir):
+    """Test whole-file, nested and key-path includes, relative to the including file."""
+    data = parse_yaml_file(str(cv_dir / 'cv.yaml'))
+    acme = data['experience'][0]
+    assert acme['company'] == "Acme Corp"
+    assert acme['roles'][0]['achievements'] == ["Shipped it"]
+    assert data['experience'][1]['company'] == "Test Company"
+    assert data['skills'] == [{'category': "Backend", 'name': "Python"},
+                              {'category': "Backend", 'name': "PostgreSQL"}]
+    assert data['projects'][0]['technologies'] == ["TypeScript"]
+
+    text = "skills: !include shared/skills.yaml#frontend\n"
+    assert parse_yaml_string(text, str(cv_dir)) == {'skills': [{'category': "Frontend", 'name': "TypeScript"}]}
+    pipeline = RenderPipeline()
+    context = pipeline.run(str(cv_dir / 'cv.yaml'))
+    assert context.pages == 1
+    assert context.includes == sorted(str(cv_dir / 'shared' / name)
+                                      for name in ('achievements.yaml', 'acme.yaml', 'skills.yaml'))
+
+
+def test_fragments_are_parsed_once_and_invalidated_on_change(cv_dir):
+    """Test that fragments are cached until their content changes."""
+    cache = FragmentCache()
+    text = (cv_dir / 'cv.yaml').read_text()
+    for _ in range(3):
+        data, includes = load_yaml(text, str(cv_dir), cache)
+    # skills.yaml is included twice per document
+    assert cache.stats() == {"hits": 7, "misses": 3, "entries": 3}
+    assert len(includes) == 3
+
+    # Callers get their own copies
+    data['skills'].append({'category': "Legacy", 'name': "Cobol"})
+    assert len(load_yaml(text, str(cv_dir), cache)[0]['skills']) == 2
+
+    # Touching a file without changing it re-hashes it but does not re-parse it
+    _write(cv_dir / 'shared' / 'skills.yaml', SKILLS)
+    load_yaml(text, str(cv_dir), cache)
+    assert cache.stats()["misses"] == 3
+
+    # A changed nested fragment invalidates the fragment that includes it
+    _write(cv_dir / 'shared' / 'achievements.yaml', "- Shipped it again\n")
+    data, _ = load_yaml(text, str(cv_dir), cache)
+    assert data['experience'][0]['roles'][0]['achievements'] == ["Shipped it again"]
+    assert cache.stats()["misses"] == 5
+
+
+@pytest.mark.parametrize("text, message", [
+    ("a: !include missing.yaml\n", "YAML fragment not found"),
+    ("a: !include shared/skills.yaml#backend.5\n", "no '5' in the fragment"),
+    ("a: !include\n", "needs a file path"),
+    ("a: !include loop.yaml\n", "Include cycle"),
+])
+def test_include_errors(cv_dir, text, message):
+    """Test that bad includes are reported as YAML errors pointing at the tag."""
+    _write(cv_dir / 'loop.yaml', "b: !include shared/../loop.yaml\n")
+    with pytest.raises(yaml.YAMLError, match=message) as e:
+        parse_yaml_string(text, str(cv_dir))
+    assert "line 1" in str(e.value)
+
+
+def test_includes_are_confined(cv_dir):
+    """Test that text payloads cannot include files and file includes cannot leave the CV's directory."""
+    secret = cv_dir / 'secret.txt'
+    secret.write_text("password")
+    for text in (f"summary: !include {secret}\n", "summary: !include secret.txt\n"):
+        with pytest.raises(yaml.YAMLError, match="only allowed in CV files"):
+            parse_yaml_string(text)
+        with pytest.raises(yaml.YAMLError, match="only allowed in CV files"):
+            RenderPipeline().run(text=CV_YAML + text)
+
+    team = cv_dir / 'team'
+    team.mkdir()
+    for reference, message in ((str(secret), "must be relative"), ("~/secret.txt", "must be relative"),
+                               ("../secret.txt", "outside"), ("../team/../secret.txt", "outside")):
+        _write(team / 'cv.yaml', f"summary: !include {reference}\n")
+        with pytest.raises(yaml.YAMLError, match=message):
+            parse_yaml_file(str(team / 'cv.yaml'))
+
+    # A cached fragment that is fine for one CV is still checked for another
+    _write(cv_dir / 'shared' / 'up.yaml', "a: !include ../secret.txt\n")
+    parse_yaml_string("a: !include shared/up.yaml\n", str(cv_dir))
+    with pytest.raises(yaml.YAMLError, match="outside"):
+        parse_yaml_string("a: !include up.yaml\n", str(cv_dir / 'shared'))
+
+
+def test_watchers_see_fragment_changes(cv_dir):
+    """Test that the preview re-renders and builds depend on included fragments."""
+    state = PreviewState(str(cv_dir / 'cv.yaml'), RenderPipeline())
+    assert state.refresh()
+    assert not state.refresh()
+    _write(cv_dir / 'shared' / 'acme.yaml', COMPANY.replace("Acme Corp", "Acme Inc"))
+    assert state.refresh()
+    assert state.cv.experience[0].company == "Acme Inc"
+
+    dependencies = discover_dependencies(str(cv_dir / 'cv.yaml'))
+    assert str(cv_dir / 'shared' / 'achievements.yaml') in dependencies
@@ -0,0 +1,138 @@
+"""Tests for profile photos, company logos and the image cache."""
+
+import json
+import os
+import shutil
+import tempfile
+
+import pytest
+from PIL import Image
+from reportlab import rl_config
+
+from cv_builder_from_yaml_to_pdf.batch import run_batch, STATUS_INVALID, STATUS_OK
+from cv_builder_from_yaml_to_pdf.images import ImageCache, ImagePathError, downscale, resolve_image_path
+from cv_builder_from_yaml_to_pdf.pdf_generator import Renderer
+from cv_builder_from_yaml_to_pdf.pipeline import RenderPipeline
+from cv_builder_from_yaml_to_pdf.sources import Record
+from cv_builder_from_yaml_to_pdf.yaml_parser import parse_yaml_string
+
+from tests.test_batch import CV_YAML
+
+
+CV_WITH_IMAGES = CV_YAML.replace("  email: test@example.com\n", "  email: test@example.com\n  photo: photo.jpg\n") \
+    .replace("  - company: Test Company\n", "  - company: Test Company\n    logo: logo.png\n") + '''
+  - company: Other Company
+    logo: logo.png
+    roles:
+      - title: Other Title
+        start_date: "2017"
+'''
+
+
+@pytest.fixture
+def image_dir():
+    """Directory with a large JPEG photo, a transparent PNG logo and a CV using both."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        Image.new('RGB', (1800, 2400), (200, 120, 80)).save(os.path.join(temp_dir, 'photo.jpg'))
+        Image.new('RGBA', (900, 300), (0, 100, 200, 128)).save(os.path.join(temp_dir, 'logo.png'))
+        with open(os.path.join(temp_dir, 'cv.yaml'), 'w') as f:
+            f.write(CV_WITH_IMAGES)
+        yield temp_dir
+
+
+def test_downscale_fits_box_and_keeps_transparency(image_dir):
+    """Test that images are shrunk into the pixel box, never enlarged, and keep their alpha channel."""
+    with open(os.path.join(image_dir, 'photo.jpg'), 'rb') as f:
+        data, size = downscale(f.read(), (300, 300))
+    assert size == (225, 300) and data.startswith(b'\xff\xd8')
+
+    with open(os.path.join(image_dir, 'logo.png'), 'rb') as f:
+        data, size = downscale(f.read(), (3000, 3000))
+    assert size == (900, 300) and data.startswith(b'\x89PNG')
+
+
+def test_image_cache_is_keyed_by_content_and_size(image_dir):
+    """Test cache hits for identical content at the same size, misses otherwise, and eviction."""
+    cache = ImageCache(max_entries=2)
+    photo = os.path.join(image_dir, 'photo.jpg')
+    copy = os.path.join(image_dir, 'copy.jpg')
+    shutil.copy(photo, copy)
+
+    first = cache.get(photo, 72, 72)
+    assert max(first.pixel_size) == 150
+    assert cache.get(copy, 72, 72) is first
+    assert cache.get(photo, 36, 36) is not first
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 2
+
+    cache.get(os.path.join(image_dir, 'logo.png'), 72, 72)
+    assert cache.stats()['entries'] == 2
+    # The least recently used entry was evicted
+    assert cache.get(photo, 72, 72) is not first
+
+
+def test_image_cache_rejects_bad_files(image_dir):
+    """Test the errors for missing and unreadable image files."""
+    cache = ImageCache()
+    with pytest.raises(FileNotFoundError):
+        cache.get(os.path.join(image_dir, 'missing.png'), 72, 72)
+    with pytest.raises(ValueError):
+        cache.get(os.path.join(image_dir, 'cv.yaml'), 72, 72)
+
+
+def test_render_with_photo_and_logos(image_dir):
+    """Test that images are resolved next to the CV file and each is embedded once per PDF."""
+    cache = ImageCache()
+    pipeline = RenderPipeline(renderer=Renderer(images=cache))
+    cwd = os.getcwd()
+    try:
+        # Relative image paths must not depend on the working directory
+        os.chdir(tempfile.gettempdir())
+        first = pipeline.run(os.path.join(image_dir, 'cv.yaml')).pdf
+        second = pipeline.run(os.path.join(image_dir, 'cv.yaml')).pdf
+    finally:
+        os.chdir(cwd)
+
+    assert cache.stats()['misses'] == 2
+    assert cache.stats()['hits'] == 4
+    for pdf in (first, second):
+        # Photo passed through as JPEG, and the logo plus its soft mask, shared by both companies
+        assert pdf.count(b'/Subtype /Image') == 3
+        assert pdf.count(b'/DCTDecode') == 1
+
+
+def test_missing_image_fails_the_document(image_dir):
+    """Test that a CV pointing at a missing image is reported as invalid."""
+    os.remove(os.path.join(image_dir, 'logo.png'))
+    result, = run_batch([os.path.join(image_dir, 'cv.yaml')], None)
+    assert result.status == STATUS_INVALID
+    assert 'logo.png' in result.error
+
+
+def test_image_paths_are_confined(image_dir):
+    """Test that images must be relative paths inside the CV's directory, and are refused in text."""
+    assert resolve_image_path('logos/../photo.jpg', image_dir) == os.path.join(image_dir, 'photo.jpg')
+    for path, message in [(os.path.join(image_dir, 'photo.jpg'), "must be relative"), ('~/photo.jpg', "must be relative"),
+                          ('../photo.jpg', "outside"), ('logos/../../photo.jpg', "outside")]:
+        with pytest.raises(ImagePathError, match=message):
+            resolve_image_path(path, os.path.join(image_dir, 'cvs'))
+    with pytest.raises(ImagePathError, match="only allowed in CV files"):
+        resolve_image_path('photo.jpg', None)
+
+    # A record naming a file on the host is invalid, not embedded
+    data = parse_yaml_string(CV_WITH_IMAGES.replace("photo.jpg", os.path.join(image_dir, 'photo.jpg')))
+    result, = run_batch([Record(key='upload', name='upload', json_text=json.dumps(data))], None)
+    assert result.status == STATUS_INVALID
+    assert "only allowed in CV files" in result.error
+
+
+def test_threaded_renders_with_shared_images(image_dir):
+    """Test that renders sharing cached images in threads match a single-threaded render."""
+    invariant = rl_config.invariant
+    rl_config.invariant = 1
+    try:
+        sources = [os.path.join(image_dir, 'cv.yaml')] * 8
+        serial, = run_batch(sources[:1], None)
+        threaded = list(run_batch(sources, None, workers=4, executor='thread'))
+    finally:
+        rl_config.invariant = invariant
+    assert all(result.status == STATUS_OK and result.pdf == serial.pdf for result in threaded)
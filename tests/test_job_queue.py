@@ -0,0 +1,188 @@
+"""Tests for the persistent render job queue."""
+
+import os
+import tempfile
+import time
+
+from click.testing import CliRunner
+
+from cv_builder_from_yaml_to_pdf import job_queue
+from cv_builder_from_yaml_to_pdf.job_queue import (
+    JobQueue, process_one, run_workers, JOB_DONE, JOB_FAILED, JOB_QUEUED, JOB_RUNNING,
+)
+from cv_builder_from_yaml_to_pdf.main import cli
+
+
+VALID_CV_YAML = '''
+personal_info:
+  name: Test User
+  email: test@example.com
+education:
+  - institution: Test University
+    degree: Test Degree
+    start_date: "2015"
+experience:
+  - company: Test Company
+    roles:
+      - title: Test Title
+        start_date: "2019"
+'''
+
+
+def test_submit_and_process_job():
+    """Test that a submitted job is claimed, rendered and marked as done."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        queue = JobQueue(os.path.join(temp_dir, 'jobs.db'))
+        output_path = os.path.join(temp_dir, 'out.pdf')
+        job_id = queue.submit(VALID_CV_YAML, output_path)
+
+        job = process_one(queue, 'test-worker')
+
+        assert job.id == job_id
+        assert job.status == JOB_DONE
+        assert job.attempts == 1
+        assert job.duration is not None
+        assert os.path.exists(output_path)
+        assert process_one(queue, 'test-worker') is None
+        queue.close()
+
+
+def test_invalid_payload_fails_without_retry():
+    """Test that validation errors are recorded and not retried."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        queue = JobQueue(os.path.join(temp_dir, 'jobs.db'))
+        queue.submit('{"personal_info": {"name": "No Email"}}', os.path.join(temp_dir, 'out.pdf'))
+
+        job = process_one(queue, 'test-worker')
+
+        assert job.status == JOB_FAILED
+        assert 'email' in job.error
+        queue.close()
+
+
+def test_failed_job_is_retried_with_backoff():
+    """Test that transient failures are rescheduled until max_attempts is reached."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        queue = JobQueue(os.path.join(temp_dir, 'jobs.db'), backoff_seconds=0)
+        job_id = queue.submit(VALID_CV_YAML, os.path.join(temp_dir, 'out.pdf'), max_attempts=2)
+
+        queue.claim('test-worker')
+        queue.fail(job_id, 'boom', 0.1)
+        assert queue.get(job_id).status == JOB_QUEUED
+
+        queue.claim('test-worker')
+        queue.fail(job_id, 'boom again', 0.1)
+        job = queue.get(job_id)
+        assert job.status == JOB_FAILED
+        assert job.error == 'boom again'
+        queue.close()
+
+
+def test_expired_lease_is_reclaimed():
+    """Test that a job abandoned by a dead worker is claimed again."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        queue = JobQueue(os.path.join(temp_dir, 'jobs.db'), lease_seconds=0)
+        job_id = queue.submit(VALID_CV_YAML, os.path.join(temp_dir, 'out.pdf'))
+
+        first = queue.claim('dead-worker')
+        assert first.status == JOB_RUNNING
+
+        second = queue.claim('live-worker')
+        assert second.id == job_id
+        assert second.worker == 'live-worker'
+        assert second.attempts == 2
+        queue.close()
+
+
+def test_job_that_keeps_losing_its_worker_fails():
+    """Test that a job whose lease expires on its last attempt fails instead of being retried forever."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        queue = JobQueue(os.path.join(temp_dir, 'jobs.db'), lease_seconds=0)
+        job_id = queue.submit(VALID_CV_YAML, os.path.join(temp_dir, 'out.pdf'), max_attempts=2)
+        other_id = queue.submit(VALID_CV_YAML, os.path.join(temp_dir, 'other.pdf'))
+
+        assert queue.claim('worker-1').id == job_id
+        assert queue.claim('worker-2').id == job_id
+        # The second lease expired too; the job is given up and the next one claimed
+        assert queue.claim('worker-3').id == other_id
+        job = queue.get(job_id)
+        assert (job.status, job.attempts) == (JOB_FAILED, 2)
+        assert job.error == 'Worker lost: the lease of attempt 2 expired'
+        queue.close()
+
+
+def test_worker_that_lost_its_lease_cannot_record_a_result():
+    """Test that a slow worker cannot overwrite the outcome of the worker that reclaimed its job."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        queue = JobQueue(os.path.join(temp_dir, 'jobs.db'), lease_seconds=0, backoff_seconds=0)
+        job_id = queue.submit(VALID_CV_YAML, os.path.join(temp_dir, 'out.pdf'))
+
+        queue.claim('slow-worker')
+        queue.claim('live-worker')
+        assert not queue.complete(job_id, 1.0, worker='slow-worker')
+        assert not queue.fail(job_id, 'late', 1.0, worker='slow-worker')
+        assert queue.get(job_id).status == JOB_RUNNING
+
+        assert queue.complete(job_id, 0.5, worker='live-worker')
+        assert not queue.fail(job_id, 'late', 1.0, retry=False, worker='slow-worker')
+        job = queue.get(job_id)
+        assert (job.status, job.duration, job.error) == (JOB_DONE, 0.5, None)
+        queue.close()
+
+
+def test_render_that_outlives_the_lease_is_not_reclaimed(monkeypatch):
+    """Test that the lease of a rendering job is renewed, so no second worker renders it meanwhile."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, 'jobs.db')
+        queue, other = JobQueue(db_path, lease_seconds=0.5), JobQueue(db_path, lease_seconds=0.5)
+        job_id = queue.submit(VALID_CV_YAML, os.path.join(temp_dir, 'out.pdf'))
+        render_job = job_queue.render_job
+        reclaimed = []
+
+        def slow_render_job(job, *args):
+            for _ in range(4):
+                time.sleep(0.25)
+                reclaimed.append(other.claim('other-worker'))
+            return render_job(job, *args)
+
+        monkeypatch.setattr(job_queue, 'render_job', slow_render_job)
+        job = process_one(queue, 'slow-worker')
+
+        assert reclaimed == [None] * 4
+        assert (job.status, job.attempts, job.worker) == (JOB_DONE, 1, 'slow-worker')
+        # Renewing stops once the job is no longer held
+        assert not queue.renew(job_id, 'slow-worker')
+        queue.close()
+        other.close()
+
+
+def test_worker_pool_drains_queue():
+    """Test that a pool of worker processes renders every submitted job."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, 'jobs.db')
+        queue = JobQueue(db_path)
+        for i in range(4):
+            queue.submit(VALID_CV_YAML, os.path.join(temp_dir, f'out{i}.pdf'))
+
+        run_workers(db_path, concurrency=2, poll_interval=0.05, drain=True)
+
+        assert queue.counts() == {JOB_DONE: 4}
+        queue.close()
+
+
+def test_submit_and_worker_commands():
+    """Test the submit and worker CLI commands."""
+    runner = CliRunner()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        yaml_path = os.path.join(temp_dir, 'cv.yaml')
+        db_path = os.path.join(temp_dir, 'jobs.db')
+        with open(yaml_path, 'w') as f:
+            f.write(VALID_CV_YAML)
+
+        result = runner.invoke(cli, ['submit', yaml_path, '--queue', db_path, '--page-size', 'letter'])
+        assert result.exit_code == 0, result.output
+
+        result = runner.invoke(cli, ['worker', '--queue', db_path, '--drain', '--poll-interval', '0.05'])
+        assert result.exit_code == 0, result.output
+        assert 'done: 1' in result.output
+        assert os.path.exists(os.path.join(temp_dir, 'cv.pdf'))
@@ -0,0 +1,126 @@
+"""Tests for per-render resource limits and the render sandbox."""
+
+import os
+import signal
+import time
+
+import pytest
+from click.testing import CliRunner
+
+from cv_builder_from_yaml_to_pdf.batch import STATUS_LIMIT, STATUS_OK, run_batch
+from cv_builder_from_yaml_to_pdf.job_queue import JOB_FAILED, JobQueue, process_one
+from cv_builder_from_yaml_to_pdf.limits import (LIMIT_CPU, LIMIT_KILLED, LIMIT_MEMORY, LIMIT_PAGES, LIMIT_TIMEOUT,
+                                                RenderLimits, RenderSandbox, ResourceLimitExceeded)
+from cv_builder_from_yaml_to_pdf.main import cli
+from cv_builder_from_yaml_to_pdf.metrics import MetricsRegistry, RenderMetrics
+from cv_builder_from_yaml_to_pdf.preview_server import PreviewState
+from cv_builder_from_yaml_to_pdf.pipeline import RenderPipeline
+
+from benchmarks.common import make_large_cv
+from tests.test_batch import CV_YAML
+
+
+# Run in the sandbox process, so they must be importable module-level functions
+
+def _sleep(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def _spin():
+    while True:
+        pass
+
+
+def _allocate(mib):
+    return len(bytearray(mib * 1024 * 1024))
+
+
+def _die():
+    os.kill(os.getpid(), signal.SIGKILL)
+
+
+@pytest.fixture
+def sources(tmp_path):
+    """A one-page CV and a CV of about 40 pages."""
+    small, large = tmp_path / 'small.yaml', tmp_path / 'large.json'
+    small.write_text(CV_YAML)
+    large.write_text(make_large_cv(30).model_dump_json())
+    return str(small), str(large)
+
+
+def test_sandbox_limits_and_recycling():
+    """Test that each limit stops a call and that the sandbox recovers for the next one."""
+    with RenderSandbox(RenderLimits(timeout=2, cpu_seconds=1, memory_mb=512)) as sandbox:
+        assert sandbox.call(_sleep, 0) == 0
+        pid = sandbox._process.pid
+
+        for fn, args, limit in ((_sleep, (5,), LIMIT_TIMEOUT), (_spin, (), LIMIT_CPU),
+                                (_allocate, (1024,), LIMIT_MEMORY), (_die, (), LIMIT_KILLED)):
+            with pytest.raises(ResourceLimitExceeded) as e:
+                sandbox.call(fn, *args)
+            assert e.value.limit == limit
+            assert sandbox.call(_allocate, 10) == 10 * 1024 * 1024
+        # The CPU limit applies to each call, not to the life of the process
+        assert sandbox.restarts == 3
+        assert sandbox._process.pid != pid
+
+        with pytest.raises(RuntimeError, match="ZeroDivisionError"):
+            sandbox.call(divmod, 1, 0)
+
+
+def test_batch_reports_limits(sources):
+    """Test the limit status in batch results and metrics, in and out of the sandbox."""
+    small, large = sources
+    metrics = RenderMetrics(MetricsRegistry())
+    for limits in (RenderLimits(max_pages=5), RenderLimits(max_pages=5, timeout=30)):
+        results = list(run_batch([small, large, small], None, workers=2, limits=limits))
+        assert [result.status for result in results] == [STATUS_OK, STATUS_LIMIT, STATUS_OK]
+        assert (results[1].limit, results[1].error) == (LIMIT_PAGES, "Document has more than 5 pages")
+        for result in results:
+            metrics.observe_result(result, 'classic')
+    exposition = metrics.registry.exposition()
+    assert 'cv_builder_limit_exceeded_total{limit="pages"} 2' in exposition
+    assert 'cv_builder_documents_total{style="classic",status="limit"} 2' in exposition
+
+    results = list(run_batch([large, small], None, limits=RenderLimits(timeout=0.2)))
+    assert [(result.status, result.limit) for result in results] == [(STATUS_LIMIT, LIMIT_TIMEOUT), (STATUS_OK, None)]
+
+
+def test_queue_and_preview_limits(sources, tmp_path):
+    """Test that queue jobs over a limit fail without retries and the preview shows the limit."""
+    _, large = sources
+    queue = JobQueue(str(tmp_path / 'jobs.db'))
+    try:
+        with open(large) as f:
+            payload = f.read()
+        queue.submit(payload, str(tmp_path / 'page.pdf'))
+        job = process_one(queue, 'worker', limits=RenderLimits(max_pages=2))
+        assert (job.status, job.attempts) == (JOB_FAILED, 1)
+        assert job.error == "Limit exceeded (pages): Document has more than 2 pages"
+
+        queue.submit(payload, str(tmp_path / 'time.pdf'))
+        with RenderSandbox(RenderLimits(timeout=0.2)) as sandbox:
+            job = process_one(queue, 'worker', sandbox=sandbox)
+        assert job.status == JOB_FAILED
+        assert job.error == "Limit exceeded (timeout): Render took longer than 0.2s"
+    finally:
+        queue.close()
+
+    state = PreviewState(large, RenderPipeline(max_pages=2))
+    state.refresh()
+    assert state.pdf is None
+    assert state.errors == ["Limit exceeded (pages): Document has more than 2 pages"]
+
+
+def test_limit_options(sources, tmp_path):
+    """Test the limit options of the batch command."""
+    result = CliRunner().invoke(cli, ['batch', *sources, '-d', str(tmp_path / 'out'), '-w', '1',
+                                      '--max-pages', '3'])
+    assert result.exit_code == 1
+    assert "Failed" in result.stderr and "[limit]: Document has more than 3 pages" in result.stderr
+    assert "2 documents (limit: 1, ok: 1)" in result.stdout
+
+    result = CliRunner().invoke(cli, ['batch', *sources, '-d', str(tmp_path / 'out'), '--timeout', '5',
+                                      '--cprofile', str(tmp_path / 'profile')])
+    assert result.exit_code == 2
@@ -0,0 +1,195 @@
+"""Tests for the CV YAML language server."""
+
+import io
+import json
+import time
+
+from cv_builder_from_yaml_to_pdf.fragments import FRAGMENT_CACHE
+from cv_builder_from_yaml_to_pdf.lsp import (CVLanguageServer, CompletionProvider, apply_change, document_path,
+                                             validate_document)
+from cv_builder_from_yaml_to_pdf.templates import TemplateIndex
+
+
+CV_YAML = '''personal_info:
+  name: Test User
+  email: test@example.com
+education:
+  - institution: Test University
+    degree: Test Degree
+    start_date: 2015
+experience:
+  - company: Test Company
+    roles:
+      - title: Test Title
+        start_date: "2019"
+'''
+
+
+def test_validation_errors_map_to_yaml_positions():
+    """Test that pydantic errors are reported at the offending YAML node."""
+    diagnostics = validate_document(CV_YAML)
+
+    assert len(diagnostics) == 1
+    assert diagnostics[0]['range']['start'] == {'line': 6, 'character': 16}
+    assert 'string' in diagnostics[0]['message']
+
+
+def test_missing_field_points_at_parent_key():
+    """Test that a missing required field is reported on its parent mapping key."""
+    diagnostics = validate_document(CV_YAML.replace('  email: test@example.com\n', '').replace('2015', '"2015"'))
+
+    assert len(diagnostics) == 1
+    assert diagnostics[0]['range']['start'] == {'line': 0, 'character': 0}
+    assert diagnostics[0]['message'] == 'personal_info.email: Field required'
+
+
+def test_syntax_error_is_reported():
+    """Test that YAML syntax errors become diagnostics."""
+    diagnostics = validate_document('personal_info: [unclosed\n')
+
+    assert len(diagnostics) == 1
+    assert diagnostics[0]['message'].startswith('YAML syntax error')
+
+
+def test_includes_resolve_relative_to_the_document(tmp_path):
+    """Test that !include is resolved for file documents and errors in fragments point at the tag."""
+    (tmp_path / 'shared').mkdir()
+    skills = tmp_path / 'shared' / 'skills.yaml'
+    skills.write_text("- {category: Backend, name: Python}\n")
+    FRAGMENT_CACHE.clear()
+    path = document_path((tmp_path / 'cv.yaml').as_uri())
+    assert path == str(tmp_path / 'cv.yaml')
+    text = CV_YAML.replace('2015', '"2015"') + 'skills: !include shared/skills.yaml\n'
+    assert validate_document(text, path) == []
+
+    skills.write_text("- {category: Backend}\n")
+    diagnostic, = validate_document(text, path)
+    assert diagnostic['range']['start'] == {'line': 12, 'character': 0}
+    assert diagnostic['message'] == 'skills.0.name: Field required'
+
+    skills.write_text("- [unclosed\n")
+    diagnostic, = validate_document(text, path)
+    assert diagnostic['range']['start'] == {'line': 12, 'character': 8}
+    assert f"{skills}, line 2" in diagnostic['message']
+
+    diagnostic, = validate_document(text)
+    assert "only allowed in CV files" in diagnostic['message']
+    assert document_path('untitled:Untitled-1') is None
+
+
+def test_completion_uses_schema_for_nested_objects():
+    """Test that completion offers the fields of the object around the cursor."""
+    completion = CompletionProvider()
+    text = CV_YAML + '        \n'
+
+    labels = [item['label'] for item in completion.complete(text, 12, 8)]
+    assert 'achievements' in labels and 'end_date' in labels
+
+    labels = [item['label'] for item in completion.complete('personal_info:\n  \n', 1, 2)]
+    assert 'linkedin' in labels
+
+    labels = [item['label'] for item in completion.complete('', 0, 0)]
+    assert 'personal_info' in labels and 'experience' in labels
+
+
+def test_apply_incremental_change():
+    """Test applying a ranged edit to a document."""
+    change = {'range': {'start': {'line': 1, 'character': 8}, 'end': {'line': 1, 'character': 12}}, 'text': 'Jane'}
+    assert apply_change(CV_YAML, change).split('\n')[1] == '  name: Jane User'
+
+
+def test_validation_latency_for_typical_cv():
+    """Test that a typical CV is validated well within the interactive budget."""
+    document = TemplateIndex().get('default')
+    validate_document(document)
+
+    start = time.perf_counter()
+    for _ in range(5):
+        assert validate_document(document) == []
+    assert (time.perf_counter() - start) / 5 < 0.05
+
+
+def _frame(message):
+    body = json.dumps(message).encode('utf-8')
+    return f'Content-Length: {len(body)}\r\n\r\n'.encode('ascii') + body
+
+
+def _read_all(data):
+    server = CVLanguageServer(io.BytesIO(data), io.BytesIO())
+    messages = []
+    while True:
+        message = server.read_message()
+        if message is None:
+            return messages
+        messages.append(message)
+
+
+def test_server_protocol_round_trip():
+    """Test a short editing session over JSON-RPC."""
+    uri = 'file:///cv.yaml'
+    requests = b''.join(_frame(message) for message in [
+        {'jsonrpc': '2.0', 'id': 1, 'method': 'initialize', 'params': {}},
+        {'jsonrpc': '2.0', 'method': 'textDocument/didOpen',
+         'params': {'textDocument': {'uri': uri, 'languageId': 'yaml', 'version': 1, 'text': CV_YAML}}},
+        {'jsonrpc': '2.0', 'method': 'textDocument/didChange',
+         'params': {'textDocument': {'uri': uri, 'version': 2}, 'contentChanges': [
+             {'range': {'start': {'line': 6, 'character': 16}, 'end': {'line': 6, 'character': 20}},
+              'text': '"2015"'}]}},
+        {'jsonrpc': '2.0', 'id': 2, 'method': 'shutdown'},
+        {'jsonrpc': '2.0', 'method': 'exit'},
+    ])
+    output = io.BytesIO()
+    server = CVLanguageServer(io.BytesIO(requests), output)
+    server.serve()
+
+    responses = _read_all(output.getvalue())
+    assert responses[0]['result']['capabilities']['completionProvider'] is not None
+    diagnostics = [r['params']['diagnostics'] for r in responses if r.get('method') == 'textDocument/publishDiagnostics']
+    assert len(diagnostics[0]) == 1
+    assert diagnostics[1] == []
+    assert server.shutdown_requested
+    assert server.last_validation_ms < 50
+
+
+def test_bad_messages_do_not_end_the_session():
+    """Test that malformed messages get error responses and later messages are still handled."""
+    uri = 'file:///cv.yaml'
+    requests = b''.join(_frame(message) for message in [
+        {'jsonrpc': '2.0', 'method': 'textDocument/didOpen', 'params': {}},
+        {'jsonrpc': '2.0', 'id': 1, 'method': 'textDocument/completion', 'params': {'textDocument': {'uri': uri}}},
+    ]) + b'Content-Length: 8\r\n\r\n{"broken' + _frame(
+        {'jsonrpc': '2.0', 'method': 'textDocument/didOpen',
+         'params': {'textDocument': {'uri': uri, 'languageId': 'yaml', 'version': 1, 'text': CV_YAML}}})
+    output = io.BytesIO()
+    server = CVLanguageServer(io.BytesIO(requests), output)
+    server.serve()
+
+    invalid, parse_error, diagnostics = _read_all(output.getvalue())
+    assert (invalid['id'], invalid['error']['code']) == (1, -32602)
+    assert (parse_error['id'], parse_error['error']['code']) == (None, -32700)
+    assert len(diagnostics['params']['diagnostics']) == 1
+
+
+def test_positions_are_utf16_unless_utf32_is_negotiated():
+    """Test edits and diagnostics on lines with characters outside the Basic Multilingual Plane."""
+    text = CV_YAML.replace('Test User', '\U0001F600 User').replace('2015', '"2015"') + 'skills: "\U0001F600\U0001F600" x\n'
+    # The emoji is two UTF-16 code units
+    change = {'range': {'start': {'line': 1, 'character': 11}, 'end': {'line': 1, 'character': 15}}, 'text': 'Jane'}
+    assert apply_change(text, change).split('\n')[1] == '  name: \U0001F600 Jane'
+    change['range']['start']['character'] = 10
+    change['range']['end']['character'] = 14
+    assert apply_change(text, change, 'utf-32').split('\n')[1] == '  name: \U0001F600 Jane'
+
+    for encodings, character in ((['utf-16'], 15), (['utf-32', 'utf-16'], 13)):
+        requests = b''.join(_frame(message) for message in [
+            {'jsonrpc': '2.0', 'id': 1, 'method': 'initialize',
+             'params': {'capabilities': {'general': {'positionEncodings': encodings}}}},
+            {'jsonrpc': '2.0', 'method': 'textDocument/didOpen',
+             'params': {'textDocument': {'uri': 'untitled:cv', 'languageId': 'yaml', 'version': 1, 'text': text}}},
+        ])
+        output = io.BytesIO()
+        CVLanguageServer(io.BytesIO(requests), output).serve()
+        initialized, published = _read_all(output.getvalue())
+        assert initialized['result']['capabilities']['positionEncoding'] == encodings[0]
+        diagnostic, = published['params']['diagnostics']
+        assert diagnostic['range']['start'] == {'line': 12, 'character': character}
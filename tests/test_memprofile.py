@@ -0,0 +1,90 @@
+"""Tests for memory profiling of the render stages."""
+
+import json
+import os
+import tracemalloc
+
+from click.testing import CliRunner
+
+from cv_builder_from_yaml_to_pdf.batch import STATUS_OK, run_batch
+from cv_builder_from_yaml_to_pdf.main import cli
+from cv_builder_from_yaml_to_pdf.memprofile import DOCUMENT, MemoryProfiler
+from cv_builder_from_yaml_to_pdf.pipeline import STAGES, RenderPipeline
+
+from benchmarks.common import make_large_cv
+from tests.test_batch import CV_YAML
+
+
+def test_profiler_measures_stages_and_growth():
+    """Test per-stage statistics, sampling and that memory kept between documents shows up as growth."""
+    text = make_large_cv(3).model_dump_json()
+    pipeline = RenderPipeline()
+    profiler = MemoryProfiler(every=2)
+    profiler.attach(pipeline)
+    leaked = []
+    pipeline.after('write', lambda context: leaked.append(bytearray(200000)))
+    try:
+        for _ in range(5):
+            pipeline.run(text=text)
+    finally:
+        profiler.close()
+    assert not tracemalloc.is_tracing()
+
+    report = profiler.report()
+    assert (report['documents'], report['profiled']) == (5, 3)
+    assert list(report['phases']) == list(STAGES) + [DOCUMENT]
+    build = report['phases']['build_flowables']
+    assert build['count'] == 3
+    assert build['peak_bytes_max'] >= build['retained_bytes_max'] > 0
+    assert any('pdf_generator.py' in site['site'] for site in build['top_sites'])
+    assert report['phases']['load']['top_sites']
+
+    # Two documents' worth of leaked buffers between profiled documents
+    growth = report['growth']
+    assert growth['intervals'] == 2
+    assert growth['bytes_per_document'] >= 400000
+    assert growth['top_sites'][0]['site'].endswith(f"test_memprofile.py:{_leak_line()}")
+
+    text = profiler.text(report)
+    assert "Memory profile of 3 of 5 documents" in text
+    assert "Top allocation sites retained by build_flowables:" in text
+
+
+def _leak_line():
+    with open(__file__) as f:
+        return next(n for n, line in enumerate(f, 1) if 'bytearray(200000)' in line)
+
+
+def test_batch_merges_worker_memory_profiles(tmp_path):
+    """Test that statistics from batch worker processes are merged and written as JSON and text."""
+    sources = []
+    for i in range(3):
+        source = tmp_path / f'cv{i}.yaml'
+        source.write_text(CV_YAML)
+        sources.append(str(source))
+    profiler = MemoryProfiler()
+    results = list(run_batch(sources, str(tmp_path / 'out'), workers=2, memory_profiler=profiler))
+    assert all(result.status == STATUS_OK for result in results)
+    assert (profiler.documents, profiler.profiled) == (3, 3)
+
+    path = str(tmp_path / 'memory.json')
+    assert profiler.write(path) == [path, str(tmp_path / 'memory.txt')]
+    with open(path) as f:
+        assert json.load(f)['phases']['layout']['count'] == 3
+    assert (tmp_path / 'memory.txt').read_text().startswith("Memory profile of 3 of 3 documents")
+
+
+def test_memprofile_option(tmp_path):
+    """Test the --memprofile option of the generate and batch commands."""
+    source = tmp_path / 'cv.yaml'
+    source.write_text(CV_YAML)
+    memprofile = str(tmp_path / 'generate.json')
+    result = CliRunner().invoke(cli, ['generate', str(source), '--memprofile', memprofile])
+    assert result.exit_code == 0, result.output
+    assert f"Wrote memory profile: {memprofile}" in result.output
+    assert os.path.exists(tmp_path / 'generate.txt')
+    assert not tracemalloc.is_tracing()
+
+    result = CliRunner().invoke(cli, ['batch', str(source), '-d', str(tmp_path / 'out'), '-w', '2',
+                                      '--executor', 'thread', '--memprofile', memprofile])
+    assert result.exit_code == 2
@@ -0,0 +1,149 @@
+"""Tests for the metrics registry and render metrics."""
+
+import os
+import tempfile
+import urllib.request
+
+import pytest
+from click.testing import CliRunner
+
+from cv_builder_from_yaml_to_pdf.batch import run_batch
+from cv_builder_from_yaml_to_pdf.main import cli
+from cv_builder_from_yaml_to_pdf.metrics import METRICS, MetricsRegistry, RenderMetrics, serve_metrics
+from cv_builder_from_yaml_to_pdf.pipeline import CVValidationError, RenderPipeline
+
+
+VALID_YAML = '''
+personal_info:
+  name: Test User
+  email: test@example.com
+education:
+  - institution: Test University
+    degree: Test Degree
+    start_date: "2015"
+experience:
+  - company: Test Company
+    roles:
+      - title: Test Title
+        start_date: "2019"
+'''
+
+INVALID_YAML = '''
+personal_info:
+  name: Test User
+  email: not-an-email
+education:
+  - institution: Test University
+    degree: Test Degree
+    start_date: "2015"
+experience:
+  - company: Test Company
+    roles:
+      - start_date: "2019"
+'''
+
+
+def test_exposition_format():
+    """Test counters and histograms in the Prometheus text format."""
+    registry = MetricsRegistry()
+    counter = registry.counter('jobs_total', 'Jobs done.', ('kind',))
+    counter.labels(kind='a "quoted"\nvalue').inc(2)
+    histogram = registry.histogram('latency_seconds', 'Latency.', buckets=(0.1, 1.0))
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+
+    text = registry.exposition()
+    assert '# TYPE jobs_total counter' in text
+    assert 'jobs_total{kind="a \\"quoted\\"\\nvalue"} 2' in text
+    assert '# TYPE latency_seconds histogram' in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1"} 2' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in text
+    assert 'latency_seconds_sum 5.55' in text
+    assert 'latency_seconds_count 3' in text
+
+    # The same definition returns the existing metric; a different one is rejected
+    assert registry.counter('jobs_total', 'Jobs done.', ('kind',)) is counter
+    with pytest.raises(ValueError):
+        registry.histogram('jobs_total', 'Jobs done.', ('kind',))
+    with pytest.raises(ValueError):
+        counter.labels(other='x')
+
+
+def test_pipeline_metrics_record_successes_and_failures():
+    """Test that an attached pipeline records stage latencies, pages, bytes and validation failures."""
+    metrics = RenderMetrics(MetricsRegistry())
+    pipeline = RenderPipeline(style='minimal')
+    metrics.attach(pipeline)
+
+    context = pipeline.run(text=VALID_YAML)
+    with pytest.raises(CVValidationError):
+        pipeline.run(text=INVALID_YAML)
+
+    text = metrics.registry.exposition()
+    assert 'cv_builder_documents_total{style="minimal",status="ok"} 1' in text
+    assert 'cv_builder_documents_total{style="minimal",status="invalid"} 1' in text
+    assert 'cv_builder_render_stage_seconds_count{stage="layout",style="minimal"} 1' in text
+    assert 'cv_builder_render_stage_seconds_count{stage="validate",style="minimal"} 2' in text
+    assert 'cv_builder_pages_bucket{style="minimal",le="1"} 1' in text
+    assert f'cv_builder_output_bytes_total{{style="minimal"}} {len(context.pdf)}' in text
+    assert 'cv_builder_validation_failures_total{location="personal_info.email"} 1' in text
+    assert 'cv_builder_validation_failures_total{location="experience.*.roles.*.title"} 1' in text
+
+
+def test_metrics_http_endpoint():
+    """Test serving a registry over HTTP."""
+    registry = MetricsRegistry()
+    registry.counter('up_total', 'Up.').inc()
+    server = serve_metrics(registry, port=0)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url, timeout=5) as response:
+            assert response.headers.get_content_type() == 'text/plain'
+            assert b'up_total 1' in response.read()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_batch_writes_metrics_textfile():
+    """Test that batch writes a metrics textfile covering the run."""
+    runner = CliRunner()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        sources = []
+        for name, text in (('good.yaml', VALID_YAML), ('bad.yaml', INVALID_YAML)):
+            sources.append(os.path.join(temp_dir, name))
+            with open(sources[-1], 'w') as f:
+                f.write(text)
+        textfile = os.path.join(temp_dir, 'metrics', 'cv_builder.prom')
+
+        result = runner.invoke(cli, ['batch', *sources, '-d', os.path.join(temp_dir, 'out'), '-w', '1',
+                                     '--metrics-textfile', textfile])
+        assert result.exit_code == 1
+
+        with open(textfile) as f:
+            text = f.read()
+        assert 'cv_builder_documents_total{style="classic",status="ok"}' in text
+        assert 'cv_builder_documents_total{style="classic",status="invalid"}' in text
+        assert 'cv_builder_validation_failures_total{location="personal_info.email"}' in text
+        assert os.listdir(os.path.dirname(textfile)) == ['cv_builder.prom']
+
+
+def test_cache_lookups_in_worker_processes_are_merged():
+    """Test that cache lookups made by batch worker processes are counted in the parent."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        sources = []
+        for i in range(4):
+            sources.append(os.path.join(temp_dir, f'cv{i}.yaml'))
+            with open(sources[-1], 'w') as f:
+                f.write(VALID_YAML)
+        before = METRICS.cache_counts()
+
+        results = list(run_batch(sources, None, workers=2))
+
+        counts = METRICS.cache_counts(since=before)
+        # Every document looks up the same paragraphs, in one of the two workers
+        assert sum(counts['wrap'].values()) > 0 and counts['wrap']['hit'] > 0
+        assert all(result.cache_requests for result in results)
+        assert 'cache_requests' not in results[0].model_dump()
@@ -0,0 +1,76 @@
+"""Tests for candidate packs."""
+
+import io
+import os
+import tempfile
+
+from click.testing import CliRunner
+
+from cv_builder_from_yaml_to_pdf.main import cli
+from cv_builder_from_yaml_to_pdf.pack import Candidate, render_pack
+from cv_builder_from_yaml_to_pdf.pdf_generator import Renderer
+
+from benchmarks.common import make_large_cv
+from tests.test_batch import _write_sources
+
+
+def _candidates(count):
+    candidates = []
+    for i in range(count):
+        cv = make_large_cv(1 + i, roles_per_company=2, achievements_per_role=3)
+        cv.personal_info.name = f"Candidate {i}"
+        candidates.append(Candidate(title=cv.personal_info.name, source=f"cv{i}.yaml", cv=cv))
+    return candidates
+
+
+def test_render_pack():
+    """Test that every candidate starts on a new page, with a bookmark and an outline entry."""
+    renderer = Renderer()
+    candidates = _candidates(4)
+    pdf = io.BytesIO()
+    result = render_pack(renderer, candidates, pdf)
+    data = pdf.getvalue()
+
+    first_pages = [entry.first_page for entry in result.entries]
+    assert first_pages[0] == 2
+    assert first_pages == sorted(set(first_pages))
+    assert result.pages > first_pages[-1]
+    assert [entry.title for entry in result.entries] == [c.title for c in candidates]
+    assert data.count(b'/Subtype /Form') == 4
+    assert b'/Outlines' in data and b'/PageMode /UseOutlines' in data
+
+    # Shared fonts and resources make the pack smaller than the separate CVs
+    assert len(data) < sum(len(renderer.render(candidate.cv)) for candidate in candidates)
+
+
+def test_render_pack_without_toc():
+    """Test a pack that starts straight with the first CV."""
+    result = render_pack(Renderer(streaming=True), _candidates(2), io.BytesIO(), toc=False)
+    assert result.entries[0].first_page == 1
+    assert result.entries[1].first_page > 1
+
+
+def test_pack_command():
+    """Test the pack CLI command, including invalid CVs."""
+    runner = CliRunner()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        sources = _write_sources(temp_dir, 2, invalid=1)
+        output = os.path.join(temp_dir, 'pack.pdf')
+
+        result = runner.invoke(cli, ['pack', *sources, '-o', output])
+        assert result.exit_code == 1
+        assert 'cv2.yaml' in result.stderr
+        assert not os.path.exists(output)
+
+        result = runner.invoke(cli, ['pack', *sources, '-o', output, '--skip-invalid'])
+        assert result.exit_code == 0, result.output
+        assert 'Packed 2 CVs' in result.stdout
+        with open(output, 'rb') as f:
+            assert f.read().startswith(b'%PDF')
+
+        result = runner.invoke(cli, ['pack', sources[0], '-o', '-'])
+        assert result.exit_code == 0
+        assert result.stdout_bytes.startswith(b'%PDF')
+        assert 'Packed 1 CVs' in result.stderr
+
+        assert runner.invoke(cli, ['pack', '-o', output]).exit_code == 2
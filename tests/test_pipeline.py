@@ -0,0 +1,143 @@
+"""Tests for the reusable render pipeline."""
+
+import os
+import tempfile
+
+import pytest
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import Paragraph
+
+from cv_builder_from_yaml_to_pdf.pipeline import CVValidationError, RenderPipeline, STAGES
+
+
+CV_YAML = '''
+personal_info:
+  name: Test User
+  email: test@example.com
+education:
+  - institution: Test University
+    degree: Test Degree
+    start_date: "2015"
+experience:
+  - company: Test Company
+    roles:
+      - title: Test Title
+        start_date: "2019"
+'''
+
+
+def test_pipeline_renders_many_documents_in_memory_and_to_files():
+    """Test that one pipeline renders several documents, with and without an output path."""
+    pipeline = RenderPipeline()
+
+    context = pipeline.run(text=CV_YAML)
+    assert context.pdf.startswith(b'%PDF')
+    assert context.pages == 1
+    assert context.written_path is None
+    assert set(context.timings) == set(STAGES)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source = os.path.join(temp_dir, 'cv.yaml')
+        with open(source, 'w') as f:
+            f.write(CV_YAML)
+        results = list(pipeline.run_many([source, source], os.path.join(temp_dir, 'out')))
+        assert [os.path.basename(r.written_path) for r in results] == ['cv.pdf', 'cv.pdf']
+        assert os.path.exists(results[0].written_path)
+
+
+def test_hooks_run_around_each_stage():
+    """Test that before and after hooks are called in stage order."""
+    calls = []
+    pipeline = RenderPipeline()
+    for stage in STAGES:
+        pipeline.before(stage, lambda context, stage=stage: calls.append(('before', stage)))
+        pipeline.after(stage, lambda context, stage=stage: calls.append(('after', stage)))
+
+    pipeline.run(text=CV_YAML)
+
+    assert calls == [(when, stage) for stage in STAGES for when in ('before', 'after')]
+
+
+def test_before_hook_can_skip_a_stage():
+    """Test that a stage is skipped when a hook already provided its output."""
+    cached = RenderPipeline().run(text=CV_YAML).pdf
+    pipeline = RenderPipeline()
+    pipeline.before('layout', lambda context: setattr(context, 'pdf', cached))
+
+    context = pipeline.run(text=CV_YAML)
+
+    assert context.pdf is cached
+
+
+def test_after_hook_can_add_custom_sections():
+    """Test that flowables can be appended after the build stage."""
+    style = getSampleStyleSheet()['Normal']
+    pipeline = RenderPipeline()
+    pipeline.after('build_flowables', lambda context: context.flowables.extend(
+        Paragraph(f'Custom line {i}', style) for i in range(100)
+    ))
+
+    context = pipeline.run(text=CV_YAML)
+
+    # The extra content no longer fits on the single page of the plain CV
+    assert context.pages == 2
+
+
+def test_validation_errors_are_raised():
+    """Test that invalid data raises CVValidationError with the error list."""
+    with pytest.raises(CVValidationError) as excinfo:
+        RenderPipeline().run(text='personal_info:\n  name: No Email\n')
+    assert any('email' in error for error in excinfo.value.errors)
+
+
+def test_invalid_stage_name():
+    """Test that hooks can only be registered for known stages."""
+    with pytest.raises(ValueError):
+        RenderPipeline().after('print', lambda context: None)
+
+
+def test_renderer_reuse_matches_one_shot_generation():
+    """Test that a reused Renderer produces the same PDF as a one-shot generator."""
+    from reportlab import rl_config
+    from cv_builder_from_yaml_to_pdf.pdf_generator import Renderer, generate_cv_pdf
+    from cv_builder_from_yaml_to_pdf.yaml_parser import parse_yaml_string, validate_cv_data
+
+    cv = validate_cv_data(parse_yaml_string(CV_YAML))
+    invariant = rl_config.invariant
+    rl_config.invariant = 1
+    try:
+        renderer = Renderer(style='minimal', page_size='letter')
+        first = renderer.render(cv)
+        second = renderer.render(cv)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_path = os.path.join(temp_dir, 'cv.pdf')
+            generate_cv_pdf(cv, output_path, style='minimal', page_size='letter')
+            with open(output_path, 'rb') as f:
+                one_shot = f.read()
+    finally:
+        rl_config.invariant = invariant
+
+    assert first == second == one_shot
+
+
+def test_renderer_applies_font_overrides_and_margins():
+    """Test that renderer configuration is applied to its styles and page templates."""
+    from cv_builder_from_yaml_to_pdf.pdf_generator import Renderer
+
+    renderer = Renderer(margins={'left': 20}, fonts={'Name': 'Courier'})
+    assert renderer.styles['Name'].fontName == 'Courier'
+    assert renderer.create_document().pageTemplates[0].frames[0]._x1 == 20
+
+    pipeline = RenderPipeline(renderer=renderer)
+    assert pipeline.renderer is renderer
+    assert pipeline.run(text=CV_YAML).pdf.startswith(b'%PDF')
+
+
+def test_pipeline_skips_stages_before_supplied_cv():
+    """Test that rendering a validated CV skips loading and validation."""
+    from cv_builder_from_yaml_to_pdf.yaml_parser import parse_yaml_string, validate_cv_data
+
+    cv = validate_cv_data(parse_yaml_string(CV_YAML))
+    context = RenderPipeline().run(cv=cv)
+    assert context.data is None
+    assert context.pdf.startswith(b'%PDF')
@@ -0,0 +1,109 @@
+"""Tests for rendering CV text as plain text, and as markup for opted-in fields."""
+
+from xml.sax.saxutils import escape
+
+import pytest
+from click.testing import CliRunner
+from reportlab import rl_config
+from reportlab.platypus import ListFlowable, Paragraph
+
+from cv_builder_from_yaml_to_pdf.main import cli
+from cv_builder_from_yaml_to_pdf.pdf_generator import MARKUP_FIELDS, Renderer
+from cv_builder_from_yaml_to_pdf.pipeline import RenderPipeline
+from cv_builder_from_yaml_to_pdf.wrap_cache import WrapCache
+
+from benchmarks.common import make_large_cv
+from tests.test_batch import CV_YAML
+
+
+# Text the markup parser rejects or changes
+MARKUP_TEXTS = ["AT&T <font size=80>", "<f", "a < b > c", "&nbsp; C&amp;C &#9999999;", "</i><br/>"]
+
+CV_WITH_MARKUP = CV_YAML + '''
+        achievements:
+          - "Shipped <b>v2</b> <f"
+'''
+
+
+@pytest.fixture
+def deterministic_output():
+    """Make reportlab output depend only on the document content."""
+    invariant = rl_config.invariant
+    rl_config.invariant = 1
+    try:
+        yield
+    finally:
+        rl_config.invariant = invariant
+
+
+def _achievements(renderer, cv):
+    """Get the achievement paragraphs of a rendered CV."""
+    return [item._flowables[0] for flowable in renderer.build_flowables(cv) if isinstance(flowable, ListFlowable)
+            for item in flowable._flowables]
+
+
+@pytest.mark.parametrize('style', ['classic', 'modern', 'minimal'])
+def test_plain_text_matches_markup_parser(deterministic_output, style):
+    """Test that plain paragraphs lay out exactly like the parsed escaped text."""
+    cv = make_large_cv(3)
+    plain = Renderer(style, wrap_cache=WrapCache(max_entries=0))
+    parsed = Renderer(style, wrap_cache=WrapCache(max_entries=0), markup_fields=MARKUP_FIELDS)
+    assert plain.render(cv) == parsed.render(cv)
+
+    # The parser splits text at entities, which changes the PDF operators but not the lines
+    texts = MARKUP_TEXTS + ["  Lead\n engineer   at AT&T  \n\n<b>not bold</b>", "", " \n "]
+    width = plain.frame_geometry[2]
+    for text in texts:
+        for style_name in ('Name', 'Normal', 'ExperienceTitle'):
+            paragraph = plain.paragraph(text, style_name)
+            expected = parsed.paragraph(escape(text), style_name, markup=True)
+            assert paragraph.getPlainText() == expected.getPlainText()
+            assert paragraph.wrap(width, 1000) == expected.wrap(width, 1000)
+            assert len(paragraph.blPara.lines) == len(expected.blPara.lines)
+
+
+def test_markup_characters_are_printed_as_written():
+    """Test that markup characters in plain fields render literally instead of failing."""
+    cv = make_large_cv(1, roles_per_company=1, achievements_per_role=0)
+    cv.experience[0].roles[0].achievements = MARKUP_TEXTS
+    renderer = Renderer()
+    assert [p.getPlainText() for p in _achievements(renderer, cv)] == MARKUP_TEXTS
+    assert renderer.render(cv).startswith(b'%PDF')
+
+    # Equivalent plain and markup paragraphs share cached line breaks
+    paragraph = renderer.paragraph("AT&T", 'Normal')
+    assert paragraph._wrap_key == renderer.paragraph("AT&amp;T", 'Normal', markup=True)._wrap_key
+    assert renderer.paragraph("", 'Normal').frags == []
+
+
+def test_markup_fields_opt_in():
+    """Test that only opted-in fields are parsed as markup."""
+    cv = make_large_cv(1, roles_per_company=1, achievements_per_role=0)
+    cv.experience[0].roles[0].achievements = ["<b>Bold</b> claim"]
+    cv.experience[0].roles[0].description = "<b>Plain</b>"
+
+    renderer = Renderer(markup_fields=['achievements'])
+    achievement, = _achievements(renderer, cv)
+    assert achievement.getPlainText() == "Bold claim"
+    assert achievement.frags[0].fontName.endswith('-Bold')
+    descriptions = [flowable.getPlainText() for flowable in renderer.build_flowables(cv)
+                    if isinstance(flowable, Paragraph) and 'Plain' in flowable.getPlainText()]
+    assert descriptions == ["<b>Plain</b>"]
+
+    with pytest.raises(ValueError, match="Unknown markup fields: bio"):
+        RenderPipeline(markup_fields=['summary', 'bio'])
+
+
+def test_markup_option(tmp_path):
+    """Test the --markup option of the generate command."""
+    source = tmp_path / 'cv.yaml'
+    source.write_text(CV_WITH_MARKUP)
+    result = CliRunner().invoke(cli, ['generate', str(source), '--markup', 'achievements'])
+    # "<f" is not valid markup
+    assert result.exit_code != 0
+
+    source.write_text(CV_WITH_MARKUP.replace("<f", "&lt;f"))
+    result = CliRunner().invoke(cli, ['generate', str(source), '--markup', 'achievements'])
+    assert result.exit_code == 0, result.output
+    result = CliRunner().invoke(cli, ['generate', str(source), '--markup', 'bio'])
+    assert result.exit_code == 2
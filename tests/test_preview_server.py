@@ -0,0 +1,110 @@
+"""Tests for the live preview server."""
+
+import json
+import os
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from cv_builder_from_yaml_to_pdf.preview_server import PreviewServer
+
+
+CV_YAML = '''
+personal_info:
+  name: {name}
+  email: test@example.com
+education:
+  - institution: Test University
+    degree: Test Degree
+    start_date: "2015"
+experience:
+  - company: Test Company
+    roles:
+      - title: Test Title
+        start_date: "2019"
+        achievements:
+          - Shipped <things> & more
+'''
+
+
+@pytest.fixture
+def preview():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source = os.path.join(temp_dir, 'cv.yaml')
+        with open(source, 'w') as f:
+            f.write(CV_YAML.format(name='First Name'))
+        server = PreviewServer(source, port=0, poll_interval=0.05)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            yield server, source
+        finally:
+            server.shutdown()
+            server.server_close()
+            thread.join(5)
+
+
+def _get(server, path):
+    with urllib.request.urlopen(server.url.rstrip('/') + path, timeout=5) as response:
+        return response.headers.get_content_type(), response.read()
+
+
+def _rewrite(source, text):
+    # Make sure the modification time moves even on coarse-grained filesystems
+    mtime = os.stat(source).st_mtime_ns
+    with open(source, 'w') as f:
+        f.write(text)
+    os.utime(source, ns=(mtime + 10 ** 9, mtime + 10 ** 9))
+
+
+def test_serves_pdf_html_and_status(preview):
+    """Test that the server renders on start and serves all routes."""
+    server, _ = preview
+
+    content_type, body = _get(server, '/cv.pdf')
+    assert content_type == 'application/pdf'
+    assert body.startswith(b'%PDF')
+
+    content_type, body = _get(server, '/cv.html')
+    assert content_type == 'text/html'
+    assert b'<h1>First Name</h1>' in body
+    assert b'Shipped &lt;things&gt; &amp; more' in body
+
+    _, body = _get(server, '/')
+    assert b'/cv.pdf?v=1' in body
+    assert b'EventSource' in body
+
+    status = json.loads(_get(server, '/status')[1])
+    assert status['version'] == 1
+    assert status['errors'] == []
+
+    with pytest.raises(urllib.error.HTTPError):
+        _get(server, '/missing')
+
+
+def test_reload_event_after_file_change(preview):
+    """Test that editing the file re-renders it and pushes a reload event."""
+    server, source = preview
+    response = urllib.request.urlopen(server.url + 'events', timeout=5)
+    assert response.headers.get_content_type() == 'text/event-stream'
+
+    _rewrite(source, CV_YAML.format(name='Second Name'))
+    assert response.readline() == b'event: reload\n'
+    assert response.readline() == b'data: 2\n'
+    response.close()
+    assert b'Second Name' in _get(server, '/cv.html')[1]
+
+    # An invalid edit keeps the last good PDF and reports the errors
+    pdf = server.state.pdf
+    _rewrite(source, 'personal_info: {}\n')
+    deadline = time.time() + 5
+    while server.state.version < 3 and time.time() < deadline:
+        time.sleep(0.02)
+    status = json.loads(_get(server, '/status')[1])
+    assert status['version'] == 3
+    assert status['errors']
+    assert _get(server, '/cv.pdf')[1] == pdf
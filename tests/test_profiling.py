@@ -0,0 +1,69 @@
+"""Tests for render profiling."""
+
+import os
+import pstats
+import tempfile
+
+from cv_builder_from_yaml_to_pdf.batch import run_batch, STATUS_OK
+from cv_builder_from_yaml_to_pdf.pipeline import RenderPipeline
+from cv_builder_from_yaml_to_pdf.profiling import RenderProfiler, RENDER_STAGES
+
+from benchmarks.common import make_large_cv
+
+
+def _check_folded(text):
+    lines = text.splitlines()
+    assert lines
+    for line in lines:
+        stack, count = line.rsplit(' ', 1)
+        assert int(count) > 0
+        assert stack.split(';')[0] in RENDER_STAGES
+
+
+def test_profiler_covers_only_sampled_render_stages():
+    """Test that only every n-th document is profiled and only its render stages."""
+    cv = make_large_cv(10)
+    pipeline = RenderPipeline()
+    profiler = RenderProfiler(every=2)
+    profiler.attach(pipeline)
+    for _ in range(3):
+        pipeline.run(cv=cv)
+
+    assert profiler.documents == 3
+    assert profiler.sampled == 2
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cprofile_path = os.path.join(temp_dir, 'out.pstats')
+        folded_path = os.path.join(temp_dir, 'out.folded')
+        assert profiler.write(cprofile_path, folded_path) == [cprofile_path, folded_path]
+
+        stats = pstats.Stats(cprofile_path)
+        functions = {(os.path.basename(filename), name): counts[0]
+                     for (filename, _, name), counts in stats.stats.items()}
+        assert functions[('doctemplate.py', 'build')] == 2
+        assert ('yaml_parser.py', 'validate_cv_data') not in functions
+
+        with open(folded_path) as f:
+            _check_folded(f.read())
+
+
+def test_batch_merges_worker_profiles():
+    """Test that profiles from batch worker processes are merged by the parent."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        sources = []
+        for i in range(2):
+            source = os.path.join(temp_dir, f'cv{i}.json')
+            with open(source, 'w') as f:
+                f.write(make_large_cv(3).model_dump_json())
+            sources.append(source)
+
+        profiler = RenderProfiler(flamegraph=False)
+        results = list(run_batch(sources, os.path.join(temp_dir, 'out'), workers=2, profiler=profiler))
+        assert all(result.status == STATUS_OK for result in results)
+
+        cprofile_path = os.path.join(temp_dir, 'out.pstats')
+        assert profiler.write(cprofile_path) == [cprofile_path]
+        stats = pstats.Stats(cprofile_path)
+        builds = [counts[0] for (filename, _, name), counts in stats.stats.items()
+                  if name == 'build' and filename.endswith('doctemplate.py')]
+        assert builds == [2]
@@ -0,0 +1,111 @@
+"""Tests for the incremental full-text and skill index."""
+
+import json
+import os
+
+import pytest
+from click.testing import CliRunner
+
+from cv_builder_from_yaml_to_pdf.main import cli
+from cv_builder_from_yaml_to_pdf.search_index import (INDEX_ADDED, INDEX_INVALID, INDEX_REMOVED, INDEX_UNCHANGED,
+                                                      INDEX_UPDATED, CVIndex, find_sources)
+
+from tests.test_batch import CV_YAML
+
+
+SKILLS = '''
+skills:
+  - category: Languages
+    name: C++
+  - category: Infrastructure
+    name: Kubernetes
+projects:
+  - name: Scheduler
+    technologies: [Rust, gRPC]
+'''
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    """A directory with two CVs, one of which includes a fragment, and an invalid file."""
+    cvs = tmp_path / 'cvs'
+    (cvs / 'team').mkdir(parents=True)
+    (cvs / 'plain.yaml').write_text(CV_YAML)
+    (cvs / 'team' / 'skills.yaml').write_text(SKILLS)
+    (cvs / 'team' / 'systems.yaml').write_text(CV_YAML.replace("Test User", "Sys Admin") + "skills: !include skills.yaml#skills\n"
+                                               "projects: !include skills.yaml#projects\n")
+    (cvs / 'notes.txt').write_text("not a CV")
+    return cvs
+
+
+def _statuses(results):
+    return {os.path.basename(result.path): result.status for result in results}
+
+
+def test_incremental_update(corpus, tmp_path):
+    """Test that only new, changed and removed files are re-indexed."""
+    sources = find_sources([str(corpus)])
+    assert [os.path.relpath(path, corpus) for path in sources] == ['plain.yaml', os.path.join('team', 'skills.yaml'),
+                                                                   os.path.join('team', 'systems.yaml')]
+    with CVIndex(str(tmp_path / 'index.db')) as index:
+        results = list(index.update(sources))
+        assert _statuses(results) == {'plain.yaml': INDEX_ADDED, 'skills.yaml': INDEX_INVALID,
+                                      'systems.yaml': INDEX_ADDED}
+        assert len(index) == 2
+        assert _statuses(index.update(sources)) == dict.fromkeys(_statuses(results), INDEX_UNCHANGED)
+
+        # Touched without changes, changed, and changed through a fragment
+        plain = corpus / 'plain.yaml'
+        os.utime(plain, ns=(0, 0))
+        assert _statuses(index.update(sources))['plain.yaml'] == INDEX_UNCHANGED
+        plain.write_text(CV_YAML.replace("Test User", "Renamed User"))
+        (corpus / 'team' / 'skills.yaml').write_text(SKILLS.replace("Kubernetes", "Nomad"))
+        assert _statuses(index.update(sources)) == {'plain.yaml': INDEX_UPDATED, 'skills.yaml': INDEX_INVALID,
+                                                    'systems.yaml': INDEX_UPDATED}
+        assert [hit.name for hit in index.search("renamed")] == ["Renamed User"]
+        assert [hit.name for hit in index.search("nomad")] == ["Sys Admin"]
+        assert index.search("kubernetes") == []
+
+        plain.unlink()
+        assert _statuses(index.update(find_sources([str(corpus)])))['plain.yaml'] == INDEX_REMOVED
+        assert len(index) == 1
+
+
+def test_search_fields_and_syntax(corpus, tmp_path):
+    """Test field filters, skill names with punctuation, prefixes and query errors."""
+    with CVIndex(str(tmp_path / 'index.db')) as index:
+        list(index.update(find_sources([str(corpus)]), workers=2))
+        hit, = index.search('"C++"', fields=['skills'])
+        assert (hit.name, hit.snippet) == ("Sys Admin", "Languages\nInfrastructure\n[C++]\nKubernetes")
+        assert [hit.name for hit in index.search("infra*")] == ["Sys Admin"]
+        assert [hit.name for hit in index.search("grpc", fields=['technologies'])] == ["Sys Admin"]
+        assert index.search("grpc", fields=['skills']) == []
+        assert len(index.search("test OR admin")) == 2
+
+        with pytest.raises(ValueError, match="Invalid search query"):
+            index.search('"unterminated')
+        with pytest.raises(ValueError, match="Unknown search fields: hobbies"):
+            index.search("chess", fields=['hobbies'])
+
+
+def test_index_and_search_commands(corpus, tmp_path):
+    """Test the index and search commands."""
+    db = str(tmp_path / 'index.db')
+    result = CliRunner().invoke(cli, ['index', str(corpus), '-i', db, '-w', '1'])
+    assert result.exit_code == 0, result.output
+    assert "Skipped" in result.stderr and "skills.yaml" in result.stderr
+    assert f"2 CVs in {db} (added: 2, invalid: 1)" in result.stdout
+
+    result = CliRunner().invoke(cli, ['index', str(corpus), '-i', db])
+    assert f"2 CVs in {db} (unchanged: 3)" in result.stdout
+
+    result = CliRunner().invoke(cli, ['search', 'kubernetes', '-i', db, '--json'])
+    assert result.exit_code == 0, result.output
+    hit, = [json.loads(line) for line in result.stdout.splitlines()]
+    assert hit['name'] == "Sys Admin" and hit['path'].endswith('systems.yaml')
+
+    result = CliRunner().invoke(cli, ['search', 'kubernetes', '-i', db, '-f', 'companies'])
+    assert "No matches" in result.stderr
+    result = CliRunner().invoke(cli, ['search', 'AND', '-i', db])
+    assert result.exit_code == 1
+    assert "Invalid search query" in result.stderr
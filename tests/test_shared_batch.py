@@ -0,0 +1,173 @@
+"""Tests for shared-directory batch rendering."""
+
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+
+import pytest
+from click.testing import CliRunner
+
+from cv_builder_from_yaml_to_pdf.batch import STATUS_INVALID, STATUS_OK
+from cv_builder_from_yaml_to_pdf.main import cli
+from cv_builder_from_yaml_to_pdf.shared_batch import SharedWorkDir, parse_shard, run_node, shard_of
+
+from tests.test_batch import _write_sources
+
+
+def _node(work_dir, node, shard=None):
+    run_node(work_dir, node, shard=shard, lease_seconds=5.0, poll_interval=0.05)
+
+
+def _run_nodes(work_dir, nodes):
+    context = multiprocessing.get_context('spawn')
+    processes = [context.Process(target=_node, args=(work_dir, *node)) for node in nodes]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(120)
+        assert process.exitcode == 0
+
+
+def test_nodes_share_work_without_duplicates():
+    """Test that several node processes render every item exactly once and merge a manifest."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        sources = _write_sources(temp_dir, 8, invalid=1)
+        work_dir = os.path.join(temp_dir, 'work')
+        shared = SharedWorkDir(work_dir)
+        assert shared.init(sources, os.path.join(temp_dir, 'out')) == 9
+        # Queuing the same files again adds nothing
+        assert shared.init(sources, os.path.join(temp_dir, 'out')) == 0
+
+        _run_nodes(work_dir, [('node-a',), ('node-b',), ('node-c',)])
+
+        with open(os.path.join(work_dir, 'manifest.json')) as f:
+            manifest = json.load(f)
+        assert manifest['complete'] is True
+        assert sorted(result['source'] for result in manifest['results']) == sorted(sources)
+        assert manifest['counts'] == {STATUS_OK: 8, STATUS_INVALID: 1}
+        assert set(manifest['nodes']) <= {'node-a', 'node-b', 'node-c'}
+        assert all(os.path.exists(result['output_path'])
+                   for result in manifest['results'] if result['status'] == STATUS_OK)
+
+
+def test_init_refuses_sources_with_the_same_output():
+    """Test that init queues nothing when two sources, new or queued before, would write the same PDF."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        sources = []
+        for team in ('a', 'b'):
+            os.mkdir(os.path.join(temp_dir, team))
+            sources += _write_sources(os.path.join(temp_dir, team), 1)
+        shared = SharedWorkDir(os.path.join(temp_dir, 'work'))
+        output_dir = os.path.join(temp_dir, 'out')
+
+        with pytest.raises(ValueError, match="would both be written to"):
+            shared.init(sources, output_dir)
+        assert shared.pending_ids() == []
+        assert shared.init(sources[:1], output_dir) == 1
+        with pytest.raises(ValueError, match="would both be written to"):
+            shared.init(sources[1:], output_dir)
+        assert len(shared.pending_ids()) == 1
+
+        result = CliRunner().invoke(cli, ['shared-init', os.path.join(temp_dir, 'work'), *sources, '-d', output_dir])
+        assert result.exit_code == 1
+        assert "would both be written to" in result.stderr
+
+
+def test_hash_sharding_partitions_items():
+    """Test that shard nodes only take their own items and together cover the batch."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        sources = _write_sources(temp_dir, 6)
+        work_dir = os.path.join(temp_dir, 'work')
+        shared = SharedWorkDir(work_dir)
+        shared.init(sources, os.path.join(temp_dir, 'out'))
+        items = shared.pending_ids()
+
+        results = run_node(work_dir, 'only-shard-0', shard=(0, 2), poll_interval=0.05)
+        assert sorted(result.id for result in results) == [item for item in items if shard_of(item, 2) == 0]
+        assert not os.path.exists(os.path.join(work_dir, 'manifest.json'))
+
+        _run_nodes(work_dir, [('shard-1', (1, 2))])
+        assert shared.is_finished()
+        assert [result.source for result in shared.results()] == sorted(sources)
+
+
+def test_stale_claim_is_reclaimed():
+    """Test that the claim of a dead node is taken over once its lease expires."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        sources = _write_sources(temp_dir, 2)
+        work_dir = os.path.join(temp_dir, 'work')
+        shared = SharedWorkDir(work_dir, lease_seconds=60.0)
+        shared.init(sources, os.path.join(temp_dir, 'out'))
+
+        # A node claims an item and dies without finishing it
+        item = shared.claim('dead-node')
+        assert shared.claims() == [(item.id, 'dead-node')]
+        assert shared.reclaim_stale() == []
+        claim_path = os.path.join(work_dir, 'claimed', f'{item.id}@dead-node.json')
+        old = time.time() - 120
+        os.utime(claim_path, (old, old))
+
+        results = run_node(work_dir, 'live-node', lease_seconds=60.0, poll_interval=0.05)
+
+        assert sorted(result.id for result in results) == sorted(shared.done_ids())
+        assert item.id in shared.done_ids()
+        assert shared.is_finished()
+        assert os.path.exists(os.path.join(work_dir, 'manifest.json'))
+
+
+def test_claim_survives_a_reclaim_right_after_the_rename(monkeypatch):
+    """Test that an item queued long ago is not reclaimed between its rename and the claim's heartbeat."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        work_dir = os.path.join(temp_dir, 'work')
+        SharedWorkDir(work_dir).init(_write_sources(temp_dir, 1), os.path.join(temp_dir, 'out'))
+        for lease_seconds, claimed in ((60.0, True), (-1.0, False)):
+            shared, other = SharedWorkDir(work_dir, lease_seconds), SharedWorkDir(work_dir, lease_seconds)
+            item, = shared.pending_ids()
+            os.utime(os.path.join(work_dir, 'pending', f'{item}.json'), (0, 0))
+            rename = os.rename
+
+            def rename_then_reclaim(source, destination):
+                rename(source, destination)
+                monkeypatch.setattr(os, 'rename', rename)
+                other.reclaim_stale()
+
+            monkeypatch.setattr(os, 'rename', rename_then_reclaim)
+            # A claim that is reclaimed anyway (here: by a negative lease) is skipped, not a crash
+            assert (shared.claim('node-a') is not None) == claimed
+            assert shared.pending_ids() == ([] if claimed else [item])
+            assert len(shared.claims()) == claimed
+            if claimed:
+                os.rename(shared._claim_path(item, 'node-a'), os.path.join(work_dir, 'pending', f'{item}.json'))
+
+
+def test_parse_shard():
+    """Test parsing INDEX/COUNT shard specifications."""
+    assert parse_shard('1/4') == (1, 4)
+    for value in ('4/4', '1', 'a/b', '0/0'):
+        with pytest.raises(ValueError):
+            parse_shard(value)
+
+
+def test_shared_commands():
+    """Test the shared-init, shared-node and shared-manifest commands."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        sources = _write_sources(temp_dir, 2)
+        work_dir = os.path.join(temp_dir, 'work')
+        runner = CliRunner()
+
+        result = runner.invoke(cli, ['shared-init', work_dir, *sources, '-d', os.path.join(temp_dir, 'out')])
+        assert result.exit_code == 0, result.output
+        assert "Queued 2 of 2 files" in result.output
+
+        result = runner.invoke(cli, ['shared-node', work_dir, '--node', 'cli-node', '--poll-interval', '0.05'])
+        assert result.exit_code == 0, result.output
+        assert "Node cli-node: 2 documents (ok: 2)" in result.output
+
+        result = runner.invoke(cli, ['shared-manifest', work_dir])
+        assert result.exit_code == 0, result.output
+        assert "0 pending, 0 claimed" in result.output
+
+        result = runner.invoke(cli, ['shared-node', work_dir, '--shard', '2/2'])
+        assert result.exit_code != 0
@@ -0,0 +1,121 @@
+"""Tests for JSON Lines and SQLite batch input sources."""
+
+import json
+import os
+import sqlite3
+import tempfile
+
+import yaml
+from click.testing import CliRunner
+
+from cv_builder_from_yaml_to_pdf.batch import run_batch, STATUS_INVALID, STATUS_OK
+from cv_builder_from_yaml_to_pdf.main import cli
+from cv_builder_from_yaml_to_pdf.sources import iter_jsonl, iter_sqlite
+
+from tests.test_batch import CV_YAML
+
+
+CV_JSON = json.dumps(yaml.safe_load(CV_YAML))
+
+
+def _write_jsonl(path, lines):
+    with open(path, 'w') as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def test_iter_jsonl_is_lazy():
+    """Test that JSON Lines records are read one line at a time, skipping blank lines."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, 'export.jsonl')
+        _write_jsonl(path, [CV_JSON, '', CV_JSON])
+
+        records = iter_jsonl(path)
+        first = next(records)
+        assert first.key == f"{path}:1" and first.name == 'export-1'
+        # Lines written after the first record was taken are still picked up
+        with open(path, 'a') as f:
+            f.write(CV_JSON + "\n")
+        assert [record.name for record in records] == ['export-3', 'export-4']
+
+
+def test_run_batch_with_records():
+    """Test rendering JSON Lines and SQLite records in worker processes."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        jsonl_path = os.path.join(temp_dir, 'export.jsonl')
+        _write_jsonl(jsonl_path, [CV_JSON, '{"personal_info": {}}', 'not json'])
+        database = os.path.join(temp_dir, 'cvs.db')
+        with sqlite3.connect(database) as connection:
+            connection.execute("CREATE TABLE cvs (id TEXT, data TEXT)")
+            connection.executemany("INSERT INTO cvs VALUES (?, ?)", [('alice', CV_JSON), ('bob/2', CV_JSON)])
+        connection.close()
+
+        output_dir = os.path.join(temp_dir, 'out')
+        sources = list(iter_jsonl(jsonl_path)) + list(iter_sqlite(database))
+        results = list(run_batch(sources, output_dir, workers=2, max_in_flight=2))
+
+        assert [result.source for result in results] == [f"{jsonl_path}:{n}" for n in (1, 2, 3)] + \
+            [f"{database}:alice", f"{database}:bob/2"]
+        assert [result.status for result in results] == [STATUS_OK, STATUS_INVALID, STATUS_INVALID,
+                                                         STATUS_OK, STATUS_OK]
+        assert results[1].error_locations and results[2].error_locations
+        assert sorted(os.listdir(output_dir)) == ['alice.pdf', 'bob_2.pdf', 'export-1.pdf']
+
+
+def test_batch_command_with_record_sources():
+    """Test the --jsonl and --sqlite options of the batch command."""
+    runner = CliRunner()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        jsonl_path = os.path.join(temp_dir, 'export.jsonl')
+        _write_jsonl(jsonl_path, [CV_JSON, CV_JSON])
+        database = os.path.join(temp_dir, 'cvs.db')
+        with sqlite3.connect(database) as connection:
+            connection.execute("CREATE TABLE people (name TEXT, cv TEXT)")
+            connection.execute("INSERT INTO people VALUES ('carol', ?)", (CV_JSON,))
+        connection.close()
+        output_dir = os.path.join(temp_dir, 'out')
+
+        result = runner.invoke(cli, ['batch', '--jsonl', jsonl_path, '--sqlite', database,
+                                     '--query', 'SELECT name, cv FROM people', '-d', output_dir, '-w', '1'])
+        assert result.exit_code == 0, result.output
+        assert '3 documents (ok: 3)' in result.output
+        assert sorted(os.listdir(output_dir)) == ['carol.pdf', 'export-1.pdf', 'export-2.pdf']
+
+        result = runner.invoke(cli, ['batch', '--sqlite', database, '--query', 'SELECT nope FROM people',
+                                     '-d', output_dir])
+        assert result.exit_code == 1
+        assert 'Error reading' in result.output
+
+        assert runner.invoke(cli, ['batch', '-d', output_dir]).exit_code == 2
+
+
+def test_unreadable_records_are_invalid():
+    """Test that a bad line or row fails only its own record, not the batch."""
+    runner = CliRunner()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        jsonl_path = os.path.join(temp_dir, 'export.jsonl')
+        with open(jsonl_path, 'wb') as f:
+            f.write(b'{"personal_info": "\xff"}\n' + CV_JSON.encode() + b'\n')
+        database = os.path.join(temp_dir, 'cvs.db')
+        with sqlite3.connect(database) as connection:
+            connection.execute("CREATE TABLE cvs (id TEXT, data)")
+            connection.executemany("INSERT INTO cvs VALUES (?, ?)", [('null', None), ('latin1', b'\xe9'),
+                                                                     ('alice', CV_JSON)])
+        connection.close()
+
+        records = list(iter_jsonl(jsonl_path)) + list(iter_sqlite(database)) + \
+            list(iter_sqlite(database, "SELECT id FROM cvs LIMIT 1"))
+        assert [record.key for record in records] == [f"{jsonl_path}:1", f"{jsonl_path}:2", f"{database}:null",
+                                                      f"{database}:latin1", f"{database}:alice",
+                                                      f"{database}:row 1"]
+        results = list(run_batch(records, None))
+        assert [result.status for result in results] == [STATUS_INVALID, STATUS_OK, STATUS_INVALID,
+                                                         STATUS_INVALID, STATUS_OK, STATUS_INVALID]
+        assert "not valid UTF-8" in results[0].error
+        assert results[2].error == "CV column is NULL, not JSON text"
+        assert "Query returned 1 columns" in results[5].error
+
+        output_dir = os.path.join(temp_dir, 'out')
+        result = runner.invoke(cli, ['batch', '--jsonl', jsonl_path, '--sqlite', database, '-d', output_dir])
+        assert result.exit_code == 1
+        assert '5 documents (invalid: 3, ok: 2)' in result.output
+        assert sorted(os.listdir(output_dir)) == ['alice.pdf', 'export-2.pdf']
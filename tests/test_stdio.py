@@ -0,0 +1,74 @@
+"""Tests for rendering from standard input to standard output."""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import yaml
+from click.testing import CliRunner
+
+from cv_builder_from_yaml_to_pdf.main import cli, EXIT_INVALID_INPUT
+
+from tests.test_batch import CV_YAML
+
+
+def test_generate_from_stdin_to_stdout(tmp_path, monkeypatch):
+    """Test that YAML or JSON on stdin renders a PDF to stdout and nothing else."""
+    monkeypatch.chdir(tmp_path)
+    runner = CliRunner()
+    for document in (CV_YAML, json.dumps(yaml.safe_load(CV_YAML))):
+        result = runner.invoke(cli, ['generate', '-', '-o', '-'], input=document.encode('utf-8'))
+        assert result.exit_code == 0, result.stderr
+        assert result.stdout_bytes.startswith(b'%PDF') and result.stdout_bytes.rstrip().endswith(b'%%EOF')
+        assert result.stderr == ''
+    # Without --output, a document read from stdin is also written to stdout
+    result = runner.invoke(cli, ['generate', '-'], input=CV_YAML)
+    assert result.stdout_bytes.startswith(b'%PDF')
+    assert os.listdir(tmp_path) == []
+
+
+def test_generate_file_to_stdout():
+    """Test writing the PDF of a file to stdout without creating the default output file."""
+    runner = CliRunner()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source = os.path.join(temp_dir, 'cv.yaml')
+        with open(source, 'w') as f:
+            f.write(CV_YAML)
+        result = runner.invoke(cli, ['generate', source, '-o', '-'])
+        assert result.exit_code == 0
+        assert result.stdout_bytes.startswith(b'%PDF')
+        assert os.listdir(temp_dir) == ['cv.yaml']
+
+
+def test_profile_reports_go_to_stderr(tmp_path):
+    """Test that profiling a render to stdout keeps its reports out of the PDF."""
+    profiles = [str(tmp_path / name) for name in ('render.pstats', 'render.svg', 'memory.json')]
+    result = CliRunner().invoke(cli, ['generate', '-', '-o', '-', '--cprofile', profiles[0],
+                                      '--flamegraph', profiles[1], '--memprofile', profiles[2]], input=CV_YAML)
+    assert result.exit_code == 0, result.stderr
+    assert result.stdout_bytes.startswith(b'%PDF') and result.stdout_bytes.rstrip().endswith(b'%%EOF')
+    for path in profiles:
+        assert path in result.stderr
+
+
+def test_generate_stdin_errors_go_to_stderr():
+    """Test that invalid input leaves stdout empty and exits with the invalid-input code."""
+    runner = CliRunner()
+    for document in ('personal_info: {}\n', 'personal_info: [\n', b'\xff\xfe'):
+        result = runner.invoke(cli, ['generate', '-', '-o', '-'], input=document)
+        assert result.exit_code == EXIT_INVALID_INPUT
+        assert result.stdout_bytes == b''
+        assert result.stderr.startswith('Error')
+
+    result = runner.invoke(cli, ['generate', '-', '--preview'], input=CV_YAML)
+    assert result.exit_code == 2
+
+
+def test_generate_in_a_pipeline():
+    """Test the command as a filter between real pipes."""
+    process = subprocess.run([sys.executable, '-m', 'cv_builder_from_yaml_to_pdf.main', 'generate', '-'],
+                             input=CV_YAML.encode('utf-8'), capture_output=True, timeout=120)
+    assert process.returncode == 0, process.stderr
+    assert process.stdout.startswith(b'%PDF')
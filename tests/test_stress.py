@@ -0,0 +1,48 @@
+"""Tests for the stress harness."""
+
+import json
+import random
+
+from cv_builder_from_yaml_to_pdf.models import CV
+
+from benchmarks.common import make_large_cv
+from benchmarks.stress import INVALID, MEMORY, OK, TIMEOUT, CaseRunner, generate_case, shrink
+
+
+def test_generated_cases_are_valid_and_reproducible():
+    """Test that cases match the CV schema and depend only on their seed."""
+    for number in range(20):
+        data, stressed = generate_case(random.Random(f"test-{number}"), scale=0.2)
+        CV.model_validate(data)
+        assert generate_case(random.Random(f"test-{number}"), scale=0.2) == (data, stressed)
+
+
+def test_shrink_keeps_only_what_fails():
+    """Test minimising a value down to the parts that make it fail."""
+    data = {'items': [{'text': "plain " * 50}, {'text': "x <b> y " * 20}], 'name': "n" * 1000, 'keep': 1}
+    attempts = []
+
+    def fails(value):
+        attempts.append(value)
+        text = json.dumps(value)
+        return '<b>' in text and '"keep"' in text
+
+    assert shrink(data, fails) == {'items': [{'text': "<b>"}], 'keep': 1}
+    assert len(attempts) < 100
+    assert len(shrink(data, fails, max_attempts=3)) <= len(json.dumps(data))
+
+
+def test_case_runner_budgets():
+    """Test that cases over the time or memory budget are reported as such."""
+    small, large = make_large_cv(1).model_dump(mode='json'), make_large_cv(30).model_dump(mode='json')
+    runner = CaseRunner(time_budget=60, memory_budget=1000)
+    assert runner.run(small)[0] == OK
+    assert runner.run({'personal_info': {}})[0] == INVALID
+
+    runner.memory_budget = 1
+    outcome, seconds, peak, _ = runner.run(large)
+    assert outcome == MEMORY and peak > 1
+
+    runner.time_budget = 0.05
+    outcome, seconds, _, _ = runner.run(large)
+    assert (outcome, seconds) == (TIMEOUT, 0.05)
@@ -0,0 +1,50 @@
+"""Tests for template loading and the template index."""
+
+import os
+import tempfile
+
+import pytest
+import yaml
+
+from cv_builder_from_yaml_to_pdf.templates import TemplateIndex, create_yaml_from_template, list_templates
+
+
+def test_builtin_templates_are_indexed():
+    """Test that the built-in templates are found through package resources."""
+    assert {'default', 'academic', 'minimal'} <= set(list_templates())
+
+    index = TemplateIndex()
+    content = index.get('default')
+    assert 'personal_info' in yaml.safe_load(content)
+    # The content is read once and served from the index afterwards
+    assert index.get('default') is content
+
+
+def test_invalid_template_name():
+    """Test that an unknown template name raises a ValueError."""
+    with pytest.raises(ValueError, match='Valid templates are'):
+        TemplateIndex().get('does-not-exist')
+
+
+def test_user_template_directory_overrides_builtin():
+    """Test that user templates are added and take precedence over built-ins."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        with open(os.path.join(temp_dir, 'team.yaml'), 'w') as f:
+            f.write('personal_info:\n  name: Team Template\n')
+        with open(os.path.join(temp_dir, 'default.yaml'), 'w') as f:
+            f.write('personal_info:\n  name: Overridden\n')
+
+        index = TemplateIndex()
+        index.add_directory(temp_dir)
+
+        assert 'team' in index.names()
+        assert 'Overridden' in index.get('default')
+
+
+def test_create_yaml_from_template():
+    """Test writing a template to a file."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_path = os.path.join(temp_dir, 'cv.yaml')
+        create_yaml_from_template('minimal', output_path)
+        with open(output_path) as f:
+            assert 'personal_info' in yaml.safe_load(f)
@@ -0,0 +1,69 @@
+"""Stress test for rendering CVs from many threads at once."""
+
+import os
+import sys
+import tempfile
+
+import pytest
+from reportlab import rl_config
+
+from cv_builder_from_yaml_to_pdf.batch import run_batch, STATUS_OK
+from cv_builder_from_yaml_to_pdf.pdf_generator import Renderer
+
+from benchmarks.common import make_large_cv
+
+
+@pytest.fixture
+def deterministic_output():
+    """Make reportlab output depend only on the document content."""
+    invariant, switch_interval = rl_config.invariant, sys.getswitchinterval()
+    rl_config.invariant = 1
+    # Switch threads far more often than usual to provoke interleaving
+    sys.setswitchinterval(1e-5)
+    try:
+        yield
+    finally:
+        rl_config.invariant = invariant
+        sys.setswitchinterval(switch_interval)
+
+
+@pytest.mark.parametrize('style,streaming', [('classic', False), ('modern', True), ('minimal', False)])
+def test_concurrent_renders_match_single_threaded(deterministic_output, style, streaming):
+    """Test that renders in a thread pool produce the same bytes as a single-threaded render."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        sources = []
+        for i in range(16):
+            cv = make_large_cv(1 + i % 5, roles_per_company=1 + i % 3, achievements_per_role=2)
+            cv.personal_info.name = f"Candidate {i}"
+            source = os.path.join(temp_dir, f'cv{i}.json')
+            with open(source, 'w') as f:
+                f.write(cv.model_dump_json())
+            sources.append(source)
+
+        serial = {result.source: result for result in
+                  run_batch(sources, os.path.join(temp_dir, 'serial'), style, workers=1, streaming=streaming)}
+        threaded = list(run_batch(sources, os.path.join(temp_dir, 'threaded'), style, workers=8,
+                                  streaming=streaming, executor='thread'))
+
+        assert [result.source for result in threaded] == sources
+        for result in threaded:
+            assert result.status == STATUS_OK, result.error
+            with open(result.output_path, 'rb') as f:
+                threaded_pdf = f.read()
+            with open(serial[result.source].output_path, 'rb') as f:
+                assert threaded_pdf == f.read(), result.source
+
+
+def test_renderer_shares_no_layout_state_between_documents():
+    """Test that each document gets its own frames and page templates."""
+    renderer = Renderer()
+    first, second = renderer.create_document(), renderer.create_document()
+    assert first.pageTemplates[0] is not second.pageTemplates[0]
+    assert first.pageTemplates[0].frames[0] is not second.pageTemplates[0].frames[0]
+
+
+def test_styles_are_isolated_between_renderers():
+    """Test that style sheets, including the mutated Normal style, are never shared."""
+    classic, modern = Renderer('classic', fonts={'Normal': 'Courier'}), Renderer('modern')
+    assert classic.styles['Normal'] is not modern.styles['Normal']
+    assert modern.styles['Normal'].fontName != 'Courier'
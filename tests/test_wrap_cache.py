@@ -0,0 +1,97 @@
+"""Tests for the paragraph line-break cache."""
+
+import pytest
+from reportlab import rl_config
+from reportlab.lib.styles import getSampleStyleSheet
+
+from cv_builder_from_yaml_to_pdf.pdf_generator import Renderer
+from cv_builder_from_yaml_to_pdf.wrap_cache import CachedParagraph, WrapCache, paragraph_key, style_fingerprint
+
+from benchmarks.common import make_large_cv
+
+
+@pytest.fixture
+def deterministic_output():
+    """Make reportlab output depend only on the document content."""
+    invariant = rl_config.invariant
+    rl_config.invariant = 1
+    try:
+        yield
+    finally:
+        rl_config.invariant = invariant
+
+
+@pytest.mark.parametrize('style,streaming', [('classic', False), ('modern', True), ('minimal', False)])
+def test_cached_renders_match_uncached(deterministic_output, style, streaming):
+    """Test that cached line breaks give the same PDF, including paragraphs split across pages."""
+    cv = make_large_cv(4, roles_per_company=2, achievements_per_role=3)
+    # A summary long enough to be split over several pages
+    cv.personal_info.summary = " ".join(f"word{i}" for i in range(3000))
+    uncached = Renderer(style, streaming=streaming, wrap_cache=WrapCache(max_entries=0)).render(cv)
+
+    cache = WrapCache()
+    renderer = Renderer(style, streaming=streaming, wrap_cache=cache)
+    first = renderer.render(cv)
+    misses = cache.stats()['misses']
+    second = renderer.render(cv)
+
+    assert first == second == uncached
+    # The second document, split halves included, is measured entirely from the cache
+    assert cache.stats()['misses'] == misses
+    assert any(isinstance(key[0], tuple) and 'tail' in key[0] for key in cache._entries)
+
+
+def test_style_fingerprint_ignores_names():
+    """Test that equal styles share a fingerprint and different ones do not."""
+    styles = getSampleStyleSheet()
+    normal, body = styles['Normal'], styles['BodyText']
+    assert style_fingerprint(normal) != style_fingerprint(styles['Heading1'])
+    body.spaceBefore = normal.spaceBefore
+    assert style_fingerprint(normal) == style_fingerprint(body)
+
+
+def test_uncacheable_paragraphs():
+    """Test that right-to-left styles and tags with side effects are not cached."""
+    styles = getSampleStyleSheet()
+    rtl = styles['Normal'].clone('RTL', wordWrap='RTL')
+    assert style_fingerprint(rtl) is None
+    assert paragraph_key("Figure <seq id='f'/>", style_fingerprint(styles['Normal'])) is None
+    assert paragraph_key("Plain <b>text</b>", style_fingerprint(styles['Normal'])) is not None
+
+
+def test_cache_is_bounded_and_counts_hits():
+    """Test eviction of the least recently used entries and the hit rate."""
+    cache = WrapCache(max_entries=2)
+    normal = getSampleStyleSheet()['Normal']
+    fingerprint = style_fingerprint(normal)
+    for text in ('one', 'two', 'one', 'three'):
+        CachedParagraph(text, normal, cache=cache, key=paragraph_key(text, fingerprint)).wrap(200, 100)
+
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 3, 2)
+    assert stats['hit_rate'] == 0.25
+    assert [key[0][0] for key in cache._entries] == ['one', 'three']
+
+
+def test_splitting_markup_paragraphs_leaves_the_cache_intact():
+    """Test that splitting a paragraph with cached markup line breaks does not edit the cached fragments."""
+    cache = WrapCache()
+    normal = getSampleStyleSheet()['Normal']
+    text = "<b>bold</b> plain1 plain2 " * 10
+    key = paragraph_key(text, style_fingerprint(normal))
+
+    def words(bl_para):
+        return [[word.text for word in line.words] for line in bl_para.lines]
+
+    CachedParagraph(text, normal, cache=cache, key=key).wrap(100, 1000)
+    entry, = cache._entries.values()
+    expected = words(entry)
+    assert entry.kind == 1 and expected[0] == ['bold', ' plain1 plain2']
+    for _ in range(2):
+        paragraph = CachedParagraph(text, normal, cache=cache, key=key)
+        paragraph.wrap(100, 1000)
+        # Splitting appends a space to the last fragment of each line of the head
+        head, _ = paragraph.split(100, 30)
+        assert words(entry) == expected
+        assert len(head.blPara.lines) == 2
+    assert cache.stats()['hits'] == 2